@@ -6,6 +6,7 @@ import contextlib
 import json
 import logging
 import re
+import threading
 from typing import Any, NamedTuple, Optional, Union
 from urllib import parse as urlparse
 
@@ -148,6 +149,8 @@ class HttpConnector(abstract.Connector):
     self.session.proxies = proxies
     self.session.trust_env = trust_env
     self.session.verify = verify
+    self._session_thread = threading.current_thread()
+    self._thread_local = threading.local()
 
     self.csrf_token: Optional[str] = None
     self.api_methods: dict[str, reflection_pb2.ApiMethod] = {}
@@ -158,6 +161,33 @@ class HttpConnector(abstract.Connector):
     if validate_version:
       self._ValidateVersion()
 
+  def _GetSession(self) -> requests.Session:
+    """Returns a session to be used by the calling thread.
+
+    `requests.Session` is not thread-safe. Threads other than the one that
+    created the connector (e.g. ones prefetching result pages) get sessions
+    of their own, configured like `self.session`.
+
+    Returns:
+      A session object.
+    """
+    if threading.current_thread() is self._session_thread:
+      return self.session
+
+    session = getattr(self._thread_local, "session", None)
+    if session is None:
+      session = requests.Session()
+      session.auth = self.session.auth
+      session.cert = self.session.cert
+      session.proxies = self.session.proxies
+      session.trust_env = self.session.trust_env
+      session.verify = self.session.verify
+      session.headers.update(self.session.headers)
+      session.cookies.update(self.session.cookies)
+      self._thread_local.session = session
+
+    return session
+
   def _GetCSRFToken(self) -> Optional[str]:
     logger.debug("Fetching CSRF token from %s...", self.api_endpoint)
 
@@ -396,13 +426,14 @@ class HttpConnector(abstract.Connector):
     self._InitializeIfNeeded()
     method_descriptor = self.api_methods[handler_name]
 
+    session = self._GetSession()
     request = self.BuildRequest(method_descriptor.name, args)
-    prepped_request = self.session.prepare_request(request)
+    prepped_request = session.prepare_request(request)
 
-    options = self.session.merge_environment_settings(
+    options = session.merge_environment_settings(
         prepped_request.url, self.proxies or {}, None, self.verify, self.cert
     )
-    response = self.session.send(prepped_request, **options)
+    response = session.send(prepped_request, **options)
 
     self._CheckResponseStatus(response)
 
@@ -422,14 +453,15 @@ class HttpConnector(abstract.Connector):
     self._InitializeIfNeeded()
     method_descriptor = self.api_methods[handler_name]
 
+    session = self._GetSession()
     request = self.BuildRequest(method_descriptor.name, args)
-    prepped_request = self.session.prepare_request(request)
+    prepped_request = session.prepare_request(request)
 
-    options = self.session.merge_environment_settings(
+    options = session.merge_environment_settings(
         prepped_request.url, self.proxies or {}, None, self.verify, self.cert
     )
     options["stream"] = True
-    response = self.session.send(prepped_request, **options)
+    response = session.send(prepped_request, **options)
     self._CheckResponseStatus(response)
 
     def GenerateChunks() -> Iterator[bytes]:
@@ -1,12 +1,15 @@
 #!/usr/bin/env python
 """API context definition. Context defines request/response behavior."""
 
+import collections
 from collections.abc import Iterator
+from concurrent import futures
 import itertools
 from typing import Any, Optional
 
 from google.protobuf import message
 from grr_api_client import connectors
+from grr_api_client import errors
 from grr_api_client import utils
 from grr_response_proto.api import user_pb2
 
@@ -14,10 +17,23 @@ from grr_response_proto.api import user_pb2
 class GrrApiContext(object):
   """API context object. Used to make every API request."""
 
-  def __init__(self, connector: connectors.Connector):
+  # Number of pages of paged iterator requests fetched ahead of the consumer.
+  # Prefetching is opt-in: with the default of 1, pages are fetched one by one
+  # as they are consumed.
+  DEFAULT_PREFETCH_PAGES = 1
+
+  def __init__(
+      self,
+      connector: connectors.Connector,
+      prefetch_pages: Optional[int] = None,
+  ):
     super().__init__()
 
+    if prefetch_pages is None:
+      prefetch_pages = self.DEFAULT_PREFETCH_PAGES
+
     self.connector: connectors.Connector = connector
+    self.prefetch_pages: int = prefetch_pages
     self.user: Optional[user_pb2.ApiGrrUser] = None
 
   def SendRequest(
@@ -31,33 +47,100 @@ class GrrApiContext(object):
   # be refactored with protocols (or better yet: completely removed and replaced
   # with properly typed methods).
 
+  def _FetchPage(
+      self,
+      handler_name: str,
+      args: Any,
+      offset: int,
+  ) -> message.Message:
+    """Fetches a single page starting at a given offset."""
+    args_copy = utils.CopyProto(args)
+    args_copy.offset = offset
+    args_copy.count = self.connector.page_size
+    result = self.connector.SendRequest(handler_name, args_copy)
+
+    if result is None:
+      detail = f"No response returned for '{handler_name}'"
+      raise TypeError(detail)
+    if not hasattr(result, "items"):
+      detail = f"Incorrect result type for '{handler_name}': {type(result)}"
+      raise TypeError(detail)
+
+    return result
+
   def _GeneratePages(
       self,
       handler_name: str,
       args: Any,
   ) -> Iterator[message.Message]:
-    """Generates iterator pages."""
+    """Generates iterator pages.
+
+    The first page is fetched right away. Afterwards, if `prefetch_pages` is
+    greater than 1, up to `prefetch_pages` subsequent pages are requested
+    concurrently, so that the next page is usually already available by the
+    time the current one is consumed. Pages past the total number of items
+    reported by the first page (or past the requested count) are never
+    prefetched: they are only fetched one at a time to detect the end of the
+    results. Prefetching requires the connector to support being called from
+    multiple threads.
+
+    Args:
+      handler_name: A name of the API method to call.
+      args: Arguments of the API method (with `offset` and `count` fields).
+
+    Yields:
+      Consecutive result pages, the last one being empty.
+    """
+    page_size = self.connector.page_size
     offset = args.offset
 
-    while True:
-      args_copy = utils.CopyProto(args)
-      args_copy.offset = offset
-      args_copy.count = self.connector.page_size
-      result = self.connector.SendRequest(handler_name, args_copy)
-
-      if result is None:
-        detail = f"No response returned for '{handler_name}'"
-        raise TypeError(detail)
-      if not hasattr(result, "items"):
-        detail = f"Incorrect result type for '{handler_name}': {type(result)}"
-        raise TypeError(detail)
-
-      yield result
-
-      if not result.items:
-        break
-
-      offset += self.connector.page_size
+    result = self._FetchPage(handler_name, args, offset)
+    yield result
+    if not result.items:
+      return
+    offset += page_size
+
+    # There is no point in prefetching pages past the requested count or past
+    # the number of items the server knows about.
+    end = args.offset + args.count if args.count else None
+    total_count = getattr(result, "total_count", None)
+    if total_count:
+      end = total_count if end is None else min(end, total_count)
+
+    if self.prefetch_pages <= 1:
+      while True:
+        result = self._FetchPage(handler_name, args, offset)
+        yield result
+        if not result.items:
+          return
+        offset += page_size
+
+    pending: collections.deque[futures.Future[message.Message]] = (
+        collections.deque()
+    )
+    with futures.ThreadPoolExecutor(
+        max_workers=self.prefetch_pages,
+        thread_name_prefix="grr_api_client_prefetch",
+    ) as executor:
+      try:
+        while True:
+          while len(pending) < self.prefetch_pages and (
+              end is None or offset < end or not pending
+          ):
+            pending.append(
+                executor.submit(self._FetchPage, handler_name, args, offset)
+            )
+            offset += page_size
+
+          result = pending.popleft().result()
+          yield result
+          if not result.items:
+            return
+      finally:
+        # Pages fetched past the end of the results (or past the point where
+        # the consumer stopped iterating) are not needed.
+        for future in pending:
+          future.cancel()
 
   def SendIteratorRequest(
       self,
@@ -101,6 +184,47 @@ class GrrApiContext(object):
   ) -> utils.BinaryChunkIterator:
     return self.connector.SendStreamingRequest(handler_name, args)
 
+  def SendStreamingIteratorRequest(
+      self,
+      handler_name: str,
+      args: message.Message,
+      result_type: type[message.Message],
+      fallback_handler_name: str,
+      fallback_args: Any,
+  ) -> utils.ItemsIterator:
+    """Sends a streaming request for items, falling back to paged requests.
+
+    The streaming method is expected to return items as length-delimited
+    serialized messages in the gzchunked format. If the server (or the API
+    router in use) does not provide the streaming method, the items are read
+    through the paged fallback method instead.
+
+    Args:
+      handler_name: A name of the streaming API method.
+      args: Arguments of the streaming API method.
+      result_type: A type of the streamed messages.
+      fallback_handler_name: A name of the paged API method.
+      fallback_args: Arguments of the paged API method.
+
+    Returns:
+      An iterator over the items.
+    """
+    try:
+      chunks = self.SendStreamingRequest(handler_name, args)
+    except (KeyError, errors.ApiNotImplementedError):
+      return self.SendIteratorRequest(fallback_handler_name, fallback_args)
+
+    def TotalCount() -> Optional[int]:
+      # The stream carries no item count, a single item page provides it. It
+      # is only requested if the caller is interested in the count.
+      count_args = utils.CopyProto(fallback_args)
+      count_args.count = 1
+      count_result = self.SendRequest(fallback_handler_name, count_args)
+      return getattr(count_result, "total_count", None)
+
+    items = map(result_type.FromString, utils.DecodeGzchunked(chunks))
+    return utils.ItemsIterator(items=items, total_count=TotalCount)
+
   @property
   def username(self) -> str:
     if self.user is None:
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+import gzip
+import io
+import struct
+import threading
+from typing import Optional
+
+from absl.testing import absltest
+
+from google.protobuf import message
+from grr_api_client import context
+from grr_api_client import utils
+from grr_response_proto.api import flow_pb2
+
+
+class _FakeConnector:
+  """Connector serving a fixed number of flow results."""
+
+  def __init__(self, num_items: int, page_size: int) -> None:
+    self.num_items = num_items
+    self._page_size = page_size
+    self.requests: list[tuple[str, Optional[message.Message]]] = []
+    self.threads: set[threading.Thread] = set()
+    self._lock = threading.Lock()
+
+  @property
+  def page_size(self) -> int:
+    return self._page_size
+
+  def SendRequest(
+      self,
+      handler_name: str,
+      args: Optional[message.Message],
+  ) -> Optional[message.Message]:
+    with self._lock:
+      self.requests.append((handler_name, args))
+      self.threads.add(threading.current_thread())
+
+    end = min(args.offset + args.count, self.num_items)
+    return flow_pb2.ApiListFlowResultsResult(
+        items=[
+            flow_pb2.ApiFlowResult(tag=str(i)) for i in range(args.offset, end)
+        ],
+        total_count=self.num_items,
+    )
+
+  def SendStreamingRequest(
+      self,
+      handler_name: str,
+      args: message.Message,
+  ) -> utils.BinaryChunkIterator:
+    del handler_name, args  # Unused.
+
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb") as filedesc:
+      for i in range(self.num_items):
+        record = flow_pb2.ApiFlowResult(tag=str(i)).SerializeToString()
+        filedesc.write(struct.pack("!Q", len(record)))
+        filedesc.write(record)
+
+    return utils.BinaryChunkIterator(chunks=iter([buf.getvalue()]))
+
+  @property
+  def offsets(self) -> list[int]:
+    return sorted(args.offset for _, args in self.requests)
+
+
+class GrrApiContextTest(absltest.TestCase):
+
+  def testIteratorRequestFetchesPagesSequentiallyByDefault(self):
+    connector = _FakeConnector(num_items=5, page_size=2)
+    ctx = context.GrrApiContext(connector=connector)
+
+    items = ctx.SendIteratorRequest(
+        "ListFlowResults", flow_pb2.ApiListFlowResultsArgs()
+    )
+
+    self.assertEqual([item.tag for item in items], ["0", "1", "2", "3", "4"])
+    self.assertEqual(connector.offsets, [0, 2, 4, 6])
+    self.assertEqual(connector.threads, {threading.current_thread()})
+
+  def testIteratorRequestDoesNotPrefetchPastTotalCount(self):
+    connector = _FakeConnector(num_items=5, page_size=2)
+    ctx = context.GrrApiContext(connector=connector, prefetch_pages=10)
+
+    items = ctx.SendIteratorRequest(
+        "ListFlowResults", flow_pb2.ApiListFlowResultsArgs()
+    )
+
+    self.assertEqual([item.tag for item in items], ["0", "1", "2", "3", "4"])
+    self.assertEqual(connector.offsets, [0, 2, 4, 6])
+
+  def testIteratorRequestDoesNotPrefetchPastCount(self):
+    connector = _FakeConnector(num_items=100, page_size=2)
+    ctx = context.GrrApiContext(connector=connector, prefetch_pages=10)
+
+    items = ctx.SendIteratorRequest(
+        "ListFlowResults", flow_pb2.ApiListFlowResultsArgs(count=5)
+    )
+
+    self.assertEqual([item.tag for item in items], ["0", "1", "2", "3", "4"])
+    self.assertEqual(connector.offsets, [0, 2, 4])
+
+  def testStreamingIteratorRequestReadsTotalCountLazily(self):
+    connector = _FakeConnector(num_items=3, page_size=2)
+    ctx = context.GrrApiContext(connector=connector)
+
+    items = ctx.SendStreamingIteratorRequest(
+        "StreamFlowResults",
+        flow_pb2.ApiStreamFlowResultsArgs(),
+        flow_pb2.ApiFlowResult,
+        "ListFlowResults",
+        flow_pb2.ApiListFlowResultsArgs(),
+    )
+
+    self.assertEqual([item.tag for item in items], ["0", "1", "2"])
+    self.assertEmpty(connector.requests)
+
+    self.assertEqual(items.total_count, 3)
+    self.assertEqual(items.total_count, 3)
+    self.assertLen(connector.requests, 1)
+
+
+if __name__ == "__main__":
+  absltest.main()
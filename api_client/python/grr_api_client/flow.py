@@ -79,10 +79,17 @@ class FlowBase(object):
     self._context.SendRequest("CancelFlow", args)
 
   def ListResults(self) -> utils.ItemsIterator[FlowResult]:
-    args = flow_pb2.ApiListFlowResultsArgs(
-        client_id=self.client_id, flow_id=self.flow_id
+    items = self._context.SendStreamingIteratorRequest(
+        "StreamFlowResults",
+        flow_pb2.ApiStreamFlowResultsArgs(
+            client_id=self.client_id, flow_id=self.flow_id
+        ),
+        flow_pb2.ApiFlowResult,
+        "ListFlowResults",
+        flow_pb2.ApiListFlowResultsArgs(
+            client_id=self.client_id, flow_id=self.flow_id
+        ),
     )
-    items = self._context.SendIteratorRequest("ListFlowResults", args)
     return utils.MapItemsIterator(lambda data: FlowResult(data=data), items)
 
   def GetExportedResultsArchive(self, plugin_name) -> utils.BinaryChunkIterator:
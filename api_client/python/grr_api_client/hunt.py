@@ -304,8 +304,13 @@ class HuntBase(object):
     return Hunt(data=data, context=self._context)
 
   def ListResults(self) -> utils.ItemsIterator[HuntResult]:
-    args = hunt_pb2.ApiListHuntResultsArgs(hunt_id=self.hunt_id)
-    items = self._context.SendIteratorRequest("ListHuntResults", args)
+    items = self._context.SendStreamingIteratorRequest(
+        "StreamHuntResults",
+        hunt_pb2.ApiStreamHuntResultsArgs(hunt_id=self.hunt_id),
+        hunt_pb2.ApiHuntResult,
+        "ListHuntResults",
+        hunt_pb2.ApiListHuntResultsArgs(hunt_id=self.hunt_id),
+    )
     return utils.MapItemsIterator(
         lambda data: HuntResult(data=data, context=self._context), items
     )
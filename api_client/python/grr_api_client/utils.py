@@ -2,11 +2,12 @@
 """Utility functions and classes for GRR API client library."""
 
 from collections.abc import Callable, Iterator
+import gzip
 import io
 import itertools
 import struct
 import time
-from typing import Any, IO, TypeVar, Union
+from typing import Any, IO, Optional, TypeVar, Union
 
 from cryptography.hazmat.primitives.ciphers import aead
 
@@ -50,17 +51,27 @@ _T = TypeVar("_T")
 
 
 class ItemsIterator(Iterator[_T]):
-  """Iterator object with a total_count property."""
+  """Iterator object with a total_count property.
+
+  The total count can be given as a callable, in which case it is only
+  computed (once) when the `total_count` property is first accessed.
+  """
 
   def __init__(
       self,
       items: Iterator[_T],
-      total_count: int,
+      total_count: Union[Optional[int], Callable[[], Optional[int]]],
   ) -> None:
     super().__init__()
 
     self.items = items
-    self.total_count = total_count
+    self._total_count = total_count
+
+  @property
+  def total_count(self) -> Optional[int]:
+    if callable(self._total_count):
+      self._total_count = self._total_count()
+    return self._total_count
 
   def __iter__(self) -> Iterator[_T]:
     for i in self.items:
@@ -80,7 +91,7 @@ def MapItemsIterator(
 ) -> ItemsIterator[_T2]:
   """Maps ItemsIterator via given function."""
   return ItemsIterator(
-      items=map(function, items), total_count=items.total_count
+      items=map(function, items), total_count=lambda: items.total_count
   )
 
 
@@ -332,6 +343,41 @@ class _Unchunked(io.RawIOBase, IO[bytes]):  # pytype: disable=signature-mismatch
     return self._buf.readinto(buf)
 
 
+def DecodeGzchunked(chunks: Iterator[bytes]) -> Iterator[bytes]:
+  """Decodes a stream in the gzchunked format into a stream of records.
+
+  A gzchunked stream is a sequence of gzip members, each of them containing
+  records prefixed with their length (as a network-endian 64-bit unsigned
+  integer). Chunks of the stream do not need to be aligned with gzip members.
+
+  Args:
+    chunks: Chunks of the stream to decode.
+
+  Yields:
+    Records contained in the stream.
+  """
+  # `GzipFile` transparently reads all the members of a multi-member stream.
+  with gzip.GzipFile(
+      fileobj=io.BufferedReader(_Unchunked(chunks)), mode="rb"
+  ) as stream:
+    while True:
+      header = stream.read(_GZCHUNKED_LENGTH_FORMAT.size)
+      if not header:
+        break
+      if len(header) != _GZCHUNKED_LENGTH_FORMAT.size:
+        raise EOFError(f"Incorrect record header length: {len(header)}")
+
+      (length,) = _GZCHUNKED_LENGTH_FORMAT.unpack(header)
+      data = stream.read(length)
+      if len(data) != length:
+        raise EOFError(f"Incorrect record length: {len(data)} != {length}")
+
+      yield data
+
+
+_GZCHUNKED_LENGTH_FORMAT = struct.Struct("!Q")
+
+
 def AEADDecrypt(stream: IO[bytes], key: bytes) -> IO[bytes]:
   """Decrypts given file-like object using AES algorithm in GCM mode.
 
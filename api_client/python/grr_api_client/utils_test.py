@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import gzip
 import io
 import os
 import struct
@@ -163,5 +164,43 @@ class AEADDecryptTest(absltest.TestCase):
       utils.AEADDecrypt(buf, key).read()
 
 
+
+def _GzchunkedMember(records: list[bytes]) -> bytes:
+  buf = io.BytesIO()
+  with gzip.GzipFile(fileobj=buf, mode="wb") as filedesc:
+    for record in records:
+      filedesc.write(struct.pack("!Q", len(record)))
+      filedesc.write(record)
+  return buf.getvalue()
+
+
+class DecodeGzchunkedTest(absltest.TestCase):
+
+  def testEmpty(self):
+    self.assertEmpty(list(utils.DecodeGzchunked(iter([]))))
+
+  def testSingleMember(self):
+    chunks = [_GzchunkedMember([b"foo", b"", b"bar"])]
+
+    records = list(utils.DecodeGzchunked(iter(chunks)))
+    self.assertEqual(records, [b"foo", b"", b"bar"])
+
+  def testMultipleMembersSplitAtArbitraryBoundaries(self):
+    data = _GzchunkedMember([b"foo", b"bar"]) + _GzchunkedMember([b"baz"])
+    chunks = [data[i : i + 7] for i in range(0, len(data), 7)]
+
+    records = list(utils.DecodeGzchunked(iter(chunks)))
+    self.assertEqual(records, [b"foo", b"bar", b"baz"])
+
+  def testTruncatedRecord(self):
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb") as filedesc:
+      filedesc.write(struct.pack("!Q", 42))
+      filedesc.write(b"foo")
+
+    with self.assertRaises(EOFError):
+      list(utils.DecodeGzchunked(iter([buf.getvalue()])))
+
+
 if __name__ == "__main__":
   absltest.main()
@@ -16,6 +16,12 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
 
+try:
+  import resource  # pylint: disable=g-import-not-at-top
+except ImportError:
+  # The `resource` module is not available on Windows.
+  resource = None
+
 # Our first response in the session is this:
 INITIAL_RESPONSE_ID = 1
 
@@ -41,30 +47,50 @@ class _CpuUsed(NamedTuple):
   sys_time: float
 
 
+def _ThreadCpuTimesSupported() -> bool:
+  return resource is not None and hasattr(resource, "RUSAGE_THREAD")
+
+
 class _CpuTimes:
-  """Accounting of used CPU time."""
+  """Accounting of used CPU time.
+
+  By default, CPU time of the whole process is accounted. If `per_thread` is
+  set and the platform supports it, only CPU time of the calling thread is
+  accounted instead, so that actions running concurrently in other threads are
+  not charged to each other. CPU time of unprivileged servers is always
+  accounted in total.
+  """
 
-  def __init__(self):
+  def __init__(self, per_thread: bool = False):
     self.proc = psutil.Process()
-    self.cpu_start = self.proc.cpu_times()
+    self.per_thread = per_thread and _ThreadCpuTimesSupported()
+    self.cpu_start = self._CpuTimes()
     self.unprivileged_cpu_start = communication.TotalServerCpuTime()
     self.unprivileged_sys_start = communication.TotalServerSysTime()
 
+  def _CpuTimes(self) -> _CpuUsed:
+    if self.per_thread:
+      usage = resource.getrusage(resource.RUSAGE_THREAD)
+      return _CpuUsed(usage.ru_utime, usage.ru_stime)
+
+    times = self.proc.cpu_times()
+    return _CpuUsed(times.user, times.system)
+
   @property
   def cpu_used(self) -> _CpuUsed:
-    end = self.proc.cpu_times()
+    end = self._CpuTimes()
     unprivileged_cpu_end = communication.TotalServerCpuTime()
     unprivileged_sys_end = communication.TotalServerSysTime()
     return _CpuUsed(
         (
-            end.user
-            - self.cpu_start.user
+            end.cpu_time
+            - self.cpu_start.cpu_time
             + unprivileged_cpu_end
             - self.unprivileged_cpu_start
         ),
         (
-            end.system
-            - self.cpu_start.system
+            end.sys_time
+            - self.cpu_start.sys_time
             + unprivileged_sys_end
             - self.unprivileged_sys_start
         ),
@@ -109,8 +135,6 @@ class ActionPlugin(object):
 
   _PROGRESS_THROTTLE_INTERVAL = rdfvalue.Duration.From(2, rdfvalue.SECONDS)
 
-  last_progress_time = rdfvalue.RDFDatetime.FromSecondsSinceEpoch(0)
-
   def __init__(self, grr_worker=None):
     """Initializes the action plugin.
 
@@ -132,14 +156,19 @@ class ActionPlugin(object):
     self.cpu_limit = rdf_flows.GrrMessage().cpu_limit
     self.start_time = None
     self.runtime_limit = None
+    # Progress is throttled per action: with actions running concurrently, the
+    # worker only heartbeats once each of them has reported progress.
+    self.last_progress_time = rdfvalue.RDFDatetime.FromSecondsSinceEpoch(0)
 
-  def Execute(self, message):
+  def Execute(self, message, per_thread_cpu_times=False):
     """This function parses the RDFValue from the server.
 
     The Run method will be called with the specified RDFValue.
 
     Args:
       message:     The GrrMessage that we are called to process.
+      per_thread_cpu_times: If True, only CPU time of the calling thread is
+        charged to the action. Used when actions run concurrently.
 
     Returns:
        Upon return a callback will be called on the server to register
@@ -175,7 +204,7 @@ class ActionPlugin(object):
             "Message for %s was not Authenticated." % self.message.name
         )
 
-      self.cpu_times = _CpuTimes()
+      self.cpu_times = _CpuTimes(per_thread=per_thread_cpu_times)
       self.cpu_limit = self.message.cpu_limit
 
       if getattr(flags.FLAGS, "debug_client_actions", False):
@@ -350,7 +379,7 @@ class ActionPlugin(object):
       RuntimeExceededError: Runtime limit exceeded.
     """
     now = rdfvalue.RDFDatetime.Now()
-    time_since_last_progress = now - ActionPlugin.last_progress_time
+    time_since_last_progress = now - self.last_progress_time
 
     if time_since_last_progress <= self._PROGRESS_THROTTLE_INTERVAL:
       return
@@ -362,7 +391,7 @@ class ActionPlugin(object):
           )
       )
 
-    ActionPlugin.last_progress_time = now
+    self.last_progress_time = now
 
     self.grr_worker.Heartbeat()
 
@@ -28,11 +28,13 @@ class GRRClientWorker(threading.Thread):
   """This client worker runs the main loop in another thread.
 
   The client which uses this worker is not blocked while queuing messages to be
-  worked on. There is only a single working thread though.
+  worked on. The messages are handed over to a bounded pool of threads running
+  the client actions (see `_ActionScheduler`), so that a long running action
+  does not block quick actions of other flows.
 
   The overall effect is that the HTTP client is not blocked waiting for actions
-  to be executed, and at the same time, the client working thread is not blocked
-  waiting on network latency.
+  to be executed, and at the same time, the client working threads are not
+  blocked waiting on network latency.
   """
 
   sent_bytes_per_flow = {}
@@ -43,7 +45,20 @@ class GRRClientWorker(threading.Thread):
     # A reference to the parent client that owns us.
     self.client = client
 
-    self._is_active = False
+    self._num_active = 0
+
+    self._max_concurrent_actions = config.CONFIG[
+        "Client.max_concurrent_actions"
+    ]
+
+    # Messages currently being handled, oldest first. The transaction log keeps
+    # the oldest of them.
+    self._transactions = []
+
+    # Threads currently handling a message and those of them that haven't
+    # reported progress since the last heartbeat, see `Heartbeat`.
+    self._action_threads = set()
+    self._action_threads_without_progress = set()
 
     self.proc = psutil.Process()
 
@@ -59,7 +74,9 @@ class GRRClientWorker(threading.Thread):
 
     # This queue should never hit its maximum since the server will throttle
     # messages before this.
-    self._in_queue = utils.HeartbeatQueue(callback=heart_beat_cb, maxsize=1024)
+    self._in_queue = utils.HeartbeatQueue(
+        callback=self.Heartbeat, maxsize=1024
+    )
 
     if out_queue is not None:
       self._out_queue = out_queue
@@ -68,7 +85,7 @@ class GRRClientWorker(threading.Thread):
       # is too large, the worker thread will block until the queue is drained.
       self._out_queue = SizeLimitedQueue(
           maxsize=config.CONFIG["Client.max_out_queue"],
-          heart_beat_cb=self.heart_beat_cb,
+          heart_beat_cb=self.Heartbeat,
       )
 
     self.daemon = True
@@ -110,8 +127,21 @@ class GRRClientWorker(threading.Thread):
     self.transaction_log.Sync()
 
   def Heartbeat(self):
-    if self.heart_beat_cb:
-      self.heart_beat_cb()
+    """Heartbeats on behalf of the calling thread.
+
+    While client actions are running, the heartbeat is only passed on once each
+    of them has reported progress since the previous one. This way a hung
+    action is still detected while other actions (or the idle worker loop) keep
+    heartbeating.
+    """
+    with self.lock:
+      if self._action_threads:
+        self._action_threads_without_progress.discard(threading.get_ident())
+        if self._action_threads_without_progress:
+          return
+        self._action_threads_without_progress = set(self._action_threads)
+
+    self.heart_beat_cb()
 
   def SendReply(
       self,
@@ -197,7 +227,9 @@ class GRRClientWorker(threading.Thread):
     Raises:
         RuntimeError: The client action requested was not found.
     """
-    self._is_active = True
+    with self.lock:
+      self._num_active += 1
+      self._action_threads.add(threading.get_ident())
     try:
       action_cls = client_actions.REGISTRY.get(message.name)
       if action_cls is None:
@@ -206,20 +238,55 @@ class GRRClientWorker(threading.Thread):
       action = action_cls(grr_worker=self)
 
       # Write the message to the transaction log.
+      self._BeginTransaction(message)
+
+      succeeded = False
+      try:
+        # Heartbeat so we have the full period to work on this message.
+        action.Progress()
+        action.Execute(
+            message,
+            per_thread_cpu_times=self._max_concurrent_actions > 1,
+        )
+        succeeded = True
+      finally:
+        # Only remove the transaction if the action did not raise.
+        self._EndTransaction(message, clear=succeeded)
+    finally:
+      with self.lock:
+        self._num_active -= 1
+        self._action_threads.discard(threading.get_ident())
+        self._action_threads_without_progress.discard(threading.get_ident())
+
+  def _BeginTransaction(self, message):
+    with self.lock:
+      self._transactions.append(message)
       self.transaction_log.Write(message)
 
-      # Heartbeat so we have the full period to work on this message.
-      action.Progress()
-      action.Execute(message)
+  def _EndTransaction(self, message, clear=True):
+    """Removes a handled message from the transaction log.
 
-      # If we get here without exception, we can remove the transaction.
-      self.transaction_log.Clear()
-    finally:
-      self._is_active = False
+    The transaction log only holds a single message. While other messages are
+    still being handled, the oldest of them is kept in the log instead.
+
+    Args:
+      message: The handled message.
+      clear: If False, the message is left in the log, so that it is reported
+        as failed on the next startup.
+    """
+    with self.lock:
+      self._transactions = [m for m in self._transactions if m is not message]
+      if not clear:
+        return
+
+      if self._transactions:
+        self.transaction_log.Write(self._transactions[0])
+      else:
+        self.transaction_log.Clear()
 
   def IsActive(self):
     """Returns True if worker is currently handling a message."""
-    return self._is_active
+    return self._num_active > 0
 
   def SendClientAlert(self, msg):
     self.SendReply(
@@ -265,47 +332,223 @@ class GRRClientWorker(threading.Thread):
     action = admin.SendStartupInfo(grr_worker=self)
     action.Run(None, ttl=1)
 
+  def _ProcessMessage(self, message):
+    """Handles a single message, reporting errors back to the server."""
+    try:
+      self.HandleMessage(message)
+      # Catch any errors and keep going here
+    except Exception as e:  # pylint: disable=broad-except
+      logging.warning("%s", e)
+      self.SendReply(
+          rdf_flows.GrrStatus(
+              status=rdf_flows.GrrStatus.ReturnedStatus.GENERIC_ERROR,
+              error_message=utils.SmartUnicode(e),
+          ),
+          request_id=message.request_id,
+          response_id=1,
+          session_id=message.session_id,
+          message_type=rdf_flows.GrrMessage.Type.STATUS,
+      )
+      if flags.FLAGS.pdb_post_mortem:
+        pdb.post_mortem()
+
   def run(self):
     """Main thread for processing messages."""
 
     self.OnStartup()
 
+    scheduler = _ActionScheduler(
+        self._ProcessMessage,
+        max_concurrent=self._max_concurrent_actions,
+        heavy_actions=config.CONFIG["Client.heavy_actions"],
+        max_concurrent_heavy=config.CONFIG[
+            "Client.max_concurrent_heavy_actions"
+        ],
+        max_pending=self._in_queue.maxsize,
+        heart_beat_cb=self.Heartbeat,
+    )
+
     try:
+      scheduler.Start()
+
       while True:
         message = self._in_queue.get()
 
         # A message of None is our terminal message.
         if message is None:
+          scheduler.Join()
           break
 
-        try:
-          self.HandleMessage(message)
-          # Catch any errors and keep going here
-        except Exception as e:  # pylint: disable=broad-except
-          logging.warning("%s", e)
-          self.SendReply(
-              rdf_flows.GrrStatus(
-                  status=rdf_flows.GrrStatus.ReturnedStatus.GENERIC_ERROR,
-                  error_message=utils.SmartUnicode(e),
-              ),
-              request_id=message.request_id,
-              response_id=1,
-              session_id=message.session_id,
-              message_type=rdf_flows.GrrMessage.Type.STATUS,
-          )
-          if flags.FLAGS.pdb_post_mortem:
-            pdb.post_mortem()
+        scheduler.Submit(message)
 
     except Exception as e:  # pylint: disable=broad-except
       logging.error("Exception outside of the processing loop: %r", e)
     finally:
-      # There's no point in running the client if it's broken out of the
-      # processing loop and it should be restarted shortly anyway.
-      logging.fatal("The client has broken out of its processing loop.")
+      _Abort("The client has broken out of its processing loop.")
+
+
+def _Abort(reason):
+  # There's no point in running the client if it's broken out of the
+  # processing loop and it should be restarted shortly anyway.
+  logging.fatal(reason)
+
+  # The binary (Python threading library, perhaps) has proven in tests to be
+  # very persistent to termination calls, so we kill it with fire.
+  os.kill(os.getpid(), signal.SIGKILL)
+
+
+class _ActionScheduler(object):
+  """Runs client action messages on a bounded pool of threads.
+
+  Messages of the same session are handled one at a time, in the order in
+  which they were submitted. Heavy actions (e.g. ones reading a lot of files
+  or process memory) are additionally limited to a smaller number of
+  concurrent runs, so that they can't take up all of the threads.
+  """
+
+  def __init__(
+      self,
+      handle_fn,
+      max_concurrent,
+      heavy_actions=(),
+      max_concurrent_heavy=1,
+      max_pending=1024,
+      heart_beat_cb=None,
+  ):
+    """Initializes the scheduler.
+
+    Args:
+      handle_fn: A function called with every submitted message.
+      max_concurrent: Maximum number of messages handled at the same time.
+      heavy_actions: Names of client actions considered heavy.
+      max_concurrent_heavy: Maximum number of heavy actions handled at the same
+        time.
+      max_pending: Maximum number of messages waiting to be handled. Submitting
+        more messages blocks.
+      heart_beat_cb: A callback called periodically while `Submit` blocks.
+    """
+    self._handle_fn = handle_fn
+    self._max_concurrent = max(1, max_concurrent)
+    self._heavy_actions = frozenset(heavy_actions)
+    self._max_concurrent_heavy = max(1, max_concurrent_heavy)
+    self._max_pending = max_pending
+    self._heart_beat_cb = heart_beat_cb or (lambda: None)
+
+    self._cond = threading.Condition()
+    self._pending = collections.deque()
+    self._running_sessions = set()
+    self._num_running = 0
+    self._num_running_heavy = 0
+    self._stopped = False
+    self._threads = []
+
+  def Start(self):
+    for i in range(self._max_concurrent):
+      thread = threading.Thread(
+          name="ClientActionRunner%d" % i, target=self._RunLoop
+      )
+      thread.daemon = True
+      thread.start()
+      self._threads.append(thread)
+
+  def Stop(self):
+    """Stops the threads once they are done with their current messages."""
+    with self._cond:
+      self._stopped = True
+      self._cond.notify_all()
+
+    for thread in self._threads:
+      thread.join()
+    self._threads = []
+
+  def Submit(self, message, poll_interval=5):
+    """Queues a message, blocking while too many messages are pending."""
+    while True:
+      with self._cond:
+        if len(self._pending) < self._max_pending:
+          self._pending.append(message)
+          self._cond.notify_all()
+          return
+
+        if self._cond.wait(timeout=poll_interval):
+          continue
+
+      self._heart_beat_cb()
+
+  def Join(self):
+    """Waits until all submitted messages are handled."""
+    with self._cond:
+      while self._pending or self._num_running:
+        self._cond.wait()
+
+  def _IsHeavy(self, message):
+    return message.name in self._heavy_actions
+
+  def _PopRunnable(self):
+    """Removes the first message that can be run now from the pending ones.
+
+    Lock should be held by the caller.
+
+    Returns:
+      A message or None if no pending message can be run.
+    """
+    heavy_allowed = self._num_running_heavy < self._max_concurrent_heavy
 
-      # The binary (Python threading library, perhaps) has proven in tests to be
-      # very persistent to termination calls, so we kill it with fire.
-      os.kill(os.getpid(), signal.SIGKILL)
+    blocked_sessions = set(self._running_sessions)
+    for index, message in enumerate(self._pending):
+      session_id = str(message.session_id)
+      if session_id not in blocked_sessions and (
+          heavy_allowed or not self._IsHeavy(message)
+      ):
+        del self._pending[index]
+        return message
+
+      # Later messages of this session have to wait for this one.
+      blocked_sessions.add(session_id)
+
+    return None
+
+  def _Acquire(self):
+    """Waits for a runnable message, returns None once stopped."""
+    with self._cond:
+      while True:
+        if self._stopped:
+          return None
+
+        message = self._PopRunnable()
+        if message is not None:
+          break
+
+        self._cond.wait()
+
+      self._running_sessions.add(str(message.session_id))
+      self._num_running += 1
+      self._num_running_heavy += self._IsHeavy(message)
+      return message
+
+  def _Release(self, message):
+    with self._cond:
+      self._running_sessions.discard(str(message.session_id))
+      self._num_running -= 1
+      self._num_running_heavy -= self._IsHeavy(message)
+      self._cond.notify_all()
+
+  def _RunLoop(self):
+    """Main loop of a single action thread."""
+    try:
+      while True:
+        message = self._Acquire()
+        if message is None:
+          return
+
+        try:
+          self._handle_fn(message)
+        finally:
+          self._Release(message)
+
+    except Exception as e:  # pylint: disable=broad-except
+      logging.error("Exception outside of the action processing loop: %r", e)
+      _Abort("A client action thread has broken out of its processing loop.")
 
 
 class SizeLimitedQueue(object):
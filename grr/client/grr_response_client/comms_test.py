@@ -1,10 +1,16 @@
 #!/usr/bin/env python
 """Test for client comms."""
 
+import queue
+import threading
+from unittest import mock
+
 from absl import app
+from absl.testing import absltest
 
 from grr_response_client import comms
 from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr.test_lib import test_lib
 
 
@@ -24,6 +30,108 @@ class GRRClientWorkerTest(test_lib.GRRBaseTest):
     self.assertIsInstance(messages[0].payload, rdfvalue.RDFDatetime)
     self.assertEqual(messages[0].payload, rdfvalue.RDFDatetime(0))
 
+  def testHungActionIsNotHiddenByOtherHeartbeats(self):
+    heartbeats = []
+    worker = comms.GRRClientWorker(heart_beat_cb=lambda: heartbeats.append(1))
+
+    def HeartbeatFromThread(ident):
+      with mock.patch.object(threading, "get_ident", return_value=ident):
+        worker.Heartbeat()
+
+    worker._action_threads.update([1, 2])
+
+    # The idle worker loop and the first action keep heartbeating while the
+    # second action is hung.
+    HeartbeatFromThread(0)
+    self.assertLen(heartbeats, 1)
+    for _ in range(3):
+      HeartbeatFromThread(0)
+      HeartbeatFromThread(1)
+    self.assertLen(heartbeats, 1)
+
+    HeartbeatFromThread(2)
+    self.assertLen(heartbeats, 2)
+
+
+class ActionSchedulerTest(absltest.TestCase):
+  """Tests the _ActionScheduler class."""
+
+  def setUp(self):
+    super().setUp()
+    self.started = queue.Queue()
+    self.release = threading.Event()
+    self.handled = []
+
+  def _Handle(self, message):
+    self.started.put(message.name)
+    if message.name.startswith("Heavy"):
+      self.release.wait(10)
+    self.handled.append(message.name)
+
+  def _StartScheduler(self, **kwargs):
+    scheduler = comms._ActionScheduler(self._Handle, **kwargs)
+    scheduler.Start()
+    self.addCleanup(scheduler.Stop)
+    self.addCleanup(self.release.set)
+    return scheduler
+
+  def _Submit(self, scheduler, name, session_id):
+    scheduler.Submit(
+        rdf_flows.GrrMessage(name=name, session_id=session_id, request_id=1)
+    )
+
+  def _AssertNothingStarted(self):
+    with self.assertRaises(queue.Empty):
+      self.started.get(timeout=0.2)
+
+  def testCheapActionRunsWhileHeavyActionIsRunning(self):
+    scheduler = self._StartScheduler(
+        max_concurrent=2, heavy_actions=["HeavyAction"]
+    )
+
+    self._Submit(scheduler, "HeavyAction", "W:1")
+    self.assertEqual(self.started.get(timeout=10), "HeavyAction")
+    self._Submit(scheduler, "CheapAction", "W:2")
+    self.assertEqual(self.started.get(timeout=10), "CheapAction")
+
+    self.release.set()
+    scheduler.Join()
+    self.assertEqual(self.handled, ["CheapAction", "HeavyAction"])
+
+  def testHeavyActionsAreLimited(self):
+    scheduler = self._StartScheduler(
+        max_concurrent=3,
+        heavy_actions=["HeavyAction1", "HeavyAction2"],
+        max_concurrent_heavy=1,
+    )
+
+    self._Submit(scheduler, "HeavyAction1", "W:1")
+    self.assertEqual(self.started.get(timeout=10), "HeavyAction1")
+    self._Submit(scheduler, "HeavyAction2", "W:2")
+    self._AssertNothingStarted()
+
+    self.release.set()
+    scheduler.Join()
+    self.assertEqual(self.handled, ["HeavyAction1", "HeavyAction2"])
+
+  def testMessagesOfSessionAreHandledInOrder(self):
+    scheduler = self._StartScheduler(
+        max_concurrent=3, heavy_actions=["HeavyAction"]
+    )
+
+    self._Submit(scheduler, "HeavyAction", "W:1")
+    self.assertEqual(self.started.get(timeout=10), "HeavyAction")
+    self._Submit(scheduler, "CheapAction1", "W:1")
+    self._Submit(scheduler, "CheapAction2", "W:2")
+    self.assertEqual(self.started.get(timeout=10), "CheapAction2")
+    self._AssertNothingStarted()
+
+    self.release.set()
+    scheduler.Join()
+    self.assertEqual(
+        self.handled, ["CheapAction2", "HeavyAction", "CheapAction1"]
+    )
+
 
 def main(argv):
   test_lib.main(argv)
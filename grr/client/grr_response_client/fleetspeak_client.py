@@ -11,6 +11,7 @@ import queue
 import struct
 import threading
 import time
+from typing import NamedTuple, Optional, Sequence
 import zlib
 
 from absl import flags
@@ -20,6 +21,7 @@ from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_proto import jobs_pb2
 from fleetspeak.src.common.proto.fleetspeak import common_pb2 as fs_common_pb2
 from fleetspeak.client_connector import connector as fs_client
@@ -39,6 +41,22 @@ _MAX_MSG_LIST_BYTES = 1 << 20  # 1 MiB
 # Maximum number of GrrMessages to put in one PackedMessageList.
 _MAX_MSG_LIST_MSG_COUNT = 100
 
+# Maximum time (in seconds) to wait for more GrrMessages to add to a
+# PackedMessageList once its first message was queued. Messages are usually
+# queued in bursts, so a short wait batches them without delaying a lone message
+# much.
+_MAX_MSG_LIST_DELAY = 0.2
+
+# A MessageList is not compressed if at least this fraction of it consists of
+# payloads that are compressed already.
+_MAX_PRECOMPRESSED_RATIO = 0.9
+
+# Encoded tag of the `job` field of a MessageList.
+_MESSAGE_LIST_JOB_TAG = rdf_structs.VarintEncode(
+    jobs_pb2.MessageList.DESCRIPTOR.fields_by_name["job"].number << 3
+    | rdf_structs.WIRETYPE_LENGTH_DELIMITED
+)
+
 # Maximum size of annotations to add for a Fleetspeak message.
 _MAX_ANNOTATIONS_BYTES = 3 << 10  # 3 KiB
 
@@ -53,15 +71,70 @@ class BrokenFSConnectionError(Exception):
   pass
 
 
+class _SerializedMessage(NamedTuple):
+  """A GrrMessage serialized once, when it is queued for sending."""
+
+  data: bytes
+  # Value of the data ids annotation, None if the message has no ids.
+  data_ids: Optional[str]
+  # Whether the payload of the message is compressed already.
+  compressed: bool
+
+
+def _SerializeMessage(grr_msg: rdf_flows.GrrMessage) -> _SerializedMessage:
+  """Serializes a GrrMessage for sending."""
+  data_ids = None
+  if (
+      grr_msg.session_id is not None
+      and grr_msg.request_id is not None
+      and grr_msg.response_id is not None
+  ):
+    data_ids = "%s:%d:%d" % (
+        grr_msg.session_id.Basename(),
+        grr_msg.request_id,
+        grr_msg.response_id,
+    )
+
+  return _SerializedMessage(
+      data=grr_msg.SerializeToBytes(),
+      data_ids=data_ids,
+      compressed=_IsPayloadCompressed(grr_msg),
+  )
+
+
+def _IsPayloadCompressed(grr_msg: rdf_flows.GrrMessage) -> bool:
+  # File contents are uploaded as blobs, compressed by the client actions.
+  if grr_msg.args_rdf_name != rdf_protodict.DataBlob.__name__:
+    return False
+
+  return (
+      grr_msg.payload.compression
+      == rdf_protodict.DataBlob.CompressionType.ZCOMPRESSION
+  )
+
+
 def _EncodeMessageList(
-    message_list: rdf_flows.MessageList,
+    messages: Sequence[_SerializedMessage],
     packed_message_list: rdf_flows.PackedMessageList,
 ) -> None:
-  """Encode the MessageList into the packed_message_list rdfvalue."""
+  """Encode the messages as a MessageList into the packed_message_list."""
+  # A serialized MessageList is a concatenation of its length-delimited `job`
+  # fields, so the messages don't need to be serialized again.
+  chunks = []
+  for message in messages:
+    chunks.append(_MESSAGE_LIST_JOB_TAG)
+    chunks.append(rdf_structs.VarintEncode(len(message.data)))
+    chunks.append(message.data)
+
   # By default uncompress
-  uncompressed_data = message_list.SerializeToBytes()
+  uncompressed_data = b"".join(chunks)
   packed_message_list.message_list = uncompressed_data
 
+  # Compressing already compressed payloads again doesn't buy us anything.
+  precompressed_size = sum(len(m.data) for m in messages if m.compressed)
+  if precompressed_size >= _MAX_PRECOMPRESSED_RATIO * len(uncompressed_data):
+    return
+
   compressed_data = zlib.compress(uncompressed_data)
 
   # Only compress if it buys us something.
@@ -153,10 +226,10 @@ class GRRFleetspeakClient(object):
     )
     time.sleep(period)
 
-  def _SendMessages(self, grr_msgs, background=False):
-    """Sends a block of messages through Fleetspeak."""
+  def _SendMessages(self, msgs, background=False):
+    """Sends a block of serialized messages through Fleetspeak."""
     message_list = rdf_flows.PackedMessageList()
-    _EncodeMessageList(rdf_flows.MessageList(job=grr_msgs), message_list)
+    _EncodeMessageList(msgs, message_list)
     fs_msg = fs_common_pb2.Message(
         message_type="MessageList",
         destination=fs_common_pb2.Address(service_name="GRR"),
@@ -164,23 +237,15 @@ class GRRFleetspeakClient(object):
     )
     fs_msg.data.Pack(message_list.AsPrimitiveProto())
 
-    for grr_msg in grr_msgs:
-      if (
-          grr_msg.session_id is None
-          or grr_msg.request_id is None
-          or grr_msg.response_id is None
-      ):
+    for msg in msgs:
+      if msg.data_ids is None:
         continue
       # Place all ids in a single annotation, instead of having separate
       # annotations for the flow-id, request-id and response-id. This reduces
       # overall size of the annotations by half (~60 bytes to ~30 bytes).
       annotation = fs_msg.annotations.entries.add()
       annotation.key = _DATA_IDS_ANNOTATION_KEY
-      annotation.value = "%s:%d:%d" % (
-          grr_msg.session_id.Basename(),
-          grr_msg.request_id,
-          grr_msg.response_id,
-      )
+      annotation.value = msg.data_ids
       if fs_msg.annotations.ByteSize() >= _MAX_ANNOTATIONS_BYTES:
         break
 
@@ -197,14 +262,19 @@ class GRRFleetspeakClient(object):
     msgs.append(msg)
 
     count = 1
-    size = len(msg.SerializeToBytes())
+    size = len(msg.data)
+    deadline = time.monotonic() + _MAX_MSG_LIST_DELAY
 
     while count < _MAX_MSG_LIST_MSG_COUNT and size < _MAX_MSG_LIST_BYTES:
+      timeout = deadline - time.monotonic()
+      if timeout <= 0:
+        break
+
       try:
-        msg = self._sender_queue.get(timeout=1)
+        msg = self._sender_queue.get(timeout=timeout)
         msgs.append(msg)
         count += 1
-        size += len(msg.SerializeToBytes())
+        size += len(msg.data)
       except queue.Empty:
         break
 
@@ -247,14 +317,17 @@ class _FleetspeakQueueForwarder(object):
 
   def Put(self, grr_msg, block=True, timeout=None):
     """Places a message in the queue."""
+    # Messages are serialized on the calling thread, once.
+    msg = _SerializeMessage(grr_msg)
+
     if not block:
-      self._sender_queue.put(grr_msg, block=False)
+      self._sender_queue.put(msg, block=False)
     else:
       t0 = time.time()
       while not timeout or (time.time() - t0 < timeout):
         self.heart_beat_cb()
         try:
-          self._sender_queue.put(grr_msg, timeout=1)
+          self._sender_queue.put(msg, timeout=1)
           return
         except queue.Full:
           continue
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 import logging
+import threading
 from unittest import mock
 import zlib
 
@@ -10,6 +11,7 @@ from grr_response_client import comms
 from grr_response_client import fleetspeak_client
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr.test_lib import test_lib
 from fleetspeak.src.common.proto.fleetspeak import common_pb2 as fs_common_pb2
 from fleetspeak.client_connector import connector as fs_client
@@ -70,7 +72,7 @@ class FleetspeakClientTest(absltest.TestCase):
       annotation.key = fleetspeak_client._DATA_IDS_ANNOTATION_KEY
       annotation.value = "%s:2:%d" % (flow_id, len(grr_messages) + 1)
       grr_messages.append(grr_message)
-      client._sender_queue.put(grr_message)
+      client._sender_queue.put(fleetspeak_client._SerializeMessage(grr_message))
 
     # Add an extra GrrMessage whose annotation will not be captured.
     extra_message = rdf_flows.GrrMessage(
@@ -80,7 +82,9 @@ class FleetspeakClientTest(absltest.TestCase):
         response_id=1,
     )
     grr_messages.append(extra_message)
-    client._sender_queue.put(extra_message)
+    client._sender_queue.put(
+        fleetspeak_client._SerializeMessage(extra_message)
+    )
 
     self.assertLess(
         len(grr_messages), fleetspeak_client._MAX_MSG_LIST_MSG_COUNT
@@ -127,6 +131,123 @@ class FleetspeakClientTest(absltest.TestCase):
       self.assertEqual(l.call_count, 1)
       self.assertIn("Broken local Fleetspeak connection", l.call_args[0][0])
 
+  @mock.patch.object(fs_client, "FleetspeakConnection")
+  @mock.patch.object(comms, "GRRClientWorker")
+  @mock.patch.object(fleetspeak_client, "_MAX_MSG_LIST_DELAY", 1)
+  def testSendOpBatchesMessagesQueuedDuringDelay(
+      self, mock_worker_class, mock_conn_class
+  ):
+    # We stub out the worker class since it starts threads in its
+    # __init__ method.
+    del mock_worker_class  # Unused
+
+    mock_conn = mock.Mock()
+    mock_conn.Send.return_value = 123
+    mock_conn_class.return_value = mock_conn
+    client = fleetspeak_client.GRRFleetspeakClient()
+
+    grr_messages = [
+        rdf_flows.GrrMessage(
+            session_id="C.0123456789abcdef/01234567",
+            name="TestClientAction",
+            request_id=2,
+            response_id=i,
+        )
+        for i in range(1, 3)
+    ]
+    client._sender_queue.put(
+        fleetspeak_client._SerializeMessage(grr_messages[0])
+    )
+    timer = threading.Timer(
+        0.1,
+        client._sender_queue.put,
+        args=(fleetspeak_client._SerializeMessage(grr_messages[1]),),
+    )
+    timer.start()
+    self.addCleanup(timer.join)
+
+    client._SendOp()
+
+    mock_conn.Send.assert_called_once()
+    fs_message = mock_conn.Send.call_args[0][0]
+    packed_message_list = rdf_flows.PackedMessageList.protobuf()
+    fs_message.data.Unpack(packed_message_list)
+    message_list = _DecompressMessageList(
+        rdf_flows.PackedMessageList.FromSerializedBytes(
+            packed_message_list.SerializeToString()
+        )
+    )
+    self.assertListEqual(list(message_list.job), grr_messages)
+
+
+class EncodeMessageListTest(absltest.TestCase):
+
+  def testEncodesMessageList(self):
+    grr_messages = [
+        rdf_flows.GrrMessage(
+            session_id="C.0123456789abcdef/01234567",
+            name="TestClientAction",
+            request_id=1,
+            response_id=i,
+            payload=rdf_protodict.DataBlob(string="foo" * i),
+        )
+        for i in range(1, 10)
+    ]
+
+    packed_message_list = rdf_flows.PackedMessageList()
+    fleetspeak_client._EncodeMessageList(
+        [fleetspeak_client._SerializeMessage(m) for m in grr_messages],
+        packed_message_list,
+    )
+
+    self.assertEqual(
+        _DecompressMessageList(packed_message_list).SerializeToBytes(),
+        rdf_flows.MessageList(job=grr_messages).SerializeToBytes(),
+    )
+
+  def testDoesNotCompressCompressedPayloads(self):
+    grr_message = rdf_flows.GrrMessage(
+        session_id="C.0123456789abcdef/TransferStore",
+        payload=rdf_protodict.DataBlob(
+            data=zlib.compress(b"foo" * 10000),
+            compression=rdf_protodict.DataBlob.CompressionType.ZCOMPRESSION,
+        ),
+    )
+
+    packed_message_list = rdf_flows.PackedMessageList()
+    fleetspeak_client._EncodeMessageList(
+        [fleetspeak_client._SerializeMessage(grr_message)],
+        packed_message_list,
+    )
+
+    self.assertEqual(
+        packed_message_list.compression,
+        rdf_flows.PackedMessageList.CompressionType.UNCOMPRESSED,
+    )
+    self.assertEqual(
+        _DecompressMessageList(packed_message_list).job, [grr_message]
+    )
+
+  def testCompressesUncompressedPayloads(self):
+    grr_message = rdf_flows.GrrMessage(
+        session_id="C.0123456789abcdef/TransferStore",
+        payload=rdf_protodict.DataBlob(data=b"foo" * 10000),
+    )
+
+    packed_message_list = rdf_flows.PackedMessageList()
+    fleetspeak_client._EncodeMessageList(
+        [fleetspeak_client._SerializeMessage(grr_message)],
+        packed_message_list,
+    )
+
+    self.assertEqual(
+        packed_message_list.compression,
+        rdf_flows.PackedMessageList.CompressionType.ZCOMPRESSION,
+    )
+    self.assertEqual(
+        _DecompressMessageList(packed_message_list).job, [grr_message]
+    )
+
 
 if __name__ == "__main__":
   app.run(test_lib.main)
@@ -76,6 +76,31 @@ config_lib.DEFINE_integer("Client.max_post_size", 40000000,
 config_lib.DEFINE_integer("Client.max_out_queue", 51200000,
                           "Maximum size of the output queue.")
 
+config_lib.DEFINE_integer(
+    "Client.max_concurrent_actions", 1,
+    "Maximum number of client actions the client runs concurrently. Messages "
+    "of the same flow are always processed one at a time, in order. Note that "
+    "the transaction log holds a single message, so if the client dies while "
+    "running several actions, only the oldest of them is reported as killed.")
+
+config_lib.DEFINE_list(
+    name="Client.heavy_actions",
+    help="Names of client actions doing a lot of I/O. At most "
+    "Client.max_concurrent_heavy_actions of them run at the same time.",
+    default=[
+        "CollectLargeFile",
+        "FileFinderOS",
+        "Osquery",
+        "Timeline",
+        "YaraProcessDump",
+        "YaraProcessScan",
+    ])
+
+config_lib.DEFINE_integer(
+    "Client.max_concurrent_heavy_actions", 1,
+    "Maximum number of client actions listed in Client.heavy_actions the "
+    "client runs concurrently.")
+
 config_lib.DEFINE_integer(
     "Client.foreman_check_frequency", 1800,
     "The minimum number of seconds before checking with "
@@ -3,6 +3,7 @@
 
 
 from grr_response_core.lib import config_lib
+from grr_response_core.lib import rdfvalue
 
 config_lib.DEFINE_integer("Datastore.maximum_blob_size", 512 * 1024,
                           "Maximum blob size we may store in the datastore.")
@@ -38,6 +39,34 @@ config_lib.DEFINE_integer(
     help="The maximum number of open connections to keep available in the pool."
 )
 
+config_lib.DEFINE_integer(
+    "Mysql.conn_max_lifetime_secs",
+    default=3600,
+    help=(
+        "Connections older than this number of seconds are closed instead of "
+        "being reused. 0 means no limit."
+    ),
+)
+
+config_lib.DEFINE_integer(
+    "Mysql.conn_max_idle_secs",
+    default=600,
+    help=(
+        "Connections that were not used for this number of seconds are closed "
+        "instead of being reused. 0 means no limit."
+    ),
+)
+
+config_lib.DEFINE_integer(
+    "Mysql.conn_keepalive_interval_secs",
+    default=60,
+    help=(
+        "Interval (in seconds) in which idle connections in the pool are "
+        "pinged and closed if they turn out to be broken or expired. 0 "
+        "disables the background checks."
+    ),
+)
+
 config_lib.DEFINE_integer(
     "Mysql.flow_processing_threads_min",
     default=1,
@@ -50,6 +79,75 @@ config_lib.DEFINE_integer(
     help="The maximum number of flow-processing worker threads.",
 )
 
+config_lib.DEFINE_bool(
+    "Mysql.materialized_hunt_counters",
+    default=True,
+    help=(
+        "If true, hunt counters are read from incrementally maintained "
+        "per-hunt rows. Otherwise they are computed by aggregating over all "
+        "flows of a hunt."
+    ),
+)
+
+config_lib.DEFINE_string(
+    "Mysql.replica_host",
+    default="",
+    help=(
+        "If set, readonly transactions of methods that tolerate stale data "
+        "(e.g. reading logs and statistics, or results and client info read "
+        "by the API) are run against a MySQL read replica on this host, "
+        "unless the replica lags behind by more than "
+        "Mysql.replica_max_lag_secs. Credentials and database name are the "
+        "same as for the primary server."
+    ),
+)
+
+config_lib.DEFINE_integer(
+    "Mysql.replica_port",
+    default=0,
+    help="The MySQL read replica port. Defaults to Mysql.port.",
+)
+
+config_lib.DEFINE_integer(
+    "Mysql.replica_conn_pool_max",
+    default=10,
+    help="The maximum number of open connections to the MySQL read replica.",
+)
+
+config_lib.DEFINE_integer(
+    "Mysql.replica_max_lag_secs",
+    default=5,
+    help=(
+        "Readonly transactions fall back to the primary MySQL server while "
+        "the read replica lags behind by more than this number of seconds."
+    ),
+)
+
+config_lib.DEFINE_bool(
+    "Mysql.profile_queries",
+    default=False,
+    help=(
+        "If true, all executed SQL statements are profiled and aggregated per "
+        "database method. The profile is served by the monitoring server on "
+        "the /mysql_profile path."
+    ),
+)
+
+config_lib.DEFINE_string(
+    "Mysql.profile_dump_path",
+    default="",
+    help=(
+        "If set (and Mysql.profile_queries is true), the SQL profile is "
+        "periodically written to this file as JSON."
+    ),
+)
+
+config_lib.DEFINE_integer(
+    "Mysql.profile_dump_interval_secs",
+    default=60,
+    help="Interval (in seconds) in which the SQL profile is written to a file.",
+)
+
 config_lib.DEFINE_string(
     "Mysql.migrations_dir", "%(grr_response_server/databases/mysql_migrations@"
     "grr-response-server|resource)", "Folder with MySQL migrations files.")
@@ -121,3 +219,81 @@ config_lib.DEFINE_string(
         "Only used when Blobstore.implementation is GCSBlobStore."
     ),
 )
+
+# Local filesystem blobstore config
+config_lib.DEFINE_string(
+    "Blobstore.local_fs.path",
+    default="",
+    help=(
+        "Directory where blobs are stored when Blobstore.implementation is "
+        "LocalFSBlobStore."
+    ),
+)
+config_lib.DEFINE_integer(
+    "Blobstore.local_fs.shard_depth",
+    default=2,
+    help=(
+        "Number of directory levels LocalFSBlobStore shards blobs into. Each "
+        "level uses one byte of the blob identifier (256 subdirectories)."
+    ),
+)
+config_lib.DEFINE_integer(
+    "Blobstore.local_fs.read_threads",
+    default=8,
+    help="Number of threads LocalFSBlobStore uses to read blobs in parallel.",
+)
+
+# Caching blobstore config
+config_lib.DEFINE_string(
+    "Blobstore.caching.delegate",
+    default="DbBlobStore",
+    help=(
+        "Blob store whose blobs are cached. Only used when "
+        "Blobstore.implementation is CachingBlobStore."
+    ),
+)
+config_lib.DEFINE_integer(
+    "Blobstore.caching.max_size_bytes",
+    default=256 * 1024 * 1024,
+    help="Maximum total size of blobs CachingBlobStore keeps in memory.",
+)
+config_lib.DEFINE_string(
+    "Blobstore.caching.disk_cache_path",
+    default="",
+    help=(
+        "Directory where CachingBlobStore keeps blobs evicted from memory. "
+        "The on-disk cache is disabled if empty."
+    ),
+)
+config_lib.DEFINE_integer(
+    "Blobstore.caching.disk_cache_max_size_bytes",
+    default=4 * 1024 * 1024 * 1024,
+    help="Maximum total size of blobs CachingBlobStore keeps on disk.",
+)
+config_lib.DEFINE_bool(
+    "Blobstore.caching.write_through",
+    default=True,
+    help=(
+        "Whether CachingBlobStore caches the blobs written through it. "
+        "Disabling it keeps freshly collected data from evicting blobs that "
+        "are actually read."
+    ),
+)
+config_lib.DEFINE_semantic_value(
+    rdfvalue.Duration,
+    "Blobstore.caching.negative_cache_ttl",
+    default="0s",
+    help=(
+        "For how long CachingBlobStore remembers that a blob does not exist. "
+        "Blobs written by other processes in the meantime are not visible "
+        "until the entry expires. Set to 0s to disable negative caching."
+    ),
+)
+config_lib.DEFINE_integer(
+    "Blobstore.caching.negative_cache_max_entries",
+    default=100000,
+    help=(
+        "Maximum number of missing blobs CachingBlobStore remembers. The "
+        "entries closest to expiry are dropped first."
+    ),
+)
@@ -306,3 +306,19 @@ config_lib.DEFINE_list(
     "Policy header added. This is applied to URLs after applying "
     "AdminUI.csp_include_url_prefixes.",
 )
+
+config_lib.DEFINE_integer(
+    "AdminUI.archive_read_threads",
+    2,
+    "Number of batches of blobs read concurrently ahead of the archive writer "
+    "when generating files archives. Reads of all archives generated by a "
+    "process share a pool of Mysql.conn_pool_max / 2 threads.",
+)
+
+config_lib.DEFINE_integer(
+    "AdminUI.archive_max_bytes_in_flight",
+    256 * 1024 * 1024,
+    "Maximum number of bytes of blobs read ahead of the archive writer when "
+    "generating files archives. Bounds memory used by a single archive "
+    "download.",
+)
@@ -38,6 +38,20 @@ config_lib.DEFINE_integer(
     "Worker.queue_shards", 5, "Queue notifications will be sharded across "
     "this number of datastore subjects.")
 
+config_lib.DEFINE_integer(
+    "Worker.flow_processing_batch_size", 1,
+    "Maximum number of flows a worker thread leases and processes in one go. "
+    "Larger batches save database round trips when many small flows are "
+    "ready at the same time, e.g. during large hunts.")
+
+config_lib.DEFINE_bool(
+    "Worker.async_hunt_output_plugins", False,
+    "If set, results of hunt flows are queued and run through the hunt's "
+    "output plugins in batches by a worker's message handler thread, instead "
+    "of being processed while processing the flow. As a batch contains "
+    "results of many flows, output plugins then get 'hunts/<hunt id>' instead "
+    "of the flow id as their source URN.")
+
 config_lib.DEFINE_list("Frontend.well_known_flows", [], "Unused, Deprecated.")
 
 # Smtp settings.
@@ -254,6 +268,27 @@ config_lib.DEFINE_integer(
     "If the average network usage per client becomes "
     "greater than this limit, the hunt gets stopped.")
 
+config_lib.DEFINE_bool(
+    "Hunt.assign_clients_on_start",
+    default=False,
+    help="If true, a hunt's client rules are evaluated against all online "
+    "clients by the workers when the hunt is started and the hunt is "
+    "scheduled on matching clients right away instead of when they check in "
+    "with the foreman.")
+
+config_lib.DEFINE_semantic_value(
+    rdfvalue.Duration,
+    "Hunt.assign_clients_on_start_online_threshold",
+    default=rdfvalue.Duration.From(1, rdfvalue.HOURS),
+    help="Only clients that pinged the server within this time are assigned "
+    "to a hunt when it is started.")
+
+config_lib.DEFINE_integer(
+    "Hunt.assign_clients_on_start_batch_size",
+    default=1000,
+    help="Number of clients read and evaluated by a single message handler "
+    "request when assigning clients to a hunt on start.")
+
 # GRRafana HTTP Server settings.
 config_lib.DEFINE_string(
     "GRRafana.bind", default="localhost", help="The GRRafana server address.")
@@ -297,6 +332,12 @@ config_lib.DEFINE_integer(
     help="Maximum number of client ids to place in a single Fleetspeak "
     "ListClients() API request.")
 
+config_lib.DEFINE_integer(
+    "Server.fleetspeak_send_batch_size",
+    default=16,
+    help="Maximum number of messages for a single client that are sent to "
+    "Fleetspeak concurrently when flushing the messages queued by a flow.")
+
 config_lib.DEFINE_bool(
     "Server.fleetspeak_cps_enabled",
     default=False,
@@ -79,6 +79,43 @@ class GrrWorkerTest(flow_test_lib.FlowTestsBaseclass):
     self.assertEqual(client_mock.storage["cpulimit"], [1000, 980, 960])
     self.assertEqual(client_mock.storage["networklimit"], [10000, 9000, 8000])
 
+  def testProcessFlowsReadsAndReleasesInBulk(self):
+    client_ids = [self.SetupClient(i) for i in range(3)]
+    flow_ids = [
+        flow_test_lib.StartFlow(
+            flow_test_lib.DummyFlowWithSingleReply, client_id=client_id
+        )
+        for client_id in client_ids
+    ]
+
+    requests = data_store.REL_DB.ReadFlowProcessingRequests()
+    self.assertLen(requests, 3)
+
+    db_obj = data_store.REL_DB
+    with mock.patch.object(
+        db_obj,
+        "ReadFlowRequestsForFlows",
+        wraps=db_obj.ReadFlowRequestsForFlows,
+    ) as read_requests:
+      with mock.patch.object(
+          db_obj,
+          "ReleaseProcessedFlows",
+          wraps=db_obj.ReleaseProcessedFlows,
+      ) as release_flows:
+        with mock.patch.object(db_obj, "ReleaseProcessedFlow") as release_flow:
+          worker_lib.GRRWorker().ProcessFlows(requests)
+
+    read_requests.assert_called_once()
+    release_flows.assert_called_once()
+    release_flow.assert_not_called()
+
+    for client_id, flow_id in zip(client_ids, flow_ids):
+      results = data_store.REL_DB.ReadFlowResults(client_id, flow_id, 0, 10)
+      self.assertLen(results, 1)
+
+      flow_obj = data_store.REL_DB.ReadFlowObject(client_id, flow_id)
+      self.assertFalse(flow_obj.HasField("processing_on"))
+
   def testForemanMessageHandler(self):
     with mock.patch.object(foreman.Foreman, "AssignTasksToClient") as instr:
       # Send a message to the Foreman.
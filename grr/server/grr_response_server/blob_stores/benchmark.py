@@ -1,18 +1,34 @@
 #!/usr/bin/env python
 """Benchmark to compare different BlobStore implementations."""
 
-import io
+from collections.abc import Callable, Sequence
+import contextlib
+import json
+import os
+import random
+import threading
 import time
-from typing import IO
+from typing import Any, Iterator, Optional
 
 from absl import app
 from absl import flags
+from cryptography import exceptions as crypto_exceptions
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import hmac
+from cryptography.hazmat.primitives.ciphers import aead
 import numpy as np
 
 from grr_response_core.lib import rdfvalue
+from grr_response_proto import objects_pb2
 from grr_response_server import blob_store
+from grr_response_server import data_store
+from grr_response_server import file_store
 from grr_response_server import server_startup
+from grr_response_server.blob_stores import encrypted_blob_store
+from grr_response_server.databases import db
+from grr_response_server.keystore import abstract as abstract_keystore
 from grr_response_server.models import blobs as models_blobs
+from grr_response_server.rdfvalues import objects as rdf_objects
 
 
 _TARGET = flags.DEFINE_list(
@@ -24,20 +40,142 @@ _TARGET = flags.DEFINE_list(
     ),
 )
 
+_ENCRYPTED_DELEGATE = flags.DEFINE_string(
+    "encrypted_delegate",
+    default="DbBlobStore",
+    help=(
+        "Blob store wrapped by the EncryptedBlobStore target. Blobs are "
+        "encrypted with AES-GCM using keys kept in memory, so the cost of a "
+        "real cipher is measured but not that of a remote key management "
+        "service."
+    ),
+)
+
+_BENCHMARKS = flags.DEFINE_list(
+    "benchmarks",
+    default=["write"],
+    help=(
+        "Benchmarks to run. Any of: write (single blob writes), write_batch, "
+        "read_batch, check_exist, read_and_wait (batched blob store calls), "
+        "add_files (file_store.AddFilesWithUnknownHashes) and stream_chunks "
+        "(file_store.StreamFilesChunks)."
+    ),
+)
+
 _SIZES = flags.DEFINE_list(
     "sizes",
     default=["500K", "200K", "100K", "50K", "5K", "500", "50"],
     help="Use the given blob sizes for the benchmark.",
 )
 
+_BATCH_SIZES = flags.DEFINE_list(
+    "batch_sizes",
+    default=["1", "10", "100"],
+    help="Number of blobs per call for the batched benchmarks.",
+)
+
+_THREADS = flags.DEFINE_integer(
+    "threads",
+    default=1,
+    help="Number of concurrent clients calling the blob store.",
+)
+
+_FILE_SIZE = flags.DEFINE_string(
+    "file_size",
+    default="10M",
+    help="Size of files used by the add_files and stream_chunks benchmarks.",
+)
+
 _PER_SIZE_DURATION_SECONDS = flags.DEFINE_integer(
     "per_size_duration_seconds",
     default=30,
     help="Benchmark duration per blob size in seconds.",
 )
 
+_OUTPUT_JSON = flags.DEFINE_string(
+    "output_json",
+    default=None,
+    help="If set, results are also written to this file as a JSON list.",
+)
+
+_BENCHMARK_CLIENT_ID = "C.0000000000000000"
+_BENCHMARK_KEY_NAME = "benchmark"
+
+
+class _AesGcmCrypter(abstract_keystore.Crypter):
+  """A crypter using AES-GCM, prepending a random nonce to the ciphertext."""
+
+  _NONCE_SIZE = 12
+
+  def __init__(self, key: bytes) -> None:
+    super().__init__()
+    self._aead = aead.AESGCM(key)
+
+  def Encrypt(self, data: bytes, assoc_data: bytes) -> bytes:
+    nonce = os.urandom(self._NONCE_SIZE)
+    return nonce + self._aead.encrypt(nonce, data, assoc_data)
+
+  def Decrypt(self, data: bytes, assoc_data: bytes) -> bytes:
+    nonce, ciphertext = data[: self._NONCE_SIZE], data[self._NONCE_SIZE :]
+    try:
+      return self._aead.decrypt(nonce, ciphertext, assoc_data)
+    except crypto_exceptions.InvalidTag as error:
+      raise abstract_keystore.DecryptionError(str(error)) from error
+
+
+class _HmacMAC(abstract_keystore.MAC):
+  """A MAC using HMAC-SHA256."""
+
+  def __init__(self, key: bytes) -> None:
+    super().__init__()
+    self._key = key
+
+  def ComputeMAC(self, data: bytes) -> bytes:
+    h = hmac.HMAC(self._key, hashes.SHA256())
+    h.update(data)
+    return h.finalize()
+
+  def VerifyMAC(self, mac_value: bytes, data: bytes) -> None:
+    h = hmac.HMAC(self._key, hashes.SHA256())
+    h.update(data)
+    try:
+      h.verify(mac_value)
+    except crypto_exceptions.InvalidSignature as error:
+      raise abstract_keystore.MACVerificationError(str(error)) from error
+
+
+class _BenchmarkKeystore(abstract_keystore.Keystore):
+  """An in-memory keystore using real ciphers, unlike the XOR test keystore."""
+
+  def __init__(self, key_names: Sequence[str]) -> None:
+    self._keys = {key_name: os.urandom(32) for key_name in key_names}
+
+  def _Key(self, name: str) -> bytes:
+    try:
+      return self._keys[name]
+    except KeyError as error:
+      raise abstract_keystore.UnknownKeyError(name) from error
+
+  def Crypter(self, name: str) -> _AesGcmCrypter:
+    return _AesGcmCrypter(self._Key(name))
+
+  def MAC(self, name: str) -> _HmacMAC:
+    return _HmacMAC(self._Key(name))
+
 
 def _MakeBlobStore(blobstore_name):
+  """Creates a blob store by the name of its class."""
+  if blobstore_name == encrypted_blob_store.EncryptedBlobStore.__name__:
+    # EncryptedBlobStore can't be created from the config alone, so it is not
+    # in the registry.
+    bs = encrypted_blob_store.EncryptedBlobStore(
+        _MakeBlobStore(_ENCRYPTED_DELEGATE.value),
+        data_store.REL_DB,
+        _BenchmarkKeystore([_BENCHMARK_KEY_NAME]),
+        _BENCHMARK_KEY_NAME,
+    )
+    return blob_store.BlobStoreValidationWrapper(bs)
+
   try:
     cls = blob_store.REGISTRY[blobstore_name]
   except KeyError:
@@ -47,50 +185,295 @@ def _MakeBlobStore(blobstore_name):
 
 def _MakeRandomBlob(
     size_b: rdfvalue.ByteSize,
-    random_fd: IO[bytes],
 ) -> tuple[models_blobs.BlobID, bytes]:
-  blob_data = random_fd.read(int(size_b))
+  blob_data = os.urandom(int(size_b))
   blob_id = models_blobs.BlobID.Of(blob_data)
   return blob_id, blob_data
 
 
+def _MakeRandomBlobs(
+    size_b: rdfvalue.ByteSize, count: int
+) -> dict[models_blobs.BlobID, bytes]:
+  return dict(_MakeRandomBlob(size_b) for _ in range(count))
+
+
 def _Timed(fn, *args, **kwargs):
   start = time.time()
   result = fn(*args, **kwargs)
   return result, time.time() - start
 
 
-def _PrintStats(size, size_b, durations):
+def _RunConcurrently(
+    fn: Callable[..., None],
+    duration_sec: float,
+    threads: int,
+    make_arg: Optional[Callable[[], Any]] = None,
+) -> list[float]:
+  """Calls fn from the given number of threads and returns call durations.
+
+  Args:
+    fn: A function to benchmark.
+    duration_sec: For how long to keep calling the function.
+    threads: The number of threads calling the function.
+    make_arg: If set, called before every call of fn and its result is passed
+      to fn. Time spent in make_arg is not included in the durations.
+
+  Returns:
+    Durations of all calls of fn in seconds.
+  """
+  deadline = time.time() + duration_sec
+  durations = []
+  lock = threading.Lock()
+
+  def Loop():
+    thread_durations = []
+    while time.time() < deadline:
+      args = () if make_arg is None else (make_arg(),)
+      _, duration = _Timed(fn, *args)
+      thread_durations.append(duration)
+    with lock:
+      durations.extend(thread_durations)
+
+  workers = [threading.Thread(target=Loop) for _ in range(threads)]
+  for worker in workers:
+    worker.start()
+  for worker in workers:
+    worker.join()
+
+  return durations
+
+
+def _Stats(
+    durations: Sequence[float], bytes_per_call: int, threads: int
+) -> dict[str, Any]:
+  """Computes statistics of a single benchmark run."""
   durations_ms = np.array(durations) * 1000
-  total_s = sum(durations)
+  # Calls from different threads overlap, so throughput is computed from the
+  # average time each thread spent per call.
+  total_s = sum(durations) / threads
   qps = len(durations) / total_s
+  return {
+      "num": len(durations),
+      "total_s": total_s,
+      "qps": qps,
+      "bytes_per_sec": int(bytes_per_call * qps),
+      "p50_ms": np.percentile(durations_ms, 50),
+      "p90_ms": np.percentile(durations_ms, 90),
+      "p95_ms": np.percentile(durations_ms, 95),
+      "p99_ms": np.percentile(durations_ms, 99),
+  }
+
+
+def _PrintHeader():
+  print(
+      "benchmark\tsize\tbatch\ttotal\tnum\tqps\t  b/sec\tp50\tp90\tp95\tp99"
+  )
+
+
+def _PrintStats(result: dict[str, Any]) -> None:
   print(
-      "{size}\t{total:.1f}s\t{num}\t{qps:.2f}\t{bps: >7}\t{p50:.1f}\t{p90:.1f}"
-      "\t{p95:.1f}\t{p99:.1f}".format(
-          size=size,
-          total=total_s,
-          num=len(durations),
-          qps=qps,
-          bps=str(rdfvalue.ByteSize(int(size_b * qps))).replace("iB", ""),
-          p50=np.percentile(durations_ms, 50),
-          p90=np.percentile(durations_ms, 90),
-          p95=np.percentile(durations_ms, 95),
-          p99=np.percentile(durations_ms, 99),
+      "{benchmark}\t{size}\t{batch_size}\t{total_s:.1f}s\t{num}\t{qps:.2f}"
+      "\t{bps: >7}\t{p50_ms:.1f}\t{p90_ms:.1f}\t{p95_ms:.1f}\t{p99_ms:.1f}"
+      .format(
+          bps=str(rdfvalue.ByteSize(result["bytes_per_sec"])).replace("iB", ""),
+          **result,
       )
   )
 
 
-def _RunBenchmark(bs, size_b, duration_sec, random_fd):
+def _RunWriteBenchmark(bs, size_b, batch_size, duration_sec, threads):
   """Returns a list of runtimes for writes of the given size."""
-  start_timestamp = time.time()
-  durations = []
 
-  # Monotonically increasing time would be nice, but is unavailable in Py2.
-  while time.time() < start_timestamp + duration_sec:
-    blob_id, blob_data = _MakeRandomBlob(size_b, random_fd)
-    _, write_time = _Timed(bs.WriteBlobs, {blob_id: blob_data})
-    durations.append(write_time)
-  return durations
+  # Blobs are generated outside of the timed call, but a fresh batch is used
+  # for every call so that content-addressed stores can't skip the write.
+  return _RunConcurrently(
+      bs.WriteBlobs,
+      duration_sec,
+      threads,
+      make_arg=lambda: _MakeRandomBlobs(size_b, batch_size),
+  )
+
+
+def _WriteBlobsPool(bs, size_b, batch_size) -> list[models_blobs.BlobID]:
+  """Writes blobs to read during a benchmark and returns their identifiers."""
+  blobs = _MakeRandomBlobs(size_b, max(batch_size * 10, 100))
+  bs.WriteBlobs(blobs)
+  return list(blobs.keys())
+
+
+def _RunReadBenchmark(bs, size_b, batch_size, duration_sec, threads):
+  """Returns a list of runtimes for batched reads of existing blobs."""
+  blob_ids = _WriteBlobsPool(bs, size_b, batch_size)
+
+  def Read():
+    bs.ReadBlobs(random.sample(blob_ids, batch_size))
+
+  return _RunConcurrently(Read, duration_sec, threads)
+
+
+def _RunCheckExistBenchmark(bs, size_b, batch_size, duration_sec, threads):
+  """Returns a list of runtimes for existence checks of blobs.
+
+  Half of the checked blobs exist, the other half does not.
+  """
+  blob_ids = _WriteBlobsPool(bs, size_b, batch_size)
+
+  def MakeBatch():
+    num_existing = (batch_size + 1) // 2
+    batch = random.sample(blob_ids, num_existing)
+    batch.extend(
+        models_blobs.BlobID(os.urandom(32))
+        for _ in range(batch_size - num_existing)
+    )
+    return batch
+
+  return _RunConcurrently(
+      bs.CheckBlobsExist, duration_sec, threads, make_arg=MakeBatch
+  )
+
+
+def _RunReadAndWaitBenchmark(bs, size_b, batch_size, duration_sec, threads):
+  """Returns a list of runtimes of ReadAndWaitForBlobs on existing blobs."""
+  blob_ids = _WriteBlobsPool(bs, size_b, batch_size)
+  timeout = rdfvalue.Duration.From(10, rdfvalue.SECONDS)
+
+  def ReadAndWait():
+    bs.ReadAndWaitForBlobs(random.sample(blob_ids, batch_size), timeout)
+
+  return _RunConcurrently(ReadAndWait, duration_sec, threads)
+
+
+@contextlib.contextmanager
+def _GlobalBlobStore(bs: blob_store.BlobStore) -> Iterator[None]:
+  """Makes file_store functions use the given blob store."""
+  original_bs = data_store.BLOBS
+  data_store.BLOBS = bs
+  try:
+    yield
+  finally:
+    data_store.BLOBS = original_bs
+
+
+def _WriteFileBlobs(
+    bs, size_b, file_size_b
+) -> list[rdf_objects.BlobReference]:
+  """Writes blobs of a file of the given size and returns their references."""
+  blob_refs = []
+  offset = 0
+  while offset < file_size_b:
+    blob_size = min(int(size_b), int(file_size_b) - offset)
+    blob_id, blob_data = _MakeRandomBlob(rdfvalue.ByteSize(blob_size))
+    bs.WriteBlobs({blob_id: blob_data})
+    blob_refs.append(
+        rdf_objects.BlobReference(
+            offset=offset, size=blob_size, blob_id=bytes(blob_id)
+        )
+    )
+    offset += blob_size
+  return blob_refs
+
+
+def _RunAddFilesBenchmark(bs, size_b, file_size_b, duration_sec, threads):
+  """Returns a list of runtimes of adding a file to the file store."""
+  blob_refs = _WriteFileBlobs(bs, size_b, file_size_b)
+  data_store.REL_DB.WriteClientMetadata(_BENCHMARK_CLIENT_ID)
+
+  def AddFiles():
+    client_path = db.ClientPath.OS(
+        _BENCHMARK_CLIENT_ID, ("benchmark", os.urandom(8).hex())
+    )
+    file_store.AddFilesWithUnknownHashes({client_path: blob_refs})
+
+  with _GlobalBlobStore(bs):
+    return _RunConcurrently(AddFiles, duration_sec, threads)
+
+
+def _RunStreamChunksBenchmark(bs, size_b, file_size_b, duration_sec, threads):
+  """Returns a list of runtimes of streaming a file from the file store."""
+  blob_refs = _WriteFileBlobs(bs, size_b, file_size_b)
+  data_store.REL_DB.WriteClientMetadata(_BENCHMARK_CLIENT_ID)
+
+  client_path = db.ClientPath.OS(
+      _BENCHMARK_CLIENT_ID, ("benchmark", os.urandom(8).hex())
+  )
+  with _GlobalBlobStore(bs):
+    hash_id = file_store.AddFilesWithUnknownHashes({client_path: blob_refs})[
+        client_path
+    ]
+
+  path_info = objects_pb2.PathInfo(
+      path_type=objects_pb2.PathInfo.PathType.OS,
+      components=client_path.components,
+  )
+  path_info.hash_entry.sha256 = hash_id.AsBytes()
+  path_info.hash_entry.num_bytes = int(file_size_b)
+  data_store.REL_DB.WritePathInfos(_BENCHMARK_CLIENT_ID, [path_info])
+
+  def StreamChunks():
+    for _ in file_store.StreamFilesChunks([client_path]):
+      pass
+
+  with _GlobalBlobStore(bs):
+    return _RunConcurrently(StreamChunks, duration_sec, threads)
+
+
+_BLOB_BENCHMARKS = {
+    "write_batch": _RunWriteBenchmark,
+    "read_batch": _RunReadBenchmark,
+    "check_exist": _RunCheckExistBenchmark,
+    "read_and_wait": _RunReadAndWaitBenchmark,
+}
+
+_FILE_BENCHMARKS = {
+    "add_files": _RunAddFilesBenchmark,
+    "stream_chunks": _RunStreamChunksBenchmark,
+}
+
+
+def _RunBenchmarks(blobstore_name, bs) -> list[dict[str, Any]]:
+  """Runs all requested benchmarks against a blob store."""
+  duration_sec = _PER_SIZE_DURATION_SECONDS.value
+  threads = _THREADS.value
+  batch_sizes = [int(batch_size) for batch_size in _BATCH_SIZES.value]
+  file_size_b = rdfvalue.ByteSize(_FILE_SIZE.value)
+
+  results = []
+
+  def Record(benchmark, size, size_b, batch_size, durations):
+    result = {
+        "store": blobstore_name,
+        "benchmark": benchmark,
+        "size": size,
+        "batch_size": batch_size,
+        "threads": threads,
+    }
+    result.update(_Stats(durations, int(size_b) * batch_size, threads))
+    _PrintStats(result)
+    results.append(result)
+
+  for benchmark in _BENCHMARKS.value:
+    for size in _SIZES.value:
+      size_b = rdfvalue.ByteSize(size)
+
+      if benchmark == "write":
+        durations = _RunWriteBenchmark(bs, size_b, 1, duration_sec, threads)
+        Record(benchmark, size, size_b, 1, durations)
+      elif benchmark in _BLOB_BENCHMARKS:
+        for batch_size in batch_sizes:
+          durations = _BLOB_BENCHMARKS[benchmark](
+              bs, size_b, batch_size, duration_sec, threads
+          )
+          Record(benchmark, size, size_b, batch_size, durations)
+      elif benchmark in _FILE_BENCHMARKS:
+        durations = _FILE_BENCHMARKS[benchmark](
+            bs, size_b, file_size_b, duration_sec, threads
+        )
+        # Throughput of file benchmarks is reported per whole file.
+        Record(benchmark, size, file_size_b, 1, durations)
+      else:
+        raise ValueError("Unknown benchmark: %s" % benchmark)
+
+  return results
 
 
 def main(argv):
@@ -101,23 +484,27 @@ def main(argv):
   server_startup.Init()
 
   if not _TARGET.value:
-    store_names = ", ".join(sorted(blob_store.REGISTRY.keys()))
+    store_names = ", ".join(
+        sorted(
+            list(blob_store.REGISTRY.keys())
+            + [encrypted_blob_store.EncryptedBlobStore.__name__]
+        )
+    )
     print("Missing --target. Use one or multiple of: {}.".format(store_names))
     exit(1)
 
   stores = [_MakeBlobStore(blobstore_name) for blobstore_name in _TARGET.value]
 
-  with io.open("/dev/urandom", "rb") as random_fd:
-    for blobstore_name, bs in zip(_TARGET.value, stores):
-      print()
-      print(blobstore_name)
-      print("size\ttotal\tnum\tqps\t  b/sec\tp50\tp90\tp95\tp99")
-      for size in _SIZES.value:
-        size_b = rdfvalue.ByteSize(size)
-        durations = _RunBenchmark(
-            bs, size_b, _PER_SIZE_DURATION_SECONDS.value, random_fd
-        )
-        _PrintStats(size, size_b, durations)
+  results = []
+  for blobstore_name, bs in zip(_TARGET.value, stores):
+    print()
+    print(blobstore_name)
+    _PrintHeader()
+    results.extend(_RunBenchmarks(blobstore_name, bs))
+
+  if _OUTPUT_JSON.value:
+    with open(_OUTPUT_JSON.value, "w") as f:
+      json.dump(results, f, indent=2)
 
 
 if __name__ == "__main__":
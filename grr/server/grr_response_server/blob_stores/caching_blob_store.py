@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+"""A blob store wrapper that caches blobs of another blob store."""
+
+import collections
+from collections.abc import Iterable
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from grr_response_core import config
+from grr_response_core.lib import rdfvalue
+from grr_response_core.stats import metrics
+from grr_response_server import blob_store
+from grr_response_server.models import blobs as models_blobs
+
+BLOB_CACHE_HITS = metrics.Counter(
+    "blob_store_cache_hits", fields=[("tier", str)]
+)
+BLOB_CACHE_MISSES = metrics.Counter("blob_store_cache_misses")
+BLOB_CACHE_EVICTIONS = metrics.Counter(
+    "blob_store_cache_evictions", fields=[("tier", str)]
+)
+
+_MEMORY_TIER = "memory"
+_DISK_TIER = "disk"
+_NEGATIVE_TIER = "negative"
+
+
+class _SizeBoundedLRU:
+  """An LRU mapping of blob identifiers to sizes bounded by the total size."""
+
+  def __init__(self, max_size_bytes: int, tier: str) -> None:
+    self._max_size_bytes = max_size_bytes
+    self._tier = tier
+    self._size_bytes = 0
+    self._entries: collections.OrderedDict[models_blobs.BlobID, int] = (
+        collections.OrderedDict()
+    )
+
+  def __contains__(self, blob_id: models_blobs.BlobID) -> bool:
+    return blob_id in self._entries
+
+  def Touch(self, blob_id: models_blobs.BlobID) -> None:
+    self._entries.move_to_end(blob_id)
+
+  def Put(
+      self, blob_id: models_blobs.BlobID, size: int
+  ) -> list[models_blobs.BlobID]:
+    """Adds an entry and returns identifiers of entries that got evicted."""
+    self.Pop(blob_id)
+
+    if size > self._max_size_bytes:
+      return []
+
+    self._entries[blob_id] = size
+    self._size_bytes += size
+
+    evicted = []
+    while self._size_bytes > self._max_size_bytes:
+      evicted_id, evicted_size = self._entries.popitem(last=False)
+      self._size_bytes -= evicted_size
+      evicted.append(evicted_id)
+
+    if evicted:
+      BLOB_CACHE_EVICTIONS.Increment(delta=len(evicted), fields=[self._tier])
+    return evicted
+
+  def Pop(self, blob_id: models_blobs.BlobID) -> None:
+    size = self._entries.pop(blob_id, None)
+    if size is not None:
+      self._size_bytes -= size
+
+
+class _DiskCache:
+  """A size-bounded on-disk cache of blobs.
+
+  The lock only guards the index: files are read and written without holding
+  it, so that slow disk operations don't serialize concurrent readers.
+  """
+
+  def __init__(self, path: str, max_size_bytes: int) -> None:
+    self._path = path
+    self._lock = threading.Lock()
+    self._index = _SizeBoundedLRU(max_size_bytes, _DISK_TIER)
+
+    os.makedirs(self._path, exist_ok=True)
+
+    # Blobs cached by previous runs are indexed (in arbitrary order) so that
+    # the cache survives restarts and its size bound is respected.
+    for entry in os.scandir(self._path):
+      if not entry.is_file():
+        continue
+      try:
+        blob_id = models_blobs.BlobID(bytes.fromhex(entry.name))
+      except ValueError:
+        continue
+      self._Evict(self._index.Put(blob_id, entry.stat().st_size))
+
+  def __contains__(self, blob_id: models_blobs.BlobID) -> bool:
+    with self._lock:
+      return blob_id in self._index
+
+  def _Filename(self, blob_id: models_blobs.BlobID) -> str:
+    return os.path.join(self._path, bytes(blob_id).hex())
+
+  def _Evict(self, blob_ids: Iterable[models_blobs.BlobID]) -> None:
+    for blob_id in blob_ids:
+      try:
+        os.remove(self._Filename(blob_id))
+      except FileNotFoundError:
+        pass
+
+  def Get(self, blob_id: models_blobs.BlobID) -> Optional[bytes]:
+    with self._lock:
+      if blob_id not in self._index:
+        return None
+
+    try:
+      with open(self._Filename(blob_id), "rb") as f:
+        data = f.read()
+    except FileNotFoundError:
+      with self._lock:
+        self._index.Pop(blob_id)
+      return None
+
+    with self._lock:
+      if blob_id in self._index:
+        self._index.Touch(blob_id)
+    return data
+
+  def Put(self, blob_id: models_blobs.BlobID, data: bytes) -> None:
+    """Stores the blob on disk, replacing the file atomically."""
+    temp_path = None
+    try:
+      with tempfile.NamedTemporaryFile(dir=self._path, delete=False) as f:
+        temp_path = f.name
+        f.write(data)
+      os.replace(temp_path, self._Filename(blob_id))
+    except OSError as e:
+      logging.warning("Unable to cache blob %s on disk: %s", blob_id, e)
+      if temp_path is not None:
+        try:
+          os.remove(temp_path)
+        except OSError:
+          pass
+      return
+
+    with self._lock:
+      evicted = self._index.Put(blob_id, len(data))
+    self._Evict(evicted)
+
+
+class CachingBlobStore(blob_store.BlobStore):
+  """A blob store wrapper keeping recently used blobs in an LRU cache.
+
+  Blobs are content-addressed and never change once written, so cached data
+  never needs to be invalidated. Blobs are cached in memory and, optionally,
+  in a larger on-disk tier. Written blobs are cached as well unless
+  write-through caching is disabled. Missing blobs can be cached for a short
+  time as well: this is disabled by default as blobs written by other
+  processes are only noticed once the negative entry expires.
+  """
+
+  def __init__(
+      self,
+      delegate: Optional[blob_store.BlobStore] = None,
+      max_size_bytes: Optional[int] = None,
+      disk_cache_path: Optional[str] = None,
+      disk_cache_max_size_bytes: Optional[int] = None,
+      negative_cache_ttl: Optional[rdfvalue.Duration] = None,
+      negative_cache_max_entries: Optional[int] = None,
+      write_through: Optional[bool] = None,
+  ) -> None:
+    """Initializes the caching blob store.
+
+    Args:
+      delegate: A blob store to cache blobs of. If none is provided, the blob
+        store specified in the `Blobstore.caching.delegate` option is used.
+      max_size_bytes: The maximum total size of blobs cached in memory.
+      disk_cache_path: A directory to cache blobs in. The on-disk tier is
+        disabled if empty.
+      disk_cache_max_size_bytes: The maximum total size of blobs cached on disk.
+      negative_cache_ttl: For how long to remember that a blob does not exist.
+      negative_cache_max_entries: The maximum number of missing blobs to
+        remember.
+      write_through: Whether blobs written through this store are cached.
+    """
+    super().__init__()
+
+    if delegate is None:
+      delegate_name = config.CONFIG["Blobstore.caching.delegate"]
+      if delegate_name == self.__class__.__name__:
+        raise ValueError("Caching blob store can't wrap itself")
+      try:
+        delegate = blob_store.REGISTRY[delegate_name]()
+      except KeyError:
+        raise ValueError(f"No blob store {delegate_name} found.")  # pylint: disable=raise-missing-from
+
+    if max_size_bytes is None:
+      max_size_bytes = config.CONFIG["Blobstore.caching.max_size_bytes"]
+    if disk_cache_path is None:
+      disk_cache_path = config.CONFIG["Blobstore.caching.disk_cache_path"]
+    if disk_cache_max_size_bytes is None:
+      disk_cache_max_size_bytes = config.CONFIG[
+          "Blobstore.caching.disk_cache_max_size_bytes"
+      ]
+    if negative_cache_ttl is None:
+      negative_cache_ttl = config.CONFIG["Blobstore.caching.negative_cache_ttl"]
+    if negative_cache_max_entries is None:
+      negative_cache_max_entries = config.CONFIG[
+          "Blobstore.caching.negative_cache_max_entries"
+      ]
+    if write_through is None:
+      write_through = config.CONFIG["Blobstore.caching.write_through"]
+
+    self._delegate = delegate
+    self._lock = threading.RLock()
+
+    self._blobs: dict[models_blobs.BlobID, bytes] = {}
+    self._memory_index = _SizeBoundedLRU(max_size_bytes, _MEMORY_TIER)
+
+    self._disk_cache = None
+    if disk_cache_path:
+      self._disk_cache = _DiskCache(disk_cache_path, disk_cache_max_size_bytes)
+
+    self._negative_cache_ttl = negative_cache_ttl
+    self._negative_cache_max_entries = negative_cache_max_entries
+    # All entries live for the same time, so they are ordered by expiry.
+    self._missing: collections.OrderedDict[
+        models_blobs.BlobID, rdfvalue.RDFDatetime
+    ] = collections.OrderedDict()
+    self._write_through = write_through
+
+  def _PutInMemory(self, blob_id: models_blobs.BlobID, data: bytes) -> None:
+    self._blobs[blob_id] = data
+    for evicted_id in self._memory_index.Put(blob_id, len(data)):
+      del self._blobs[evicted_id]
+    if blob_id not in self._memory_index:
+      # The blob is bigger than the whole memory cache.
+      del self._blobs[blob_id]
+
+  def _Put(self, blob_id_data_map: dict[models_blobs.BlobID, bytes]) -> None:
+    """Caches blobs, writing them to disk without holding the lock."""
+    with self._lock:
+      for blob_id, data in blob_id_data_map.items():
+        self._missing.pop(blob_id, None)
+        self._PutInMemory(blob_id, data)
+
+    if self._disk_cache is not None:
+      for blob_id, data in blob_id_data_map.items():
+        self._disk_cache.Put(blob_id, data)
+
+  def _Get(self, blob_id: models_blobs.BlobID) -> Optional[bytes]:
+    """Returns cached blob data or None if the blob is not cached."""
+    with self._lock:
+      data = self._blobs.get(blob_id)
+      if data is not None:
+        self._memory_index.Touch(blob_id)
+        BLOB_CACHE_HITS.Increment(fields=[_MEMORY_TIER])
+        return data
+
+    if self._disk_cache is None:
+      return None
+
+    data = self._disk_cache.Get(blob_id)
+    if data is not None:
+      with self._lock:
+        self._PutInMemory(blob_id, data)
+      BLOB_CACHE_HITS.Increment(fields=[_DISK_TIER])
+    return data
+
+  def _IsKnownMissing(self, blob_id: models_blobs.BlobID) -> bool:
+    expiry = self._missing.get(blob_id)
+    if expiry is None:
+      return False
+    if expiry < rdfvalue.RDFDatetime.Now():
+      del self._missing[blob_id]
+      return False
+
+    BLOB_CACHE_HITS.Increment(fields=[_NEGATIVE_TIER])
+    return True
+
+  def _MarkMissing(self, blob_ids: Iterable[models_blobs.BlobID]) -> None:
+    if not self._negative_cache_ttl:
+      return
+
+    now = rdfvalue.RDFDatetime.Now()
+    expiry = now + self._negative_cache_ttl
+    for blob_id in blob_ids:
+      self._missing.pop(blob_id, None)
+      self._missing[blob_id] = expiry
+
+    # Expired entries are dropped on insert, so that blobs that are never
+    # queried again don't stay around.
+    evicted = 0
+    while self._missing and (
+        len(self._missing) > self._negative_cache_max_entries
+        or next(iter(self._missing.values())) < now
+    ):
+      self._missing.popitem(last=False)
+      evicted += 1
+
+    if evicted:
+      BLOB_CACHE_EVICTIONS.Increment(delta=evicted, fields=[_NEGATIVE_TIER])
+
+  def WriteBlobs(
+      self,
+      blob_id_data_map: dict[models_blobs.BlobID, bytes],
+  ) -> None:
+    """Writes blobs to the underlying blob store and caches them."""
+    self._delegate.WriteBlobs(blob_id_data_map)
+
+    if self._write_through:
+      self._Put(blob_id_data_map)
+      return
+
+    with self._lock:
+      for blob_id in blob_id_data_map:
+        self._missing.pop(blob_id, None)
+
+  def ReadBlobs(
+      self,
+      blob_ids: Iterable[models_blobs.BlobID],
+  ) -> dict[models_blobs.BlobID, Optional[bytes]]:
+    """Reads blobs from the cache, falling back to the underlying store."""
+    result = {}
+    to_read = []
+
+    for blob_id in blob_ids:
+      if blob_id in result:
+        continue
+
+      result[blob_id] = self._Get(blob_id)
+      if result[blob_id] is None:
+        with self._lock:
+          if not self._IsKnownMissing(blob_id):
+            to_read.append(blob_id)
+
+    if not to_read:
+      return result
+
+    BLOB_CACHE_MISSES.Increment(delta=len(to_read))
+    read_blobs = self._delegate.ReadBlobs(to_read)
+    result.update(read_blobs)
+
+    self._Put({
+        blob_id: data
+        for blob_id, data in read_blobs.items()
+        if data is not None
+    })
+    with self._lock:
+      self._MarkMissing(
+          blob_id for blob_id, data in read_blobs.items() if data is None
+      )
+
+    return result
+
+  def CheckBlobsExist(
+      self,
+      blob_ids: Iterable[models_blobs.BlobID],
+  ) -> dict[models_blobs.BlobID, bool]:
+    """Checks whether blobs exist, consulting the cache first."""
+    result = {}
+    to_check = []
+
+    with self._lock:
+      for blob_id in blob_ids:
+        if blob_id in result:
+          continue
+
+        if blob_id in self._blobs:
+          self._memory_index.Touch(blob_id)
+          BLOB_CACHE_HITS.Increment(fields=[_MEMORY_TIER])
+          result[blob_id] = True
+        elif self._disk_cache is not None and blob_id in self._disk_cache:
+          BLOB_CACHE_HITS.Increment(fields=[_DISK_TIER])
+          result[blob_id] = True
+        elif self._IsKnownMissing(blob_id):
+          result[blob_id] = False
+        else:
+          to_check.append(blob_id)
+
+    if not to_check:
+      return result
+
+    BLOB_CACHE_MISSES.Increment(delta=len(to_check))
+    exist = self._delegate.CheckBlobsExist(to_check)
+    result.update(exist)
+
+    with self._lock:
+      self._MarkMissing(
+          blob_id for blob_id, exists in exist.items() if not exists
+      )
+
+    return result
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+from collections.abc import Callable
+import os
+from typing import Optional
+from unittest import mock
+
+from absl.testing import absltest
+
+from grr_response_core.lib import rdfvalue
+from grr_response_core.stats import default_stats_collector
+from grr_response_core.stats import stats_collector_instance
+from grr_response_server import blob_store
+from grr_response_server import blob_store_test_mixin
+from grr_response_server.blob_stores import caching_blob_store
+from grr_response_server.databases import mem as mem_db
+from grr_response_server.models import blobs as models_blobs
+from grr.test_lib import stats_test_lib
+from grr.test_lib import test_lib
+
+
+def setUpModule() -> None:
+  stats_collector_instance.Set(default_stats_collector.DefaultStatsCollector())
+
+
+def _CreateCachingBlobStore(
+    delegate: blob_store.BlobStore,
+    **kwargs,
+) -> caching_blob_store.CachingBlobStore:
+  kwargs.setdefault("max_size_bytes", 1024 * 1024)
+  kwargs.setdefault("disk_cache_path", "")
+  kwargs.setdefault("disk_cache_max_size_bytes", 0)
+  kwargs.setdefault("negative_cache_ttl", rdfvalue.Duration(0))
+  kwargs.setdefault("negative_cache_max_entries", 1000)
+  kwargs.setdefault("write_through", True)
+  return caching_blob_store.CachingBlobStore(delegate, **kwargs)
+
+
+class CachingBlobStoreTest(
+    blob_store_test_mixin.BlobStoreTestMixin,
+    absltest.TestCase,
+):
+  # Test methods are defined in the base mixin class.
+
+  def CreateBlobStore(
+      self,
+  ) -> tuple[blob_store.BlobStore, Optional[Callable[[], None]]]:
+    return _CreateCachingBlobStore(mem_db.InMemoryDB()), None
+
+
+class CachingBlobStoreWithDiskCacheTest(
+    blob_store_test_mixin.BlobStoreTestMixin,
+    absltest.TestCase,
+):
+  # Test methods are defined in the base mixin class.
+
+  def CreateBlobStore(
+      self,
+  ) -> tuple[blob_store.BlobStore, Optional[Callable[[], None]]]:
+    bs = _CreateCachingBlobStore(
+        mem_db.InMemoryDB(),
+        max_size_bytes=1024,
+        disk_cache_path=self.create_tempdir().full_path,
+        disk_cache_max_size_bytes=1024 * 1024,
+    )
+    return bs, None
+
+
+class CachingBlobStoreCachingTest(
+    stats_test_lib.StatsTestMixin, absltest.TestCase
+):
+
+  def setUp(self):
+    super().setUp()
+    self.delegate = mem_db.InMemoryDB()
+
+  def testReadBlobsServedFromMemory(self):
+    blob = os.urandom(128)
+    blob_id = models_blobs.BlobID.Of(blob)
+    self.delegate.WriteBlobs({blob_id: blob})
+
+    bs = _CreateCachingBlobStore(self.delegate)
+    self.assertEqual(bs.ReadBlob(blob_id), blob)
+
+    with mock.patch.object(self.delegate, "ReadBlobs") as read_blobs_mock:
+      with self.assertStatsCounterDelta(
+          1, caching_blob_store.BLOB_CACHE_HITS, fields=["memory"]
+      ):
+        self.assertEqual(bs.ReadBlob(blob_id), blob)
+
+    read_blobs_mock.assert_not_called()
+
+  def testWrittenBlobsAreCached(self):
+    blob = os.urandom(128)
+    blob_id = models_blobs.BlobID.Of(blob)
+
+    bs = _CreateCachingBlobStore(self.delegate)
+    bs.WriteBlobs({blob_id: blob})
+
+    with mock.patch.object(self.delegate, "CheckBlobsExist") as check_mock:
+      self.assertTrue(bs.CheckBlobExists(blob_id))
+
+    check_mock.assert_not_called()
+
+  def testWrittenBlobsAreNotCachedWithoutWriteThrough(self):
+    blob = os.urandom(128)
+    blob_id = models_blobs.BlobID.Of(blob)
+
+    bs = _CreateCachingBlobStore(
+        self.delegate,
+        disk_cache_path=self.create_tempdir().full_path,
+        disk_cache_max_size_bytes=1024,
+        write_through=False,
+    )
+    bs.WriteBlobs({blob_id: blob})
+
+    with self.assertStatsCounterDelta(1, caching_blob_store.BLOB_CACHE_MISSES):
+      self.assertEqual(bs.ReadBlob(blob_id), blob)
+
+    # Blobs that were read are cached as usual.
+    with mock.patch.object(self.delegate, "ReadBlobs") as read_blobs_mock:
+      self.assertEqual(bs.ReadBlob(blob_id), blob)
+
+    read_blobs_mock.assert_not_called()
+
+  def testMemoryCacheIsBoundedBySize(self):
+    blobs = [os.urandom(100) for _ in range(3)]
+    blob_ids = [models_blobs.BlobID.Of(blob) for blob in blobs]
+
+    bs = _CreateCachingBlobStore(self.delegate, max_size_bytes=250)
+    with self.assertStatsCounterDelta(
+        1, caching_blob_store.BLOB_CACHE_EVICTIONS, fields=["memory"]
+    ):
+      bs.WriteBlobs(dict(zip(blob_ids, blobs)))
+
+    with self.assertStatsCounterDelta(1, caching_blob_store.BLOB_CACHE_MISSES):
+      self.assertEqual(bs.ReadBlobs(blob_ids), dict(zip(blob_ids, blobs)))
+
+  def testBlobsEvictedFromMemoryAreServedFromDisk(self):
+    blobs = [os.urandom(100) for _ in range(3)]
+    blob_ids = [models_blobs.BlobID.Of(blob) for blob in blobs]
+
+    bs = _CreateCachingBlobStore(
+        self.delegate,
+        max_size_bytes=100,
+        disk_cache_path=self.create_tempdir().full_path,
+        disk_cache_max_size_bytes=1024,
+    )
+    bs.WriteBlobs(dict(zip(blob_ids, blobs)))
+
+    with mock.patch.object(self.delegate, "ReadBlobs") as read_blobs_mock:
+      with self.assertStatsCounterDelta(
+          3, caching_blob_store.BLOB_CACHE_HITS, fields=["disk"]
+      ):
+        self.assertEqual(bs.ReadBlobs(blob_ids), dict(zip(blob_ids, blobs)))
+
+    read_blobs_mock.assert_not_called()
+
+  def testDiskCacheSurvivesRestarts(self):
+    blob = os.urandom(128)
+    blob_id = models_blobs.BlobID.Of(blob)
+    disk_cache_path = self.create_tempdir().full_path
+
+    bs = _CreateCachingBlobStore(
+        self.delegate,
+        disk_cache_path=disk_cache_path,
+        disk_cache_max_size_bytes=1024,
+    )
+    bs.WriteBlobs({blob_id: blob})
+
+    bs = _CreateCachingBlobStore(
+        mem_db.InMemoryDB(),
+        disk_cache_path=disk_cache_path,
+        disk_cache_max_size_bytes=1024,
+    )
+    self.assertEqual(bs.ReadBlob(blob_id), blob)
+
+  def testFailedDiskWritesLeaveNoTemporaryFiles(self):
+    blob = os.urandom(128)
+    blob_id = models_blobs.BlobID.Of(blob)
+    disk_cache_path = self.create_tempdir().full_path
+
+    bs = _CreateCachingBlobStore(
+        self.delegate,
+        disk_cache_path=disk_cache_path,
+        disk_cache_max_size_bytes=1024,
+    )
+    with mock.patch.object(os, "replace", side_effect=OSError("No space")):
+      bs.WriteBlobs({blob_id: blob})
+
+    self.assertEmpty(os.listdir(disk_cache_path))
+    self.assertEqual(bs.ReadBlob(blob_id), blob)
+
+  def testMissingBlobsAreCachedForConfiguredTime(self):
+    blob = os.urandom(128)
+    blob_id = models_blobs.BlobID.Of(blob)
+    now = rdfvalue.RDFDatetime.Now()
+
+    bs = _CreateCachingBlobStore(
+        self.delegate,
+        negative_cache_ttl=rdfvalue.Duration.From(10, rdfvalue.SECONDS),
+    )
+    with test_lib.FakeTime(now):
+      self.assertFalse(bs.CheckBlobExists(blob_id))
+
+    # Written by somebody else, not visible until the negative entry expires.
+    self.delegate.WriteBlobs({blob_id: blob})
+
+    with test_lib.FakeTime(now + rdfvalue.Duration.From(5, rdfvalue.SECONDS)):
+      self.assertFalse(bs.CheckBlobExists(blob_id))
+      self.assertIsNone(bs.ReadBlob(blob_id))
+
+    with test_lib.FakeTime(now + rdfvalue.Duration.From(11, rdfvalue.SECONDS)):
+      self.assertTrue(bs.CheckBlobExists(blob_id))
+      self.assertEqual(bs.ReadBlob(blob_id), blob)
+
+  def testWritingBlobClearsNegativeCacheEntry(self):
+    blob = os.urandom(128)
+    blob_id = models_blobs.BlobID.Of(blob)
+
+    bs = _CreateCachingBlobStore(
+        self.delegate,
+        negative_cache_ttl=rdfvalue.Duration.From(10, rdfvalue.SECONDS),
+    )
+    self.assertFalse(bs.CheckBlobExists(blob_id))
+
+    bs.WriteBlobs({blob_id: blob})
+    self.assertTrue(bs.CheckBlobExists(blob_id))
+
+  def testNegativeCacheIsBoundedByEntries(self):
+    blobs = [os.urandom(128) for _ in range(3)]
+    blob_ids = [models_blobs.BlobID.Of(blob) for blob in blobs]
+
+    bs = _CreateCachingBlobStore(
+        self.delegate,
+        negative_cache_ttl=rdfvalue.Duration.From(10, rdfvalue.SECONDS),
+        negative_cache_max_entries=2,
+    )
+    for blob_id in blob_ids:
+      self.assertFalse(bs.CheckBlobExists(blob_id))
+
+    self.delegate.WriteBlobs(dict(zip(blob_ids, blobs)))
+
+    # The oldest entry got evicted, the others are still cached.
+    self.assertTrue(bs.CheckBlobExists(blob_ids[0]))
+    self.assertFalse(bs.CheckBlobExists(blob_ids[1]))
+    self.assertFalse(bs.CheckBlobExists(blob_ids[2]))
+
+  def testExpiredNegativeCacheEntriesAreDroppedOnInsert(self):
+    now = rdfvalue.RDFDatetime.Now()
+    bs = _CreateCachingBlobStore(
+        self.delegate,
+        negative_cache_ttl=rdfvalue.Duration.From(10, rdfvalue.SECONDS),
+    )
+    with test_lib.FakeTime(now):
+      for _ in range(10):
+        bs.CheckBlobExists(models_blobs.BlobID.Of(os.urandom(128)))
+
+    with test_lib.FakeTime(now + rdfvalue.Duration.From(11, rdfvalue.SECONDS)):
+      bs.CheckBlobExists(models_blobs.BlobID.Of(os.urandom(128)))
+
+    self.assertLen(bs._missing, 1)
+
+
+if __name__ == "__main__":
+  absltest.main()
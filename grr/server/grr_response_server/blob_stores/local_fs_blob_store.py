@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""A BlobStore keeping blobs as files in a local directory tree."""
+
+from collections.abc import Iterable
+from concurrent import futures
+import os
+import tempfile
+from typing import Optional
+
+from grr_response_core import config
+from grr_response_server import blob_store
+from grr_response_server.models import blobs as models_blobs
+
+
+class ConfigError(Exception):
+  """Raised when the local filesystem blob store config is invalid."""
+
+
+class LocalFSBlobStore(blob_store.BlobStore):
+  """A content-addressed BlobStore implementation backed by local files.
+
+  Blobs are stored in a directory tree sharded by the leading bytes of their
+  identifiers (e.g. `ab/cd/abcd...` for two levels of sharding) so that no
+  single directory grows too big. Blobs are written to temporary files first
+  and renamed into place, so readers never see partially written blobs. As
+  blobs are content-addressed, blobs that already exist are never rewritten.
+  """
+
+  def __init__(
+      self,
+      path: Optional[str] = None,
+      shard_depth: Optional[int] = None,
+      read_threads: Optional[int] = None,
+  ) -> None:
+    """Instantiates a new LocalFSBlobStore.
+
+    Args:
+      path: A root directory of the blob store. Defaults to the
+        `Blobstore.local_fs.path` config option.
+      shard_depth: The number of directory levels blobs are sharded into.
+      read_threads: The number of threads used to read blobs in parallel.
+    """
+    if path is None:
+      path = config.CONFIG["Blobstore.local_fs.path"]
+    if shard_depth is None:
+      shard_depth = config.CONFIG["Blobstore.local_fs.shard_depth"]
+    if read_threads is None:
+      read_threads = config.CONFIG["Blobstore.local_fs.read_threads"]
+
+    if not path:
+      raise ConfigError("Missing config value for Blobstore.local_fs.path")
+    if not 0 <= shard_depth <= 4:
+      raise ConfigError(f"Invalid shard depth: {shard_depth}")
+
+    self._path = path
+    self._shard_depth = shard_depth
+    self._executor = futures.ThreadPoolExecutor(
+        max_workers=max(read_threads, 1),
+        thread_name_prefix="local_fs_blob_store",
+    )
+
+    os.makedirs(self._path, exist_ok=True)
+
+  def _GetDirname(self, blob_id: models_blobs.BlobID) -> str:
+    hex_blob_id = bytes(blob_id).hex()
+    shards = [hex_blob_id[2 * i : 2 * i + 2] for i in range(self._shard_depth)]
+    return os.path.join(self._path, *shards)
+
+  def _GetFilename(self, blob_id: models_blobs.BlobID) -> str:
+    return os.path.join(self._GetDirname(blob_id), bytes(blob_id).hex())
+
+  def WriteBlobs(
+      self,
+      blob_id_data_map: dict[models_blobs.BlobID, bytes],
+  ) -> None:
+    """Creates blobs that don't exist yet."""
+    # All files are written and synced before any of them is renamed into
+    # place and every affected directory is synced only once per call.
+    pending = []
+    dirnames = set()
+    try:
+      for blob_id, blob in blob_id_data_map.items():
+        if os.path.isfile(self._GetFilename(blob_id)):
+          continue
+
+        dirname = self._GetDirname(blob_id)
+        os.makedirs(dirname, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(
+            dir=dirname, prefix=".tmp", delete=False
+        ) as f:
+          pending.append((f.name, self._GetFilename(blob_id)))
+          f.write(blob)
+          f.flush()
+          os.fsync(f.fileno())
+
+      while pending:
+        tmp_filename, filename = pending[-1]
+        os.replace(tmp_filename, filename)
+        pending.pop()
+        dirnames.add(os.path.dirname(filename))
+    finally:
+      for tmp_filename, _ in pending:
+        try:
+          os.remove(tmp_filename)
+        except FileNotFoundError:
+          pass
+
+    for dirname in dirnames:
+      _SyncDirectory(dirname)
+
+  def _ReadBlob(self, blob_id: models_blobs.BlobID) -> Optional[bytes]:
+    try:
+      with open(self._GetFilename(blob_id), "rb") as f:
+        return f.read()
+    except FileNotFoundError:
+      return None
+
+  def ReadBlobs(
+      self, blob_ids: Iterable[models_blobs.BlobID]
+  ) -> dict[models_blobs.BlobID, Optional[bytes]]:
+    """Reads all blobs, specified by blob_ids, returning their contents."""
+    blob_ids = list(set(blob_ids))
+    if len(blob_ids) <= 1:
+      return {blob_id: self._ReadBlob(blob_id) for blob_id in blob_ids}
+
+    return dict(zip(blob_ids, self._executor.map(self._ReadBlob, blob_ids)))
+
+  def CheckBlobsExist(
+      self, blob_ids: Iterable[models_blobs.BlobID]
+  ) -> dict[models_blobs.BlobID, bool]:
+    """Checks if blobs for the given identifiers already exist."""
+    return {
+        blob_id: os.path.isfile(self._GetFilename(blob_id))
+        for blob_id in blob_ids
+    }
+
+
+def _SyncDirectory(dirname: str) -> None:
+  """Makes sure that renames within the given directory are persisted."""
+  try:
+    fd = os.open(dirname, os.O_RDONLY)
+  except OSError:
+    # Opening directories is not supported on all platforms (e.g. Windows).
+    return
+
+  try:
+    os.fsync(fd)
+  finally:
+    os.close(fd)
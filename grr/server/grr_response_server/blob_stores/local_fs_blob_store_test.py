@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""Tests for the local filesystem blob store implementation."""
+
+import os
+
+from absl import app
+
+from grr_response_server import blob_store_test_mixin
+from grr_response_server.blob_stores import local_fs_blob_store
+from grr_response_server.models import blobs as models_blobs
+from grr.test_lib import test_lib
+
+
+class LocalFSBlobStoreTest(
+    blob_store_test_mixin.BlobStoreTestMixin,
+    test_lib.GRRBaseTest,
+):
+
+  def CreateBlobStore(self):
+    path = self.create_tempdir().full_path
+    return (local_fs_blob_store.LocalFSBlobStore(path=path), lambda: None)
+
+  def testBlobsAreStoredInShardedDirectories(self):
+    path = self.create_tempdir().full_path
+    bs = local_fs_blob_store.LocalFSBlobStore(path=path, shard_depth=2)
+    blob_id = models_blobs.BlobID(bytes.fromhex("abcd") + b"0" * 30)
+
+    bs.WriteBlobs({blob_id: b"foo"})
+
+    self.assertEqual(os.listdir(path), ["ab"])
+    self.assertEqual(os.listdir(os.path.join(path, "ab")), ["cd"])
+    self.assertEqual(
+        os.listdir(os.path.join(path, "ab", "cd")), [bytes(blob_id).hex()]
+    )
+
+  def testNoTemporaryFilesAreLeftBehind(self):
+    path = self.create_tempdir().full_path
+    bs = local_fs_blob_store.LocalFSBlobStore(path=path, shard_depth=0)
+    blobs = [os.urandom(64) for _ in range(10)]
+    blob_ids = [models_blobs.BlobID.Of(blob) for blob in blobs]
+
+    bs.WriteBlobs(dict(zip(blob_ids, blobs)))
+
+    self.assertCountEqual(
+        os.listdir(path), [bytes(blob_id).hex() for blob_id in blob_ids]
+    )
+
+  def testDoesNotRewriteExistingBlobs(self):
+    path = self.create_tempdir().full_path
+    bs = local_fs_blob_store.LocalFSBlobStore(path=path, shard_depth=0)
+    blob = os.urandom(1024)
+    blob_id = models_blobs.BlobID.Of(blob)
+
+    bs.WriteBlobs({blob_id: blob})
+    filename = os.path.join(path, bytes(blob_id).hex())
+    inode = os.stat(filename).st_ino
+
+    bs.WriteBlobs({blob_id: blob})
+
+    self.assertEqual(os.stat(filename).st_ino, inode)
+    self.assertEqual(os.listdir(path), [bytes(blob_id).hex()])
+    self.assertEqual(bs.ReadBlob(blob_id), blob)
+
+  def testRaisesIfPathIsNotConfigured(self):
+    with test_lib.ConfigOverrider({"Blobstore.local_fs.path": ""}):
+      with self.assertRaises(local_fs_blob_store.ConfigError):
+        local_fs_blob_store.LocalFSBlobStore()
+
+
+if __name__ == "__main__":
+  app.run(test_lib.main)
@@ -2,8 +2,10 @@
 """Load all blob stores so that they are visible in the registry."""
 
 from grr_response_server import blob_store
+from grr_response_server.blob_stores import caching_blob_store
 from grr_response_server.blob_stores import db_blob_store
 from grr_response_server.blob_stores import gcs_blob_store
+from grr_response_server.blob_stores import local_fs_blob_store
 
 
 def RegisterBlobStores():
@@ -14,3 +16,9 @@ def RegisterBlobStores():
   blob_store.REGISTRY[gcs_blob_store.GCSBlobStore.__name__] = (
       gcs_blob_store.GCSBlobStore
   )
+  blob_store.REGISTRY[local_fs_blob_store.LocalFSBlobStore.__name__] = (
+      local_fs_blob_store.LocalFSBlobStore
+  )
+  blob_store.REGISTRY[caching_blob_store.CachingBlobStore.__name__] = (
+      caching_blob_store.CachingBlobStore
+  )
@@ -8,9 +8,11 @@ a logical relational database model.
 import abc
 import collections
 from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, Sequence, Set
+import contextlib
 import dataclasses
 import enum
 import re
+import threading
 from typing import Literal, NamedTuple, Optional, Protocol, Union
 
 from grr_response_core.lib import rdfvalue
@@ -60,6 +62,8 @@ MAX_COUNT = 1024**3
 
 CLIENT_IDS_BATCH_SIZE = 500000
 
+FLOW_RESULTS_BATCH_SIZE = 1000
+
 _EMAIL_REGEX = re.compile(r"[^@]+@([^@]+)$")
 MAX_EMAIL_LENGTH = 255
 
@@ -511,6 +515,17 @@ FlowStateAndTimestamps = collections.namedtuple(
 )
 
 
+# Creation and completion times of hunt flows as sorted sequences of integer
+# seconds since epoch. Running flows have no completion time.
+HuntFlowsTimestamps = collections.namedtuple(
+    "HuntFlowsTimestamps",
+    [
+        "create_times",
+        "completion_times",
+    ],
+)
+
+
 @dataclasses.dataclass
 class FlowErrorInfo:
   """Information about what caused flow to error-out."""
@@ -520,6 +535,29 @@ class FlowErrorInfo:
   backtrace: Optional[str] = None
 
 
+@dataclasses.dataclass(frozen=True)
+class FlowResultsCursor:
+  """A position in an ordered sequence of flow or hunt results.
+
+  Cursors are returned by the `Read*ResultsPage` methods and passed back to
+  them to continue reading right after the last returned result. Unlike
+  offsets, cursors let databases seek to the right position directly, so
+  reading a page does not get slower the further into the results it is.
+  """
+
+  timestamp: int
+  """Timestamp of the result (in microseconds since epoch)."""
+
+  client_id: str
+  """Id of the client the result comes from."""
+
+  flow_id: str
+  """Id of the flow the result comes from."""
+
+  result_id: int
+  """Database-specific id of the result disambiguating equal timestamps."""
+
+
 class SearchClientsResult(NamedTuple):
   """The result of a structured search."""
 
@@ -651,6 +689,36 @@ class ClientPath(object):
     )
 
 
+_stale_reads = threading.local()
+
+
+@contextlib.contextmanager
+def AllowStaleReads() -> Iterator[None]:
+  """Allows database reads of the current thread to return slightly stale data.
+
+  Database implementations may serve reads that support it (e.g. from a MySQL
+  read replica) from a source that lags behind the latest writes. Only code that
+  merely displays or exports data (e.g. API handlers) should use it: flows and
+  workers expect to observe the writes they have just made.
+
+  Since the setting is per thread, the context must not be held across a yield.
+
+  Yields:
+    None.
+  """
+  previous = getattr(_stale_reads, "allowed", False)
+  _stale_reads.allowed = True
+  try:
+    yield
+  finally:
+    _stale_reads.allowed = previous
+
+
+def StaleReadsAllowed() -> bool:
+  """Returns whether the current thread is within `AllowStaleReads`."""
+  return getattr(_stale_reads, "allowed", False)
+
+
 class Database(metaclass=abc.ABCMeta):
   """The GRR relational database abstraction."""
 
@@ -1294,6 +1362,17 @@ class Database(metaclass=abc.ABCMeta):
   def RemoveExpiredForemanRules(self) -> None:
     """Removes all expired foreman rules from the database."""
 
+  @abc.abstractmethod
+  def ReadForemanRulesVersion(self) -> int:
+    """Reads the current version of the foreman rules.
+
+    The version changes every time a foreman rule is written or removed and can
+    be used to cheaply check whether previously read rules are still current.
+
+    Returns:
+      An integer identifying the current set of foreman rules.
+    """
+
   @abc.abstractmethod
   def WriteGRRUser(
       self,
@@ -2119,6 +2198,28 @@ class Database(metaclass=abc.ABCMeta):
       And Flow object.
     """
 
+  @abc.abstractmethod
+  def LeaseFlowsForProcessing(
+      self,
+      flow_keys: Collection[tuple[str, str]],
+      processing_time: rdfvalue.Duration,
+  ) -> dict[tuple[str, str], flows_pb2.Flow]:
+    """Marks multiple flows as being processed on this worker in one go.
+
+    Flows that can't be leased (because they don't exist, are already being
+    processed or their parent hunt is not running) are silently skipped.
+    Callers are expected to use LeaseFlowForProcessing on such flows to find
+    out the exact reason.
+
+    Args:
+      flow_keys: (client_id, flow_id) tuples identifying the flows to lease.
+      processing_time: Duration that the worker has to finish processing before
+        the flows are considered stuck.
+
+    Returns:
+      A dict mapping (client_id, flow_id) tuples to leased Flow objects.
+    """
+
   @abc.abstractmethod
   def ReleaseProcessedFlow(self, flow_obj: flows_pb2.Flow) -> bool:
     """Releases a flow that the worker was processing to the database.
@@ -2136,6 +2237,22 @@ class Database(metaclass=abc.ABCMeta):
       this method will return false and the flow will not be written.
     """
 
+  @abc.abstractmethod
+  def ReleaseProcessedFlows(
+      self, flow_objs: Sequence[flows_pb2.Flow]
+  ) -> dict[tuple[str, str], bool]:
+    """Releases multiple flows that the worker was processing in one go.
+
+    Every flow is released exactly as with ReleaseProcessedFlow.
+
+    Args:
+      flow_objs: The Flow objects to return to the database.
+
+    Returns:
+      A dict mapping (client_id, flow_id) tuples to booleans indicating if it
+      was possible to return the flow to the database.
+    """
+
   @abc.abstractmethod
   def UpdateFlow(
       self,
@@ -2311,6 +2428,36 @@ class Database(metaclass=abc.ABCMeta):
       sorted list of responses for the request).
     """
 
+  @abc.abstractmethod
+  def ReadFlowRequestsForFlows(
+      self,
+      flow_keys: Collection[tuple[str, str]],
+  ) -> dict[
+      tuple[str, str],
+      dict[
+          int,
+          tuple[
+              flows_pb2.FlowRequest,
+              Sequence[
+                  Union[
+                      flows_pb2.FlowResponse,
+                      flows_pb2.FlowStatus,
+                      flows_pb2.FlowIterator,
+                  ],
+              ],
+          ],
+      ],
+  ]:
+    """Reads all requests for multiple flows in one go.
+
+    Args:
+      flow_keys: (client_id, flow_id) tuples identifying the flows.
+
+    Returns:
+      A dict mapping (client_id, flow_id) tuples to dicts as returned by
+      ReadFlowRequests. Every flow key is present in the result.
+    """
+
   @abc.abstractmethod
   def WriteFlowProcessingRequests(
       self,
@@ -2358,6 +2505,21 @@ class Database(metaclass=abc.ABCMeta):
         rdf_flows.FlowProcessingRequest. Required.
     """
 
+  @abc.abstractmethod
+  def RegisterFlowProcessingBatchHandler(
+      self,
+      handler: Callable[[Sequence[flows_pb2.FlowProcessingRequest]], None],
+      batch_size: int,
+  ) -> None:
+    """Registers a handler to receive batches of flow processing messages.
+
+    Args:
+      handler: Method, which will be called repeatedly with lists of at most
+        `batch_size` rdf_flows.FlowProcessingRequest. Required.
+      batch_size: The maximum number of requests passed to a single handler
+        call.
+    """
+
   @abc.abstractmethod
   def UnregisterFlowProcessingHandler(
       self, timeout: Optional[rdfvalue.Duration] = None
@@ -2415,6 +2577,74 @@ class Database(metaclass=abc.ABCMeta):
       A list of FlowResult values sorted by timestamp in ascending order.
     """
 
+  @abc.abstractmethod
+  def ReadFlowResultsPage(
+      self,
+      client_id: str,
+      flow_id: str,
+      count: int,
+      after: Optional[FlowResultsCursor] = None,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+  ) -> tuple[Sequence[flows_pb2.FlowResult], Optional[FlowResultsCursor]]:
+    """Reads a page of flow results of a given flow.
+
+    Args:
+      client_id: The client id on which this flow is running.
+      flow_id: The id of the flow to read results for.
+      count: Maximum number of results to read.
+      after: (Optional) A cursor returned by a previous call. Only results
+        following the result the cursor points to will be returned.
+      with_tag: (Optional) When specified, should be a string. Only results
+        having specified tag will be returned.
+      with_proto_type_url: (Optional) When specified, should be a string. Only
+        results of a specified proto type url will be returned.
+
+    Returns:
+      A tuple with a list of FlowResult values sorted by timestamp in
+      ascending order and a cursor pointing to the last of them (or None if
+      there are no results).
+    """
+
+  def IterateFlowResults(
+      self,
+      client_id: str,
+      flow_id: str,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+      batch_size: int = FLOW_RESULTS_BATCH_SIZE,
+      allow_stale: bool = False,
+  ) -> Iterator[flows_pb2.FlowResult]:
+    """Yields all flow results of a given flow, reading them in pages.
+
+    Args:
+      client_id: The client id on which this flow is running.
+      flow_id: The id of the flow to read results for.
+      with_tag: (Optional) Only results having specified tag will be returned.
+      with_proto_type_url: (Optional) Only results of a specified proto type url
+        will be returned.
+      batch_size: Number of results to read from the database at a time.
+      allow_stale: Whether the pages may be read with `AllowStaleReads`.
+
+    Yields:
+      FlowResult values sorted by timestamp in ascending order.
+    """
+    after = None
+    while True:
+      with AllowStaleReads() if allow_stale else contextlib.nullcontext():
+        results, after = self.ReadFlowResultsPage(
+            client_id,
+            flow_id,
+            batch_size,
+            after=after,
+            with_tag=with_tag,
+            with_proto_type_url=with_proto_type_url,
+        )
+      yield from results
+
+      if len(results) < batch_size:
+        break
+
   @abc.abstractmethod
   def CountFlowResults(
       self,
@@ -3110,6 +3340,69 @@ class Database(metaclass=abc.ABCMeta):
       A list of FlowResult values sorted by timestamp in ascending order.
     """
 
+  @abc.abstractmethod
+  def ReadHuntResultsPage(
+      self,
+      hunt_id: str,
+      count: int,
+      after: Optional[FlowResultsCursor] = None,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+  ) -> tuple[Sequence[flows_pb2.FlowResult], Optional[FlowResultsCursor]]:
+    """Reads a page of hunt results of a given hunt.
+
+    Args:
+      hunt_id: The id of the hunt to read results for.
+      count: Maximum number of results to read.
+      after: (Optional) A cursor returned by a previous call. Only results
+        following the result the cursor points to will be returned.
+      with_tag: (Optional) When specified, should be a string. Only results
+        having specified tag will be returned.
+      with_proto_type_url: (Optional) When specified, should be a string. Only
+        results of a specified proto type url will be returned.
+
+    Returns:
+      A tuple with a list of FlowResult values sorted by timestamp in
+      ascending order and a cursor pointing to the last of them (or None if
+      there are no results).
+    """
+
+  def IterateHuntResults(
+      self,
+      hunt_id: str,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+      batch_size: int = FLOW_RESULTS_BATCH_SIZE,
+      allow_stale: bool = False,
+  ) -> Iterator[flows_pb2.FlowResult]:
+    """Yields all hunt results of a given hunt, reading them in pages.
+
+    Args:
+      hunt_id: The id of the hunt to read results for.
+      with_tag: (Optional) Only results having specified tag will be returned.
+      with_proto_type_url: (Optional) Only results of a specified proto type url
+        will be returned.
+      batch_size: Number of results to read from the database at a time.
+      allow_stale: Whether the pages may be read with `AllowStaleReads`.
+
+    Yields:
+      FlowResult values sorted by timestamp in ascending order.
+    """
+    after = None
+    while True:
+      with AllowStaleReads() if allow_stale else contextlib.nullcontext():
+        results, after = self.ReadHuntResultsPage(
+            hunt_id,
+            batch_size,
+            after=after,
+            with_tag=with_tag,
+            with_proto_type_url=with_proto_type_url,
+        )
+      yield from results
+
+      if len(results) < batch_size:
+        break
+
   @abc.abstractmethod
   def CountHuntResults(
       self,
@@ -3270,6 +3563,22 @@ class Database(metaclass=abc.ABCMeta):
       A mapping from hunt_ids to HuntCounters objects.
     """
 
+  @abc.abstractmethod
+  def RecomputeHuntsCounters(
+      self,
+      hunt_ids: Collection[str],
+  ) -> None:
+    """Recomputes hunt counters of given hunts from scratch.
+
+    Databases may maintain hunt counters incrementally instead of computing
+    them on every read. This brings such counters back in sync with hunt flows
+    in case they have drifted (e.g. due to flows deleted together with their
+    clients).
+
+    Args:
+      hunt_ids: The ids of the hunts to recompute counters for.
+    """
+
   @abc.abstractmethod
   def ReadHuntClientResourcesStats(
       self, hunt_id: str
@@ -3298,6 +3607,24 @@ class Database(metaclass=abc.ABCMeta):
       sorting order).
     """
 
+  @abc.abstractmethod
+  def ReadHuntFlowsTimestamps(
+      self,
+      hunt_id: str,
+  ) -> HuntFlowsTimestamps:
+    """Reads creation and completion times of hunt flows.
+
+    Unlike `ReadHuntFlowsStatesAndTimestamps`, timestamps are returned in a
+    columnar form, which is considerably cheaper to read for big hunts.
+
+    Args:
+      hunt_id: The id of the hunt to read timestamps for.
+
+    Returns:
+      A HuntFlowsTimestamps object with both sequences sorted in ascending
+      order.
+    """
+
   @abc.abstractmethod
   def WriteSignedBinaryReferences(
       self,
@@ -3877,6 +4204,11 @@ class DatabaseValidationWrapper(Database):
   def RemoveExpiredForemanRules(self) -> None:
     return self.delegate.RemoveExpiredForemanRules()
 
+  def ReadForemanRulesVersion(self) -> int:
+    result = self.delegate.ReadForemanRulesVersion()
+    precondition.AssertType(result, int)
+    return result
+
   def WriteGRRUser(
       self,
       username: str,
@@ -4386,10 +4718,27 @@ class DatabaseValidationWrapper(Database):
         client_id, flow_id, processing_time
     )
 
+  def LeaseFlowsForProcessing(
+      self,
+      flow_keys: Collection[tuple[str, str]],
+      processing_time: rdfvalue.Duration,
+  ) -> dict[tuple[str, str], flows_pb2.Flow]:
+    for client_id, flow_id in flow_keys:
+      precondition.ValidateClientId(client_id)
+      precondition.ValidateFlowId(flow_id)
+    _ValidateDuration(processing_time)
+    return self.delegate.LeaseFlowsForProcessing(flow_keys, processing_time)
+
   def ReleaseProcessedFlow(self, flow_obj: flows_pb2.Flow) -> bool:
     precondition.AssertType(flow_obj, flows_pb2.Flow)
     return self.delegate.ReleaseProcessedFlow(flow_obj)
 
+  def ReleaseProcessedFlows(
+      self, flow_objs: Sequence[flows_pb2.Flow]
+  ) -> dict[tuple[str, str], bool]:
+    precondition.AssertIterableType(flow_objs, flows_pb2.Flow)
+    return self.delegate.ReleaseProcessedFlows(flow_objs)
+
   def UpdateFlow(
       self,
       client_id: str,
@@ -4539,6 +4888,30 @@ class DatabaseValidationWrapper(Database):
     precondition.ValidateFlowId(flow_id)
     return self.delegate.ReadFlowRequests(client_id, flow_id)
 
+  def ReadFlowRequestsForFlows(
+      self,
+      flow_keys: Collection[tuple[str, str]],
+  ) -> dict[
+      tuple[str, str],
+      dict[
+          int,
+          tuple[
+              flows_pb2.FlowRequest,
+              Sequence[
+                  Union[
+                      flows_pb2.FlowResponse,
+                      flows_pb2.FlowStatus,
+                      flows_pb2.FlowIterator,
+                  ],
+              ],
+          ],
+      ],
+  ]:
+    for client_id, flow_id in flow_keys:
+      precondition.ValidateClientId(client_id)
+      precondition.ValidateFlowId(flow_id)
+    return self.delegate.ReadFlowRequestsForFlows(flow_keys)
+
   def WriteFlowProcessingRequests(
       self,
       requests: Sequence[flows_pb2.FlowProcessingRequest],
@@ -4567,6 +4940,17 @@ class DatabaseValidationWrapper(Database):
       raise ValueError("handler must be provided")
     return self.delegate.RegisterFlowProcessingHandler(handler)
 
+  def RegisterFlowProcessingBatchHandler(
+      self,
+      handler: Callable[[Sequence[flows_pb2.FlowProcessingRequest]], None],
+      batch_size: int,
+  ) -> None:
+    if handler is None:
+      raise ValueError("handler must be provided")
+    if batch_size < 1:
+      raise ValueError("batch_size must be positive")
+    return self.delegate.RegisterFlowProcessingBatchHandler(handler, batch_size)
+
   def UnregisterFlowProcessingHandler(
       self, timeout: Optional[rdfvalue.Duration] = None
   ) -> None:
@@ -4615,6 +4999,31 @@ class DatabaseValidationWrapper(Database):
         with_substring=with_substring,
     )
 
+  def ReadFlowResultsPage(
+      self,
+      client_id: str,
+      flow_id: str,
+      count: int,
+      after: Optional[FlowResultsCursor] = None,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+  ) -> tuple[Sequence[flows_pb2.FlowResult], Optional[FlowResultsCursor]]:
+    precondition.ValidateClientId(client_id)
+    precondition.ValidateFlowId(flow_id)
+    precondition.AssertType(count, int)
+    precondition.AssertOptionalType(after, FlowResultsCursor)
+    precondition.AssertOptionalType(with_tag, str)
+    precondition.AssertOptionalType(with_proto_type_url, str)
+
+    return self.delegate.ReadFlowResultsPage(
+        client_id,
+        flow_id,
+        count,
+        after=after,
+        with_tag=with_tag,
+        with_proto_type_url=with_proto_type_url,
+    )
+
   def CountFlowResults(
       self,
       client_id,
@@ -5124,6 +5533,28 @@ class DatabaseValidationWrapper(Database):
         with_timestamp=with_timestamp,
     )
 
+  def ReadHuntResultsPage(
+      self,
+      hunt_id: str,
+      count: int,
+      after: Optional[FlowResultsCursor] = None,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+  ) -> tuple[Sequence[flows_pb2.FlowResult], Optional[FlowResultsCursor]]:
+    _ValidateHuntId(hunt_id)
+    precondition.AssertType(count, int)
+    precondition.AssertOptionalType(after, FlowResultsCursor)
+    precondition.AssertOptionalType(with_tag, str)
+    precondition.AssertOptionalType(with_proto_type_url, str)
+
+    return self.delegate.ReadHuntResultsPage(
+        hunt_id,
+        count,
+        after=after,
+        with_tag=with_tag,
+        with_proto_type_url=with_proto_type_url,
+    )
+
   def CountHuntResults(
       self,
       hunt_id: str,
@@ -5190,6 +5621,14 @@ class DatabaseValidationWrapper(Database):
       _ValidateHuntId(hunt_id)
     return self.delegate.ReadHuntsCounters(hunt_ids)
 
+  def RecomputeHuntsCounters(
+      self,
+      hunt_ids: Collection[str],
+  ) -> None:
+    for hunt_id in hunt_ids:
+      _ValidateHuntId(hunt_id)
+    return self.delegate.RecomputeHuntsCounters(hunt_ids)
+
   def ReadHuntClientResourcesStats(
       self, hunt_id: str
   ) -> jobs_pb2.ClientResourcesStats:
@@ -5203,6 +5642,13 @@ class DatabaseValidationWrapper(Database):
     _ValidateHuntId(hunt_id)
     return self.delegate.ReadHuntFlowsStatesAndTimestamps(hunt_id)
 
+  def ReadHuntFlowsTimestamps(
+      self,
+      hunt_id: str,
+  ) -> HuntFlowsTimestamps:
+    _ValidateHuntId(hunt_id)
+    return self.delegate.ReadHuntFlowsTimestamps(hunt_id)
+
   def WriteSignedBinaryReferences(
       self,
       binary_id: objects_pb2.SignedBinaryID,
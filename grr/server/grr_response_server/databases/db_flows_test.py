@@ -1576,6 +1576,57 @@ class DatabaseTestFlowMixin(object):
     self.assertEqual(counters.num_clients_with_results, 1)
     self.assertEqual(counters.num_results, 10)
 
+  def testLeaseFlowsForProcessing(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id_1 = db_test_utils.InitializeFlow(self.db, client_id)
+    flow_id_2 = db_test_utils.InitializeFlow(self.db, client_id)
+    processing_time = rdfvalue.Duration.From(60, rdfvalue.SECONDS)
+
+    flows = self.db.LeaseFlowsForProcessing(
+        [(client_id, flow_id_1), (client_id, flow_id_2)], processing_time
+    )
+
+    self.assertCountEqual(
+        flows.keys(), [(client_id, flow_id_1), (client_id, flow_id_2)]
+    )
+    for flow in flows.values():
+      self.assertEqual(flow.processing_on, utils.ProcessIdString())
+      read_flow = self.db.ReadFlowObject(flow.client_id, flow.flow_id)
+      self.assertEqual(read_flow.processing_on, flow.processing_on)
+      self.assertEqual(read_flow.processing_deadline, flow.processing_deadline)
+
+  def testLeaseFlowsForProcessingSkipsFlowsThatCannotBeLeased(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+    self.db.UpdateHuntObject(
+        hunt_id, hunt_state=hunts_pb2.Hunt.HuntState.STOPPED
+    )
+
+    client_id = db_test_utils.InitializeClient(self.db)
+    hunt_flow_id = db_test_utils.InitializeFlow(
+        self.db, client_id, parent_hunt_id=hunt_id
+    )
+    leased_flow_id = db_test_utils.InitializeFlow(self.db, client_id)
+    free_flow_id = db_test_utils.InitializeFlow(self.db, client_id)
+    processing_time = rdfvalue.Duration.From(60, rdfvalue.SECONDS)
+
+    self.db.LeaseFlowForProcessing(client_id, leased_flow_id, processing_time)
+
+    flows = self.db.LeaseFlowsForProcessing(
+        [
+            (client_id, hunt_flow_id),
+            (client_id, leased_flow_id),
+            (client_id, free_flow_id),
+            (client_id, "ABCDEF42"),
+        ],
+        processing_time,
+    )
+
+    self.assertCountEqual(flows.keys(), [(client_id, free_flow_id)])
+
+  def testLeaseFlowsForProcessingWithNoFlows(self):
+    processing_time = rdfvalue.Duration.From(60, rdfvalue.SECONDS)
+    self.assertEqual(self.db.LeaseFlowsForProcessing([], processing_time), {})
+
   def testLeaseFlowForProcessingUpdatesFlowObjects(self):
     client_id = db_test_utils.InitializeClient(self.db)
     flow_id = db_test_utils.InitializeFlow(self.db, client_id)
@@ -1706,6 +1757,48 @@ class DatabaseTestFlowMixin(object):
 
     self.assertFalse(self.db.ReleaseProcessedFlow(processed_flow))
 
+  def testReleaseProcessedFlows(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id_1 = db_test_utils.InitializeFlow(self.db, client_id)
+    flow_id_2 = db_test_utils.InitializeFlow(self.db, client_id)
+    processing_time = rdfvalue.Duration.From(60, rdfvalue.SECONDS)
+
+    flows = self.db.LeaseFlowsForProcessing(
+        [(client_id, flow_id_1), (client_id, flow_id_2)], processing_time
+    )
+    for flow in flows.values():
+      flow.next_request_to_process = 2
+      flow.num_replies_sent = 3
+
+    # Only the second flow has its next request ready for processing.
+    self.db.WriteFlowRequests([
+        flows_pb2.FlowRequest(
+            client_id=client_id,
+            flow_id=flow_id_2,
+            request_id=2,
+            needs_processing=True,
+        ),
+    ])
+
+    released = self.db.ReleaseProcessedFlows(list(flows.values()))
+
+    self.assertEqual(
+        released,
+        {(client_id, flow_id_1): True, (client_id, flow_id_2): False},
+    )
+
+    read_flow = self.db.ReadFlowObject(client_id, flow_id_1)
+    self.assertFalse(read_flow.processing_on)
+    self.assertFalse(read_flow.HasField("processing_deadline"))
+    self.assertEqual(read_flow.next_request_to_process, 2)
+    self.assertEqual(read_flow.num_replies_sent, 3)
+
+    read_flow = self.db.ReadFlowObject(client_id, flow_id_2)
+    self.assertEqual(read_flow.processing_on, utils.ProcessIdString())
+
+  def testReleaseProcessedFlowsWithNoFlows(self):
+    self.assertEqual(self.db.ReleaseProcessedFlows([]), {})
+
   def testReleaseProcessedFlowWithRequestScheduledInFuture(self):
     client_id = db_test_utils.InitializeClient(self.db)
     flow_id = db_test_utils.InitializeFlow(
@@ -1972,6 +2065,57 @@ class DatabaseTestFlowMixin(object):
     self.assertEqual(responses[0].flow_id, flow_id_1)
     self.assertEqual(responses[0].response_id, 2)
 
+  def testReadFlowRequestsForFlows(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id_1 = db_test_utils.InitializeFlow(self.db, client_id)
+    flow_id_2 = db_test_utils.InitializeFlow(self.db, client_id)
+    flow_id_3 = db_test_utils.InitializeFlow(self.db, client_id)
+
+    self.db.WriteFlowRequests([
+        flows_pb2.FlowRequest(
+            client_id=client_id, flow_id=flow_id_1, request_id=1
+        ),
+        flows_pb2.FlowRequest(
+            client_id=client_id, flow_id=flow_id_1, request_id=2
+        ),
+        flows_pb2.FlowRequest(
+            client_id=client_id, flow_id=flow_id_2, request_id=1
+        ),
+    ])
+    self.db.WriteFlowResponses([
+        flows_pb2.FlowResponse(
+            client_id=client_id, flow_id=flow_id_1, request_id=2, response_id=1
+        ),
+        flows_pb2.FlowResponse(
+            client_id=client_id, flow_id=flow_id_2, request_id=1, response_id=1
+        ),
+        flows_pb2.FlowResponse(
+            client_id=client_id, flow_id=flow_id_2, request_id=1, response_id=2
+        ),
+    ])
+
+    keys = [
+        (client_id, flow_id_1),
+        (client_id, flow_id_2),
+        (client_id, flow_id_3),
+    ]
+    flow_requests = self.db.ReadFlowRequestsForFlows(keys)
+
+    self.assertCountEqual(flow_requests.keys(), keys)
+    self.assertEqual(flow_requests[(client_id, flow_id_3)], {})
+
+    for key in keys:
+      self.assertEqual(
+          flow_requests[key], self.db.ReadFlowRequests(*key), msg=key
+      )
+
+    self.assertCountEqual(flow_requests[(client_id, flow_id_1)].keys(), [1, 2])
+    _, responses = flow_requests[(client_id, flow_id_2)][1]
+    self.assertEqual([r.response_id for r in responses], [1, 2])
+
+  def testReadFlowRequestsForFlowsWithNoFlows(self):
+    self.assertEqual(self.db.ReadFlowRequestsForFlows([]), {})
+
   def testUpdateIncrementalFlowRequests(self):
     client_id = db_test_utils.InitializeClient(self.db)
     flow_id = db_test_utils.InitializeFlow(self.db, client_id)
@@ -2044,6 +2188,45 @@ class DatabaseTestFlowMixin(object):
           int(g.creation_time), pre_creation_time, post_creation_time
       )
 
+  def testFlowProcessingRequestsBatchQueue(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    flow_ids = []
+    for _ in range(5):
+      flow_id = db_test_utils.InitializeFlow(self.db, client_id)
+      flow_ids.append(flow_id)
+
+    request_queue = queue.Queue()
+
+    def Callback(requests: Sequence[flows_pb2.FlowProcessingRequest]):
+      self.assertLessEqual(len(requests), 2)
+      self.db.AckFlowProcessingRequests(requests)
+      for request in requests:
+        request_queue.put(request)
+
+    self.db.RegisterFlowProcessingBatchHandler(Callback, batch_size=2)
+    self.addCleanup(self.db.UnregisterFlowProcessingHandler)
+
+    requests = []
+    for flow_id in flow_ids:
+      requests.append(
+          flows_pb2.FlowProcessingRequest(client_id=client_id, flow_id=flow_id)
+      )
+
+    self.db.WriteFlowProcessingRequests(requests)
+
+    got = []
+    while len(got) < 5:
+      try:
+        l = request_queue.get(True, timeout=6)
+        got.append(l)
+      except queue.Empty:
+        self.fail(
+            "Timed out waiting for messages, expected 5, got %d" % len(got)
+        )
+
+    self.assertCountEqual(flow_ids, [g.flow_id for g in got])
+
   def testFlowProcessingRequestsQueueWithDelay(self):
     client_id = db_test_utils.InitializeClient(self.db)
 
@@ -2479,6 +2662,124 @@ class DatabaseTestFlowMixin(object):
             % (i, l, result_payloads, expected_payloads),
         )
 
+  def testReadFlowResultsPageResumesAfterCursor(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id = db_test_utils.InitializeFlow(self.db, client_id)
+
+    sample_results = self._WriteFlowResults(
+        self._SampleResults(client_id, flow_id), multiple_timestamps=True
+    )
+
+    results, after = self.db.ReadFlowResultsPage(client_id, flow_id, 4)
+    self.assertEqual(
+        [r.payload for r in results], [r.payload for r in sample_results[:4]]
+    )
+    self.assertEqual(after.timestamp, results[-1].timestamp)
+
+    results, after = self.db.ReadFlowResultsPage(
+        client_id, flow_id, 4, after=after
+    )
+    self.assertEqual(
+        [r.payload for r in results], [r.payload for r in sample_results[4:8]]
+    )
+
+    results, after = self.db.ReadFlowResultsPage(
+        client_id, flow_id, 4, after=after
+    )
+    self.assertEqual(
+        [r.payload for r in results], [r.payload for r in sample_results[8:]]
+    )
+
+    results, last = self.db.ReadFlowResultsPage(
+        client_id, flow_id, 4, after=after
+    )
+    self.assertEmpty(results)
+    self.assertIsNone(last)
+
+  def testReadFlowResultsPageHandlesEqualTimestamps(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id = db_test_utils.InitializeFlow(self.db, client_id)
+
+    # All results are written in one call and thus share the timestamp.
+    sample_results = self._WriteFlowResults(
+        self._SampleResults(client_id, flow_id)
+    )
+
+    results = []
+    after = None
+    while True:
+      page, after = self.db.ReadFlowResultsPage(
+          client_id, flow_id, 3, after=after
+      )
+      results.extend(page)
+      if len(page) < 3:
+        break
+
+    self.assertLen(results, len(sample_results))
+    self.assertCountEqual(
+        [r.payload for r in results], [r.payload for r in sample_results]
+    )
+
+  def testReadFlowResultsPageAppliesFilters(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id = db_test_utils.InitializeFlow(self.db, client_id)
+
+    sample_results = self._WriteFlowResults(
+        self._SampleResults(client_id, flow_id), multiple_timestamps=True
+    )
+
+    results, _ = self.db.ReadFlowResultsPage(
+        client_id, flow_id, 10, with_tag="tag_1"
+    )
+    self.assertEqual([r.payload for r in results], [sample_results[1].payload])
+
+    results, _ = self.db.ReadFlowResultsPage(
+        client_id,
+        flow_id,
+        10,
+        with_proto_type_url=sample_results[0].payload.type_url,
+    )
+    self.assertLen(results, len(sample_results))
+
+    crash_any = any_pb2.Any()
+    crash_any.Pack(jobs_pb2.ClientCrash())
+    results, _ = self.db.ReadFlowResultsPage(
+        client_id, flow_id, 10, with_proto_type_url=crash_any.type_url
+    )
+    self.assertEmpty(results)
+
+  def testIterateFlowResultsReadsAllResultsInPages(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id = db_test_utils.InitializeFlow(self.db, client_id)
+
+    sample_results = self._WriteFlowResults(
+        self._SampleResults(client_id, flow_id), multiple_timestamps=True
+    )
+
+    results = list(self.db.IterateFlowResults(client_id, flow_id, batch_size=3))
+    self.assertEqual(
+        [r.payload for r in results], [r.payload for r in sample_results]
+    )
+
+  def testIterateFlowResultsAllowsStaleReadsOnlyForPageReads(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id = db_test_utils.InitializeFlow(self.db, client_id)
+
+    sample_results = self._WriteFlowResults(
+        self._SampleResults(client_id, flow_id), multiple_timestamps=True
+    )
+
+    results = []
+    for result in self.db.IterateFlowResults(
+        client_id, flow_id, batch_size=3, allow_stale=True
+    ):
+      self.assertFalse(db.StaleReadsAllowed())
+      results.append(result)
+
+    self.assertEqual(
+        [r.payload for r in results], [r.payload for r in sample_results]
+    )
+
   def testReadFlowResultsCorrectlyAppliesWithTagFilter(self):
     client_id = db_test_utils.InitializeClient(self.db)
     flow_id = db_test_utils.InitializeFlow(self.db, client_id)
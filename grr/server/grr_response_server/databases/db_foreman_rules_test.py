@@ -99,5 +99,33 @@ class DatabaseTestForemanRulesMixin(object):
 
     self.assertLen(self.db.ReadAllForemanRules(), 2)
 
+  def testForemanRulesVersionChangesWhenRulesChange(self):
+    db_test_utils.InitializeHunt(self.db, "123456")
+    db_test_utils.InitializeHunt(self.db, "654321")
+
+    version = self.db.ReadForemanRulesVersion()
+    self.assertEqual(self.db.ReadForemanRulesVersion(), version)
+
+    self.db.WriteForemanRule(self._GetTestRule("123456"))
+    self.assertNotEqual(self.db.ReadForemanRulesVersion(), version)
+    version = self.db.ReadForemanRulesVersion()
+
+    self.db.WriteForemanRule(self._GetTestRule("654321"))
+    self.assertNotEqual(self.db.ReadForemanRulesVersion(), version)
+    version = self.db.ReadForemanRulesVersion()
+
+    self.db.RemoveForemanRule("123456")
+    self.assertNotEqual(self.db.ReadForemanRulesVersion(), version)
+
+  def testForemanRulesVersionChangesWhenExpiredRulesAreRemoved(self):
+    db_test_utils.InitializeHunt(self.db, "123456")
+    expires = self.db.Now() - rdfvalue.Duration("1s")
+    self.db.WriteForemanRule(self._GetTestRule("123456", expires=expires))
+
+    version = self.db.ReadForemanRulesVersion()
+    self.db.RemoveExpiredForemanRules()
+    self.assertNotEqual(self.db.ReadForemanRulesVersion(), version)
+    self.assertEmpty(self.db.ReadAllForemanRules())
+
 
 # This file is a test library and thus does not require a __main__ block.
@@ -24,6 +24,7 @@ from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
 from grr_response_server.rdfvalues import mig_flow_objects
 from grr_response_server.rdfvalues import mig_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
+from grr.test_lib import test_lib
 
 
 class DatabaseTestHuntMixin(object):
@@ -1360,6 +1361,78 @@ class DatabaseTestHuntMixin(object):
             % (i, l, result_payloads, expected_payloads),
         )
 
+  def testReadHuntResultsPageResumesAfterCursor(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+
+    sample_results = []
+    for _ in range(10):
+      client_id, flow_id = self._SetupHuntClientAndFlow(hunt_id=hunt_id)
+      results = self._SampleSingleTypeHuntResults(
+          client_id=client_id, flow_id=flow_id, hunt_id=hunt_id, count=1
+      )
+      sample_results.extend(results)
+      self._WriteHuntResults(results)
+
+    results = []
+    after = None
+    for _ in range(4):
+      page, after = self.db.ReadHuntResultsPage(hunt_id, 3, after=after)
+      results.extend(page)
+
+    self.assertIsNone(after)
+    self.assertEqual(
+        [r.payload for r in results], [r.payload for r in sample_results]
+    )
+    for r in results:
+      self.assertEqual(r.hunt_id, hunt_id)
+
+  def testReadHuntResultsPageHandlesEqualTimestamps(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+
+    sample_results = []
+    for _ in range(3):
+      client_id, flow_id = self._SetupHuntClientAndFlow(hunt_id=hunt_id)
+      sample_results.extend(
+          self._SampleSingleTypeHuntResults(
+              client_id=client_id, flow_id=flow_id, hunt_id=hunt_id, count=4
+          )
+      )
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(42)):
+      self._WriteHuntResults(sample_results)
+
+    results = list(self.db.IterateHuntResults(hunt_id, batch_size=5))
+    self.assertLen(results, len(sample_results))
+    self.assertCountEqual(
+        [r.payload for r in results], [r.payload for r in sample_results]
+    )
+
+  def testIterateHuntResultsAppliesFilters(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+
+    client_id, flow_id = self._SetupHuntClientAndFlow(hunt_id=hunt_id)
+    sample_results = self._SampleTwoTypeHuntResults(
+        client_id=client_id, flow_id=flow_id, hunt_id=hunt_id
+    )
+    self._WriteHuntResults(sample_results)
+
+    type_url = sample_results[-1].payload.type_url
+    results = list(
+        self.db.IterateHuntResults(
+            hunt_id, with_proto_type_url=type_url, batch_size=2
+        )
+    )
+    self.assertCountEqual(
+        [r.payload for r in results],
+        [r.payload for r in sample_results if r.payload.type_url == type_url],
+    )
+
+    results = list(self.db.IterateHuntResults(hunt_id, with_tag="tag_1"))
+    self.assertCountEqual(
+        [r.payload for r in results],
+        [r.payload for r in sample_results if r.tag == "tag_1"],
+    )
+
   def testReadHuntResultsCorrectlyAppliesWithTagFilter(self):
     hunt_id = db_test_utils.InitializeHunt(self.db)
 
@@ -2359,6 +2432,82 @@ class DatabaseTestHuntMixin(object):
     self.assertAlmostEqual(hunt_counters.total_cpu_seconds, 14.5)
     self.assertEqual(hunt_counters.total_network_bytes_sent, 42)
 
+  def testReadHuntCountersReflectsFlowUpdates(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id = db_test_utils.InitializeFlow(
+        self.db,
+        client_id,
+        flow_id=hunt_id,
+        flow_state=rdf_flow_objects.Flow.FlowState.RUNNING,
+        parent_hunt_id=hunt_id,
+    )
+
+    hunt_counters = self.db.ReadHuntCounters(hunt_id)
+    self.assertEqual(hunt_counters.num_clients, 1)
+    self.assertEqual(hunt_counters.num_running_clients, 1)
+    self.assertEqual(hunt_counters.num_successful_clients, 0)
+
+    flow_obj = self.db.ReadFlowObject(client_id, flow_id)
+    flow_obj.flow_state = flows_pb2.Flow.FlowState.FINISHED
+    flow_obj.network_bytes_sent = 42
+    self.db.UpdateFlow(client_id, flow_id, flow_obj=flow_obj)
+
+    hunt_counters = self.db.ReadHuntCounters(hunt_id)
+    self.assertEqual(hunt_counters.num_clients, 1)
+    self.assertEqual(hunt_counters.num_running_clients, 0)
+    self.assertEqual(hunt_counters.num_successful_clients, 1)
+    self.assertEqual(hunt_counters.total_network_bytes_sent, 42)
+
+    self.db.UpdateFlow(
+        client_id, flow_id, flow_state=flows_pb2.Flow.FlowState.CRASHED
+    )
+
+    hunt_counters = self.db.ReadHuntCounters(hunt_id)
+    self.assertEqual(hunt_counters.num_successful_clients, 0)
+    self.assertEqual(hunt_counters.num_crashed_clients, 1)
+    self.assertEqual(hunt_counters.total_network_bytes_sent, 42)
+
+  def testReadHuntCountersReflectsDeletedClients(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+
+    client_ids = []
+    for _ in range(2):
+      client_id = db_test_utils.InitializeClient(self.db)
+      db_test_utils.InitializeFlow(
+          self.db,
+          client_id,
+          flow_id=hunt_id,
+          flow_state=rdf_flow_objects.Flow.FlowState.FINISHED,
+          parent_hunt_id=hunt_id,
+          network_bytes_sent=42,
+      )
+      client_ids.append(client_id)
+
+    self.db.UpdateHuntObject(
+        hunt_id, hunt_state=hunts_pb2.Hunt.HuntState.STOPPED
+    )
+    self.db.DeleteClient(client_ids[0])
+
+    hunt_counters = self.db.ReadHuntCounters(hunt_id)
+    self.assertEqual(hunt_counters.num_clients, 1)
+    self.assertEqual(hunt_counters.num_successful_clients, 1)
+    self.assertEqual(hunt_counters.total_network_bytes_sent, 42)
+
+  def testRecomputeHuntsCountersPreservesCounters(self):
+    hunt_id_1 = db_test_utils.InitializeHunt(self.db)
+    self._BuildFilterConditionExpectations(hunt_id_1)
+    hunt_id_2 = db_test_utils.InitializeHunt(self.db)
+
+    expected = self.db.ReadHuntsCounters([hunt_id_1, hunt_id_2])
+    self.db.RecomputeHuntsCounters([hunt_id_1, hunt_id_2])
+
+    self.assertEqual(
+        self.db.ReadHuntsCounters([hunt_id_1, hunt_id_2]), expected
+    )
+    self.assertEqual(expected[hunt_id_2].num_clients, 0)
+
   def testReadHuntClientResourcesStatsIgnoresSubflows(self):
     hunt_id = db_test_utils.InitializeHunt(self.db)
 
@@ -2700,6 +2849,54 @@ class DatabaseTestHuntMixin(object):
         ),
     )
 
+  def testReadHuntFlowsTimestampsReturnsSortedTimestamps(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+
+    expected_create_times = []
+    expected_completion_times = []
+    for i in range(10):
+      client_id, flow_id = self._SetupHuntClientAndFlow(hunt_id=hunt_id)
+
+      if i % 2 == 0:
+        flow_state = flows_pb2.Flow.FlowState.RUNNING
+      else:
+        flow_state = flows_pb2.Flow.FlowState.FINISHED
+      self.db.UpdateFlow(client_id, flow_id, flow_state=flow_state)
+
+      flow_obj = self.db.ReadFlowObject(client_id, flow_id)
+      expected_create_times.append(flow_obj.create_time // 10**6)
+      if flow_state == flows_pb2.Flow.FlowState.FINISHED:
+        expected_completion_times.append(flow_obj.last_update_time // 10**6)
+
+    timestamps = self.db.ReadHuntFlowsTimestamps(hunt_id)
+    self.assertEqual(
+        list(timestamps.create_times), sorted(expected_create_times)
+    )
+    self.assertEqual(
+        list(timestamps.completion_times), sorted(expected_completion_times)
+    )
+
+  def testReadHuntFlowsTimestampsIgnoresNestedFlows(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+
+    client_id, flow_id = self._SetupHuntClientAndFlow(hunt_id=hunt_id)
+    self._SetupHuntClientAndFlow(
+        hunt_id=hunt_id,
+        client_id=client_id,
+        flow_id=flow.RandomFlowId(),
+        parent_flow_id=flow_id,
+    )
+
+    timestamps = self.db.ReadHuntFlowsTimestamps(hunt_id)
+    self.assertLen(timestamps.create_times, 1)
+
+  def testReadHuntFlowsTimestampsReturnsNothingForHuntWithoutFlows(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+
+    timestamps = self.db.ReadHuntFlowsTimestamps(hunt_id)
+    self.assertEmpty(timestamps.create_times)
+    self.assertEmpty(timestamps.completion_times)
+
   def testReadHuntOutputPluginLogEntriesReturnsEntryFromSingleHuntFlow(self):
     hunt_id = db_test_utils.InitializeHunt(self.db)
 
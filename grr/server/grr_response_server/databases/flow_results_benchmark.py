@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""Benchmark comparing offset and cursor based reads of flow results."""
+
+import time
+
+from absl import app
+from absl import flags
+
+from grr_response_proto import flows_pb2
+from grr_response_proto import jobs_pb2
+from grr_response_server import data_store
+from grr_response_server import server_startup
+from grr_response_server.databases import db_test_utils
+
+
+_NUM_RESULTS = flags.DEFINE_integer(
+    "num_results",
+    default=100000,
+    help="Number of flow results to write before reading them back.",
+)
+
+_PAGE_SIZE = flags.DEFINE_integer(
+    "page_size",
+    default=1000,
+    help="Number of results read per database call.",
+)
+
+_WRITE_BATCH_SIZE = 1000
+
+
+def _WriteResults(client_id: str, flow_id: str, count: int) -> None:
+  batch = []
+  for i in range(count):
+    result = flows_pb2.FlowResult(client_id=client_id, flow_id=flow_id)
+    result.payload.Pack(jobs_pb2.LogMessage(data=f"result_{i}"))
+    batch.append(result)
+
+    if len(batch) == _WRITE_BATCH_SIZE:
+      data_store.REL_DB.WriteFlowResults(batch)
+      batch = []
+
+  if batch:
+    data_store.REL_DB.WriteFlowResults(batch)
+
+
+def _ReadWithOffset(client_id: str, flow_id: str) -> list[float]:
+  page_times = []
+  offset = 0
+  while True:
+    start = time.time()
+    results = data_store.REL_DB.ReadFlowResults(
+        client_id, flow_id, offset, _PAGE_SIZE.value
+    )
+    page_times.append(time.time() - start)
+
+    if len(results) < _PAGE_SIZE.value:
+      return page_times
+    offset += len(results)
+
+
+def _ReadWithCursor(client_id: str, flow_id: str) -> list[float]:
+  page_times = []
+  after = None
+  while True:
+    start = time.time()
+    results, after = data_store.REL_DB.ReadFlowResultsPage(
+        client_id, flow_id, _PAGE_SIZE.value, after=after
+    )
+    page_times.append(time.time() - start)
+
+    if len(results) < _PAGE_SIZE.value:
+      return page_times
+
+
+def _PrintTimes(name: str, page_times: list[float]) -> None:
+  print(
+      "{:<8} pages: {:>6}  total: {:>8.3f}s  first page: {:>8.2f}ms  "
+      "last page: {:>8.2f}ms".format(
+          name,
+          len(page_times),
+          sum(page_times),
+          page_times[0] * 1000,
+          page_times[-1] * 1000,
+      )
+  )
+
+
+def main(argv):
+  """Main."""
+  del argv  # Unused.
+
+  # Initialise flows and config_lib
+  server_startup.Init()
+
+  client_id = db_test_utils.InitializeClient(data_store.REL_DB)
+  flow_id = db_test_utils.InitializeFlow(data_store.REL_DB, client_id)
+
+  print("Writing {} results...".format(_NUM_RESULTS.value))
+  _WriteResults(client_id, flow_id, _NUM_RESULTS.value)
+
+  _PrintTimes("offset", _ReadWithOffset(client_id, flow_id))
+  _PrintTimes("cursor", _ReadWithCursor(client_id, flow_id))
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -73,6 +73,7 @@ class InMemoryDB(
     # Serialized `jobs_pb2.ClientCrash`.
     self.crash_history: dict[str, dict[rdfvalue.RDFDatetime, bytes]] = {}
     self.foreman_rules: list[jobs_pb2.ForemanCondition] = []
+    self.foreman_rules_version: int = 0
     self.keywords: dict[str, dict[str, rdfvalue.RDFDatetime]] = {}
     self.labels: dict[str, dict[str, set[str]]] = {}
     # Maps handler_id to dict[request_id, lease expiration time in us].
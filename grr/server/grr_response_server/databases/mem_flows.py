@@ -3,6 +3,7 @@
 
 import collections
 from collections.abc import Callable, Collection, Iterable, Mapping, Sequence
+import dataclasses
 import logging
 import sys
 import threading
@@ -308,6 +309,23 @@ class InMemoryDBFlowMixin(object):
     flow.processing_deadline = int(processing_deadline)
     return flow
 
+  @utils.Synchronized
+  def LeaseFlowsForProcessing(
+      self,
+      flow_keys: Collection[tuple[str, str]],
+      processing_time: rdfvalue.Duration,
+  ) -> dict[tuple[str, str], flows_pb2.Flow]:
+    """Marks multiple flows as being processed on this worker in one go."""
+    result = {}
+    for client_id, flow_id in flow_keys:
+      try:
+        result[(client_id, flow_id)] = self.LeaseFlowForProcessing(
+            client_id, flow_id, processing_time
+        )
+      except (db.UnknownFlowError, db.ParentHuntIsNotRunningError, ValueError):
+        continue
+    return result
+
   @utils.Synchronized
   def UpdateFlow(
       self,
@@ -681,6 +699,32 @@ class InMemoryDBFlowMixin(object):
 
     return res
 
+  @utils.Synchronized
+  def ReadFlowRequestsForFlows(
+      self,
+      flow_keys: Collection[tuple[str, str]],
+  ) -> dict[
+      tuple[str, str],
+      dict[
+          int,
+          tuple[
+              flows_pb2.FlowRequest,
+              Sequence[
+                  Union[
+                      flows_pb2.FlowResponse,
+                      flows_pb2.FlowStatus,
+                      flows_pb2.FlowIterator,
+                  ],
+              ],
+          ],
+      ],
+  ]:
+    """Reads all requests for multiple flows in one go."""
+    return {
+        (client_id, flow_id): self.ReadFlowRequests(client_id, flow_id)
+        for client_id, flow_id in flow_keys
+    }
+
   @utils.Synchronized
   def ReleaseProcessedFlow(self, flow_obj: flows_pb2.Flow) -> bool:
     """Releases a flow that the worker was processing to the database."""
@@ -705,6 +749,18 @@ class InMemoryDBFlowMixin(object):
     )
     return True
 
+  @utils.Synchronized
+  def ReleaseProcessedFlows(
+      self, flow_objs: Sequence[flows_pb2.Flow]
+  ) -> dict[tuple[str, str], bool]:
+    """Releases multiple flows that the worker was processing in one go."""
+    return {
+        (flow_obj.client_id, flow_obj.flow_id): self.ReleaseProcessedFlow(
+            flow_obj
+        )
+        for flow_obj in flow_objs
+    }
+
   def _InlineProcessingOK(
       self, requests: Sequence[flows_pb2.FlowProcessingRequest]
   ) -> bool:
@@ -784,6 +840,17 @@ class InMemoryDBFlowMixin(object):
             (request.client_id, request.flow_id), None
         )
 
+  def RegisterFlowProcessingBatchHandler(
+      self,
+      handler: Callable[[Sequence[flows_pb2.FlowProcessingRequest]], None],
+      batch_size: int,
+  ) -> None:
+    """Registers a handler to receive batches of flow processing messages."""
+    # Requests are handled inline or one at a time by the handler thread, so
+    # there is nothing to gain from batching in the in-memory database.
+    del batch_size  # Unused.
+    self.RegisterFlowProcessingHandler(lambda request: handler([request]))
+
   def _RegisterFlowProcessingHandler(
       self, handler: Callable[[flows_pb2.FlowProcessingRequest], None]
   ) -> None:
@@ -964,6 +1031,73 @@ class InMemoryDBFlowMixin(object):
         with_substring=with_substring,
     )
 
+  @utils.Synchronized
+  def _ReadFlowResultsPage(
+      self,
+      flows: Iterable[tuple[str, str]],
+      count: int,
+      after: Optional[db.FlowResultsCursor] = None,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+  ) -> tuple[Sequence[flows_pb2.FlowResult], Optional[db.FlowResultsCursor]]:
+    """Reads a page of flow results of given (client id, flow id) pairs."""
+    # Results are ordered by (timestamp, client id, flow id, write order) and
+    # the position in the per-flow list is used as the result id.
+    after_key = dataclasses.astuple(after) if after is not None else None
+
+    entries = []
+    for client_id, flow_id in flows:
+      for result_id, result in enumerate(
+          self.flow_results.get((client_id, flow_id), [])
+      ):
+        if with_tag is not None and result.tag != with_tag:
+          continue
+        if (
+            with_proto_type_url is not None
+            and result.payload.type_url != with_proto_type_url
+        ):
+          continue
+
+        position = db.FlowResultsCursor(
+            timestamp=result.timestamp,
+            client_id=client_id,
+            flow_id=flow_id,
+            result_id=result_id,
+        )
+        if after_key is not None and dataclasses.astuple(position) <= after_key:
+          continue
+
+        entries.append((position, result))
+
+    entries.sort(key=lambda entry: dataclasses.astuple(entry[0]))
+    entries = entries[:count]
+
+    results = []
+    for _, result in entries:
+      result_copy = flows_pb2.FlowResult()
+      result_copy.CopyFrom(result)
+      results.append(result_copy)
+
+    return results, entries[-1][0] if entries else None
+
+  def ReadFlowResultsPage(
+      self,
+      client_id: str,
+      flow_id: str,
+      count: int,
+      after: Optional[db.FlowResultsCursor] = None,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+  ) -> tuple[Sequence[flows_pb2.FlowResult], Optional[db.FlowResultsCursor]]:
+    """Reads a page of flow results of a given flow."""
+    return self._ReadFlowResultsPage(
+        [(client_id, flow_id)],
+        count,
+        after=after,
+        with_tag=with_tag,
+        with_proto_type_url=with_proto_type_url,
+    )
+
   @utils.Synchronized
   def CountFlowResults(
       self,
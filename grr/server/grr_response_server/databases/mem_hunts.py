@@ -404,6 +404,31 @@ class InMemoryDBHuntMixin(object):
     all_results.sort(key=lambda x: x.timestamp)
     return all_results[offset : offset + count]
 
+  @utils.Synchronized
+  def ReadHuntResultsPage(
+      self,
+      hunt_id: str,
+      count: int,
+      after: Optional[db.FlowResultsCursor] = None,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+  ) -> tuple[Sequence[flows_pb2.FlowResult], Optional[db.FlowResultsCursor]]:
+    """Reads a page of hunt results of a given hunt."""
+    # _ReadFlowResultsPage is implemented in the mem_flows mixin.
+    # pytype: disable=attribute-error
+    results, last = self._ReadFlowResultsPage(
+        [(f.client_id, f.flow_id) for f in self._GetHuntFlows(hunt_id)],
+        count,
+        after=after,
+        with_tag=with_tag,
+        with_proto_type_url=with_proto_type_url,
+    )
+    # pytype: enable=attribute-error
+    for result in results:
+      result.hunt_id = hunt_id
+
+    return results, last
+
   @utils.Synchronized
   def CountHuntResults(
       self,
@@ -543,6 +568,14 @@ class InMemoryDBHuntMixin(object):
       )
     return hunt_counters
 
+  def RecomputeHuntsCounters(
+      self,
+      hunt_ids: Collection[str],
+  ) -> None:
+    """Recomputes hunt counters of given hunts from scratch."""
+    # Hunt counters are always computed from hunt flows on read.
+    del hunt_ids  # Unused.
+
   @utils.Synchronized
   def ReadHuntClientResourcesStats(
       self,
@@ -588,6 +621,24 @@ class InMemoryDBHuntMixin(object):
 
     return result
 
+  @utils.Synchronized
+  def ReadHuntFlowsTimestamps(
+      self,
+      hunt_id: str,
+  ) -> db.HuntFlowsTimestamps:
+    """Reads creation and completion times of hunt flows."""
+    create_times = []
+    completion_times = []
+    for f in self._GetHuntFlows(hunt_id):
+      create_times.append(f.create_time // 10**6)
+      if f.flow_state != flows_pb2.Flow.FlowState.RUNNING:
+        completion_times.append(f.last_update_time // 10**6)
+
+    return db.HuntFlowsTimestamps(
+        create_times=sorted(create_times),
+        completion_times=sorted(completion_times),
+    )
+
   @utils.Synchronized
   def ReadHuntOutputPluginLogEntries(
       self,
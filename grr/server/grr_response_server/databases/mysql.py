@@ -9,8 +9,9 @@ import contextlib
 import logging
 import math
 import random
+import threading
 import time
-from typing import Union
+from typing import Any, Optional, Union
 import warnings
 
 # Note: Please refer to server/setup.py for the MySQLdb version that is used.
@@ -21,6 +22,8 @@ from MySQLdb.constants import ER as mysql_errors
 
 from grr_response_core import config
 from grr_response_core.lib import rdfvalue
+from grr_response_core.stats import metrics
+from grr_response_server import stats_server
 from grr_response_server import threadpool
 from grr_response_server.databases import db as db_module
 from grr_response_server.databases import db_utils
@@ -36,6 +39,7 @@ from grr_response_server.databases import mysql_hunts
 from grr_response_server.databases import mysql_migration
 from grr_response_server.databases import mysql_paths
 from grr_response_server.databases import mysql_pool
+from grr_response_server.databases import mysql_profiler
 from grr_response_server.databases import mysql_signed_binaries
 from grr_response_server.databases import mysql_signed_commands
 from grr_response_server.databases import mysql_users
@@ -48,6 +52,15 @@ MAX_PACKET_SIZE = 20 << 21
 # Maximum retry count:
 _MAX_RETRY_COUNT = 5
 
+MYSQL_TRANSACTION_LATENCY = metrics.Event(
+    "mysql_transaction_latency",
+    bins=[0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50],
+    fields=[("pool", str)],
+)
+# Readonly transactions run on the primary server because the read replica
+# was lagging behind or unreachable.
+MYSQL_REPLICA_FALLBACKS = metrics.Counter("mysql_replica_fallbacks")
+
 # MySQL error codes:
 _RETRYABLE_ERRORS = frozenset([
     mysql_conn_errors.SERVER_GONE_ERROR,
@@ -440,6 +453,71 @@ def _Connect(
   return conn
 
 
+def _ConnectToReplica(**connect_args):
+  """Connect to a MySQL read replica and check if it fulfills requirements.
+
+  Unlike `_Connect`, this does not try to change any global server settings,
+  as replicas are usually read-only.
+
+  Args:
+    **connect_args: Same arguments as accepted by `_Connect`.
+
+  Returns:
+    A connection to the read replica.
+  """
+  connection_args = _GetConnectionArgs(**connect_args)
+
+  conn = MySQLdb.Connect(**connection_args)
+  with contextlib.closing(conn.cursor()) as cursor:
+    _CheckForSSL(cursor)
+    _SetMariaDBMode(cursor)
+    _CheckPacketSize(cursor)
+    _SetEncoding(cursor)
+    _CheckConnectionEncoding(cursor)
+    _SetSqlMode(cursor)
+
+  return conn
+
+
+def _ReadReplicaLag(cursor) -> Optional[int]:
+  """Reads the replication lag of a MySQL read replica.
+
+  Args:
+    cursor: A cursor of a connection to the read replica.
+
+  Returns:
+    The number of seconds the replica lags behind its source (0 if the server
+    does not replicate from any source) or None if the replication is broken.
+  """
+  try:
+    cursor.execute("SHOW REPLICA STATUS")
+  except MySQLdb.ProgrammingError:
+    # Older MySQL and MariaDB versions only support the legacy syntax.
+    cursor.execute("SHOW SLAVE STATUS")
+
+  row = cursor.fetchone()
+  if row is None:
+    return 0
+
+  columns = [column[0] for column in cursor.description]
+  for name in ["Seconds_Behind_Source", "Seconds_Behind_Master"]:
+    if name in columns:
+      return row[columns.index(name)]
+
+  return None
+
+
+def _GetPoolConnectionLimits():
+  """Returns connection recycling arguments for `mysql_pool.Pool`."""
+  return dict(
+      max_lifetime_secs=config.CONFIG["Mysql.conn_max_lifetime_secs"] or None,
+      max_idle_secs=config.CONFIG["Mysql.conn_max_idle_secs"] or None,
+      keepalive_interval_secs=(
+          config.CONFIG["Mysql.conn_keepalive_interval_secs"] or None
+      ),
+  )
+
+
 _TXN_RETRY_JITTER_MIN = 1.0
 _TXN_RETRY_JITTER_MAX = 2.0
 _TXN_RETRY_BACKOFF_BASE = 1.5
@@ -487,6 +565,9 @@ class MysqlDB(
   _WRITE_ROWS_BATCH_SIZE = 10000
   _DELETE_ROWS_BATCH_SIZE = 5000
 
+  _REPLICA_LAG_CHECK_INTERVAL_SECS = 1.0
+  _REPLICA_WARNING_INTERVAL_SECS = 60.0
+
   def __init__(
       self, host=None, port=None, user=None, password=None, database=None
   ):
@@ -540,13 +621,64 @@ class MysqlDB(
     _SetupDatabase(**self._connect_args)
 
     self._max_pool_size = config.CONFIG["Mysql.conn_pool_max"]
-    self.pool = mysql_pool.Pool(self._Connect, max_size=self._max_pool_size)
+    self._materialized_hunt_counters = config.CONFIG[
+        "Mysql.materialized_hunt_counters"
+    ]
+
+    self.query_profiler = None
+    if config.CONFIG["Mysql.profile_queries"]:
+      self.query_profiler = mysql_profiler.QueryProfiler(
+          dump_path=config.CONFIG["Mysql.profile_dump_path"] or None,
+          dump_interval_secs=config.CONFIG["Mysql.profile_dump_interval_secs"],
+      )
+      stats_server.RegisterJSONPage("/mysql_profile", self._RenderQueryProfile)
+
+    self.pool = mysql_pool.Pool(
+        self._Connect,
+        max_size=self._max_pool_size,
+        name="primary",
+        profiler=self.query_profiler,
+        **_GetPoolConnectionLimits(),
+    )
+
+    self.replica_pool = None
+    self._replica_lock = threading.Lock()
+    self._replica_checked_at = None
+    self._replica_usable = False
+    self._replica_warned_at = None
+
+    replica_host = config.CONFIG["Mysql.replica_host"]
+    if replica_host:
+      self._replica_connect_args = dict(self._connect_args)
+      self._replica_connect_args["host"] = replica_host
+      self._replica_connect_args["port"] = (
+          config.CONFIG["Mysql.replica_port"] or self._connect_args["port"]
+      )
+      self._max_replica_pool_size = config.CONFIG["Mysql.replica_conn_pool_max"]
+      self._replica_max_lag_secs = config.CONFIG["Mysql.replica_max_lag_secs"]
+      self.replica_pool = mysql_pool.Pool(
+          self._ConnectToReplica,
+          max_size=self._max_replica_pool_size,
+          name="replica",
+          profiler=self.query_profiler,
+          **_GetPoolConnectionLimits(),
+      )
 
     self.handler_thread = None
     self.handler_stop = True
+    self.message_handler_request_notifier = mysql_utils.RequestNotifier(
+        min_wait_secs=self._MESSAGE_HANDLER_MIN_POLL_TIME_SECS,
+        max_wait_secs=self._MESSAGE_HANDLER_POLL_TIME_SECS,
+        probe=self._HasLeasableMessageHandlerRequests,
+    )
 
     self.flow_processing_request_handler_thread = None
     self.flow_processing_request_handler_stop = None
+    self.flow_processing_request_notifier = mysql_utils.RequestNotifier(
+        min_wait_secs=self._FLOW_REQUEST_MIN_POLL_TIME_SECS,
+        max_wait_secs=self._FLOW_REQUEST_POLL_TIME_SECS,
+        probe=self._HasLeasableFlowProcessingRequests,
+    )
     self.flow_processing_request_handler_pool = threadpool.ThreadPool.Factory(
         "flow_processing_pool",
         min_threads=config.CONFIG["Mysql.flow_processing_threads_min"],
@@ -556,8 +688,87 @@ class MysqlDB(
   def _Connect(self):
     return _Connect(**self._connect_args)
 
+  def _ConnectToReplica(self):
+    return _ConnectToReplica(**self._replica_connect_args)
+
   def Close(self):
     self.pool.close()
+    if self.replica_pool is not None:
+      self.replica_pool.close()
+    if self.query_profiler is not None:
+      self.query_profiler.Stop()
+
+  def _RenderQueryProfile(self, params: dict[str, str]) -> dict[str, Any]:
+    """Renders the SQL profile for the monitoring server."""
+    return self.query_profiler.Summary(limit=int(params.get("limit", 100)))
+
+  def _RecordTransactionRetry(self, caller: Optional[str]) -> None:
+    if self.query_profiler is not None:
+      self.query_profiler.RecordRetry(caller)
+
+  def _IsReplicaUsable(self) -> bool:
+    """Returns whether readonly transactions can run on the read replica.
+
+    The replication lag is checked at most once per
+    `_REPLICA_LAG_CHECK_INTERVAL_SECS`, in between the result of the last check
+    is returned.
+    """
+    with self._replica_lock:
+      now = time.monotonic()
+      if (
+          self._replica_checked_at is not None
+          and now - self._replica_checked_at
+          < self._REPLICA_LAG_CHECK_INTERVAL_SECS
+      ):
+        return self._replica_usable
+      self._replica_checked_at = now
+
+    usable = False
+    try:
+      with contextlib.closing(
+          self.replica_pool.get(caller="_IsReplicaUsable")
+      ) as connection:
+        with contextlib.closing(connection.cursor()) as cursor:
+          lag = _ReadReplicaLag(cursor)
+
+      if lag is None:
+        self._WarnAboutReplica(
+            "Replication to the MySQL read replica is broken."
+        )
+      elif lag > self._replica_max_lag_secs:
+        self._WarnAboutReplica(
+            "MySQL read replica lags behind by %d seconds.", lag
+        )
+      else:
+        usable = True
+    except MySQLdb.Error as e:
+      self._WarnAboutReplica("Failed to check the MySQL read replica: %s", e)
+
+    with self._replica_lock:
+      self._replica_usable = usable
+    return usable
+
+  def _WarnAboutReplica(self, msg: str, *args) -> None:
+    """Logs a replica warning at most once per `_REPLICA_WARNING_INTERVAL_SECS`.
+
+    The replica is checked every second, so a persistent problem (e.g. missing
+    REPLICATION CLIENT privilege) would otherwise flood the logs.
+
+    Args:
+      msg: Format string of the warning.
+      *args: Arguments of the format string.
+    """
+    with self._replica_lock:
+      now = time.monotonic()
+      if (
+          self._replica_warned_at is not None
+          and now - self._replica_warned_at
+          < self._REPLICA_WARNING_INTERVAL_SECS
+      ):
+        return
+      self._replica_warned_at = now
+
+    logging.warning(msg, *args)
 
   def _RunInTransaction(
       self,
@@ -566,6 +777,8 @@ class MysqlDB(
           None,
       ],
       readonly: bool = False,
+      allow_replica: bool = False,
+      caller: Optional[str] = None,
   ) -> None:
     """Runs function within a transaction.
 
@@ -581,12 +794,48 @@ class MysqlDB(
       function: A function to be run.
       readonly: Indicates that only a readonly (snapshot) transaction is
         required.
+      allow_replica: Indicates that a readonly transaction may be run on the
+        read replica (if one is configured and it is not lagging behind).
+      caller: Name of the method running the transaction, used in metrics.
 
     Returns:
       The value returned by the last call to function.
 
     Raises: Any exception raised by function.
     """
+    pool = self.pool
+    pool_name = "primary"
+    max_pool_size = self._max_pool_size
+    if readonly and allow_replica and self.replica_pool is not None:
+      if self._IsReplicaUsable():
+        pool = self.replica_pool
+        pool_name = "replica"
+        max_pool_size = self._max_replica_pool_size
+      else:
+        MYSQL_REPLICA_FALLBACKS.Increment()
+
+    start_time = time.time()
+    try:
+      return self._RunInTransactionOnPool(
+          function, readonly, pool, max_pool_size, caller
+      )
+    finally:
+      MYSQL_TRANSACTION_LATENCY.RecordEvent(
+          time.time() - start_time, fields=[pool_name]
+      )
+
+  def _RunInTransactionOnPool(
+      self,
+      function: Callable[
+          [Union[MySQLdb.connections.Connection, mysql_pool._ConnectionProxy]],
+          None,
+      ],
+      readonly: bool,
+      pool: mysql_pool.Pool,
+      max_pool_size: int,
+      caller: Optional[str],
+  ) -> None:
+    """Runs function within a transaction on a connection from the pool."""
     start_query = "START TRANSACTION"
     if readonly:
       start_query = "START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"
@@ -594,7 +843,7 @@ class MysqlDB(
     broken_connections_seen = 0
     txn_execution_attempts = 0
     while True:
-      with contextlib.closing(self.pool.get()) as connection:
+      with contextlib.closing(pool.get(caller=caller)) as connection:
         try:
           with contextlib.closing(connection.cursor()) as cursor:
             cursor.execute(start_query)
@@ -607,6 +856,7 @@ class MysqlDB(
         except mysql_utils.RetryableError:
           connection.rollback()
           if txn_execution_attempts < _MAX_RETRY_COUNT:
+            self._RecordTransactionRetry(caller)
             _SleepWithBackoff(txn_execution_attempts)
             txn_execution_attempts += 1
           else:
@@ -622,14 +872,16 @@ class MysqlDB(
             # will get removed from the pool when they error out. Eventually,
             # the pool will create new connections.
             broken_connections_seen += 1
-            if broken_connections_seen > self._max_pool_size:
+            if broken_connections_seen > max_pool_size:
               # All existing connections in the pool have been exhausted, and
               # we have tried to create at least one new connection.
               raise
             # Retry immediately.
+            self._RecordTransactionRetry(caller)
           else:
             connection.rollback()
             if _IsRetryable(e) and txn_execution_attempts < _MAX_RETRY_COUNT:
+              self._RecordTransactionRetry(caller)
               _SleepWithBackoff(txn_execution_attempts)
               txn_execution_attempts += 1
             else:
@@ -271,7 +271,7 @@ class MySQLDBClientMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadClientSnapshotHistory(
       self,
       client_id: str,
@@ -459,7 +459,7 @@ class MySQLDBClientMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadClientStartupInfoHistory(
       self,
       client_id: str,
@@ -601,7 +601,7 @@ class MySQLDBClientMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_stale=True)
   def MultiReadClientFullInfo(
       self,
       client_ids: Collection[str],
@@ -766,7 +766,7 @@ class MySQLDBClientMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ListClientsForKeywords(
       self,
       keywords: Collection[str],
@@ -974,7 +974,7 @@ class MySQLDBClientMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadClientCrashInfoHistory(
       self,
       client_id: str,
@@ -1026,6 +1026,17 @@ class MySQLDBClientMixin(object):
         [db_utils.ClientIDToInt(client_id)],
     )
 
+    # Triggers are not activated by cascaded foreign key actions, so hunt
+    # flows are deleted explicitly to have them removed from `hunt_counters`.
+    cursor.execute(
+        """
+    DELETE FROM flows
+    WHERE client_id = %s
+      AND parent_hunt_id IS NOT NULL
+      AND parent_flow_id IS NULL""",
+        [db_utils.ClientIDToInt(client_id)],
+    )
+
     cursor.execute(
         "DELETE FROM clients WHERE client_id = %s",
         [db_utils.ClientIDToInt(client_id)],
@@ -25,7 +25,7 @@ class MySQLDBEventMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadAPIAuditEntries(
       self,
       username: Optional[str] = None,
@@ -2,6 +2,7 @@
 """The MySQL database methods for flow handling."""
 
 from collections.abc import Callable, Collection, Iterable, Mapping, Sequence
+import functools
 import logging
 import threading
 import time
@@ -16,6 +17,7 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.util import collection
 from grr_response_core.lib.util import random
+from grr_response_core.stats import metrics
 from grr_response_proto import flows_pb2
 from grr_response_proto import jobs_pb2
 from grr_response_proto import objects_pb2
@@ -27,15 +29,87 @@ from grr_response_server.models import hunts as models_hunts
 from grr_response_proto import rrg_pb2
 
 
+FLOW_PROCESSING_REQUEST_DISPATCH_LATENCY = metrics.Event(
+    "flow_processing_request_dispatch_latency",
+    bins=[0.005 * 1.5**x for x in range(30)],
+)  # 5ms to ~16 mins
+
+
+def _NotifiesFlowProcessingHandler(func):
+  """Wakes up the flow processing loop once the decorated call completes."""
+
+  @functools.wraps(func)
+  def Decorated(self, *args, **kw):
+    result = func(self, *args, **kw)
+    self.flow_processing_request_notifier.Notify()
+    return result
+
+  return Decorated
+
+
+def _NotifiesMessageHandler(func):
+  """Wakes up the message handler loop once the decorated call completes."""
+
+  @functools.wraps(func)
+  def Decorated(self, *args, **kw):
+    result = func(self, *args, **kw)
+    self.message_handler_request_notifier.Notify()
+    return result
+
+  return Decorated
+
+
+def _FlowResponseFromRow(
+    row,
+) -> Union[flows_pb2.FlowResponse, flows_pb2.FlowStatus, flows_pb2.FlowIterator]:
+  """Parses a (response, status, iterator, timestamp) flow_responses row."""
+  res, status, iterator, ts = row
+  if status:
+    response = flows_pb2.FlowStatus()
+    response.ParseFromString(status)
+  elif iterator:
+    response = flows_pb2.FlowIterator()
+    response.ParseFromString(iterator)
+  else:
+    response = flows_pb2.FlowResponse()
+    response.ParseFromString(res)
+  response.timestamp = int(mysql_utils.TimestampToRDFDatetime(ts))
+  return response
+
+
+def _FlowRequestFromRow(row) -> flows_pb2.FlowRequest:
+  """Parses a flow_requests row as read by ReadFlowRequests."""
+  (
+      req,
+      needs_processing,
+      responses_expected,
+      callback_state,
+      next_response_id,
+      ts,
+  ) = row
+  request = flows_pb2.FlowRequest()
+  request.ParseFromString(req)
+  request.needs_processing = needs_processing
+  if responses_expected is not None:
+    request.nr_responses_expected = responses_expected
+  request.callback_state = callback_state
+  request.next_response_id = next_response_id
+  request.timestamp = int(mysql_utils.TimestampToRDFDatetime(ts))
+  return request
+
+
 class MySQLDBFlowMixin:
   """MySQLDB mixin for flow handling."""
 
   flow_processing_request_handler_pool: threadpool.ThreadPool
   flow_processing_request_handler_thread: threading.Thread
+  flow_processing_request_notifier: mysql_utils.RequestNotifier
   handler_thread: threading.Thread
+  message_handler_request_notifier: mysql_utils.RequestNotifier
   _WRITE_ROWS_BATCH_SIZE: int
   _DELETE_ROWS_BATCH_SIZE: int
 
+  @_NotifiesMessageHandler
   @db_utils.CallLogged
   @db_utils.CallAccounted
   @mysql_utils.WithTransaction()
@@ -135,13 +209,29 @@ class MySQLDBFlowMixin:
     """Unregisters any registered message handler."""
     if self.handler_thread:
       self.handler_stop = True
+      self.message_handler_request_notifier.Notify()
       self.handler_thread.join(timeout)
       if self.handler_thread.is_alive():
         raise RuntimeError("Message handler thread did not join in time.")
       self.handler_thread = None
 
+  _MESSAGE_HANDLER_MIN_POLL_TIME_SECS = 0.1
   _MESSAGE_HANDLER_POLL_TIME_SECS = 5
 
+  @mysql_utils.WithTransaction(readonly=True)
+  def _HasLeasableMessageHandlerRequests(
+      self, cursor: Optional[cursors.Cursor] = None
+  ) -> bool:
+    """Checks whether there are message handler requests to lease."""
+    assert cursor is not None
+
+    cursor.execute(
+        "SELECT 1 FROM message_handler_requests "
+        "WHERE leased_until IS NULL OR leased_until < NOW(6) "
+        "LIMIT 1"
+    )
+    return bool(cursor.fetchall())
+
   def _MessageHandlerLoop(
       self,
       handler: Callable[[Iterable[objects_pb2.MessageHandlerRequest]], None],
@@ -149,13 +239,15 @@ class MySQLDBFlowMixin:
       limit: int = 1000,
   ) -> None:
     """Loop to handle outstanding requests."""
+    notifier = self.message_handler_request_notifier
     while not self.handler_stop:
       try:
         msgs = self._LeaseMessageHandlerRequests(lease_time, limit)
         if msgs:
+          notifier.Reset()
           handler(msgs)
         else:
-          time.sleep(self._MESSAGE_HANDLER_POLL_TIME_SECS)
+          notifier.Wait()
       except Exception as e:  # pylint: disable=broad-except
         logging.exception("_LeaseMessageHandlerRequests raised %s.", e)
 
@@ -528,6 +620,92 @@ class MySQLDBFlowMixin:
     flow.processing_deadline = int(processing_deadline)
     return flow
 
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction()
+  def LeaseFlowsForProcessing(
+      self,
+      flow_keys: Collection[tuple[str, str]],
+      processing_time: rdfvalue.Duration,
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> dict[tuple[str, str], flows_pb2.Flow]:
+    """Marks multiple flows as being processed on this worker in one go."""
+    assert cursor is not None
+
+    if not flow_keys:
+      return {}
+
+    conditions = []
+    args = []
+    for client_id, flow_id in flow_keys:
+      conditions.append("(client_id=%s AND flow_id=%s)")
+      args.append(db_utils.ClientIDToInt(client_id))
+      args.append(db_utils.FlowIDToInt(flow_id))
+
+    query = f"SELECT {self.FLOW_DB_FIELDS} FROM flows WHERE "
+    query += " OR ".join(conditions)
+    cursor.execute(query, args)
+
+    now = rdfvalue.RDFDatetime.Now()
+    flows = []
+    for row in cursor.fetchall():
+      flow = self._FlowObjectFromRow(row)
+      if flow.processing_on and flow.processing_deadline > int(now):
+        continue
+      flows.append(flow)
+
+    hunt_ids = set(f.parent_hunt_id for f in flows if f.parent_hunt_id)
+    if hunt_ids:
+      query = "SELECT hunt_id, hunt_state FROM hunts WHERE hunt_id IN ({})"
+      query = query.format(", ".join(["%s"] * len(hunt_ids)))
+      cursor.execute(query, [db_utils.HuntIDToInt(h) for h in hunt_ids])
+
+      stopped_hunt_ids = set()
+      for hunt_id_int, hunt_state in cursor.fetchall():
+        if (
+            hunt_state is not None
+            and not models_hunts.IsHuntSuitableForFlowProcessing(hunt_state)
+        ):
+          stopped_hunt_ids.add(db_utils.IntToHuntID(hunt_id_int))
+
+      flows = [f for f in flows if f.parent_hunt_id not in stopped_hunt_ids]
+
+    if not flows:
+      return {}
+
+    processing_deadline = now + processing_time
+    process_id_string = utils.ProcessIdString()
+
+    conditions = []
+    args = [
+        process_id_string,
+        mysql_utils.RDFDatetimeToTimestamp(now),
+        mysql_utils.RDFDatetimeToTimestamp(processing_deadline),
+    ]
+    for flow in flows:
+      conditions.append("(client_id=%s AND flow_id=%s)")
+      args.append(db_utils.ClientIDToInt(flow.client_id))
+      args.append(db_utils.FlowIDToInt(flow.flow_id))
+
+    update_query = (
+        "UPDATE flows SET "
+        "processing_on=%s, "
+        "processing_since=FROM_UNIXTIME(%s), "
+        "processing_deadline=FROM_UNIXTIME(%s) "
+        "WHERE "
+    )
+    update_query += " OR ".join(conditions)
+    cursor.execute(update_query, args)
+
+    # This needs to happen after we are sure that the write has succeeded.
+    result = {}
+    for flow in flows:
+      flow.processing_on = process_id_string
+      flow.processing_since = int(now)
+      flow.processing_deadline = int(processing_deadline)
+      result[(flow.client_id, flow.flow_id)] = flow
+    return result
+
   @db_utils.CallLogged
   @db_utils.CallAccounted
   @mysql_utils.WithTransaction()
@@ -645,6 +823,7 @@ class MySQLDBFlowMixin:
     query += ", ".join(templates)
     cursor.execute(query, args)
 
+  @_NotifiesFlowProcessingHandler
   @db_utils.CallLogged
   @db_utils.CallAccounted
   @mysql_utils.WithTransaction()
@@ -1033,6 +1212,7 @@ class MySQLDBFlowMixin:
     if fprs_to_write:
       self._WriteFlowProcessingRequests(fprs_to_write, cursor)
 
+  @_NotifiesFlowProcessingHandler
   @db_utils.CallLogged
   @db_utils.CallAccounted
   def WriteFlowResponses(
@@ -1254,17 +1434,8 @@ class MySQLDBFlowMixin:
     cursor.execute(query, args)
 
     responses = {}
-    for res, status, iterator, ts in cursor.fetchall():
-      if status:
-        response = flows_pb2.FlowStatus()
-        response.ParseFromString(status)
-      elif iterator:
-        response = flows_pb2.FlowIterator()
-        response.ParseFromString(iterator)
-      else:
-        response = flows_pb2.FlowResponse()
-        response.ParseFromString(res)
-      response.timestamp = int(mysql_utils.TimestampToRDFDatetime(ts))
+    for row in cursor.fetchall():
+      response = _FlowResponseFromRow(row)
       responses.setdefault(response.request_id, []).append(response)
 
     query = (
@@ -1277,22 +1448,8 @@ class MySQLDBFlowMixin:
     cursor.execute(query, args)
 
     requests = {}
-    for (
-        req,
-        needs_processing,
-        responses_expected,
-        callback_state,
-        next_response_id,
-        ts,
-    ) in cursor.fetchall():
-      request = flows_pb2.FlowRequest()
-      request.ParseFromString(req)
-      request.needs_processing = needs_processing
-      if responses_expected is not None:
-        request.nr_responses_expected = responses_expected
-      request.callback_state = callback_state
-      request.next_response_id = next_response_id
-      request.timestamp = int(mysql_utils.TimestampToRDFDatetime(ts))
+    for row in cursor.fetchall():
+      request = _FlowRequestFromRow(row)
       requests[request.request_id] = (
           request,
           sorted(
@@ -1302,6 +1459,86 @@ class MySQLDBFlowMixin:
 
     return requests
 
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadFlowRequestsForFlows(
+      self,
+      flow_keys: Collection[tuple[str, str]],
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> dict[
+      tuple[str, str],
+      dict[
+          int,
+          tuple[
+              flows_pb2.FlowRequest,
+              Sequence[
+                  Union[
+                      flows_pb2.FlowResponse,
+                      flows_pb2.FlowStatus,
+                      flows_pb2.FlowIterator,
+                  ],
+              ],
+          ],
+      ],
+  ]:
+    """Reads all requests for multiple flows in one go."""
+    assert cursor is not None
+
+    result = {flow_key: {} for flow_key in flow_keys}
+    if not result:
+      return result
+
+    conditions = []
+    args = []
+    for client_id, flow_id in result:
+      conditions.append("(client_id=%s AND flow_id=%s)")
+      args.append(db_utils.ClientIDToInt(client_id))
+      args.append(db_utils.FlowIDToInt(flow_id))
+    condition = " OR ".join(conditions)
+
+    query = (
+        "SELECT client_id, flow_id, "
+        "response, status, iterator, UNIX_TIMESTAMP(timestamp) "
+        f"FROM flow_responses WHERE {condition}"
+    )
+    cursor.execute(query, args)
+
+    responses = {}
+    for client_id_int, flow_id_int, *row in cursor.fetchall():
+      response = _FlowResponseFromRow(row)
+      key = (
+          db_utils.IntToClientID(client_id_int),
+          db_utils.IntToFlowID(flow_id_int),
+          response.request_id,
+      )
+      responses.setdefault(key, []).append(response)
+
+    query = (
+        "SELECT client_id, flow_id, "
+        "request, needs_processing, responses_expected, "
+        "callback_state, next_response_id, "
+        "UNIX_TIMESTAMP(timestamp) "
+        f"FROM flow_requests WHERE {condition}"
+    )
+    cursor.execute(query, args)
+
+    for client_id_int, flow_id_int, *row in cursor.fetchall():
+      request = _FlowRequestFromRow(row)
+      flow_key = (
+          db_utils.IntToClientID(client_id_int),
+          db_utils.IntToFlowID(flow_id_int),
+      )
+      result[flow_key][request.request_id] = (
+          request,
+          sorted(
+              responses.get(flow_key + (request.request_id,), []),
+              key=lambda r: r.response_id,
+          ),
+      )
+
+    return result
+
   @db_utils.CallLogged
   @db_utils.CallAccounted
   @mysql_utils.WithTransaction()
@@ -1370,6 +1607,117 @@ class MySQLDBFlowMixin:
     rows_updated = cursor.execute(update_query, args)
     return rows_updated == 1
 
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction()
+  def ReleaseProcessedFlows(
+      self,
+      flow_objs: Sequence[flows_pb2.Flow],
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> dict[tuple[str, str], bool]:
+    """Releases multiple flows that the worker was processing in one go."""
+    assert cursor is not None
+
+    if not flow_objs:
+      return {}
+
+    # The released flows are passed as a derived table, so that all of them are
+    # updated with a single statement equivalent to ReleaseProcessedFlow's.
+    columns = (
+        "client_id",
+        "flow_id",
+        "flow",
+        "next_request_to_process",
+        "flow_state",
+        "user_cpu_time_used_micros",
+        "system_cpu_time_used_micros",
+        "network_bytes_sent",
+        "num_replies_sent",
+    )
+    selects = []
+    args = []
+    for flow_obj in flow_objs:
+      clone = flows_pb2.Flow()
+      clone.CopyFrom(flow_obj)
+      clone.ClearField("processing_on")
+      clone.ClearField("processing_since")
+      clone.ClearField("processing_deadline")
+
+      if selects:
+        selects.append("SELECT " + ", ".join(["%s"] * len(columns)))
+      else:
+        selects.append(
+            "SELECT " + ", ".join(f"%s AS {column}" for column in columns)
+        )
+      args.extend([
+          db_utils.ClientIDToInt(flow_obj.client_id),
+          db_utils.FlowIDToInt(flow_obj.flow_id),
+          clone.SerializeToString(),
+          flow_obj.next_request_to_process,
+          int(clone.flow_state),
+          db_utils.SecondsToMicros(flow_obj.cpu_time_used.user_cpu_time),
+          db_utils.SecondsToMicros(flow_obj.cpu_time_used.system_cpu_time),
+          flow_obj.network_bytes_sent,
+          flow_obj.num_replies_sent,
+      ])
+
+    update_query = f"""
+    UPDATE flows
+    JOIN ({" UNION ALL ".join(selects)}) AS released
+    ON
+      flows.client_id = released.client_id AND
+      flows.flow_id = released.flow_id
+    LEFT OUTER JOIN flow_requests
+    ON
+      flow_requests.client_id = released.client_id AND
+      flow_requests.flow_id = released.flow_id AND
+      flow_requests.request_id = released.next_request_to_process AND
+      (flow_requests.start_time IS NULL OR
+       flow_requests.start_time < NOW(6)) AND
+      flow_requests.needs_processing
+    SET
+      flows.flow = released.flow,
+      flows.processing_on = NULL,
+      flows.processing_since = NULL,
+      flows.processing_deadline = NULL,
+      flows.next_request_to_process = released.next_request_to_process,
+      flows.flow_state = released.flow_state,
+      flows.user_cpu_time_used_micros = released.user_cpu_time_used_micros,
+      flows.system_cpu_time_used_micros =
+        released.system_cpu_time_used_micros,
+      flows.network_bytes_sent = released.network_bytes_sent,
+      flows.num_replies_sent = released.num_replies_sent,
+      flows.last_update = NOW(6)
+    WHERE
+      flow_requests.request_id IS NULL
+    """
+    cursor.execute(update_query, args)
+
+    # Flows that were not released are still leased by this worker.
+    conditions = []
+    args = []
+    for flow_obj in flow_objs:
+      conditions.append("(client_id=%s AND flow_id=%s)")
+      args.append(db_utils.ClientIDToInt(flow_obj.client_id))
+      args.append(db_utils.FlowIDToInt(flow_obj.flow_id))
+    query = (
+        "SELECT client_id, flow_id FROM flows "
+        "WHERE processing_on IS NULL AND ({})".format(" OR ".join(conditions))
+    )
+    cursor.execute(query, args)
+    released = set(
+        (db_utils.IntToClientID(client_id), db_utils.IntToFlowID(flow_id))
+        for client_id, flow_id in cursor.fetchall()
+    )
+
+    return {
+        (flow_obj.client_id, flow_obj.flow_id): (
+            (flow_obj.client_id, flow_obj.flow_id) in released
+        )
+        for flow_obj in flow_objs
+    }
+
+  @_NotifiesFlowProcessingHandler
   @db_utils.CallLogged
   @db_utils.CallAccounted
   @mysql_utils.WithTransaction()
@@ -1436,6 +1784,25 @@ class MySQLDBFlowMixin:
     query += " OR ".join(conditions)
     cursor.execute(query, args)
 
+  @mysql_utils.WithTransaction(readonly=True)
+  def _HasLeasableFlowProcessingRequests(
+      self, cursor: Optional[cursors.Cursor] = None
+  ) -> bool:
+    """Checks whether there are flow processing requests to lease."""
+    assert cursor is not None
+
+    cursor.execute("""
+      SELECT 1
+      FROM flow_processing_requests
+      WHERE
+       (delivery_time IS NULL OR
+        delivery_time <= NOW(6)) AND
+       (leased_until IS NULL OR
+        leased_until < NOW(6))
+      LIMIT 1
+    """)
+    return bool(cursor.fetchall())
+
   @db_utils.CallLogged
   @db_utils.CallAccounted
   @mysql_utils.WithTransaction()
@@ -1511,29 +1878,43 @@ class MySQLDBFlowMixin:
 
     return res
 
+  _FLOW_REQUEST_MIN_POLL_TIME_SECS = 0.05
   _FLOW_REQUEST_POLL_TIME_SECS = 3
 
   def _FlowProcessingRequestHandlerLoop(
-      self, handler: Callable[[flows_pb2.FlowProcessingRequest], None]
+      self,
+      handler: Callable[[Sequence[flows_pb2.FlowProcessingRequest]], None],
+      batch_size: int,
   ) -> None:
     """The main loop for the flow processing request queue."""
     self.flow_processing_request_handler_pool.Start()
 
+    notifier = self.flow_processing_request_notifier
     while not self.flow_processing_request_handler_stop:
       thread_pool = self.flow_processing_request_handler_pool
       free_threads = thread_pool.max_threads - thread_pool.busy_threads
       if free_threads == 0:
-        time.sleep(self._FLOW_REQUEST_POLL_TIME_SECS)
+        time.sleep(self._FLOW_REQUEST_MIN_POLL_TIME_SECS)
         continue
       try:
-        msgs = self._LeaseFlowProcessingRequests(free_threads)
+        msgs = self._LeaseFlowProcessingRequests(free_threads * batch_size)
         if msgs:
+          notifier.Reset()
+          now = rdfvalue.RDFDatetime.Now().AsMicrosecondsSinceEpoch()
           for m in msgs:
+            ready_time = max(m.creation_time, m.delivery_time)
+            FLOW_PROCESSING_REQUEST_DISPATCH_LATENCY.RecordEvent(
+                max(now - ready_time, 0) / 1e6
+            )
+          # Spread the requests over all free threads, batches are only
+          # filled up to `batch_size` when there are more requests than that.
+          per_thread = min(batch_size, -(-len(msgs) // free_threads))
+          for batch in collection.Batch(msgs, per_thread):
             self.flow_processing_request_handler_pool.AddTask(
-                target=handler, args=(m,)
+                target=handler, args=(batch,)
             )
         else:
-          time.sleep(self._FLOW_REQUEST_POLL_TIME_SECS)
+          notifier.Wait()
 
       except Exception as e:  # pylint: disable=broad-except
         logging.exception("_FlowProcessingRequestHandlerLoop raised %s.", e)
@@ -1545,6 +1926,19 @@ class MySQLDBFlowMixin:
       self, handler: Callable[[flows_pb2.FlowProcessingRequest], None]
   ) -> None:
     """Registers a handler to receive flow processing messages."""
+    if handler:
+      self.RegisterFlowProcessingBatchHandler(
+          lambda requests: handler(requests[0]), batch_size=1
+      )
+    else:
+      self.UnregisterFlowProcessingHandler()
+
+  def RegisterFlowProcessingBatchHandler(
+      self,
+      handler: Callable[[Sequence[flows_pb2.FlowProcessingRequest]], None],
+      batch_size: int,
+  ) -> None:
+    """Registers a handler to receive batches of flow processing messages."""
     self.UnregisterFlowProcessingHandler()
 
     if handler:
@@ -1552,7 +1946,7 @@ class MySQLDBFlowMixin:
       self.flow_processing_request_handler_thread = threading.Thread(
           name="flow_processing_request_handler",
           target=self._FlowProcessingRequestHandlerLoop,
-          args=(handler,),
+          args=(handler, batch_size),
       )
       self.flow_processing_request_handler_thread.daemon = True
       self.flow_processing_request_handler_thread.start()
@@ -1563,6 +1957,7 @@ class MySQLDBFlowMixin:
     """Unregisters any registered flow processing handler."""
     if self.flow_processing_request_handler_thread:
       self.flow_processing_request_handler_stop = True
+      self.flow_processing_request_notifier.Notify()
       self.flow_processing_request_handler_thread.join(timeout)
       if self.flow_processing_request_handler_thread.is_alive():
         raise RuntimeError("Flow processing handler did not join in time.")
@@ -1621,7 +2016,7 @@ class MySQLDBFlowMixin:
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_stale=True)
   def _ReadFlowResultsOrErrors(
       self,
       table_name: str,
@@ -1736,7 +2131,142 @@ class MySQLDBFlowMixin:
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_stale=True)
+  def _ReadFlowResultsPage(
+      self,
+      index: str,
+      condition: str,
+      condition_args: Sequence[int],
+      count: int,
+      after: Optional[db.FlowResultsCursor] = None,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> tuple[Sequence[flows_pb2.FlowResult], Optional[db.FlowResultsCursor]]:
+    """Reads a page of flow results matching a given condition.
+
+    Results are ordered by (timestamp, result_id). InnoDB secondary indexes
+    implicitly end with the primary key, so the seek predicate below is
+    resolved as a range scan on the given index instead of reading and
+    discarding all preceding rows like OFFSET does.
+
+    Args:
+      index: Name of the index to use.
+      condition: A condition selecting results of a single flow or hunt.
+      condition_args: Arguments of the condition.
+      count: Maximum number of results to read.
+      after: A cursor pointing to the last result of the previous page.
+      with_tag: Only results having specified tag will be returned.
+      with_proto_type_url: Only results of a specified proto type url will be
+        returned.
+      cursor: MySQL cursor to use.
+
+    Returns:
+      A tuple with a list of results and a cursor pointing to the last of them.
+    """
+    assert cursor is not None
+
+    query = f"""
+        SELECT result_id, client_id, flow_id, hunt_id,
+               payload, payload_any, type, UNIX_TIMESTAMP(timestamp), tag
+        FROM flow_results
+        FORCE INDEX ({index})
+        WHERE {condition} """
+    args = list(condition_args)
+
+    if after is not None:
+      timestamp = mysql_utils.MicrosecondsSinceEpochToTimestamp(after.timestamp)
+      query += """
+          AND (timestamp > FROM_UNIXTIME(%s) OR
+               (timestamp = FROM_UNIXTIME(%s) AND result_id > %s)) """
+      args.extend([timestamp, timestamp, after.result_id])
+
+    if with_tag is not None:
+      query += "AND tag = %s "
+      args.append(with_tag)
+
+    if with_proto_type_url is not None:
+      query += "AND type = %s "
+      args.append(db_utils.TypeURLToRDFTypeName(with_proto_type_url))
+
+    query += "ORDER BY timestamp ASC, result_id ASC LIMIT %s"
+    args.append(count)
+
+    cursor.execute(query, args)
+
+    ret = []
+    last = None
+    for (
+        result_id,
+        client_id_int,
+        flow_id_int,
+        hunt_id_int,
+        serialized_payload,
+        payload_any,
+        payload_type,
+        ts,
+        tag,
+    ) in cursor.fetchall():
+      if payload_any is not None:
+        payload = any_pb2.Any.FromString(payload_any)
+      elif payload_type in rdfvalue.RDFValue.classes:
+        payload = any_pb2.Any(
+            type_url=db_utils.RDFTypeNameToTypeURL(payload_type),
+            value=serialized_payload,
+        )
+      else:
+        unrecognized = objects_pb2.SerializedValueOfUnrecognizedType(
+            type_name=payload_type, value=serialized_payload
+        )
+        payload = any_pb2.Any()
+        payload.Pack(unrecognized)
+
+      result = flows_pb2.FlowResult(
+          client_id=db_utils.IntToClientID(client_id_int),
+          flow_id=db_utils.IntToFlowID(flow_id_int),
+          timestamp=mysql_utils.TimestampToMicrosecondsSinceEpoch(ts),
+      )
+      result.payload.CopyFrom(payload)
+
+      if hunt_id_int:
+        result.hunt_id = db_utils.IntToHuntID(hunt_id_int)
+
+      if tag:
+        result.tag = tag
+
+      ret.append(result)
+      last = db.FlowResultsCursor(
+          timestamp=result.timestamp,
+          client_id=result.client_id,
+          flow_id=result.flow_id,
+          result_id=result_id,
+      )
+
+    return ret, last
+
+  def ReadFlowResultsPage(
+      self,
+      client_id: str,
+      flow_id: str,
+      count: int,
+      after: Optional[db.FlowResultsCursor] = None,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+  ) -> tuple[Sequence[flows_pb2.FlowResult], Optional[db.FlowResultsCursor]]:
+    """Reads a page of flow results of a given flow."""
+    return self._ReadFlowResultsPage(
+        "flow_results_by_client_id_flow_id_timestamp",
+        "client_id = %s AND flow_id = %s",
+        [db_utils.ClientIDToInt(client_id), db_utils.FlowIDToInt(flow_id)],
+        count,
+        after=after,
+        with_tag=with_tag,
+        with_proto_type_url=with_proto_type_url,
+    )
+
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction(readonly=True, allow_stale=True)
   def _CountFlowResultsOrErrors(
       self,
       table_name: str,
@@ -1931,7 +2461,7 @@ class MySQLDBFlowMixin:
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadFlowLogEntries(
       self,
       client_id: str,
@@ -1977,7 +2507,7 @@ class MySQLDBFlowMixin:
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def CountFlowLogEntries(
       self,
       client_id: str,
@@ -2046,7 +2576,7 @@ class MySQLDBFlowMixin:
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadFlowRRGLogs(
       self,
       client_id: str,
@@ -2148,7 +2678,7 @@ class MySQLDBFlowMixin:
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadFlowOutputPluginLogEntries(
       self,
       client_id: str,
@@ -2205,7 +2735,7 @@ class MySQLDBFlowMixin:
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadAllFlowOutputPluginLogEntries(
       self,
       client_id: str,
@@ -2268,7 +2798,7 @@ class MySQLDBFlowMixin:
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def CountFlowOutputPluginLogEntries(
       self,
       client_id: str,
@@ -2303,7 +2833,7 @@ class MySQLDBFlowMixin:
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def CountAllFlowOutputPluginLogEntries(
       self,
       client_id: str,
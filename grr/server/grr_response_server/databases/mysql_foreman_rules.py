@@ -12,6 +12,12 @@ from grr_response_server.databases import db_utils
 from grr_response_server.databases import mysql_utils
 
 
+def _BumpForemanRulesVersion(cursor: MySQLdb.cursors.Cursor) -> None:
+  cursor.execute(
+      "UPDATE foreman_rules_version SET version = version + 1 WHERE id = 0"
+  )
+
+
 class MySQLDBForemanRulesMixin(object):
   """MySQLDB mixin for foreman rules related functions."""
 
@@ -43,6 +49,7 @@ class MySQLDBForemanRulesMixin(object):
             "rule_bytes": rule.SerializeToString(),
         },
     )
+    _BumpForemanRulesVersion(cursor)
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
@@ -53,6 +60,7 @@ class MySQLDBForemanRulesMixin(object):
     assert cursor is not None
     query = "DELETE FROM foreman_rules WHERE hunt_id=%s"
     cursor.execute(query, [hunt_id])
+    _BumpForemanRulesVersion(cursor)
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
@@ -81,3 +89,18 @@ class MySQLDBForemanRulesMixin(object):
         "DELETE FROM foreman_rules WHERE expiration_time < FROM_UNIXTIME(%s)",
         [mysql_utils.MicrosecondsSinceEpochToTimestamp(now)],
     )
+    if cursor.rowcount:
+      _BumpForemanRulesVersion(cursor)
+
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadForemanRulesVersion(
+      self, cursor: Optional[MySQLdb.cursors.Cursor] = None
+  ) -> int:
+    assert cursor is not None
+    cursor.execute("SELECT version FROM foreman_rules_version WHERE id = 0")
+    row = cursor.fetchone()
+    if row is None:
+      return 0
+    return int(row[0])
@@ -43,6 +43,112 @@ _HUNT_OUTPUT_PLUGINS_STATES_COLUMNS = (
     "plugin_state",
 )
 
+# Columns of the `hunt_counters` table, in the order of the values returned by
+# `_AggregateHuntsCounters`.
+_HUNT_COUNTERS_COLUMNS = (
+    "num_clients",
+    "num_successful_clients",
+    "num_failed_clients",
+    "num_crashed_clients",
+    "num_running_clients",
+    "num_clients_with_results",
+    "num_results",
+    "total_cpu_micros",
+    "total_network_bytes_sent",
+)
+
+# Number of `hunt_counters` rows every hunt's counters are split into. Must
+# match the shard computation in the triggers on the `flows` table.
+_HUNT_COUNTERS_SHARDS = 16
+
+
+def _AggregateHuntFlows(
+    cursor: cursors.Cursor,
+    hunt_ids_ints: Sequence[int],
+    key_columns: Sequence[str],
+) -> dict[tuple[int, ...], tuple[int, ...]]:
+  """Computes exact hunt counters grouped by given `flows` expressions."""
+  query = f"""
+      SELECT
+        {", ".join(key_columns)},
+        COUNT(*),
+        COUNT(IF(flow_state = %(finished)s, 1, NULL)),
+        COUNT(IF(flow_state = %(error)s, 1, NULL)),
+        COUNT(IF(flow_state = %(crashed)s, 1, NULL)),
+        COUNT(IF(flow_state = %(running)s, 1, NULL)),
+        COUNT(IF(num_replies_sent > 0, 1, NULL)),
+        SUM(num_replies_sent),
+        SUM(user_cpu_time_used_micros + system_cpu_time_used_micros),
+        SUM(network_bytes_sent)
+      FROM flows
+      FORCE INDEX(flows_by_hunt)
+      WHERE parent_hunt_id IN %(hunt_ids)s
+        AND parent_flow_id IS NULL
+      GROUP BY {", ".join(key_columns)}
+  """
+  args = {
+      "hunt_ids": tuple(hunt_ids_ints),
+      "finished": int(flows_pb2.Flow.FlowState.FINISHED),
+      "error": int(flows_pb2.Flow.FlowState.ERROR),
+      "crashed": int(flows_pb2.Flow.FlowState.CRASHED),
+      "running": int(flows_pb2.Flow.FlowState.RUNNING),
+  }
+  cursor.execute(query, args)
+
+  num_keys = len(key_columns)
+  return {
+      tuple(row[:num_keys]): tuple(int(value or 0) for value in row[num_keys:])
+      for row in cursor.fetchall()
+  }
+
+
+def _AggregateHuntsCounters(
+    cursor: cursors.Cursor,
+    hunt_ids_ints: Sequence[int],
+) -> dict[int, tuple[int, ...]]:
+  """Computes exact hunt counters by aggregating over hunt flows."""
+  rows = _AggregateHuntFlows(cursor, hunt_ids_ints, ["parent_hunt_id"])
+  return {hunt_id_int: row for (hunt_id_int,), row in rows.items()}
+
+
+def _AggregateHuntCountersShards(
+    cursor: cursors.Cursor,
+    hunt_id_int: int,
+) -> dict[int, tuple[int, ...]]:
+  """Computes exact counters of every shard of a hunt."""
+  rows = _AggregateHuntFlows(
+      cursor,
+      [hunt_id_int],
+      ["parent_hunt_id", f"client_id MOD {_HUNT_COUNTERS_SHARDS}"],
+  )
+  return {shard: row for (_, shard), row in rows.items()}
+
+
+def _HuntCountersFromRow(row: Sequence[int]) -> db.HuntCounters:
+  """Creates HuntCounters from values ordered like _HUNT_COUNTERS_COLUMNS."""
+  (
+      num_clients,
+      num_successful_clients,
+      num_failed_clients,
+      num_crashed_clients,
+      num_running_clients,
+      num_clients_with_results,
+      num_results,
+      total_cpu_micros,
+      total_network_bytes_sent,
+  ) = row
+  return db.HuntCounters(
+      num_clients=num_clients,
+      num_successful_clients=num_successful_clients,
+      num_failed_clients=num_failed_clients,
+      num_clients_with_results=num_clients_with_results,
+      num_crashed_clients=num_crashed_clients,
+      num_running_clients=num_running_clients,
+      num_results=num_results,
+      total_cpu_seconds=db_utils.MicrosToSeconds(total_cpu_micros),
+      total_network_bytes_sent=total_network_bytes_sent,
+  )
+
 
 class MySQLDBHuntMixin(object):
   """MySQLDB mixin for flow handling."""
@@ -177,6 +283,9 @@ class MySQLDBHuntMixin(object):
     query = "DELETE FROM hunt_output_plugins_states WHERE hunt_id = %s"
     cursor.execute(query, [hunt_id_int])
 
+    query = "DELETE FROM hunt_counters WHERE hunt_id = %s"
+    cursor.execute(query, [hunt_id_int])
+
     query = """
     DELETE
       FROM approval_request
@@ -635,7 +744,7 @@ class MySQLDBHuntMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadHuntLogEntries(
       self,
       hunt_id: str,
@@ -686,7 +795,7 @@ class MySQLDBHuntMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def CountHuntLogEntries(
       self, hunt_id: str, cursor: Optional[cursors.Cursor] = None
   ) -> int:
@@ -704,7 +813,7 @@ class MySQLDBHuntMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_stale=True)
   def ReadHuntResults(
       self,
       hunt_id: str,
@@ -791,9 +900,33 @@ class MySQLDBHuntMixin(object):
 
     return ret
 
+  def ReadHuntResultsPage(
+      self,
+      hunt_id: str,
+      count: int,
+      after: Optional[db.FlowResultsCursor] = None,
+      with_tag: Optional[str] = None,
+      with_proto_type_url: Optional[str] = None,
+  ) -> tuple[Sequence[flows_pb2.FlowResult], Optional[db.FlowResultsCursor]]:
+    """Reads a page of hunt results of a given hunt."""
+    hunt_id_int = db_utils.HuntIDToInt(hunt_id)
+
+    # _ReadFlowResultsPage is implemented in the mysql_flows mixin.
+    # pytype: disable=attribute-error
+    return self._ReadFlowResultsPage(
+        "flow_results_hunt_id_flow_id_timestamp",
+        "hunt_id = %s AND flow_id = %s",
+        [hunt_id_int, hunt_id_int],
+        count,
+        after=after,
+        with_tag=with_tag,
+        with_proto_type_url=with_proto_type_url,
+    )
+    # pytype: enable=attribute-error
+
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_stale=True)
   def CountHuntResults(
       self,
       hunt_id: str,
@@ -987,86 +1120,73 @@ class MySQLDBHuntMixin(object):
 
     hunt_ids_ints = [db_utils.HuntIDToInt(hunt_id) for hunt_id in hunt_ids]
 
-    query = """
-      SELECT parent_hunt_id, flow_state, COUNT(*)
-          FROM flows
-          FORCE INDEX(flows_by_hunt)
-          WHERE parent_hunt_id IN %(hunt_ids)s
-            AND parent_flow_id IS NULL
-          GROUP BY parent_hunt_id, flow_state
-    """
-    cursor.execute(query, {"hunt_ids": tuple(hunt_ids_ints)})
-
-    counts_by_state_per_hunt = dict.fromkeys(hunt_ids_ints, {})
-    for hunt_id, state, count in cursor.fetchall():
-      counts_by_state_per_hunt[hunt_id][state] = count
-
-    hunt_counters = dict.fromkeys(
-        hunt_ids,
-        db.HuntCounters(
-            num_clients=0,
-            num_successful_clients=0,
-            num_failed_clients=0,
-            num_clients_with_results=0,
-            num_crashed_clients=0,
-            num_running_clients=0,
-            num_results=0,
-            total_cpu_seconds=0,
-            total_network_bytes_sent=0,
-        ),
+    if self._materialized_hunt_counters:
+      sums = ", ".join(f"SUM({c})" for c in _HUNT_COUNTERS_COLUMNS)
+      query = f"""
+          SELECT hunt_id, {sums}
+            FROM hunt_counters
+           WHERE hunt_id IN %(hunt_ids)s
+           GROUP BY hunt_id
+      """
+      cursor.execute(query, {"hunt_ids": tuple(hunt_ids_ints)})
+      rows = {
+          row[0]: tuple(int(value) for value in row[1:])
+          for row in cursor.fetchall()
+      }
+    else:
+      rows = _AggregateHuntsCounters(cursor, hunt_ids_ints)
+
+    # Hunts without any flows have no counters stored.
+    empty_row = (0,) * len(_HUNT_COUNTERS_COLUMNS)
+    return {
+        hunt_id: _HuntCountersFromRow(rows.get(hunt_id_int, empty_row))
+        for hunt_id, hunt_id_int in zip(hunt_ids, hunt_ids_ints)
+    }
+
+  def RecomputeHuntsCounters(self, hunt_ids: Collection[str]) -> None:
+    """Recomputes materialized hunt counters from hunt flows."""
+    # Every hunt is recomputed in a separate transaction, so that the counters
+    # of multiple hunts are never locked at once.
+    for hunt_id in hunt_ids:
+      self._RecomputeHuntCounters(db_utils.HuntIDToInt(hunt_id))
+
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction()
+  def _RecomputeHuntCounters(
+      self,
+      hunt_id_int: int,
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> None:
+    """Recomputes materialized counters of a single hunt."""
+    assert cursor is not None
+
+    # The counters rows are locked before flows are read: transactions that
+    # have updated hunt flows and not committed yet will wait for this one
+    # and apply their changes on top of the recomputed values, while all the
+    # committed ones are visible to the (consistent, non-locking) read below.
+    # The locking read also locks the gaps between the rows, so that no
+    # missing shard row can be inserted in the meantime.
+    cursor.execute(
+        "SELECT shard FROM hunt_counters WHERE hunt_id = %s FOR UPDATE",
+        [hunt_id_int],
     )
 
-    query = """
-        SELECT
-          parent_hunt_id,
-          SUM(user_cpu_time_used_micros + system_cpu_time_used_micros),
-          SUM(network_bytes_sent),
-          SUM(num_replies_sent),
-          COUNT(IF(num_replies_sent > 0, client_id, NULL))
-        FROM flows
-        FORCE INDEX(flows_by_hunt)
-        WHERE parent_hunt_id IN %(hunt_ids)s
-          AND parent_flow_id IS NULL
-        GROUP BY parent_hunt_id
-    """
-    cursor.execute(query, {"hunt_ids": tuple(hunt_ids_ints)})
+    rows = _AggregateHuntCountersShards(cursor, hunt_id_int)
 
-    for (
-        hunt_id,
-        total_cpu_seconds,
-        total_network_bytes_sent,
-        num_results,
-        num_clients_with_results,
-    ) in cursor.fetchall():
-      counts_by_state = counts_by_state_per_hunt[hunt_id]
-      num_successful_clients = counts_by_state.get(
-          int(flows_pb2.Flow.FlowState.FINISHED), 0
-      )
-      num_failed_clients = counts_by_state.get(
-          int(flows_pb2.Flow.FlowState.ERROR), 0
-      )
-      num_crashed_clients = counts_by_state.get(
-          int(flows_pb2.Flow.FlowState.CRASHED), 0
-      )
-      num_running_clients = counts_by_state.get(
-          int(flows_pb2.Flow.FlowState.RUNNING), 0
-      )
-      num_clients = sum(counts_by_state_per_hunt[hunt_id].values())
-
-      hunt_counters[db_utils.IntToHuntID(hunt_id)] = db.HuntCounters(
-          num_clients=num_clients,
-          num_successful_clients=num_successful_clients,
-          num_failed_clients=num_failed_clients,
-          num_clients_with_results=num_clients_with_results,
-          num_crashed_clients=num_crashed_clients,
-          num_running_clients=num_running_clients,
-          num_results=int(num_results or 0),
-          total_cpu_seconds=db_utils.MicrosToSeconds(
-              int(total_cpu_seconds or 0)
-          ),
-          total_network_bytes_sent=int(total_network_bytes_sent or 0),
-      )
-    return hunt_counters
+    cursor.execute("DELETE FROM hunt_counters WHERE hunt_id = %s", [hunt_id_int])
+    if not rows:
+      return
+
+    columns = ("hunt_id", "shard") + _HUNT_COUNTERS_COLUMNS
+    query = f"""
+        INSERT INTO hunt_counters({", ".join(columns)})
+        VALUES {mysql_utils.Placeholders(len(columns), values=len(rows))}
+    """
+    args = []
+    for shard, row in rows.items():
+      args.extend((hunt_id_int, shard) + row)
+    cursor.execute(query, args)
 
   def _BinsToQuery(self, bins: list[int], column_name: str) -> str:
     """Builds an SQL query part to fetch counts corresponding to given bins."""
@@ -1088,7 +1208,7 @@ class MySQLDBHuntMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadHuntClientResourcesStats(
       self, hunt_id: str, cursor: Optional[cursors.Cursor] = None
   ) -> jobs_pb2.ClientResourcesStats:
@@ -1220,7 +1340,7 @@ class MySQLDBHuntMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadHuntFlowsStatesAndTimestamps(
       self,
       hunt_id: str,
@@ -1253,7 +1373,45 @@ class MySQLDBHuntMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
+  def ReadHuntFlowsTimestamps(
+      self,
+      hunt_id: str,
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> db.HuntFlowsTimestamps:
+    """Reads creation and completion times of hunt flows."""
+    assert cursor is not None
+
+    # Timestamps are truncated to whole seconds on the database side, so that
+    # the driver returns plain integers instead of decimals.
+    query = """
+      SELECT
+        CAST(FLOOR(UNIX_TIMESTAMP(timestamp)) AS SIGNED),
+        IF(flow_state = %s,
+           NULL,
+           CAST(FLOOR(UNIX_TIMESTAMP(last_update)) AS SIGNED))
+      FROM flows
+      FORCE INDEX(flows_by_hunt)
+      WHERE parent_hunt_id = %s AND parent_flow_id IS NULL
+    """
+
+    cursor.execute(
+        query,
+        [
+            int(flows_pb2.Flow.FlowState.RUNNING),
+            db_utils.HuntIDToInt(hunt_id),
+        ],
+    )
+    rows = cursor.fetchall()
+
+    return db.HuntFlowsTimestamps(
+        create_times=sorted(ct for ct, _ in rows),
+        completion_times=sorted(lup for _, lup in rows if lup is not None),
+    )
+
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def ReadHuntOutputPluginLogEntries(
       self,
       hunt_id: str,
@@ -1315,7 +1473,7 @@ class MySQLDBHuntMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_replica=True)
   def CountHuntOutputPluginLogEntries(
       self,
       hunt_id: str,
@@ -0,0 +1,7 @@
+CREATE TABLE foreman_rules_version(
+    id TINYINT UNSIGNED NOT NULL,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (id)
+);
+
+INSERT INTO foreman_rules_version (id, version) VALUES (0, 0);
@@ -0,0 +1,173 @@
+-- Per-hunt counters maintained incrementally from the `flows` table, so that
+-- reading them does not require aggregating over all flows of a hunt.
+--
+-- Only top-level hunt flows (`parent_hunt_id` set, `parent_flow_id` unset)
+-- are counted. `parent_hunt_id` and `parent_flow_id` of a flow never change.
+--
+-- Counters of a hunt are split into 16 shards by client id (the shard of a
+-- flow is `client_id MOD 16`) and have to be summed up when read. This way
+-- flows of a hunt being updated concurrently rarely contend for the same row.
+-- The number of shards has to match `_HUNT_COUNTERS_SHARDS` in
+-- mysql_hunts.py.
+CREATE TABLE hunt_counters(
+    hunt_id BIGINT UNSIGNED NOT NULL,
+    shard TINYINT UNSIGNED NOT NULL,
+    num_clients BIGINT NOT NULL DEFAULT 0,
+    num_successful_clients BIGINT NOT NULL DEFAULT 0,
+    num_failed_clients BIGINT NOT NULL DEFAULT 0,
+    num_crashed_clients BIGINT NOT NULL DEFAULT 0,
+    num_running_clients BIGINT NOT NULL DEFAULT 0,
+    num_clients_with_results BIGINT NOT NULL DEFAULT 0,
+    num_results BIGINT NOT NULL DEFAULT 0,
+    total_cpu_micros BIGINT NOT NULL DEFAULT 0,
+    total_network_bytes_sent BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (hunt_id, shard)
+);
+
+INSERT INTO hunt_counters(
+    hunt_id, shard, num_clients, num_successful_clients, num_failed_clients,
+    num_crashed_clients, num_running_clients, num_clients_with_results,
+    num_results, total_cpu_micros, total_network_bytes_sent)
+SELECT
+  parent_hunt_id,
+  client_id MOD 16,
+  COUNT(*),
+  COUNT(IF(flow_state = 2, 1, NULL)),
+  COUNT(IF(flow_state = 3, 1, NULL)),
+  COUNT(IF(flow_state = 4, 1, NULL)),
+  COUNT(IF(flow_state = 1, 1, NULL)),
+  COUNT(IF(num_replies_sent > 0, 1, NULL)),
+  IFNULL(SUM(num_replies_sent), 0),
+  IFNULL(SUM(user_cpu_time_used_micros + system_cpu_time_used_micros), 0),
+  IFNULL(SUM(network_bytes_sent), 0)
+FROM flows
+WHERE parent_hunt_id IS NOT NULL AND parent_flow_id IS NULL
+GROUP BY parent_hunt_id, client_id MOD 16;
+
+-- Note: the triggers below use INSERT ... SELECT ... WHERE so that each of
+-- them is a single statement; rows of flows that do not belong to a hunt are
+-- skipped by the WHERE clause. Unsigned columns are cast to signed values
+-- before subtracting, as negative deltas are out of the unsigned range.
+
+-- Adds a new hunt flow to the counters of its hunt.
+CREATE
+  TRIGGER
+    hunt_counters_flows_insert
+      AFTER INSERT
+ON
+  flows
+    FOR EACH ROW INSERT INTO hunt_counters(
+        hunt_id, shard, num_clients, num_successful_clients,
+        num_failed_clients, num_crashed_clients, num_running_clients,
+        num_clients_with_results, num_results, total_cpu_micros,
+        total_network_bytes_sent)
+SELECT
+  NEW.parent_hunt_id,
+  NEW.client_id MOD 16,
+  1,
+  NEW.flow_state <=> 2,
+  NEW.flow_state <=> 3,
+  NEW.flow_state <=> 4,
+  NEW.flow_state <=> 1,
+  IFNULL(NEW.num_replies_sent, 0) > 0,
+  IFNULL(NEW.num_replies_sent, 0),
+  IFNULL(NEW.user_cpu_time_used_micros, 0) +
+    IFNULL(NEW.system_cpu_time_used_micros, 0),
+  IFNULL(NEW.network_bytes_sent, 0)
+FROM DUAL
+WHERE NEW.parent_hunt_id IS NOT NULL AND NEW.parent_flow_id IS NULL
+ON DUPLICATE KEY UPDATE
+  num_clients = num_clients + VALUES(num_clients),
+  num_successful_clients =
+    num_successful_clients + VALUES(num_successful_clients),
+  num_failed_clients = num_failed_clients + VALUES(num_failed_clients),
+  num_crashed_clients = num_crashed_clients + VALUES(num_crashed_clients),
+  num_running_clients = num_running_clients + VALUES(num_running_clients),
+  num_clients_with_results =
+    num_clients_with_results + VALUES(num_clients_with_results),
+  num_results = num_results + VALUES(num_results),
+  total_cpu_micros = total_cpu_micros + VALUES(total_cpu_micros),
+  total_network_bytes_sent =
+    total_network_bytes_sent + VALUES(total_network_bytes_sent);
+
+-- Applies the difference between the old and the new state of a hunt flow.
+-- Updates not touching any of the counted columns (e.g. flow leases) are
+-- skipped, so that they do not lock the hunt's counters rows.
+CREATE
+  TRIGGER
+    hunt_counters_flows_update
+      AFTER UPDATE
+ON
+  flows
+    FOR EACH ROW INSERT INTO hunt_counters(
+        hunt_id, shard, num_clients, num_successful_clients,
+        num_failed_clients, num_crashed_clients, num_running_clients,
+        num_clients_with_results, num_results, total_cpu_micros,
+        total_network_bytes_sent)
+SELECT
+  NEW.parent_hunt_id,
+  NEW.client_id MOD 16,
+  0,
+  (NEW.flow_state <=> 2) - (OLD.flow_state <=> 2),
+  (NEW.flow_state <=> 3) - (OLD.flow_state <=> 3),
+  (NEW.flow_state <=> 4) - (OLD.flow_state <=> 4),
+  (NEW.flow_state <=> 1) - (OLD.flow_state <=> 1),
+  (IFNULL(NEW.num_replies_sent, 0) > 0) -
+    (IFNULL(OLD.num_replies_sent, 0) > 0),
+  CAST(IFNULL(NEW.num_replies_sent, 0) AS SIGNED) -
+    CAST(IFNULL(OLD.num_replies_sent, 0) AS SIGNED),
+  CAST(IFNULL(NEW.user_cpu_time_used_micros, 0) AS SIGNED) +
+    CAST(IFNULL(NEW.system_cpu_time_used_micros, 0) AS SIGNED) -
+    CAST(IFNULL(OLD.user_cpu_time_used_micros, 0) AS SIGNED) -
+    CAST(IFNULL(OLD.system_cpu_time_used_micros, 0) AS SIGNED),
+  CAST(IFNULL(NEW.network_bytes_sent, 0) AS SIGNED) -
+    CAST(IFNULL(OLD.network_bytes_sent, 0) AS SIGNED)
+FROM DUAL
+WHERE NEW.parent_hunt_id IS NOT NULL AND NEW.parent_flow_id IS NULL
+  AND NOT (
+    NEW.flow_state <=> OLD.flow_state
+    AND NEW.num_replies_sent <=> OLD.num_replies_sent
+    AND NEW.user_cpu_time_used_micros <=> OLD.user_cpu_time_used_micros
+    AND NEW.system_cpu_time_used_micros <=> OLD.system_cpu_time_used_micros
+    AND NEW.network_bytes_sent <=> OLD.network_bytes_sent)
+ON DUPLICATE KEY UPDATE
+  num_successful_clients =
+    num_successful_clients + VALUES(num_successful_clients),
+  num_failed_clients = num_failed_clients + VALUES(num_failed_clients),
+  num_crashed_clients = num_crashed_clients + VALUES(num_crashed_clients),
+  num_running_clients = num_running_clients + VALUES(num_running_clients),
+  num_clients_with_results =
+    num_clients_with_results + VALUES(num_clients_with_results),
+  num_results = num_results + VALUES(num_results),
+  total_cpu_micros = total_cpu_micros + VALUES(total_cpu_micros),
+  total_network_bytes_sent =
+    total_network_bytes_sent + VALUES(total_network_bytes_sent);
+
+-- Removes a deleted hunt flow from the counters of its hunt.
+-- Note: triggers are not activated by cascaded foreign key actions, so
+-- `DeleteClient` deletes hunt flows of the client explicitly before the client
+-- itself.
+CREATE
+  TRIGGER
+    hunt_counters_flows_delete
+      AFTER DELETE
+ON
+  flows
+    FOR EACH ROW UPDATE hunt_counters
+SET
+  num_clients = num_clients - 1,
+  num_successful_clients = num_successful_clients - (OLD.flow_state <=> 2),
+  num_failed_clients = num_failed_clients - (OLD.flow_state <=> 3),
+  num_crashed_clients = num_crashed_clients - (OLD.flow_state <=> 4),
+  num_running_clients = num_running_clients - (OLD.flow_state <=> 1),
+  num_clients_with_results =
+    num_clients_with_results - (IFNULL(OLD.num_replies_sent, 0) > 0),
+  num_results = num_results - CAST(IFNULL(OLD.num_replies_sent, 0) AS SIGNED),
+  total_cpu_micros = total_cpu_micros -
+    CAST(IFNULL(OLD.user_cpu_time_used_micros, 0) AS SIGNED) -
+    CAST(IFNULL(OLD.system_cpu_time_used_micros, 0) AS SIGNED),
+  total_network_bytes_sent = total_network_bytes_sent -
+    CAST(IFNULL(OLD.network_bytes_sent, 0) AS SIGNED)
+WHERE hunt_id = OLD.parent_hunt_id
+  AND shard = OLD.client_id MOD 16
+  AND OLD.parent_flow_id IS NULL;
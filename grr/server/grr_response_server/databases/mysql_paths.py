@@ -352,7 +352,7 @@ class MySQLDBPathMixin(object):
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
-  @mysql_utils.WithTransaction(readonly=True)
+  @mysql_utils.WithTransaction(readonly=True, allow_stale=True)
   def ListDescendantPathInfos(
       self,
       client_id: str,
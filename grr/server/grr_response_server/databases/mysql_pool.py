@@ -3,10 +3,35 @@
 
 import logging
 import threading
+import time
+from typing import NamedTuple, Optional
 import warnings
 
 import MySQLdb
 
+from grr_response_core.stats import metrics
+
+MYSQL_POOL_ACQUIRE_WAIT = metrics.Event(
+    "mysql_pool_acquire_wait",
+    bins=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60],
+    fields=[("pool", str), ("method", str)],
+)
+MYSQL_POOL_CONNECTIONS_IN_USE = metrics.Gauge(
+    "mysql_pool_connections_in_use", int, fields=[("pool", str)]
+)
+MYSQL_POOL_CONNECTIONS_IDLE = metrics.Gauge(
+    "mysql_pool_connections_idle", int, fields=[("pool", str)]
+)
+# Age (in seconds) of connections at the time they are closed.
+MYSQL_POOL_CONNECTION_AGE = metrics.Event(
+    "mysql_pool_connection_age",
+    bins=[1, 10, 60, 300, 600, 1800, 3600, 4 * 3600, 24 * 3600],
+    fields=[("pool", str)],
+)
+MYSQL_POOL_CLOSED_CONNECTIONS = metrics.Counter(
+    "mysql_pool_closed_connections", fields=[("pool", str), ("reason", str)]
+)
+
 
 class Error(Exception):
   pass
@@ -20,6 +45,14 @@ class SemicolonNotAllowedInQueryError(Error):
   pass
 
 
+class _IdleConnection(NamedTuple):
+  """A connection kept in the pool while it is not used."""
+
+  con: MySQLdb.connections.Connection
+  created_at: float
+  idle_since: float
+
+
 class Pool(object):
   """A Pool of database connections.
 
@@ -30,9 +63,23 @@ class Pool(object):
   Intends to be thread safe in that multiple connections can be requested and
   used by multiple threads without synchronization, but operations on each
   connection (and its associated cursors) are assumed to be serial.
+
+  Connections exceeding their maximum lifetime or idle time are closed instead
+  of being reused. If a keepalive interval is given, a background thread
+  periodically pings idle connections, so that they are not closed by the
+  server, and closes the ones that turn out to be broken.
   """
 
-  def __init__(self, connect_func, max_size=10):
+  def __init__(
+      self,
+      connect_func,
+      max_size=10,
+      name="default",
+      max_lifetime_secs=None,
+      max_idle_secs=None,
+      keepalive_interval_secs=None,
+      profiler=None,
+  ):
     """Creates a ConnectionPool.
 
     Args:
@@ -40,18 +87,52 @@ class Pool(object):
        database, i.e. a MySQLdb.Connection. Should raise or block if the
        database is unavailable.
      max_size: The maximum number of simultaneous connections.
+     name: Name of the pool, used in metrics.
+     max_lifetime_secs: If set, connections older than this are not reused.
+     max_idle_secs: If set, connections that were not used for longer than
+       this are not reused.
+     keepalive_interval_secs: If set, idle connections are checked in the
+       background with this interval.
+     profiler: If set, a mysql_profiler.QueryProfiler recording all statements
+       executed on connections of this pool.
     """
     self.connect_func = connect_func
+    self.name = name
+    self.profiler = profiler
     self.limiter = threading.BoundedSemaphore(max_size)
-    self.idle_conns = []  # Atomic access only!!
+    self.idle_conns: list[_IdleConnection] = []  # Guarded by `_lock`.
     self.closed = False
 
-  def get(self, blocking=True):
+    self._max_lifetime_secs = max_lifetime_secs
+    self._max_idle_secs = max_idle_secs
+    self._lock = threading.Lock()
+    self._num_in_use = 0
+
+    MYSQL_POOL_CONNECTIONS_IN_USE.SetCallback(
+        lambda: self._num_in_use, fields=[name]
+    )
+    MYSQL_POOL_CONNECTIONS_IDLE.SetCallback(
+        lambda: len(self.idle_conns), fields=[name]
+    )
+
+    self._keepalive_stop = threading.Event()
+    self._keepalive_thread = None
+    if keepalive_interval_secs:
+      self._keepalive_thread = threading.Thread(
+          name=f"mysql_pool_keepalive_{name}",
+          target=self._KeepaliveLoop,
+          args=(keepalive_interval_secs,),
+          daemon=True,
+      )
+      self._keepalive_thread.start()
+
+  def get(self, blocking=True, caller=None):
     """Gets a connection.
 
     Args:
       blocking: Whether to block when max_size connections are already in use.
         If false, may return None.
+      caller: Name of the method requesting the connection, used in metrics.
 
     Returns:
       A connection to the database.
@@ -66,26 +147,143 @@ class Pool(object):
     # NOTE: Once we acquire capacity from the semaphore, it is essential that we
     # return it eventually. On success, this responsibility is delegated to
     # _ConnectionProxy.
+    start_time = time.monotonic()
     if not self.limiter.acquire(blocking=blocking):
       return None
-    c = None
-    # pop is atomic, but if we did a check first, it would not be atomic with
-    # the pop.
+    MYSQL_POOL_ACQUIRE_WAIT.RecordEvent(
+        time.monotonic() - start_time, fields=[self.name, caller or "unknown"]
+    )
+
     try:
-      c = self.idle_conns.pop()
-    except IndexError:
-      # Create a connection, release the pool allocation if it fails.
-      try:
-        c = self.connect_func()
-      except Exception:
-        self.limiter.release()
-        raise
-    return _ConnectionProxy(self, c)
+      while True:
+        idle = self._PopIdle()
+        if idle is None:
+          # Create a connection, release the pool allocation if it fails.
+          con = self.connect_func()
+          created_at = time.monotonic()
+          break
+
+        reason = self._ExpiryReason(idle, time.monotonic())
+        if reason is None:
+          con = idle.con
+          created_at = idle.created_at
+          break
+
+        self.close_connection(idle.con, idle.created_at, reason)
+    except Exception:
+      self.limiter.release()
+      raise
+
+    with self._lock:
+      self._num_in_use += 1
+    return _ConnectionProxy(self, con, created_at, caller)
 
   def close(self):
     self.closed = True
-    for conn in self.idle_conns:
-      conn.close()
+    self._keepalive_stop.set()
+
+    with self._lock:
+      idle_conns = self.idle_conns
+      self.idle_conns = []
+    for idle in idle_conns:
+      self.close_connection(idle.con, idle.created_at, "pool_closed")
+
+  def _PopIdle(self) -> Optional[_IdleConnection]:
+    with self._lock:
+      try:
+        return self.idle_conns.pop()
+      except IndexError:
+        return None
+
+  def _ExpiryReason(
+      self,
+      idle: _IdleConnection,
+      now: float,
+  ) -> Optional[str]:
+    """Returns why an idle connection must not be reused, if it must not."""
+    if (
+        self._max_lifetime_secs is not None
+        and now - idle.created_at > self._max_lifetime_secs
+    ):
+      return "max_lifetime"
+    if (
+        self._max_idle_secs is not None
+        and now - idle.idle_since > self._max_idle_secs
+    ):
+      return "max_idle"
+    return None
+
+  def return_connection(self, con, created_at: float) -> None:
+    """Puts a connection that is no longer used back to the pool."""
+    idle = _IdleConnection(con, created_at, idle_since=time.monotonic())
+    reason = self._ExpiryReason(idle, idle.idle_since)
+    if reason is not None:
+      self.close_connection(con, created_at, reason)
+      return
+
+    with self._lock:
+      self.idle_conns.append(idle)
+
+  def release_connection(self) -> None:
+    with self._lock:
+      self._num_in_use -= 1
+    self.limiter.release()
+
+  def close_connection(self, con, created_at: float, reason: str) -> None:
+    MYSQL_POOL_CONNECTION_AGE.RecordEvent(
+        time.monotonic() - created_at, fields=[self.name]
+    )
+    MYSQL_POOL_CLOSED_CONNECTIONS.Increment(fields=[self.name, reason])
+    try:
+      con.close()
+    except MySQLdb.Error as e:
+      logging.warning("Failed to close MySQL connection: %s", e)
+
+  def _KeepaliveLoop(self, interval_secs: float) -> None:
+    while not self._keepalive_stop.wait(interval_secs):
+      try:
+        self.check_idle_connections()
+      except Exception:  # pylint: disable=broad-except
+        logging.exception("Failed to check idle MySQL connections.")
+
+  def check_idle_connections(self) -> None:
+    """Closes idle connections that are expired or broken, pings the others."""
+    with self._lock:
+      idle_conns = list(self.idle_conns)
+
+    for idle in idle_conns:
+      if self.closed:
+        return
+
+      # Checking a connection uses pool capacity as any other use does.
+      if not self.limiter.acquire(blocking=False):
+        return
+
+      try:
+        with self._lock:
+          try:
+            self.idle_conns.remove(idle)
+          except ValueError:
+            # The connection was taken from the pool in the meantime.
+            continue
+
+        reason = self._ExpiryReason(idle, time.monotonic())
+        if reason is None:
+          try:
+            idle.con.ping()
+          except MySQLdb.Error:
+            reason = "broken"
+
+        if reason is not None:
+          self.close_connection(idle.con, idle.created_at, reason)
+          continue
+
+        # Pinging does not count as using the connection, so it keeps its
+        # position in the pool and its idle time.
+        with self._lock:
+          self.idle_conns.insert(0, idle)
+      finally:
+        self.limiter.release()
 
 
 class _ConnectionProxy(object):
@@ -96,9 +294,11 @@ class _ConnectionProxy(object):
   connection when it may be in an errored state.
   """
 
-  def __init__(self, pool, con):
+  def __init__(self, pool, con, created_at, caller=None):
     self.con = con
     self.pool = pool
+    self.created_at = created_at
+    self.caller = caller
     self.errored = False
 
   def __del__(self):
@@ -112,18 +312,19 @@ class _ConnectionProxy(object):
         if not self.errored and not self.pool.closed:
           try:
             self.con.rollback()
-            # append is atomic.
-            self.pool.idle_conns.append(self.con)
           except Exception:
             # rollback raised and the connection didn't make it into the idle
             # list, so close it.
-            self.con.close()
+            self.pool.close_connection(self.con, self.created_at, "broken")
             raise
+          self.pool.return_connection(self.con, self.created_at)
+        elif self.errored:
+          self.pool.close_connection(self.con, self.created_at, "broken")
         else:
-          self.con.close()
+          self.pool.close_connection(self.con, self.created_at, "pool_closed")
       finally:
         self.con = None
-        self.pool.limiter.release()
+        self.pool.release_connection()
 
   def commit(self):
     assert self.con is not None
@@ -175,6 +376,27 @@ class _CursorProxy(object):
       self.con.errored = True
       raise
 
+  def _forward_statement(self, method, query, args):
+    """Forwards execution of a statement, profiling it if requested."""
+    profiler = self.con.pool.profiler
+    if profiler is None:
+      return self._forward(method, query, args)
+
+    start_time = time.monotonic()
+    error = True
+    try:
+      result = self._forward(method, query, args)
+      error = False
+      return result
+    finally:
+      profiler.RecordStatement(
+          self.con.caller,
+          query,
+          time.monotonic() - start_time,
+          rows=0 if error else self.cursor.rowcount,
+          error=error,
+      )
+
   def callproc(self, procname, args=()):
     return self._forward(self.cursor.callproc, procname, args=args)
 
@@ -202,7 +424,7 @@ class _CursorProxy(object):
       )
 
     try:
-      result = self._forward(self.cursor.execute, query, args=args)
+      result = self._forward_statement(self.cursor.execute, query, args)
       if MySQLdb.version_info >= (1, 4, 0) and self.con.warning_count():
         # Newer MySQLdb versions do not automatically turn MySQL warnings into
         # Python warnings, so this behavior must be implemented explicitly.
@@ -251,7 +473,7 @@ class _CursorProxy(object):
       raise
 
   def executemany(self, query, args):
-    return self._forward(self.cursor.executemany, query, args)
+    return self._forward_statement(self.cursor.executemany, query, args)
 
   def fetchone(self):
     return self._forward(self.cursor.fetchone)
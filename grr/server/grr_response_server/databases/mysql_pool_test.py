@@ -149,5 +149,71 @@ class TestPool(absltest.TestCase):
         self.assertLen(pool.idle_conns, 1)
 
 
+  def testConnectionExceedingMaxLifetimeIsNotReused(self):
+    mocks = []
+
+    def gen_mock():
+      c = mock.MagicMock()
+      mocks.append(c)
+      return c
+
+    pool = mysql_pool.Pool(gen_mock, max_size=5, max_lifetime_secs=10)
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=100):
+      pool.get().close()
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=105):
+      pool.get().close()
+    self.assertLen(mocks, 1)
+
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=111):
+      pool.get().close()
+    self.assertLen(mocks, 2)
+    mocks[0].close.assert_called_once()
+    mocks[1].close.assert_not_called()
+
+  def testConnectionExceedingMaxIdleTimeIsNotReused(self):
+    mocks = []
+
+    def gen_mock():
+      c = mock.MagicMock()
+      mocks.append(c)
+      return c
+
+    pool = mysql_pool.Pool(gen_mock, max_size=5, max_idle_secs=10)
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=100):
+      pool.get().close()
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=109):
+      pool.get().close()
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=118):
+      pool.get().close()
+    self.assertLen(mocks, 1)
+
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=129):
+      pool.get().close()
+    self.assertLen(mocks, 2)
+    mocks[0].close.assert_called_once()
+
+  def testCheckIdleConnectionsClosesBrokenConnections(self):
+    good_connection_mock = mock.MagicMock()
+    bad_connection_mock = mock.MagicMock()
+    bad_connection_mock.ping.side_effect = MySQLdb.OperationalError(
+        'Server gone'
+    )
+    connection_mocks = [good_connection_mock, bad_connection_mock]
+
+    pool = mysql_pool.Pool(lambda: connection_mocks.pop(0), max_size=5)
+    con_1 = pool.get()
+    con_2 = pool.get()
+    con_1.close()
+    con_2.close()
+    self.assertLen(pool.idle_conns, 2)
+
+    pool.check_idle_connections()
+
+    good_connection_mock.ping.assert_called_once()
+    good_connection_mock.close.assert_not_called()
+    bad_connection_mock.close.assert_called_once()
+    self.assertEqual([c.con for c in pool.idle_conns], [good_connection_mock])
+
+
 if __name__ == '__main__':
   app.run(test_lib.main)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""Profiling of SQL statements executed by the MySQL database."""
+
+import collections
+import dataclasses
+import functools
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Optional
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_LIST_RE = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+
+@functools.lru_cache(maxsize=10000)
+def Fingerprint(query: str) -> str:
+  """Normalizes a SQL statement, so that similar statements are grouped.
+
+  Literals and placeholders are replaced with `?`, lists of them (e.g. in
+  `IN (...)` or `VALUES (...), (...)` clauses) with a single `(...)`, so that
+  statements that only differ in the number of arguments share a fingerprint.
+
+  Args:
+    query: A SQL statement.
+
+  Returns:
+    A fingerprint of the statement.
+  """
+  query = _WHITESPACE_RE.sub(" ", query).strip()
+  query = query.replace("%s", "?")
+  query = _STRING_LITERAL_RE.sub("?", query)
+  query = _NUMBER_RE.sub("?", query)
+  query = _PLACEHOLDER_LIST_RE.sub("(...)", query)
+  query = _REPEATED_LIST_RE.sub("(...)", query)
+  return query
+
+
+@dataclasses.dataclass
+class StatementStats:
+  """Aggregated statistics of a statement executed by a database method."""
+
+  method: str
+  fingerprint: str
+  count: int = 0
+  errors: int = 0
+  total_time: float = 0.0
+  max_time: float = 0.0
+  rows: int = 0
+
+
+class QueryProfiler:
+  """Aggregates SQL statements executed by database methods.
+
+  Statements are grouped by the database method executing them and by their
+  fingerprint. For every group, the number of executions and errors, the total
+  and maximum execution time and the number of rows returned (or affected) are
+  kept. Transaction retries are counted per database method.
+  """
+
+  def __init__(
+      self,
+      dump_path: Optional[str] = None,
+      dump_interval_secs: Optional[float] = None,
+  ) -> None:
+    """Initializes the profiler.
+
+    Args:
+      dump_path: If set, the profile is written to this file every
+        `dump_interval_secs` seconds and when the profiler is stopped.
+      dump_interval_secs: Interval in which the profile is written to the
+        dump file.
+    """
+    self._lock = threading.Lock()
+    self._statements: dict[tuple[str, str], StatementStats] = {}
+    self._retries: collections.Counter[str] = collections.Counter()
+
+    self._dump_path = dump_path
+    self._dump_stop = threading.Event()
+    self._dump_thread = None
+    if dump_path and dump_interval_secs:
+      self._dump_thread = threading.Thread(
+          name="mysql_profiler_dump",
+          target=self._DumpLoop,
+          args=(dump_interval_secs,),
+          daemon=True,
+      )
+      self._dump_thread.start()
+
+  def RecordStatement(
+      self,
+      method: Optional[str],
+      query: str,
+      duration: float,
+      rows: int,
+      error: bool = False,
+  ) -> None:
+    """Records a single execution of a statement."""
+    method = method or "unknown"
+    fingerprint = Fingerprint(query)
+
+    with self._lock:
+      try:
+        stats = self._statements[(method, fingerprint)]
+      except KeyError:
+        stats = StatementStats(method=method, fingerprint=fingerprint)
+        self._statements[(method, fingerprint)] = stats
+
+      stats.count += 1
+      stats.errors += int(error)
+      stats.total_time += duration
+      stats.max_time = max(stats.max_time, duration)
+      stats.rows += max(rows, 0)
+
+  def RecordRetry(self, method: Optional[str]) -> None:
+    """Records a retry of a transaction run by a database method."""
+    with self._lock:
+      self._retries[method or "unknown"] += 1
+
+  def TopStatements(self, limit: int) -> list[StatementStats]:
+    """Returns statements with the highest total execution time."""
+    with self._lock:
+      statements = [dataclasses.replace(s) for s in self._statements.values()]
+
+    statements.sort(key=lambda s: s.total_time, reverse=True)
+    return statements[:limit]
+
+  def Summary(self, limit: int = 100) -> dict[str, Any]:
+    """Returns a JSON-serializable summary of the profile.
+
+    Args:
+      limit: Number of top statements to include.
+
+    Returns:
+      A dict with the top statements and per-method totals.
+    """
+    methods = collections.defaultdict(
+        lambda: {"statements": 0, "total_time": 0.0, "rows": 0, "retries": 0}
+    )
+    with self._lock:
+      for stats in self._statements.values():
+        method = methods[stats.method]
+        method["statements"] += stats.count
+        method["total_time"] += stats.total_time
+        method["rows"] += stats.rows
+      for method_name, retries in self._retries.items():
+        methods[method_name]["retries"] += retries
+
+    return {
+        "top_statements": [
+            dataclasses.asdict(s) for s in self.TopStatements(limit)
+        ],
+        "methods": dict(
+            sorted(
+                methods.items(),
+                key=lambda item: item[1]["total_time"],
+                reverse=True,
+            )
+        ),
+    }
+
+  def Dump(self, path: str) -> None:
+    """Writes the whole profile to the given file as JSON."""
+    with self._lock:
+      limit = len(self._statements)
+    summary = self.Summary(limit=limit)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+      json.dump(summary, f, indent=2)
+    os.replace(tmp_path, path)
+
+  def Reset(self) -> None:
+    with self._lock:
+      self._statements = {}
+      self._retries = collections.Counter()
+
+  def Stop(self) -> None:
+    """Stops periodic dumps and writes the final profile to the dump file."""
+    self._dump_stop.set()
+    if self._dump_path:
+      self.Dump(self._dump_path)
+
+  def _DumpLoop(self, interval_secs: float) -> None:
+    while not self._dump_stop.wait(interval_secs):
+      try:
+        self.Dump(self._dump_path)
+      except OSError as e:
+        logging.warning("Failed to dump MySQL query profile: %s", e)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+import json
+import os
+
+from absl import app
+from absl.testing import absltest
+
+from grr_response_server.databases import mysql_profiler
+from grr.test_lib import test_lib
+
+
+class FingerprintTest(absltest.TestCase):
+
+  def testNormalizesWhitespace(self):
+    self.assertEqual(
+        mysql_profiler.Fingerprint("SELECT  foo\n  FROM bar "),
+        "SELECT foo FROM bar",
+    )
+
+  def testReplacesLiterals(self):
+    self.assertEqual(
+        mysql_profiler.Fingerprint(
+            "SELECT foo FROM bar WHERE baz = 'quux' AND sha256 = 42"
+        ),
+        "SELECT foo FROM bar WHERE baz = ? AND sha256 = ?",
+    )
+
+  def testCollapsesPlaceholderLists(self):
+    self.assertEqual(
+        mysql_profiler.Fingerprint(
+            "SELECT foo FROM bar WHERE baz IN (%s, %s, %s)"
+        ),
+        mysql_profiler.Fingerprint("SELECT foo FROM bar WHERE baz IN (%s)"),
+    )
+    self.assertEqual(
+        mysql_profiler.Fingerprint(
+            "INSERT INTO foo (bar, baz) VALUES (%s, %s), (%s, %s)"
+        ),
+        "INSERT INTO foo (bar, baz) VALUES (...)",
+    )
+
+
+class QueryProfilerTest(absltest.TestCase):
+
+  def testAggregatesStatementsPerMethodAndFingerprint(self):
+    profiler = mysql_profiler.QueryProfiler()
+    profiler.RecordStatement("ReadFoo", "SELECT a FROM t WHERE b = %s", 1.0, 2)
+    profiler.RecordStatement("ReadFoo", "SELECT a FROM t WHERE b = %s", 3.0, 1)
+    profiler.RecordStatement("ReadBar", "SELECT a FROM t WHERE b = %s", 0.5, 0)
+    profiler.RecordStatement(
+        "ReadBar", "SELECT c FROM t", 0.1, 0, error=True
+    )
+
+    statements = profiler.TopStatements(limit=10)
+    self.assertLen(statements, 3)
+
+    self.assertEqual(statements[0].method, "ReadFoo")
+    self.assertEqual(statements[0].fingerprint, "SELECT a FROM t WHERE b = ?")
+    self.assertEqual(statements[0].count, 2)
+    self.assertEqual(statements[0].total_time, 4.0)
+    self.assertEqual(statements[0].max_time, 3.0)
+    self.assertEqual(statements[0].rows, 3)
+
+    self.assertEqual(statements[1].method, "ReadBar")
+    self.assertEqual(statements[1].total_time, 0.5)
+
+    self.assertEqual(statements[2].method, "ReadBar")
+    self.assertEqual(statements[2].errors, 1)
+
+  def testTopStatementsRespectsLimit(self):
+    profiler = mysql_profiler.QueryProfiler()
+    for i in range(5):
+      profiler.RecordStatement("ReadFoo", f"SELECT c{i} FROM t", i, 0)
+
+    statements = profiler.TopStatements(limit=2)
+    self.assertEqual(
+        [s.fingerprint for s in statements],
+        ["SELECT c4 FROM t", "SELECT c3 FROM t"],
+    )
+
+  def testSummaryIncludesRetriesPerMethod(self):
+    profiler = mysql_profiler.QueryProfiler()
+    profiler.RecordStatement("WriteFoo", "INSERT INTO t VALUES (%s)", 1.0, 1)
+    profiler.RecordRetry("WriteFoo")
+    profiler.RecordRetry("WriteFoo")
+
+    summary = profiler.Summary()
+    self.assertEqual(summary["methods"]["WriteFoo"]["retries"], 2)
+    self.assertEqual(summary["methods"]["WriteFoo"]["statements"], 1)
+    self.assertLen(summary["top_statements"], 1)
+
+  def testDump(self):
+    profiler = mysql_profiler.QueryProfiler()
+    profiler.RecordStatement("ReadFoo", "SELECT a FROM t", 1.0, 1)
+
+    path = os.path.join(self.create_tempdir().full_path, "profile.json")
+    profiler.Dump(path)
+
+    with open(path) as f:
+      dumped = json.load(f)
+    self.assertEqual(dumped, profiler.Summary())
+
+
+if __name__ == "__main__":
+  app.run(test_lib.main)
@@ -18,6 +18,7 @@ from grr_response_server.databases import db as abstract_db
 from grr_response_server.databases import db_test_mixin
 from grr_response_server.databases import db_utils
 from grr_response_server.databases import mysql
+from grr_response_server.databases import mysql_pool
 from grr_response_server.databases import mysql_utils
 from grr.test_lib import stats_test_lib
 from grr.test_lib import test_lib
@@ -293,6 +294,98 @@ class TestMysqlDB(
     self.assertGreater(sum(counts), 2)
     self.assertGreater(sleep_with_backoff_fn.call_count, 0)
 
+  def _SetUpReplicaPool(self, max_lag_secs: int) -> mysql_pool.Pool:
+    # The primary server doubles as a read replica of itself.
+    pool = mysql_pool.Pool(self.delegate._ConnectToReplica, max_size=2)
+    self.delegate._replica_connect_args = self.delegate._connect_args
+    self.delegate._max_replica_pool_size = 2
+    self.delegate._replica_max_lag_secs = max_lag_secs
+    self.delegate._replica_checked_at = None
+    self.delegate._replica_warned_at = None
+    self.delegate.replica_pool = pool
+
+    def TearDown():
+      self.delegate.replica_pool = None
+      pool.close()
+
+    self.addCleanup(TearDown)
+    return pool
+
+  def testReadReplicaLagOfNonReplicaIsZero(self):
+    def ReadLag(connection):
+      with contextlib.closing(connection.cursor()) as cursor:
+        return mysql._ReadReplicaLag(cursor)
+
+    self.assertEqual(self.delegate._RunInTransaction(ReadLag), 0)
+
+  @mock.patch.object(mysql, "_ReadReplicaLag", return_value=0)
+  def testReadonlyTransactionsRunOnReplica(self, _):
+    pool = self._SetUpReplicaPool(max_lag_secs=5)
+
+    with mock.patch.object(pool, "get", wraps=pool.get) as get_fn:
+      users = self.delegate._RunInTransaction(
+          self.ListUsers, readonly=True, allow_replica=True
+      )
+      self.assertEqual(users, ())
+      # One connection to check the replication lag and one to run the
+      # transaction.
+      self.assertEqual(get_fn.call_count, 2)
+
+      self.delegate._RunInTransaction(self.ListUsers, readonly=True)
+      self.delegate._RunInTransaction(self.ListUsers, allow_replica=True)
+      self.assertEqual(get_fn.call_count, 2)
+
+  @mock.patch.object(mysql, "_ReadReplicaLag", return_value=10)
+  def testReadonlyTransactionsFallBackToPrimaryIfReplicaLags(self, _):
+    pool = self._SetUpReplicaPool(max_lag_secs=5)
+
+    with mock.patch.object(pool, "get", wraps=pool.get) as get_fn:
+      with self.assertStatsCounterDelta(1, mysql.MYSQL_REPLICA_FALLBACKS):
+        users = self.delegate._RunInTransaction(
+            self.ListUsers, readonly=True, allow_replica=True
+        )
+      self.assertEqual(users, ())
+      # Only the connection used to check the replication lag.
+      self.assertEqual(get_fn.call_count, 1)
+
+  @mock.patch.object(mysql, "_ReadReplicaLag", return_value=0)
+  def testOnlyMethodsOptingInRunOnReplica(self, _):
+    pool = self._SetUpReplicaPool(max_lag_secs=5)
+
+    with mock.patch.object(pool, "get", wraps=pool.get) as get_fn:
+      self.delegate.ReadGRRUsers()
+      self.delegate.CountHuntFlows("ABCDEF12")
+      self.assertEqual(get_fn.call_count, 0)
+
+      self.delegate.CountHuntLogEntries("ABCDEF12")
+      self.assertEqual(get_fn.call_count, 2)
+
+  @mock.patch.object(mysql, "_ReadReplicaLag", return_value=0)
+  def testStaleTolerantMethodsRunOnReplicaOnlyIfStaleReadsAllowed(self, _):
+    pool = self._SetUpReplicaPool(max_lag_secs=5)
+
+    with mock.patch.object(pool, "get", wraps=pool.get) as get_fn:
+      self.delegate.CountHuntResults("ABCDEF12")
+      self.assertEqual(get_fn.call_count, 0)
+
+      with abstract_db.AllowStaleReads():
+        self.delegate.CountHuntResults("ABCDEF12")
+      self.assertEqual(get_fn.call_count, 2)
+
+      self.delegate.CountHuntResults("ABCDEF12")
+      self.assertEqual(get_fn.call_count, 2)
+
+  @mock.patch.object(mysql, "_ReadReplicaLag", return_value=None)
+  def testReplicaWarningsAreThrottled(self, _):
+    self._SetUpReplicaPool(max_lag_secs=5)
+
+    with mock.patch.object(logging, "warning") as warning_fn:
+      for _ in range(3):
+        self.delegate._replica_checked_at = None
+        self.assertFalse(self.delegate._IsReplicaUsable())
+
+    self.assertEqual(warning_fn.call_count, 1)
+
   def testSuccessfulCallsAreCorrectlyAccounted(self):
     with self.assertStatsCounterDelta(
         1, db_utils.DB_REQUEST_LATENCY, fields=["ReadGRRUsers"]
@@ -5,7 +5,10 @@ from collections.abc import Iterable, Sequence
 import contextlib
 import functools
 import hashlib
-from typing import Optional, overload
+import logging
+import threading
+import time
+from typing import Callable, Optional, overload
 
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.util import precondition
@@ -212,17 +215,31 @@ class WithTransaction(object):
   process, the decorated function may be called again after a short delay.
   """
 
-  def __init__(self, readonly=False):
+  def __init__(self, readonly=False, allow_replica=False, allow_stale=False):
     """Constructs a decorator.
 
     Args:
       readonly: Whether the decorated function only requires a readonly
         transaction. Has no effect when a connection is provided.
+      allow_replica: Whether a readonly transaction may be run on a read
+        replica, if one is configured. Only functions whose callers tolerate
+        reading slightly stale data (e.g. logs and statistics displayed in
+        the UI) should set it: most reads are expected to observe writes that
+        were just made. Has no effect unless readonly is set.
+      allow_stale: Whether a readonly transaction may be run on a read replica
+        when the caller allowed it with `db.AllowStaleReads`. Meant for
+        reads that are shared between flows and the API (e.g. flow results):
+        only the latter tolerate stale data. Has no effect unless readonly is
+        set.
     """
     self.readonly = readonly
+    self.allow_replica = allow_replica
+    self.allow_stale = allow_stale
 
   def __call__(self, func):
     readonly = self.readonly
+    allow_replica = self.allow_replica
+    allow_stale = self.allow_stale
 
     @functools.wraps(func)
     def Decorated(self, *args, **kw):  # pylint: disable=function-redefined
@@ -237,10 +254,139 @@ class WithTransaction(object):
           new_kw["cursor"] = cursor
           return func(self, *args, **new_kw)
 
-      return self._RunInTransaction(Closure, readonly)
+      return self._RunInTransaction(
+          Closure,
+          readonly,
+          allow_replica=allow_replica
+          or (allow_stale and db_module.StaleReadsAllowed()),
+          caller=func.__name__,
+      )
 
     return Decorated
 
 
 class RetryableError(db_module.Error):
   """Indicates that a transaction can be retried."""
+
+
+class RequestNotifier(object):
+  """Wakes up request handler loops as soon as new requests are written.
+
+  Notifications only reach handler loops running in the same process. Requests
+  written by other processes (e.g. responses written by the frontend) are
+  detected by polling: after every poll that returns nothing, the time to wait
+  before the next poll is doubled, starting at `min_wait_secs` and up to
+  `max_wait_secs`. Both a notification and a successful poll reset the wait
+  time to `min_wait_secs`.
+
+  Since polls (leasing requests) are expensive, a cheap `probe` checking
+  whether there are any requests to lease can be provided. While waiting, it
+  ends the wait as soon as it returns True, so that requests written by other
+  processes are picked up quickly. The probe backs off as well: it is first
+  called after `min_wait_secs` and the interval doubles after every probe that
+  finds nothing, up to `max_probe_interval_secs`. An idle handler loop thus
+  probes about once every `max_probe_interval_secs`.
+  """
+
+  # Minimum time between two warnings about failing probes.
+  _PROBE_WARNING_INTERVAL_SECS = 60
+
+  def __init__(
+      self,
+      min_wait_secs: float,
+      max_wait_secs: float,
+      probe: Optional[Callable[[], bool]] = None,
+      max_probe_interval_secs: float = 1,
+  ) -> None:
+    """Initializes the notifier.
+
+    Args:
+      min_wait_secs: The shortest time to wait between polls.
+      max_wait_secs: The longest time to wait between polls.
+      probe: An optional function returning True if there are requests to be
+        polled.
+      max_probe_interval_secs: The longest time to wait between probes.
+    """
+    self._event = threading.Event()
+    self._min_wait_secs = min_wait_secs
+    self._max_wait_secs = max_wait_secs
+    self._wait_secs = min_wait_secs
+    self._probe = probe
+    self._max_probe_interval_secs = max(min_wait_secs, max_probe_interval_secs)
+    self._probe_interval_secs = min_wait_secs
+    self._last_probe_warning = None
+
+  @property
+  def wait_secs(self) -> float:
+    """The time the next `Wait` call blocks for if nobody notifies."""
+    return self._wait_secs
+
+  @property
+  def probe_interval_secs(self) -> float:
+    """The time until the next probe while waiting."""
+    return self._probe_interval_secs
+
+  def Notify(self) -> None:
+    """Signals that new requests might be available."""
+    self._event.set()
+
+  def Reset(self) -> None:
+    """Signals that the last poll returned requests."""
+    self._wait_secs = self._min_wait_secs
+    self._probe_interval_secs = self._min_wait_secs
+
+  def Wait(self) -> bool:
+    """Blocks until notified or until the current wait time elapses.
+
+    Returns:
+      True if woken up by a notification or by the probe, False if the wait
+      timed out.
+    """
+    if self._probe is None:
+      notified = self._event.wait(self._wait_secs)
+    else:
+      notified = self._WaitWithProbe()
+    self._event.clear()
+
+    if notified:
+      self.Reset()
+    else:
+      self._wait_secs = min(self._wait_secs * 2, self._max_wait_secs)
+
+    return notified
+
+  def _WaitWithProbe(self) -> bool:
+    deadline = time.monotonic() + self._wait_secs
+    while True:
+      remaining = deadline - time.monotonic()
+      if remaining <= 0:
+        return False
+
+      if self._event.wait(min(remaining, self._probe_interval_secs)):
+        return True
+
+      if remaining < self._probe_interval_secs:
+        # The wait is over, polling follows anyway.
+        return False
+
+      try:
+        if self._probe():
+          return True
+      except Exception as e:  # pylint: disable=broad-except
+        # Polling is going to run into the same error and report it.
+        self._WarnProbeFailed(e)
+
+      self._probe_interval_secs = min(
+          self._probe_interval_secs * 2, self._max_probe_interval_secs
+      )
+
+  def _WarnProbeFailed(self, error: Exception) -> None:
+    now = time.monotonic()
+    if (
+        self._last_probe_warning is not None
+        and now - self._last_probe_warning < self._PROBE_WARNING_INTERVAL_SECS
+    ):
+      return
+
+    self._last_probe_warning = now
+    logging.warning("Probing for requests failed: %s", error)
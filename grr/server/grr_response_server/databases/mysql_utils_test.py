@@ -1,4 +1,8 @@
 #!/usr/bin/env python
+import logging
+import threading
+from unittest import mock
+
 from absl import app
 from absl.testing import absltest
 
@@ -106,6 +110,122 @@ class MicrosecondsSinceEpochToTimestampTest(absltest.TestCase):
     self.assertEqual(want_timestamp, got_timestamp)
 
 
+class RequestNotifierTest(absltest.TestCase):
+
+  def testWaitTimesOutWithoutNotification(self):
+    notifier = mysql_utils.RequestNotifier(min_wait_secs=0.01, max_wait_secs=1)
+    self.assertFalse(notifier.Wait())
+
+  def testWaitTimeDoublesUpToMaximum(self):
+    notifier = mysql_utils.RequestNotifier(
+        min_wait_secs=0.001, max_wait_secs=0.004
+    )
+    self.assertEqual(notifier.wait_secs, 0.001)
+    notifier.Wait()
+    self.assertEqual(notifier.wait_secs, 0.002)
+    notifier.Wait()
+    self.assertEqual(notifier.wait_secs, 0.004)
+    notifier.Wait()
+    self.assertEqual(notifier.wait_secs, 0.004)
+
+  def testResetRestoresMinimumWaitTime(self):
+    notifier = mysql_utils.RequestNotifier(
+        min_wait_secs=0.001, max_wait_secs=0.004
+    )
+    notifier.Wait()
+    notifier.Wait()
+    notifier.Reset()
+    self.assertEqual(notifier.wait_secs, 0.001)
+
+  def testNotificationBeforeWaitIsNotLost(self):
+    notifier = mysql_utils.RequestNotifier(min_wait_secs=60, max_wait_secs=60)
+    notifier.Notify()
+    self.assertTrue(notifier.Wait())
+
+  def testNotificationWakesUpWaitingThread(self):
+    notifier = mysql_utils.RequestNotifier(min_wait_secs=60, max_wait_secs=60)
+    results = []
+
+    thread = threading.Thread(target=lambda: results.append(notifier.Wait()))
+    thread.start()
+    notifier.Notify()
+    thread.join(10)
+
+    self.assertFalse(thread.is_alive())
+    self.assertEqual(results, [True])
+
+  def testNotificationResetsWaitTime(self):
+    notifier = mysql_utils.RequestNotifier(
+        min_wait_secs=0.001, max_wait_secs=0.004
+    )
+    notifier.Wait()
+    notifier.Notify()
+    notifier.Wait()
+    self.assertEqual(notifier.wait_secs, 0.001)
+
+  def testProbeEndsWait(self):
+    ready = []
+    notifier = mysql_utils.RequestNotifier(
+        min_wait_secs=0.001, max_wait_secs=60, probe=lambda: bool(ready)
+    )
+    self.assertFalse(notifier.Wait())
+    self.assertFalse(notifier.Wait())
+    self.assertEqual(notifier.wait_secs, 0.004)
+
+    ready.append(True)
+    self.assertTrue(notifier.Wait())
+    self.assertEqual(notifier.wait_secs, 0.001)
+
+  def testWaitTimesOutIfProbeFails(self):
+    def Probe():
+      raise RuntimeError("foo")
+
+    notifier = mysql_utils.RequestNotifier(
+        min_wait_secs=0.001, max_wait_secs=60, probe=Probe
+    )
+    self.assertFalse(notifier.Wait())
+
+  def testProbeBacksOff(self):
+    probes = []
+
+    def Probe():
+      probes.append(True)
+      return False
+
+    notifier = mysql_utils.RequestNotifier(
+        min_wait_secs=0.001,
+        max_wait_secs=0.1,
+        probe=Probe,
+        max_probe_interval_secs=0.004,
+    )
+    for _ in range(10):
+      notifier.Wait()
+
+    self.assertEqual(notifier.probe_interval_secs, 0.004)
+    # About 0.4 seconds of waiting, probed every 0.004 seconds at most.
+    self.assertLess(len(probes), 150)
+
+    notifier.Notify()
+    notifier.Wait()
+    self.assertEqual(notifier.probe_interval_secs, 0.001)
+
+  def testProbeFailureWarningIsRateLimited(self):
+    def Probe():
+      raise RuntimeError("foo")
+
+    notifier = mysql_utils.RequestNotifier(
+        min_wait_secs=0.001,
+        max_wait_secs=0.01,
+        probe=Probe,
+        max_probe_interval_secs=0.001,
+    )
+    with mock.patch.object(logging, "warning") as warning:
+      for _ in range(5):
+        notifier.Wait()
+
+    warning.assert_called_once()
+
+
 def main(argv):
   test_lib.main(argv)
 
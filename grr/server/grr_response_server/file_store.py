@@ -2,18 +2,23 @@
 """REL_DB-based file store implementation."""
 
 import abc
+import bisect
 import collections
 from collections.abc import Sequence
+from concurrent import futures
 import hashlib
 import io
 import os
-from typing import Collection, Dict, Iterable, NamedTuple, Optional
+import threading
+import time
+from typing import Collection, Dict, Iterable, Iterator, NamedTuple, Optional
 
 from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.util import collection
 from grr_response_core.lib.util import precondition
+from grr_response_core.stats import metrics
 from grr_response_server import data_store
 from grr_response_server.databases import db
 from grr_response_server.models import blobs as models_blob
@@ -129,8 +134,13 @@ class CompositeExternalFileStore(ExternalFileStore):
 EXTERNAL_FILE_STORE = CompositeExternalFileStore()
 
 
-# TODO(user): this is a naive implementation as it reads one chunk
-# per REL_DB call. It has to be optimized.
+# Number of blobs fetched from the blob store in a single call when BlobStream
+# needs a blob that is not cached yet.
+BLOB_STREAM_READ_AHEAD = 8
+# Number of blobs kept in memory by a single BlobStream.
+BLOB_STREAM_CACHE_SIZE = 16
+
+
 class BlobStream:
   """File-like object for reading from blobs."""
 
@@ -139,7 +149,17 @@ class BlobStream:
       client_path: db.ClientPath,
       blob_refs: Sequence[rdf_objects.BlobReference],
       hash_id: Optional[rdf_objects.HashID],
+      read_ahead: int = BLOB_STREAM_READ_AHEAD,
+      cache_size: int = BLOB_STREAM_CACHE_SIZE,
   ) -> None:
+    precondition.AssertType(read_ahead, int)
+    precondition.AssertType(cache_size, int)
+    if read_ahead < 1 or cache_size < read_ahead:
+      raise ValueError(
+          "Invalid read_ahead (%d) and cache_size (%d) values."
+          % (read_ahead, cache_size)
+      )
+
     self._client_path = client_path
     self._blob_refs = blob_refs
     self._hash_id = hash_id
@@ -151,35 +171,49 @@ class BlobStream:
     if self._blob_refs:
       self._length = self._blob_refs[-1].offset + self._blob_refs[-1].size
 
-    self._current_ref = None
-    self._current_chunk = None
+    self._ref_offsets = [ref.offset for ref in self._blob_refs]
+    self._read_ahead = read_ahead
+    # Maps indices in self._blob_refs to blob contents.
+    self._chunks = utils.FastStore(max_size=cache_size)
+
+  def _FetchChunks(self, index: int) -> None:
+    """Fetches the blob at a given index together with read-ahead blobs."""
+    blob_ids = {}
+    for i in range(index, min(index + self._read_ahead, len(self._blob_refs))):
+      if i != index and i in self._chunks:
+        continue
+      blob_ids[i] = models_blob.BlobID(self._blob_refs[i].blob_id)
+
+    data = data_store.BLOBS.ReadBlobs(list(set(blob_ids.values())))
+    if data.get(blob_ids[index]) is None:
+      raise BlobNotFoundError(blob_ids[index])
+
+    for i, blob_id in blob_ids.items():
+      # Missing read-ahead blobs are not an error yet: it is going to be raised
+      # once (and if) the reader actually gets to them.
+      if data.get(blob_id) is not None:
+        self._chunks.Put(i, data[blob_id])
 
   def _GetChunk(
       self,
   ) -> tuple[Optional[bytes], Optional[rdf_objects.BlobReference]]:
     """Fetches a chunk corresponding to the current offset."""
 
-    found_ref = None
-    for ref in self._blob_refs:
-      if self._offset >= ref.offset and self._offset < (ref.offset + ref.size):
-        found_ref = ref
-        break
-
-    if not found_ref:
+    index = bisect.bisect_right(self._ref_offsets, self._offset) - 1
+    if index < 0:
       return None, None
 
-    # If self._current_ref == found_ref, then simply return previously found
-    # chunk. Otherwise, update self._current_chunk value.
-    if self._current_ref != found_ref:
-      self._current_ref = found_ref
+    found_ref = self._blob_refs[index]
+    if self._offset >= found_ref.offset + found_ref.size:
+      return None, None
 
-      blob_id = models_blob.BlobID(found_ref.blob_id)
-      data = data_store.BLOBS.ReadBlobs([blob_id])
-      if data[blob_id] is None:
-        raise BlobNotFoundError(blob_id)
-      self._current_chunk = data[blob_id]
+    try:
+      return self._chunks.Get(index), found_ref
+    except KeyError:
+      pass
 
-    return self._current_chunk, self._current_ref
+    self._FetchChunks(index)
+    return self._chunks.Get(index), found_ref
 
   def Read(self, length: Optional[int] = None) -> bytes:
     """Reads data."""
@@ -248,6 +282,27 @@ _BLOBS_READ_BATCH_SIZE = 200
 
 BLOBS_READ_TIMEOUT = rdfvalue.Duration.From(120, rdfvalue.SECONDS)
 
+_blobs_read_ahead_executor: Optional[futures.ThreadPoolExecutor] = None
+_blobs_read_ahead_executor_lock = threading.Lock()
+
+
+def _GetBlobsReadAheadExecutor() -> futures.ThreadPoolExecutor:
+  """Returns the thread pool used to read ahead blobs of added files.
+
+  Every `AddFilesWithUnknownHashes` call has at most one read pending, so the
+  pool is sized to give each flow processing thread its own read-ahead thread:
+  a flow waiting for missing blobs doesn't hold up reads of other flows.
+  """
+  global _blobs_read_ahead_executor
+
+  with _blobs_read_ahead_executor_lock:
+    if _blobs_read_ahead_executor is None:
+      _blobs_read_ahead_executor = futures.ThreadPoolExecutor(
+          max_workers=config.CONFIG["Mysql.flow_processing_threads_max"],
+          thread_name_prefix="blobs_read_ahead",
+      )
+    return _blobs_read_ahead_executor
+
 
 def AddFilesWithUnknownHashes(
     client_path_blob_refs: Dict[
@@ -298,15 +353,27 @@ def AddFilesWithUnknownHashes(
       items=all_client_path_blob_refs, size=_BLOBS_READ_BATCH_SIZE
   )
 
-  for client_path_blob_ref_batch in client_path_blob_ref_batches:
+  def ReadBatch(client_path_blob_ref_batch):
     blob_id_batch = set(
         models_blob.BlobID(blob_ref.blob_id)
         for _, blob_ref in client_path_blob_ref_batch
     )
-    blobs = data_store.BLOBS.ReadAndWaitForBlobs(
+    return data_store.BLOBS.ReadAndWaitForBlobs(
         blob_id_batch, timeout=BLOBS_READ_TIMEOUT
     )
 
+  # Reading the next batch of blobs is overlapped with hashing the current one
+  # in the calling thread. At most two batches of blobs are kept in memory at
+  # any time. The thread pool is only used if there is more than one batch.
+  client_path_blob_ref_batch = next(client_path_blob_ref_batches, None)
+  if client_path_blob_ref_batch is not None:
+    blobs = ReadBatch(client_path_blob_ref_batch)
+
+  while client_path_blob_ref_batch is not None:
+    next_batch = next(client_path_blob_ref_batches, None)
+    if next_batch is not None:
+      pending_read = _GetBlobsReadAheadExecutor().submit(ReadBatch, next_batch)
+
     for client_path, blob_ref in client_path_blob_ref_batch:
       blob = blobs[models_blob.BlobID(blob_ref.blob_id)]
       if blob is None:
@@ -328,6 +395,10 @@ def AddFilesWithUnknownHashes(
       client_path_offset[client_path] = offset + len(blob)
       client_path_sha256[client_path].update(blob)
 
+    client_path_blob_ref_batch = next_batch
+    if next_batch is not None:
+      blobs = pending_read.result()
+
   for client_path in client_path_sha256.keys():
     sha256 = client_path_sha256[client_path].digest()
     hash_id = rdf_objects.SHA256HashID.FromSerializedBytes(sha256)
@@ -444,6 +515,40 @@ def OpenFile(
 
 
 STREAM_CHUNKS_READ_AHEAD = 500
+# Number of chunks in a batch read ahead concurrently. It is much smaller than
+# STREAM_CHUNKS_READ_AHEAD, so that with chunks of the default size (512 KiB),
+# multiple batches fit within the bytes in flight limit and are actually read
+# concurrently.
+STREAM_CHUNKS_CONCURRENT_READ_AHEAD = 32
+
+_stream_chunks_executor: Optional[futures.ThreadPoolExecutor] = None
+_stream_chunks_executor_lock = threading.Lock()
+
+
+def _GetStreamChunksExecutor() -> futures.ThreadPoolExecutor:
+  """Returns the thread pool used to read blobs ahead of streamed chunks.
+
+  The pool is shared by all streams of the process, so that threads are not
+  created for every stream and concurrent streams (e.g. archive downloads)
+  together never use more than half of the database connection pool when blobs
+  are stored in the database.
+  """
+  global _stream_chunks_executor
+
+  with _stream_chunks_executor_lock:
+    if _stream_chunks_executor is None:
+      _stream_chunks_executor = futures.ThreadPoolExecutor(
+          max_workers=max(1, config.CONFIG["Mysql.conn_pool_max"] // 2),
+          thread_name_prefix="stream_files_chunks",
+      )
+    return _stream_chunks_executor
+
+
+STREAM_CHUNKS_BYTES_READ = metrics.Counter("stream_chunks_bytes_read")
+STREAM_CHUNKS_READ_LATENCY = metrics.Event(
+    "stream_chunks_read_latency",
+    bins=[0.01, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50],
+)
 
 
 class StreamedFileChunk:
@@ -477,10 +582,99 @@ class StreamedFileChunk:
     self.total_chunks = total_chunks
 
 
+class _ChunkToStream(NamedTuple):
+  """A chunk of a file to be streamed by `StreamFilesChunks`."""
+
+  client_path: db.ClientPath
+  blob_id: models_blob.BlobID
+  chunk_index: int
+  total_chunks: int
+  offset: int
+  size: int
+  total_size: int
+
+
+def _ReadChunksBlobs(
+    chunks: Sequence[_ChunkToStream],
+) -> Dict[models_blob.BlobID, Optional[bytes]]:
+  """Reads blobs of the given chunks from the blob store."""
+  start_time = time.time()
+  blobs = data_store.BLOBS.ReadBlobs([chunk.blob_id for chunk in chunks])
+  STREAM_CHUNKS_READ_LATENCY.RecordEvent(time.time() - start_time)
+  STREAM_CHUNKS_BYTES_READ.Increment(
+      sum(len(blob) for blob in blobs.values() if blob is not None)
+  )
+  return blobs
+
+
+def _ReadChunksBlobsConcurrently(
+    batches: Iterable[Sequence[_ChunkToStream]],
+    read_threads: int,
+    max_bytes_in_flight: Optional[int] = None,
+) -> Iterator[
+    tuple[
+        Sequence[_ChunkToStream],
+        Dict[models_blob.BlobID, Optional[bytes]],
+    ]
+]:
+  """Reads blobs of batches of chunks ahead of the consumer, in order.
+
+  Args:
+    batches: Batches of chunks to read blobs of.
+    read_threads: Maximum number of batches read (or queued to be read on the
+      shared thread pool) concurrently.
+    max_bytes_in_flight: If specified, a batch is not read ahead if the total
+      size of batches read (or being read) but not yet consumed would exceed
+      this limit.
+
+  Yields:
+    Pairs of batches and blobs read for them, in the order of `batches`.
+  """
+  batches = iter(batches)
+  pending = collections.deque()
+  bytes_in_flight = 0
+
+  def BatchSize(batch: Sequence[_ChunkToStream]) -> int:
+    return sum(chunk.size for chunk in batch)
+
+  executor = _GetStreamChunksExecutor()
+  try:
+    next_batch = next(batches, None)
+    while next_batch is not None or pending:
+      # Schedule reads of following batches while within the limits. The
+      # batch at the head of the queue is always scheduled, so that big
+      # batches can not block the stream.
+      while next_batch is not None and len(pending) < read_threads:
+        next_batch_size = BatchSize(next_batch)
+        if (
+            pending
+            and max_bytes_in_flight is not None
+            and bytes_in_flight + next_batch_size > max_bytes_in_flight
+        ):
+          break
+
+        future = executor.submit(_ReadChunksBlobs, next_batch)
+        pending.append((next_batch, next_batch_size, future))
+        bytes_in_flight += next_batch_size
+        next_batch = next(batches, None)
+
+      batch, batch_size, future = pending.popleft()
+      blobs = future.result()
+      bytes_in_flight -= batch_size
+      yield batch, blobs
+  finally:
+    # The stream may be abandoned by the consumer, there is no point in
+    # reading blobs that no one is waiting for.
+    for _, _, future in pending:
+      future.cancel()
+
+
 def StreamFilesChunks(
     client_paths: Collection[db.ClientPath],
     max_timestamp: Optional[rdfvalue.RDFDatetime] = None,
     max_size: Optional[int] = None,
+    read_threads: int = 1,
+    max_bytes_in_flight: Optional[int] = None,
 ) -> Iterable[StreamedFileChunk]:
   """Streams contents of given files.
 
@@ -492,6 +686,14 @@ def StreamFilesChunks(
       each file.
     max_size: If specified, only the chunks covering max_size bytes will be
       returned.
+    read_threads: Number of batches of blobs read concurrently ahead of the
+      consumer. If 1, blobs are read sequentially on the calling thread.
+      Otherwise, blobs are read in batches of
+      `STREAM_CHUNKS_CONCURRENT_READ_AHEAD` chunks on a thread pool shared by
+      all streams of the process.
+    max_bytes_in_flight: If specified, no new batches of blobs are read ahead
+      while the total size of blobs read (or being read) but not yet consumed
+      would exceed this limit. At least one batch is always read.
 
   Yields:
     StreamedFileChunk objects for every file read. Chunks will be returned
@@ -544,19 +746,44 @@ def StreamFilesChunks(
     cur_size = 0
     for i, ref in enumerate(blob_refs):
       blob_id = models_blob.BlobID(ref.blob_id)
-      all_chunks.append((cp, blob_id, i, num_blobs, ref.offset, total_size))
+      all_chunks.append(
+          _ChunkToStream(
+              client_path=cp,
+              blob_id=blob_id,
+              chunk_index=i,
+              total_chunks=num_blobs,
+              offset=ref.offset,
+              size=ref.size,
+              total_size=total_size,
+          )
+      )
 
       cur_size += ref.size
       if max_size is not None and cur_size >= max_size:
         break
 
-  for batch in collection.Batch(all_chunks, STREAM_CHUNKS_READ_AHEAD):
-    blobs = data_store.BLOBS.ReadBlobs(
-        [blob_id for _, blob_id, _, _, _, _ in batch]
+  if read_threads > 1:
+    batches = collection.Batch(all_chunks, STREAM_CHUNKS_CONCURRENT_READ_AHEAD)
+    batches_with_blobs = _ReadChunksBlobsConcurrently(
+        batches,
+        read_threads=read_threads,
+        max_bytes_in_flight=max_bytes_in_flight,
     )
-    for cp, blob_id, i, num_blobs, offset, total_size in batch:
-      blob_data = blobs[blob_id]
-      if blob_data is None:
-        raise BlobNotFoundError(blob_id)
+  else:
+    batches = collection.Batch(all_chunks, STREAM_CHUNKS_READ_AHEAD)
+    batches_with_blobs = ((batch, _ReadChunksBlobs(batch)) for batch in batches)
 
-      yield StreamedFileChunk(cp, blob_data, i, num_blobs, offset, total_size)
+  for batch, blobs in batches_with_blobs:
+    for chunk in batch:
+      blob_data = blobs[chunk.blob_id]
+      if blob_data is None:
+        raise BlobNotFoundError(chunk.blob_id)
+
+      yield StreamedFileChunk(
+          chunk.client_path,
+          blob_data,
+          chunk.chunk_index,
+          chunk.total_chunks,
+          chunk.offset,
+          chunk.total_size,
+      )
@@ -1,12 +1,16 @@
 #!/usr/bin/env python
 """Tests for REL_DB-based file store."""
 
+import hashlib
 import itertools
+import threading
 from unittest import mock
 
 from absl import app
 
+from grr_response_core import config
 from grr_response_core.lib import rdfvalue
+from grr_response_proto import objects_pb2
 from grr_response_server import data_store
 from grr_response_server import file_store
 from grr_response_server.databases import db
@@ -94,6 +98,50 @@ class BlobStreamTest(test_lib.GRRBaseTest):
       self.blob_stream = file_store.BlobStream(None, self.blob_refs, None)
       self.blob_stream.read(self.blob_size)
 
+  def testReadsAheadInBatches(self):
+    blob_stream = file_store.BlobStream(
+        None, self.blob_refs, None, read_ahead=4, cache_size=4
+    )
+    with mock.patch.object(
+        data_store.BLOBS, "ReadBlobs", wraps=data_store.BLOBS.ReadBlobs
+    ) as read_blobs_mock:
+      self.assertEqual(blob_stream.read(), b"".join(self.blob_data))
+
+    # 10 blobs, 4 blobs per read.
+    self.assertEqual(read_blobs_mock.call_count, 3)
+
+  def testDoesNotRefetchCachedBlobsOnSeek(self):
+    with mock.patch.object(
+        data_store.BLOBS, "ReadBlobs", wraps=data_store.BLOBS.ReadBlobs
+    ) as read_blobs_mock:
+      self.assertEqual(self.blob_stream.read(1), b"a")
+      self.blob_stream.seek(self.blob_size * 3)
+      self.assertEqual(self.blob_stream.read(1), b"d")
+      self.blob_stream.seek(0)
+      self.assertEqual(self.blob_stream.read(1), b"a")
+
+    self.assertEqual(read_blobs_mock.call_count, 1)
+
+  def testRaisesIfReadAheadBlobIsMissingOnlyWhenReached(self):
+    _, missing_blob_refs = vfs_test_lib.GenerateBlobRefs(self.blob_size, "0")
+    missing_blob_refs[0].offset = self.blob_size * len(self.blob_refs)
+    blob_stream = file_store.BlobStream(
+        None, list(self.blob_refs) + missing_blob_refs, None
+    )
+
+    self.assertEqual(blob_stream.read(1), b"a")
+    blob_stream.seek(self.blob_size * len(self.blob_refs))
+    with self.assertRaises(file_store.BlobNotFoundError):
+      blob_stream.read(1)
+
+  def testRaisesOnInvalidReadAheadAndCacheSize(self):
+    with self.assertRaises(ValueError):
+      file_store.BlobStream(None, self.blob_refs, None, read_ahead=0)
+    with self.assertRaises(ValueError):
+      file_store.BlobStream(
+          None, self.blob_refs, None, read_ahead=4, cache_size=2
+      )
+
 
 class AddFileWithUnknownHashTest(test_lib.GRRBaseTest):
   """Tests for AddFileWithUnknownHash."""
@@ -354,6 +402,39 @@ class AddFilesWithUnknownHashesTest(test_lib.GRRBaseTest):
     self.assertEqual(hash_ids[foo_path], foo_hash_id)
     self.assertEqual(hash_ids[bar_path], bar_hash_id)
 
+  def testDoesNotUseThreadPoolForSingleBatch(self):
+    blobs = [b"foo", b"bar", b"baz"]
+    blob_refs = _BlobRefsFromByteArray(blobs)
+    blob_ids = [models_blobs.BlobID(ref.blob_id) for ref in blob_refs]
+    data_store.BLOBS.WriteBlobs(dict(zip(blob_ids, blobs)))
+
+    client_id = self.SetupClient(0)
+    path = db.ClientPath.OS(client_id=client_id, components=("foo",))
+
+    with mock.patch.object(
+        file_store, "_GetBlobsReadAheadExecutor"
+    ) as executor_mock:
+      hash_ids = file_store.AddFilesWithUnknownHashes({path: blob_refs})
+
+    executor_mock.assert_not_called()
+    self.assertEqual(
+        hash_ids[path], rdf_objects.SHA256HashID.FromData(b"foobarbaz")
+    )
+
+  def testRaisesIfBlobInLaterBatchHasInvalidOffset(self):
+    blobs = [b"foo", b"bar", b"baz", b"quux"]
+    blob_refs = _BlobRefsFromByteArray(blobs)
+    blob_ids = [models_blobs.BlobID(ref.blob_id) for ref in blob_refs]
+    data_store.BLOBS.WriteBlobs(dict(zip(blob_ids, blobs)))
+    blob_refs[-1].offset += 1
+
+    client_id = self.SetupClient(0)
+    path = db.ClientPath.OS(client_id=client_id, components=("foo",))
+
+    with mock.patch.object(file_store, "_BLOBS_READ_BATCH_SIZE", 2):
+      with self.assertRaises(file_store.InvalidBlobOffsetError):
+        file_store.AddFilesWithUnknownHashes({path: blob_refs})
+
 
 class OpenFileTest(test_lib.GRRBaseTest):
   """Tests for OpenFile."""
@@ -700,6 +781,123 @@ class StreamFilesChunksTest(test_lib.GRRBaseTest):
     self.assertEqual(chunks[0].data, blob_data[0])
     self.assertEqual(chunks[1].data, blob_data[1])
 
+  @mock.patch.object(file_store, "STREAM_CHUNKS_CONCURRENT_READ_AHEAD", 1)
+  def testStreamsChunksInOrderWhenReadingConcurrently(self):
+    client_path_1 = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    blob_data_1, _ = self._WriteFile(client_path_1, (0, 3))
+
+    client_path_2 = db.ClientPath.OS(self.client_id_other, ("foo", "bar"))
+    blob_data_2, _ = self._WriteFile(client_path_2, (3, 6))
+
+    chunks = list(
+        file_store.StreamFilesChunks(
+            [client_path_1, client_path_2],
+            read_threads=4,
+            max_bytes_in_flight=self.blob_size * 2,
+        )
+    )
+    self.assertEqual(
+        [(c.client_path, c.chunk_index) for c in chunks],
+        [
+            (client_path_1, 0),
+            (client_path_1, 1),
+            (client_path_1, 2),
+            (client_path_2, 0),
+            (client_path_2, 1),
+            (client_path_2, 2),
+        ],
+    )
+    self.assertEqual([c.data for c in chunks], blob_data_1 + blob_data_2)
+
+  @mock.patch.object(file_store, "STREAM_CHUNKS_CONCURRENT_READ_AHEAD", 1)
+  def testStreamsChunksWhenBatchExceedsMaxBytesInFlight(self):
+    client_path = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    blob_data, _ = self._WriteFile(client_path, (0, 3))
+
+    chunks = list(
+        file_store.StreamFilesChunks(
+            [client_path], read_threads=2, max_bytes_in_flight=1
+        )
+    )
+    self.assertEqual([c.data for c in chunks], blob_data)
+
+  def testReadsBlobsConcurrentlyWithDefaultArchiveConfig(self):
+    read_threads = config.CONFIG["AdminUI.archive_read_threads"]
+    max_bytes_in_flight = config.CONFIG["AdminUI.archive_max_bytes_in_flight"]
+    self.assertGreater(read_threads, 1)
+
+    # Files collected by GRR are split into chunks of 512 KiB.
+    chunk_size = 512 * 1024
+    num_chunks = (
+        file_store.STREAM_CHUNKS_CONCURRENT_READ_AHEAD * read_threads * 2
+    )
+    blob_refs = [
+        objects_pb2.BlobReference(
+            offset=i * chunk_size,
+            size=chunk_size,
+            blob_id=hashlib.sha256(str(i).encode("ascii")).digest(),
+        )
+        for i in range(num_chunks)
+    ]
+    hash_id = rdf_objects.SHA256HashID.FromData(b"foo")
+    data_store.REL_DB.WriteHashBlobReferences({hash_id: blob_refs})
+
+    client_path = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    path_info = rdf_objects.PathInfo.OS(components=client_path.components)
+    path_info.hash_entry.sha256 = hash_id.AsBytes()
+    data_store.REL_DB.WritePathInfos(
+        client_path.client_id, [mig_objects.ToProtoPathInfo(path_info)]
+    )
+
+    lock = threading.Lock()
+    num_reads_in_flight = 0
+    all_threads_reading = threading.Event()
+
+    def ReadBlobs(blob_ids):
+      nonlocal num_reads_in_flight
+      with lock:
+        num_reads_in_flight += 1
+        if num_reads_in_flight >= read_threads:
+          all_threads_reading.set()
+      # Reads are held until all the threads read concurrently (or a timeout
+      # passes, if they never do).
+      all_threads_reading.wait(timeout=10)
+      with lock:
+        num_reads_in_flight -= 1
+      return {blob_id: b"x" for blob_id in blob_ids}
+
+    with mock.patch.object(
+        data_store.BLOBS, "ReadBlobs", side_effect=ReadBlobs
+    ):
+      chunks = list(
+          file_store.StreamFilesChunks(
+              [client_path],
+              read_threads=read_threads,
+              max_bytes_in_flight=max_bytes_in_flight,
+          )
+      )
+
+    self.assertLen(chunks, num_chunks)
+    self.assertTrue(all_threads_reading.is_set())
+
+  @mock.patch.object(file_store, "STREAM_CHUNKS_CONCURRENT_READ_AHEAD", 1)
+  def testStreamsShareReadThreads(self):
+    client_path = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    blob_data, _ = self._WriteFile(client_path, (0, 3))
+
+    for _ in range(5):
+      chunks = list(file_store.StreamFilesChunks([client_path], read_threads=2))
+      self.assertEqual([c.data for c in chunks], blob_data)
+
+    read_threads = [
+        t
+        for t in threading.enumerate()
+        if t.name.startswith("stream_files_chunks")
+    ]
+    self.assertLessEqual(
+        len(read_threads), max(1, config.CONFIG["Mysql.conn_pool_max"] // 2)
+    )
+
 
 def main(argv):
   # Run the full test suite
@@ -2,13 +2,16 @@
 """FS GRR server side integration utility functions."""
 
 import binascii
+from concurrent import futures
 import datetime
-from typing import Collection, List
+import threading
+from typing import Collection, List, Optional, Sequence
 
 from google.protobuf import timestamp_pb2
 from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.util import collection
 from grr_response_core.lib.util import text
 from grr_response_core.stats import metrics
 from grr_response_proto import jobs_pb2
@@ -41,6 +44,144 @@ RRG_REQUEST_COUNT = metrics.Counter(
 )
 
 
+_send_executor: Optional[futures.ThreadPoolExecutor] = None
+_send_executor_lock = threading.Lock()
+
+
+def _GetSendExecutor() -> futures.ThreadPoolExecutor:
+  """Returns the thread pool used for sending messages concurrently."""
+  global _send_executor
+
+  with _send_executor_lock:
+    if _send_executor is None:
+      _send_executor = futures.ThreadPoolExecutor(
+          max_workers=max(config.CONFIG["Server.fleetspeak_send_batch_size"], 1),
+          thread_name_prefix="fleetspeak_send",
+      )
+    return _send_executor
+
+
+def _InsertMessage(fs_msg: fs_common_pb2.Message) -> None:
+  fleetspeak_connector.CONN.outgoing.InsertMessage(
+      fs_msg,
+      single_try_timeout=WRITE_SINGLE_TRY_TIMEOUT,
+      timeout=WRITE_TOTAL_TIMEOUT,
+  )
+
+
+def _InsertMessages(fs_msgs: Sequence[fs_common_pb2.Message]) -> None:
+  """Inserts multiple messages, issuing calls for a batch of them at a time.
+
+  Fleetspeak does not guarantee the order in which messages are delivered, so
+  messages of a batch are inserted concurrently instead of waiting for a round
+  trip for every single one of them.
+
+  Note that callers only pass messages queued by a single flow. Flows started
+  on many clients at once (e.g. by hunts) flush their messages separately, so
+  they typically send a single message per call and do not benefit from this.
+
+  Single messages are timed as "InsertMessage" calls, like all other single
+  message sends, and only actual batches as "InsertMessages" calls.
+
+  Args:
+    fs_msgs: Fleetspeak messages to insert.
+
+  Raises:
+    grpc.RpcError: If inserting any of the messages failed. All other messages
+      of the batch are still attempted.
+  """
+  if len(fs_msgs) == 1:
+    _InsertSingleMessage(fs_msgs[0])
+  elif fs_msgs:
+    _InsertMessagesConcurrently(fs_msgs)
+
+
+@FLEETSPEAK_CALL_LATENCY.Timed(fields=["InsertMessage"])
+def _InsertSingleMessage(fs_msg: fs_common_pb2.Message) -> None:
+  _InsertMessage(fs_msg)
+
+
+@FLEETSPEAK_CALL_LATENCY.Timed(fields=["InsertMessages"])
+def _InsertMessagesConcurrently(
+    fs_msgs: Sequence[fs_common_pb2.Message],
+) -> None:
+  executor = _GetSendExecutor()
+  batch_size = max(config.CONFIG["Server.fleetspeak_send_batch_size"], 1)
+  for batch in collection.Batch(fs_msgs, batch_size):
+    batch_futures = [executor.submit(_InsertMessage, m) for m in batch]
+    futures.wait(batch_futures)
+    for future in batch_futures:
+      future.result()
+
+
+def _GrrMessageToFleetspeakMessage(
+    grr_id: str,
+    grr_msg: rdf_flows.GrrMessage,
+) -> fs_common_pb2.Message:
+  """Wraps the given GrrMessage in a Fleetspeak message."""
+  fs_msg = fs_common_pb2.Message(
+      message_type="GrrMessage",
+      destination=fs_common_pb2.Address(
+          client_id=GRRIDToFleetspeakID(grr_id), service_name="GRR"
+      ),
+  )
+  fs_msg.data.Pack(grr_msg.AsPrimitiveProto())
+  if grr_msg.session_id is not None:
+    annotation = fs_msg.annotations.entries.add()
+    annotation.key, annotation.value = "flow_id", grr_msg.session_id.Basename()
+  if grr_msg.request_id is not None:
+    annotation = fs_msg.annotations.entries.add()
+    annotation.key, annotation.value = "request_id", str(grr_msg.request_id)
+  return fs_msg
+
+
+def _GrrMessageProtoToFleetspeakMessage(
+    grr_id: str,
+    grr_msg: jobs_pb2.GrrMessage,
+) -> fs_common_pb2.Message:
+  """Wraps the given GrrMessage proto in a Fleetspeak message."""
+  fs_msg = fs_common_pb2.Message(
+      message_type="GrrMessage",
+      destination=fs_common_pb2.Address(
+          client_id=GRRIDToFleetspeakID(grr_id), service_name="GRR"
+      ),
+  )
+  fs_msg.data.Pack(grr_msg)
+  if grr_msg.session_id is not None:
+    annotation = fs_msg.annotations.entries.add()
+    annotation.key = "flow_id"
+    annotation.value = rdfvalue.FlowSessionID(grr_msg.session_id).Basename()
+  if grr_msg.request_id is not None:
+    annotation = fs_msg.annotations.entries.add()
+    annotation.key = "request_id"
+    annotation.value = str(grr_msg.request_id)
+  return fs_msg
+
+
+def _RrgRequestToFleetspeakMessage(
+    client_id: str,
+    request: rrg_pb2.Request,
+) -> fs_common_pb2.Message:
+  """Wraps the given RRG request in a Fleetspeak message."""
+  message = fs_common_pb2.Message()
+  message.message_type = "rrg.Request"
+  message.destination.service_name = "RRG"
+  message.destination.client_id = GRRIDToFleetspeakID(client_id)
+  message.data.Pack(request)
+
+  # It is not entirely clear to me why we set these annotations below, but
+  # messages sent to Python agents do it, so we should do it as well.
+  message.annotations.entries.add(
+      key="flow_id",
+      value=str(request.flow_id),
+  )
+  message.annotations.entries.add(
+      key="request_id",
+      value=str(request.request_id),
+  )
+  return message
+
+
 @FLEETSPEAK_CALL_LATENCY.Timed(fields=["InsertMessage"])
 def SendGrrMessageThroughFleetspeak(
     grr_id: str,
@@ -62,24 +203,7 @@ def SendGrrMessageThroughFleetspeak(
     grr_msg: GRR message to send.
     labels: Labels of the endpoint to send the message to.
   """
-  fs_msg = fs_common_pb2.Message(
-      message_type="GrrMessage",
-      destination=fs_common_pb2.Address(
-          client_id=GRRIDToFleetspeakID(grr_id), service_name="GRR"
-      ),
-  )
-  fs_msg.data.Pack(grr_msg.AsPrimitiveProto())
-  if grr_msg.session_id is not None:
-    annotation = fs_msg.annotations.entries.add()
-    annotation.key, annotation.value = "flow_id", grr_msg.session_id.Basename()
-  if grr_msg.request_id is not None:
-    annotation = fs_msg.annotations.entries.add()
-    annotation.key, annotation.value = "request_id", str(grr_msg.request_id)
-  fleetspeak_connector.CONN.outgoing.InsertMessage(
-      fs_msg,
-      single_try_timeout=WRITE_SINGLE_TRY_TIMEOUT,
-      timeout=WRITE_TOTAL_TIMEOUT,
-  )
+  _InsertMessage(_GrrMessageToFleetspeakMessage(grr_id, grr_msg))
 
   GRR_REQUEST_COUNT.Increment(
       fields=[
@@ -89,6 +213,31 @@ def SendGrrMessageThroughFleetspeak(
   )
 
 
+def SendGrrMessagesThroughFleetspeak(
+    grr_id: str,
+    grr_msgs: Sequence[rdf_flows.GrrMessage],
+    labels: Collection[str],  # TODO: Remove once RRG rollout done.
+) -> None:
+  """Sends the given GrrMessages through FS in batches.
+
+  Args:
+    grr_id: ID of grr client to send messages to.
+    grr_msgs: GRR messages to send.
+    labels: Labels of the endpoint to send the messages to.
+  """
+  _InsertMessages(
+      [_GrrMessageToFleetspeakMessage(grr_id, m) for m in grr_msgs]
+  )
+
+  for grr_msg in grr_msgs:
+    GRR_REQUEST_COUNT.Increment(
+        fields=[
+            grr_msg.name,
+            ",".join(sorted(labels)),
+        ]
+    )
+
+
 @FLEETSPEAK_CALL_LATENCY.Timed(fields=["InsertMessage"])
 def SendGrrMessageProtoThroughFleetspeak(
     grr_id: str,
@@ -110,26 +259,7 @@ def SendGrrMessageProtoThroughFleetspeak(
     grr_msg: GRR message to send.
     labels: Labels of the endpoint to send the message to.
   """
-  fs_msg = fs_common_pb2.Message(
-      message_type="GrrMessage",
-      destination=fs_common_pb2.Address(
-          client_id=GRRIDToFleetspeakID(grr_id), service_name="GRR"
-      ),
-  )
-  fs_msg.data.Pack(grr_msg)
-  if grr_msg.session_id is not None:
-    annotation = fs_msg.annotations.entries.add()
-    annotation.key = "flow_id"
-    annotation.value = rdfvalue.FlowSessionID(grr_msg.session_id).Basename()
-  if grr_msg.request_id is not None:
-    annotation = fs_msg.annotations.entries.add()
-    annotation.key = "request_id"
-    annotation.value = str(grr_msg.request_id)
-  fleetspeak_connector.CONN.outgoing.InsertMessage(
-      fs_msg,
-      single_try_timeout=WRITE_SINGLE_TRY_TIMEOUT,
-      timeout=WRITE_TOTAL_TIMEOUT,
-  )
+  _InsertMessage(_GrrMessageProtoToFleetspeakMessage(grr_id, grr_msg))
 
   GRR_REQUEST_COUNT.Increment(
       fields=[
@@ -139,6 +269,31 @@ def SendGrrMessageProtoThroughFleetspeak(
   )
 
 
+def SendGrrMessageProtosThroughFleetspeak(
+    grr_id: str,
+    grr_msgs: Sequence[jobs_pb2.GrrMessage],
+    labels: Collection[str],  # TODO: Remove once RRG rollout done.
+) -> None:
+  """Sends the given GrrMessage protos through FS in batches.
+
+  Args:
+    grr_id: ID of grr client to send messages to.
+    grr_msgs: GRR messages to send.
+    labels: Labels of the endpoint to send the messages to.
+  """
+  _InsertMessages(
+      [_GrrMessageProtoToFleetspeakMessage(grr_id, m) for m in grr_msgs]
+  )
+
+  for grr_msg in grr_msgs:
+    GRR_REQUEST_COUNT.Increment(
+        fields=[
+            grr_msg.name,
+            ",".join(sorted(labels)),
+        ]
+    )
+
+
 @FLEETSPEAK_CALL_LATENCY.Timed(fields=["InsertMessage"])
 def SendRrgRequest(
     client_id: str,
@@ -152,28 +307,7 @@ def SendRrgRequest(
     request: A request to send to the endpoint.
     labels: Labels of the endpoint to send the message to.
   """
-  message = fs_common_pb2.Message()
-  message.message_type = "rrg.Request"
-  message.destination.service_name = "RRG"
-  message.destination.client_id = GRRIDToFleetspeakID(client_id)
-  message.data.Pack(request)
-
-  # It is not entirely clear to me why we set these annotations below, but
-  # messages sent to Python agents do it, so we should do it as well.
-  message.annotations.entries.add(
-      key="flow_id",
-      value=str(request.flow_id),
-  )
-  message.annotations.entries.add(
-      key="request_id",
-      value=str(request.request_id),
-  )
-
-  fleetspeak_connector.CONN.outgoing.InsertMessage(
-      message,
-      single_try_timeout=WRITE_SINGLE_TRY_TIMEOUT,
-      timeout=WRITE_TOTAL_TIMEOUT,
-  )
+  _InsertMessage(_RrgRequestToFleetspeakMessage(client_id, request))
 
   RRG_REQUEST_COUNT.Increment(
       fields=[
@@ -183,6 +317,31 @@ def SendRrgRequest(
   )
 
 
+def SendRrgRequests(
+    client_id: str,
+    requests: Sequence[rrg_pb2.Request],
+    labels: Collection[str],  # TODO: Remove once RRG rollout done.
+) -> None:
+  """Sends RRG action requests to the specified endpoint in batches.
+
+  Args:
+    client_id: A unique endpoint identifier as recognized by GRR.
+    requests: Requests to send to the endpoint.
+    labels: Labels of the endpoint to send the messages to.
+  """
+  _InsertMessages(
+      [_RrgRequestToFleetspeakMessage(client_id, r) for r in requests]
+  )
+
+  for request in requests:
+    RRG_REQUEST_COUNT.Increment(
+        fields=[
+            rrg_pb2.Action.Name(request.action),
+            ",".join(sorted(labels)),
+        ]
+    )
+
+
 @FLEETSPEAK_CALL_LATENCY.Timed(fields=["InsertMessage"])
 def KillFleetspeak(grr_id: str, force: bool) -> None:
   """Kills Fleespeak on the given client."""
@@ -15,6 +15,7 @@ from fleetspeak.src.common.proto.fleetspeak import common_pb2
 from fleetspeak.src.common.proto.fleetspeak import system_pb2 as fs_system_pb2
 from fleetspeak.src.server.proto.fleetspeak_server import admin_pb2
 from fleetspeak.src.server.proto.fleetspeak_server import resource_pb2
+from grr_response_proto import rrg_pb2
 
 
 _TEST_CLIENT_ID = "C.0000000000000001"
@@ -146,6 +147,71 @@ class FleetspeakUtilsTest(test_lib.GRRBaseTest):
     self.assertEqual(fs_message.annotations, expected_annotations)
     self.assertEqual(grr_message, unpacked_message)
 
+  @mock.patch.object(fleetspeak_connector, "CONN")
+  def testSendGrrMessagesInBatches(self, mock_conn):
+    client_id = "C.0123456789abcdef"
+    grr_messages = [
+        rdf_flows.GrrMessage(
+            session_id=f"{client_id}/01234567",
+            name="TestClientAction",
+            request_id=request_id,
+        )
+        for request_id in range(1, 6)
+    ]
+    with test_lib.ConfigOverrider({"Server.fleetspeak_send_batch_size": 2}):
+      fleetspeak_utils.SendGrrMessagesThroughFleetspeak(
+          client_id, grr_messages, []
+      )
+
+    self.assertEqual(mock_conn.outgoing.InsertMessage.call_count, 5)
+    request_ids = []
+    for insert_args, _ in mock_conn.outgoing.InsertMessage.call_args_list:
+      unpacked_message = jobs_pb2.GrrMessage()
+      insert_args[0].data.Unpack(unpacked_message)
+      request_ids.append(unpacked_message.request_id)
+    self.assertCountEqual(request_ids, [1, 2, 3, 4, 5])
+
+  @mock.patch.object(fleetspeak_connector, "CONN")
+  def testSendGrrMessageProtosRaisesIfAnySendFails(self, mock_conn):
+    client_id = "C.0123456789abcdef"
+    grr_messages = [
+        jobs_pb2.GrrMessage(
+            session_id=f"{client_id}/01234567",
+            name="TestClientAction",
+            request_id=request_id,
+        )
+        for request_id in range(1, 4)
+    ]
+
+    def InsertMessage(fs_message, **kwargs):
+      del kwargs  # Unused.
+      unpacked_message = jobs_pb2.GrrMessage()
+      fs_message.data.Unpack(unpacked_message)
+      if unpacked_message.request_id == 2:
+        raise RuntimeError("foo")
+
+    mock_conn.outgoing.InsertMessage.side_effect = InsertMessage
+
+    with self.assertRaisesRegex(RuntimeError, "foo"):
+      fleetspeak_utils.SendGrrMessageProtosThroughFleetspeak(
+          client_id, grr_messages, []
+      )
+    self.assertEqual(mock_conn.outgoing.InsertMessage.call_count, 3)
+
+  @mock.patch.object(fleetspeak_connector, "CONN")
+  def testSendRrgRequests(self, mock_conn):
+    requests = [
+        rrg_pb2.Request(flow_id=0x1234, request_id=request_id)
+        for request_id in range(1, 4)
+    ]
+    fleetspeak_utils.SendRrgRequests("C.0123456789abcdef", requests, [])
+
+    self.assertEqual(mock_conn.outgoing.InsertMessage.call_count, 3)
+    for insert_args, _ in mock_conn.outgoing.InsertMessage.call_args_list:
+      fs_message = insert_args[0]
+      self.assertEqual(fs_message.message_type, "rrg.Request")
+      self.assertEqual(fs_message.destination.service_name, "RRG")
+
   @mock.patch.object(fleetspeak_connector, "CONN")
   def testKillFleetspeak(self, mock_conn):
     fleetspeak_utils.KillFleetspeak("C.1000000000000000", True)
@@ -33,6 +33,7 @@ from grr_response_server import fleetspeak_utils
 from grr_response_server import flow
 from grr_response_server import flow_responses
 from grr_response_server import hunt
+from grr_response_server import hunt_output_plugins
 from grr_response_server import notification as notification_lib
 from grr_response_server import output_plugin as output_plugin_lib
 from grr_response_server import output_plugin_registry
@@ -43,7 +44,6 @@ from grr_response_server.models import protodicts as models_protodicts
 from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import mig_flow_objects
 from grr_response_server.rdfvalues import mig_flow_runner
-from grr_response_server.rdfvalues import mig_hunt_objects
 from grr_response_server.rdfvalues import mig_output_plugin
 from grr_response_server.rdfvalues import objects as rdf_objects
 from grr_response_server.rdfvalues import output_plugin as rdf_output_plugin
@@ -57,12 +57,19 @@ FLOW_ERRORS = metrics.Counter(
     fields=[("flow", str), ("is_child", bool), ("exception", str)],
 )
 FLOW_COMPLETIONS = metrics.Counter("flow_completions", fields=[("flow", str)])
-GRR_WORKER_STATES_RUN = metrics.Counter("grr_worker_states_run")
-HUNT_OUTPUT_PLUGIN_ERRORS = metrics.Counter(
-    "hunt_output_plugin_errors", fields=[("plugin", str)]
+# Number of objects converted between their RDF and proto representations while
+# processing flows. Since flows keep their state, requests and statuses as RDF
+# values, every flow contributes; proto-based state methods only avoid the
+# conversion of their `FlowResponse` messages. This is meant to measure what a
+# proto-native flow execution mode would save; no such mode exists yet.
+FLOW_RDF_CONVERSIONS = metrics.Counter(
+    "flow_rdf_conversions", fields=[("flow", str)]
 )
-HUNT_RESULTS_RAN_THROUGH_PLUGIN = metrics.Counter(
-    "hunt_results_ran_through_plugin", fields=[("plugin", str)]
+GRR_WORKER_STATES_RUN = metrics.Counter("grr_worker_states_run")
+# Shared with the asynchronous hunt output plugins processing.
+HUNT_OUTPUT_PLUGIN_ERRORS = hunt_output_plugins.HUNT_OUTPUT_PLUGIN_ERRORS
+HUNT_RESULTS_RAN_THROUGH_PLUGIN = (
+    hunt_output_plugins.HUNT_RESULTS_RAN_THROUGH_PLUGIN
 )
 
 # We keep this set to avoid increasing the streamz cardinality too much.
@@ -258,6 +265,9 @@ class FlowBase(
     self.proto_replies_to_process: list[flows_pb2.FlowResult] = []
     self.replies_to_write = []
     self.proto_replies_to_write: list[flows_pb2.FlowResult] = []
+    self.hunt_output_plugins_requests: list[
+        objects_pb2.MessageHandlerRequest
+    ] = []
 
     self._state = None
     self._store = None
@@ -1379,6 +1389,7 @@ class FlowBase(
                   rdf_flow_objects.FlowResponse,
                   rdf_flow_objects.FlowStatus,
                   rdf_flow_objects.FlowIterator,
+                  flows_pb2.FlowResponse,
               ]
           ]
       ] = None,
@@ -1389,7 +1400,8 @@ class FlowBase(
       method_name: The name of the state method to call.
       request: A RequestState protobuf.
       responses: A list of FlowResponses, FlowStatuses, and FlowIterators
-        responding to the request.
+        responding to the request. Proto `FlowResponse` messages are only
+        allowed for state methods accepting proto responses.
 
     Raises:
       FlowError: Processing time for the flow has expired.
@@ -1468,18 +1480,39 @@ class FlowBase(
 
       if self.proto_replies_to_process:
         self._ProcessRepliesWithOutputPluginProto(self.proto_replies_to_process)
+        if self._QueuesHuntOutputPluginsRequests():
+          # Queued results are stored as protos, no conversion is needed.
+          self.hunt_output_plugins_requests.append(
+              hunt_output_plugins.CreateRequest(
+                  self.rdf_flow.client_id, self.proto_replies_to_process
+              )
+          )
         # TODO: Remove when no more RDF-based output plugins exist.
-        rdf_replies = [
-            mig_flow_objects.ToRDFFlowResult(r)
-            for r in self.proto_replies_to_process
-        ]
-        self.replies_to_process.extend(rdf_replies)
+        elif self._MayHaveRDFOutputPlugins():
+          rdf_replies = [
+              mig_flow_objects.ToRDFFlowResult(r)
+              for r in self.proto_replies_to_process
+          ]
+          self._CountRDFConversions(len(rdf_replies))
+          self.replies_to_process.extend(rdf_replies)
         self.proto_replies_to_process = []
 
       # TODO: Remove when no more RDF-based output plugins exist.
       if self.replies_to_process:
         if self.rdf_flow.parent_hunt_id and not self.rdf_flow.parent_flow_id:
-          self._ProcessRepliesWithHuntOutputPlugins(self.replies_to_process)
+          if self._QueuesHuntOutputPluginsRequests():
+            self.hunt_output_plugins_requests.append(
+                hunt_output_plugins.CreateRequest(
+                    self.rdf_flow.client_id,
+                    [
+                        mig_flow_objects.ToProtoFlowResult(r)
+                        for r in self.replies_to_process
+                    ],
+                )
+            )
+            self._CountRDFConversions(len(self.replies_to_process))
+          else:
+            self._ProcessRepliesWithHuntOutputPlugins(self.replies_to_process)
         else:
           self._ProcessRepliesWithFlowOutputPlugins(self.replies_to_process)
 
@@ -1499,17 +1532,40 @@ class FlowBase(
       msg = str(e)
       self.Error(error_message=msg, backtrace=traceback.format_exc())
 
-  def ProcessAllReadyRequests(self) -> tuple[int, int]:
+  def ProcessAllReadyRequests(
+      self,
+      request_dict: Optional[
+          dict[
+              int,
+              tuple[
+                  flows_pb2.FlowRequest,
+                  Sequence[
+                      Union[
+                          flows_pb2.FlowResponse,
+                          flows_pb2.FlowStatus,
+                          flows_pb2.FlowIterator,
+                      ]
+                  ],
+              ],
+          ]
+      ] = None,
+  ) -> tuple[int, int]:
     """Processes all requests that are due to run.
 
+    Args:
+      request_dict: Requests of the flow as returned by `ReadFlowRequests`, if
+        they were read already (e.g. together with requests of other flows).
+        Read from the database if not provided.
+
     Returns:
       (processed, incrementally_processed) The number of completed processed
       requests and the number of incrementally processed ones.
     """
-    request_dict = data_store.REL_DB.ReadFlowRequests(
-        self.rdf_flow.client_id,
-        self.rdf_flow.flow_id,
-    )
+    if request_dict is None:
+      request_dict = data_store.REL_DB.ReadFlowRequests(
+          self.rdf_flow.client_id,
+          self.rdf_flow.flow_id,
+      )
 
     completed_requests = FindCompletedRequestsToProcess(
         request_dict,
@@ -1535,19 +1591,15 @@ class FlowBase(
     # that responses are going to be processed in the right order.
     for request, responses in incremental_requests:
       request = mig_flow_objects.ToRDFFlowRequest(request)
+      self._CountRDFConversions(1)
       if not self.IsRunning():
         break
 
       # Responses have to be processed in the correct order, no response
       # can be skipped.
-      rdf_responses = []
-      for r in responses:
-        if isinstance(r, flows_pb2.FlowResponse):
-          rdf_responses.append(mig_flow_objects.ToRDFFlowResponse(r))
-        if isinstance(r, flows_pb2.FlowStatus):
-          rdf_responses.append(mig_flow_objects.ToRDFFlowStatus(r))
-        if isinstance(r, flows_pb2.FlowIterator):
-          rdf_responses.append(mig_flow_objects.ToRDFFlowIterator(r))
+      rdf_responses = self._ConvertResponsesForStateMethod(
+          request.callback_state, responses
+      )
 
       if rdf_responses:
         # We do not sent incremental updates for FlowStatus updates.
@@ -1584,14 +1636,10 @@ class FlowBase(
         break
 
       rdf_request = mig_flow_objects.ToRDFFlowRequest(request)
-      rdf_responses = []
-      for r in responses:
-        if isinstance(r, flows_pb2.FlowResponse):
-          rdf_responses.append(mig_flow_objects.ToRDFFlowResponse(r))
-        if isinstance(r, flows_pb2.FlowStatus):
-          rdf_responses.append(mig_flow_objects.ToRDFFlowStatus(r))
-        if isinstance(r, flows_pb2.FlowIterator):
-          rdf_responses.append(mig_flow_objects.ToRDFFlowIterator(r))
+      self._CountRDFConversions(1)
+      rdf_responses = self._ConvertResponsesForStateMethod(
+          request.next_state, responses
+      )
       # If there's not even a `Status` response, we send `None` as response.
       if not rdf_responses:
         rdf_responses = None
@@ -1619,6 +1667,83 @@ class FlowBase(
 
     return len(completed_requests), num_incremental
 
+  def _ConvertResponsesForStateMethod(
+      self,
+      method_name: str,
+      responses: Sequence[
+          Union[
+              flows_pb2.FlowResponse,
+              flows_pb2.FlowStatus,
+              flows_pb2.FlowIterator,
+          ]
+      ],
+  ) -> list[
+      Union[
+          rdf_flow_objects.FlowResponse,
+          rdf_flow_objects.FlowStatus,
+          rdf_flow_objects.FlowIterator,
+          flows_pb2.FlowResponse,
+      ]
+  ]:
+    """Prepares responses read from the database for the given state method.
+
+    State methods accepting proto responses get `FlowResponse` messages as they
+    were read, without a round trip through RDF values. This is the only part
+    of response processing that is proto-native: statuses and iterators are
+    always converted, as the `Responses` API exposes the status as an RDF value
+    (and it is used for resource usage accounting), and the flow request and
+    the flow object itself remain RDF values for all flows.
+
+    Args:
+      method_name: The name of the state method to pass the responses to.
+      responses: Responses as read from the database.
+
+    Returns:
+      Responses ready to be passed to `RunStateMethod`.
+    """
+    method = getattr(self, method_name, None)
+    keep_proto_responses = method is not None and (
+        self._IsAnnotatedWithProto2AnyResponses(method)
+        or self._IsAnnotatedWithProto2AnyResponsesCallback(method)
+    )
+
+    result = []
+    for r in responses:
+      if isinstance(r, flows_pb2.FlowResponse):
+        if keep_proto_responses:
+          result.append(r)
+          continue
+        result.append(mig_flow_objects.ToRDFFlowResponse(r))
+      if isinstance(r, flows_pb2.FlowStatus):
+        result.append(mig_flow_objects.ToRDFFlowStatus(r))
+      if isinstance(r, flows_pb2.FlowIterator):
+        result.append(mig_flow_objects.ToRDFFlowIterator(r))
+      self._CountRDFConversions(1)
+
+    return result
+
+  def _QueuesHuntOutputPluginsRequests(self) -> bool:
+    """Checks whether results are left to hunt output plugins of workers."""
+    return (
+        bool(self.rdf_flow.parent_hunt_id)
+        and not self.rdf_flow.parent_flow_id
+        and config.CONFIG["Worker.async_hunt_output_plugins"]
+    )
+
+  def _MayHaveRDFOutputPlugins(self) -> bool:
+    """Checks whether replies may have to be passed to RDF output plugins."""
+    # Output plugins of hunt flows are only known after reading the hunt.
+    if self.rdf_flow.parent_hunt_id and not self.rdf_flow.parent_flow_id:
+      return True
+
+    return bool(self.rdf_flow.output_plugins_states)
+
+  def _CountRDFConversions(self, count: int) -> None:
+    if count:
+      FLOW_RDF_CONVERSIONS.Increment(
+          count, fields=[self.rdf_flow.flow_class_name]
+      )
+
   @property
   def outstanding_requests(self) -> int:
     """Returns the number of all outstanding requests.
@@ -1653,6 +1778,7 @@ class FlowBase(
       all_requests = [
           mig_flow_objects.ToProtoFlowRequest(r) for r in self.flow_requests
       ] + self.proto_flow_requests
+      self._CountRDFConversions(len(self.flow_requests))
       # We make a single DB call to write all requests. Contrary to what the
       # name suggests, this method does more than writing the requests to the
       # DB. It also tallies the flows that need processing and updates the
@@ -1671,6 +1797,7 @@ class FlowBase(
           flow_responses_proto.append(mig_flow_objects.ToProtoFlowStatus(r))
         if isinstance(r, rdf_flow_objects.FlowIterator):
           flow_responses_proto.append(mig_flow_objects.ToProtoFlowIterator(r))
+      self._CountRDFConversions(len(flow_responses_proto))
       data_store.REL_DB.WriteFlowResponses(flow_responses_proto)
       self.flow_responses = []
 
@@ -1679,34 +1806,28 @@ class FlowBase(
       self.proto_flow_responses = []
 
     if self.client_action_requests:
-      client_id = self.rdf_flow.client_id
-      for request in self.client_action_requests:
-        fleetspeak_utils.SendGrrMessageThroughFleetspeak(
-            client_id,
-            request,
-            self.client_labels,
-        )
-
+      fleetspeak_utils.SendGrrMessagesThroughFleetspeak(
+          self.rdf_flow.client_id,
+          self.client_action_requests,
+          self.client_labels,
+      )
       self.client_action_requests = []
 
     if self.proto_client_action_requests:
-      client_id = self.rdf_flow.client_id
-      for request in self.proto_client_action_requests:
-        fleetspeak_utils.SendGrrMessageProtoThroughFleetspeak(
-            client_id,
-            request,
-            self.client_labels,
-        )
+      fleetspeak_utils.SendGrrMessageProtosThroughFleetspeak(
+          self.rdf_flow.client_id,
+          self.proto_client_action_requests,
+          self.client_labels,
+      )
       self.proto_client_action_requests = []
 
-    for request in self.rrg_requests:
-      fleetspeak_utils.SendRrgRequest(
+    if self.rrg_requests:
+      fleetspeak_utils.SendRrgRequests(
           self.rdf_flow.client_id,
-          request,
+          self.rrg_requests,
           self.client_labels,
       )
-
-    self.rrg_requests = []
+      self.rrg_requests = []
 
     if self.completed_requests:
       data_store.REL_DB.DeleteFlowRequests(self.completed_requests)
@@ -1716,6 +1837,7 @@ class FlowBase(
       all_results = self.proto_replies_to_write + [
           mig_flow_objects.ToProtoFlowResult(r) for r in self.replies_to_write
       ]
+      self._CountRDFConversions(len(self.replies_to_write))
       # Write flow results to REL_DB, even if the flow is a nested flow.
       data_store.REL_DB.WriteFlowResults(all_results)
       if self.rdf_flow.parent_hunt_id:
@@ -1723,6 +1845,14 @@ class FlowBase(
       self.proto_replies_to_write = []
       self.replies_to_write = []
 
+    # Output plugins requests have to be written after the results, as they
+    # refer to them.
+    if self.hunt_output_plugins_requests:
+      data_store.REL_DB.WriteMessageHandlerRequests(
+          self.hunt_output_plugins_requests
+      )
+      self.hunt_output_plugins_requests = []
+
   def _ProcessRepliesWithOutputPluginProto(
       self, replies: Sequence[flows_pb2.FlowResult]
   ) -> None:
@@ -1836,9 +1966,9 @@ class FlowBase(
       self, replies: Sequence[rdf_flow_objects.FlowResult]
   ) -> None:
     """Applies output plugins to hunt results."""
-    hunt_obj = data_store.REL_DB.ReadHuntObject(self.rdf_flow.parent_hunt_id)
-    hunt_obj = mig_hunt_objects.ToRDFHunt(hunt_obj)
-    self.rdf_flow.output_plugins = hunt_obj.output_plugins
+    hunt_obj = hunt.ReadCachedHuntObject(self.rdf_flow.parent_hunt_id)
+    # Cached hunt objects are shared, so plugin descriptors are copied.
+    self.rdf_flow.output_plugins = [p.Copy() for p in hunt_obj.output_plugins]
     hunt_output_plugins_states = data_store.REL_DB.ReadHuntOutputPluginsStates(
         self.rdf_flow.parent_hunt_id
     )
@@ -1977,6 +2107,10 @@ class FlowBase(
     flow_obj.replies_to_write = []
     self.proto_replies_to_write.extend(flow_obj.proto_replies_to_write)
     flow_obj.proto_replies_to_write = []
+    self.hunt_output_plugins_requests.extend(
+        flow_obj.hunt_output_plugins_requests
+    )
+    flow_obj.hunt_output_plugins_requests = []
 
   def ShouldSendNotifications(self) -> bool:
     return bool(
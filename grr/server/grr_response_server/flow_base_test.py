@@ -1406,6 +1406,136 @@ class FlowBaseTest(
       self.assertEqual(request.request_id, 1)
       self.assertEqual([r.response_id for r in responses], [2, 3])
 
+  @db_test_lib.WithDatabase
+  def testProcessAllReadyRequests_PassesProtoResponsesToProtoStateMethods(
+      self, db: abstract_db.Database
+  ):
+
+    class ProtoResponsesStateMethodFlow(flow_base.FlowBase):
+
+      @flow_base.UseProto2AnyResponses
+      def NextState(self, responses: flow_responses.Responses[any_pb2.Any]):
+        del responses  # Unused.
+
+    client_id = db_test_utils.InitializeClient(db)
+    flow_id = db_test_utils.InitializeFlow(
+        db,
+        client_id,
+        next_request_to_process=1,
+        flow_state=rdf_flow_objects.Flow.FlowState.RUNNING,
+    )
+    db.WriteFlowRequests([
+        flows_pb2.FlowRequest(
+            client_id=client_id,
+            flow_id=flow_id,
+            request_id=1,
+            needs_processing=True,
+            next_state="NextState",
+        )
+    ])
+    db.WriteFlowResponses([
+        flows_pb2.FlowResponse(
+            client_id=client_id, flow_id=flow_id, request_id=1, response_id=1
+        ),
+        flows_pb2.FlowStatus(
+            client_id=client_id,
+            flow_id=flow_id,
+            request_id=1,
+            response_id=2,
+            status=flows_pb2.FlowStatus.Status.OK,
+        ),
+    ])
+
+    rdf_flow = mig_flow_objects.ToRDFFlow(db.ReadFlowObject(client_id, flow_id))
+    flow = ProtoResponsesStateMethodFlow(rdf_flow)
+
+    with mock.patch.object(flow, "RunStateMethod") as mock_run_state_method:
+      flow.ProcessAllReadyRequests()
+
+    _, _, responses = mock_run_state_method.mock_calls[0].args
+    self.assertIsInstance(responses[0], flows_pb2.FlowResponse)
+    self.assertIsInstance(responses[1], rdf_flow_objects.FlowStatus)
+
+  @db_test_lib.WithDatabase
+  def testProcessAllReadyRequests_CountsRDFConversions(
+      self, db: abstract_db.Database
+  ):
+    client_id = db_test_utils.InitializeClient(db)
+    flow_id = db_test_utils.InitializeFlow(
+        db,
+        client_id,
+        next_request_to_process=1,
+        flow_state=rdf_flow_objects.Flow.FlowState.RUNNING,
+    )
+    db.WriteFlowRequests([
+        flows_pb2.FlowRequest(
+            client_id=client_id,
+            flow_id=flow_id,
+            request_id=1,
+            needs_processing=True,
+            next_state="NextState",
+        )
+    ])
+    db.WriteFlowResponses([
+        flows_pb2.FlowResponse(
+            client_id=client_id, flow_id=flow_id, request_id=1, response_id=i
+        )
+        for i in [1, 2]
+    ])
+
+    rdf_flow = mig_flow_objects.ToRDFFlow(db.ReadFlowObject(client_id, flow_id))
+    flow = FlowBaseTest.Flow(rdf_flow)
+
+    with self.SetUpStatsCollector(
+        default_stats_collector.DefaultStatsCollector()
+    ):
+      fake_counter = metrics.Counter("fake", fields=[("flow", str)])
+      metrics.Counter("log_calls", fields=[("level", str)])
+
+    with mock.patch.object(flow_base, "FLOW_RDF_CONVERSIONS", fake_counter):
+      with mock.patch.object(flow, "RunStateMethod"):
+        flow.ProcessAllReadyRequests()
+
+    # One request and two responses.
+    self.assertEqual(
+        3, fake_counter.GetValue(fields=[rdf_flow.flow_class_name])
+    )
+
+  def testRunStateMethod_QueuesProtoHuntResultsWithoutConversion(self):
+
+    class ProtoHuntFlow(flow_base.FlowBase):
+      proto_result_types = [jobs_pb2.ClientInformation]
+
+      def Start(self):
+        self.SendReplyProto(jobs_pb2.ClientInformation(client_name="foo"))
+
+    rdf_flow = rdf_flow_objects.Flow(
+        client_id="C.0123456789ABCDEF",
+        flow_id=self._FLOW_ID,
+        parent_hunt_id=self._FLOW_ID,
+        flow_class_name=ProtoHuntFlow.__name__,
+    )
+    flow = ProtoHuntFlow(rdf_flow)
+
+    with test_lib.ConfigOverrider({"Worker.async_hunt_output_plugins": True}):
+      with mock.patch.object(
+          mig_flow_objects,
+          "ToRDFFlowResult",
+          wraps=mig_flow_objects.ToRDFFlowResult,
+      ) as to_rdf_flow_result_mock:
+        flow.RunStateMethod("Start")
+
+    to_rdf_flow_result_mock.assert_not_called()
+    self.assertEmpty(flow.replies_to_process)
+    self.assertLen(flow.hunt_output_plugins_requests, 1)
+
+    request = flow.hunt_output_plugins_requests[0]
+    batch = flows_pb2.FlowResultBatch.FromString(request.request.data)
+    self.assertLen(batch.results, 1)
+    client_info = jobs_pb2.ClientInformation()
+    batch.results[0].payload.Unpack(client_info)
+    self.assertEqual(client_info.client_name, "foo")
+
   @db_test_lib.WithDatabase
   def testStore(self, db: abstract_db.Database):
     client_id = db_test_utils.InitializeClient(db)
@@ -4,6 +4,7 @@
 from typing import Any, Iterable, Iterator, Optional, Sequence, TypeVar, Union
 
 from google.protobuf import any_pb2
+from grr_response_proto import flows_pb2
 from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 
 
@@ -51,6 +52,7 @@ class Responses(Iterable[T]):
               rdf_flow_objects.FlowResponse,
               rdf_flow_objects.FlowStatus,
               rdf_flow_objects.FlowIterator,
+              flows_pb2.FlowResponse,
           ],
       ],
       request: Optional[rdf_flow_objects.FlowRequest] = None,
@@ -89,6 +91,7 @@ class Responses(Iterable[T]):
               rdf_flow_objects.FlowResponse,
               rdf_flow_objects.FlowStatus,
               rdf_flow_objects.FlowIterator,
+              flows_pb2.FlowResponse,
           ],
       ],
       request: Optional[rdf_flow_objects.FlowRequest] = None,
@@ -101,6 +104,10 @@ class Responses(Iterable[T]):
     passes raw `Any` message as it is stored in the `any_payload` field of the
     `FlowResponse` message.
 
+    Responses can be given either as RDF values or as `flows_pb2.FlowResponse`
+    messages read from the database. The latter are used as they are, without
+    any RDF conversion.
+
     Unlike `FromResponsesProto2Any`, this method DOES NOT raise an error if the
     responses do not contain a status message.
 
@@ -129,6 +136,8 @@ class Responses(Iterable[T]):
         result.status = response
       elif isinstance(response, rdf_flow_objects.FlowResponse):
         result.responses.append(response.any_payload.AsPrimitiveProto())
+      elif isinstance(response, flows_pb2.FlowResponse):
+        result.responses.append(response.any_payload)
       else:
         # Note that this also covers `FlowIterator`—it is a legacy class that
         # should no longer be used and new state methods (that are expected to
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 from absl.testing import absltest
 
+from grr_response_proto import flows_pb2
 from grr_response_server import flow_responses
 from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 
@@ -102,6 +103,28 @@ class ResponsesTest(absltest.TestCase):
     self.assertEqual(responses.request, request)
     self.assertEqual(responses.request_data, request.request_data)
 
+  def testFromResponsesProto2AnyProtoResponses(self):
+    response_1 = flows_pb2.FlowResponse()
+    response_1.any_payload.value = b"foo"
+
+    response_2 = flows_pb2.FlowResponse()
+    response_2.any_payload.value = b"bar"
+
+    status_response = rdf_flow_objects.FlowStatus()
+    status_response.status = rdf_flow_objects.FlowStatus.Status.OK
+
+    responses = [
+        response_1,
+        response_2,
+        status_response,
+    ]
+
+    responses = flow_responses.Responses.FromResponsesProto2Any(responses)
+    self.assertLen(responses, 2)
+    self.assertEqual(responses.status, status_response)
+    self.assertEqual(list(responses)[0], response_1.any_payload)
+    self.assertEqual(list(responses)[1], response_2.any_payload)
+
 
 if __name__ == "__main__":
   absltest.main()
@@ -4,7 +4,9 @@
 
 from grr_response_core import config
 from grr_response_core.lib import rdfvalue
+from grr_response_proto import hunts_pb2
 from grr_response_server import cronjobs
+from grr_response_server import data_store
 from grr_response_server import hunt
 from grr_response_server.flows.general import discovery as flows_discovery
 
@@ -56,3 +58,43 @@ class InterrogateClientsCronJob(cronjobs.SystemCronJobBase,
 
   def Run(self):
     self.StartInterrogationHunt()
+
+
+class RecomputeHuntCountersCronJob(cronjobs.SystemCronJobBase):
+  """A cron job which recomputes counters of active hunts.
+
+  Databases may maintain hunt counters incrementally. This job periodically
+  recomputes them from hunt flows, so that they never drift for long.
+
+  Only started and paused hunts are reconciled: these are the only hunts whose
+  flows are still being started and processed, so their counters are the ones
+  that keep changing and are used for enforcing hunt limits. Flows of stopped
+  and completed hunts are no longer processed, and recomputing their counters
+  on every run would make the job's cost grow with the number of hunts ever
+  run, defeating the purpose of maintaining the counters incrementally.
+  """
+
+  frequency = rdfvalue.Duration.From(6, rdfvalue.HOURS)
+  lifetime = rdfvalue.Duration.From(1, rdfvalue.HOURS)
+
+  _BATCH_SIZE = 100
+
+  def Run(self):
+    offset = 0
+    while True:
+      hunt_objs = data_store.REL_DB.ReadHuntObjects(
+          offset,
+          self._BATCH_SIZE,
+          with_states=[
+              hunts_pb2.Hunt.HuntState.STARTED,
+              hunts_pb2.Hunt.HuntState.PAUSED,
+          ],
+      )
+      if not hunt_objs:
+        break
+
+      data_store.REL_DB.RecomputeHuntsCounters([h.hunt_id for h in hunt_objs])
+      offset += len(hunt_objs)
+      self.HeartBeat()
+
+    self.Log("Recomputed counters of %d hunts.", offset)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+from unittest import mock
+
+from absl import app
+
+from grr_response_server import cronjobs
+from grr_response_server import data_store
+from grr_response_server import hunt
+from grr_response_server.flows.cron import system
+from grr_response_server.rdfvalues import cronjobs as rdf_cronjobs
+from grr.test_lib import hunt_test_lib
+from grr.test_lib import test_lib
+
+
+class RecomputeHuntCountersCronJobTest(
+    hunt_test_lib.StandardHuntTestMixin,
+    test_lib.GRRBaseTest,
+):
+
+  def _RunCronJob(self):
+    cron_name = system.RecomputeHuntCountersCronJob.__name__
+    cronjobs.ScheduleSystemCronJobs(names=[cron_name])
+    cron_manager = cronjobs.CronManager()
+    try:
+      cron_manager.RunOnce()
+    finally:
+      cron_manager._GetThreadPool().Join()
+
+    runs = cron_manager.ReadJobRuns(cron_name)
+    self.assertLen(runs, 1)
+    self.assertEqual(
+        runs[0].status, rdf_cronjobs.CronJobRun.CronJobRunStatus.FINISHED
+    )
+
+  def testRecomputesCountersOfStartedAndPausedHuntsOnly(self):
+    started_hunt_id = self.StartHunt()
+    paused_hunt_id = self.StartHunt(paused=True)
+    stopped_hunt_id = self.StartHunt()
+    hunt.StopHunt(stopped_hunt_id)
+
+    with mock.patch.object(
+        data_store.REL_DB, "RecomputeHuntsCounters"
+    ) as recompute_mock:
+      self._RunCronJob()
+
+    recomputed_hunt_ids = []
+    for call in recompute_mock.call_args_list:
+      recomputed_hunt_ids.extend(call.args[0])
+
+    self.assertCountEqual(
+        recomputed_hunt_ids, [started_hunt_id, paused_hunt_id]
+    )
+
+  @mock.patch.object(system.RecomputeHuntCountersCronJob, "_BATCH_SIZE", 2)
+  def testRecomputesCountersOfHuntsInBatches(self):
+    hunt_ids = [self.StartHunt() for _ in range(5)]
+
+    with mock.patch.object(
+        data_store.REL_DB, "RecomputeHuntsCounters"
+    ) as recompute_mock:
+      self._RunCronJob()
+
+    self.assertEqual(recompute_mock.call_count, 3)
+    recomputed_hunt_ids = []
+    for call in recompute_mock.call_args_list:
+      self.assertLessEqual(len(call.args[0]), 2)
+      recomputed_hunt_ids.extend(call.args[0])
+
+    self.assertCountEqual(recomputed_hunt_ids, hunt_ids)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -35,6 +35,7 @@ from grr_response_server import server_stubs
 from grr_response_server.databases import db
 from grr_response_server.flows.general import filesystem
 from grr_response_server.models import blobs as models_blobs
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import mig_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
 from grr_response_server.rdfvalues import wrappers as rdf_wrappers
@@ -161,6 +162,22 @@ class MultiGetFile(
   # allows us to amortize file store round trips and increases throughput.
   MIN_CALL_TO_FILE_STORE = 200
 
+  def __init__(self, rdf_flow: rdf_flow_objects.Flow):
+    super().__init__(rdf_flow)
+    # PathInfos of files collected (or found in the file store) while
+    # processing, written in a single call when queued messages are flushed.
+    self._path_infos_to_write: list[objects_pb2.PathInfo] = []
+
+  def FlushQueuedMessages(self) -> None:
+    # PathInfos have to be written before the replies referring to them.
+    if self._path_infos_to_write:
+      data_store.REL_DB.WritePathInfos(
+          self.client_id, self._path_infos_to_write
+      )
+      self._path_infos_to_write = []
+
+    super().FlushQueuedMessages()
+
   def GetProgress(self) -> MultiGetFileProgress:
     return ToRDFMultiGetFileProgress(self.GetProtoProgress())
 
@@ -690,7 +707,7 @@ class MultiGetFile(
         )
         proto_path_info = mig_objects.ToProtoPathInfo(path_info)
         proto_path_info.hash_entry.CopyFrom(file_tracker.hash_obj)
-        data_store.REL_DB.WritePathInfos(self.client_id, [proto_path_info])
+        self._path_infos_to_write.append(proto_path_info)
 
         # Report this hit to the flow's caller.
         self._ReceiveFetchedFile(file_tracker, is_duplicate=True)
@@ -1012,7 +1029,7 @@ class MultiGetFile(
       )
       path_info.hash_entry.sha256 = hash_id_bytes
 
-    data_store.REL_DB.WritePathInfos(self.client_id, [path_info])
+    self._path_infos_to_write.append(path_info)
 
     # TODO: Replace with `clear()` once upgraded in open-source.
     del index_to_tracker.tracker.index_to_buffers[:]
@@ -1094,8 +1111,7 @@ class MultiGetFile(
       path_info.hash_entry.sha256 = hash_id.AsBytes()
       path_info.hash_entry.num_bytes = offset
 
-    proto_path_info = mig_objects.ToProtoPathInfo(path_info)
-    data_store.REL_DB.WritePathInfos(self.client_id, [proto_path_info])
+    self._path_infos_to_write.append(mig_objects.ToProtoPathInfo(path_info))
 
     # Save some space.
     file_tracker.ClearField("index_to_buffers")
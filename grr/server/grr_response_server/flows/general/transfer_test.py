@@ -604,6 +604,99 @@ class MultiGetFileFlowTest(CompareFDsMixin, flow_test_lib.FlowTestsBaseclass):
       self.assertIsNotNone(history[-1].hash_entry.sha1)
       self.assertIsNotNone(history[-1].hash_entry.md5)
 
+  def testMultiGetFileWritesPathInfosOfDeduplicatedFilesInOneCall(self):
+    client_mock = action_mocks.MultiGetFileClientMock()
+
+    pathspecs = []
+    for i in range(10):
+      path = os.path.join(self.temp_dir, "test_%s.txt" % i)
+      with io.open(path, "wb") as fd:
+        fd.write(b"Hello")
+
+      pathspecs.append(
+          rdf_paths.PathSpec(pathtype=rdf_paths.PathSpec.PathType.OS, path=path)
+      )
+
+    # Collect the first file so that its contents end up in the file store.
+    flow_test_lib.StartAndRunFlow(
+        transfer.MultiGetFile,
+        client_mock,
+        creator=self.test_username,
+        client_id=self.client_id,
+        flow_args=transfer.MultiGetFileArgs(pathspecs=pathspecs[:1]),
+    )
+
+    with mock.patch.object(
+        data_store.REL_DB,
+        "WritePathInfos",
+        wraps=data_store.REL_DB.WritePathInfos,
+    ) as mock_write:
+      flow_id = flow_test_lib.StartAndRunFlow(
+          transfer.MultiGetFile,
+          client_mock,
+          creator=self.test_username,
+          client_id=self.client_id,
+          flow_args=transfer.MultiGetFileArgs(pathspecs=pathspecs),
+      )
+
+    mock_write.assert_called_once()
+    self.assertLen(mock_write.call_args[0][1], 10)
+
+    f_obj = flow_test_lib.GetFlowObj(self.client_id, flow_id)
+    p = transfer.MultiGetFile(f_obj).GetProgress()
+    self.assertEqual(p.num_skipped, 10)
+    self.assertEqual(p.num_collected, 0)
+
+    results = flow_test_lib.GetFlowResults(self.client_id, flow_id)
+    self.assertLen(results, 10)
+
+    for pathspec in pathspecs:
+      cp = db.ClientPath.FromPathSpec(self.client_id, pathspec)
+      fd_rel_db = file_store.OpenFile(cp)
+      self.assertEqual(b"Hello", fd_rel_db.read())
+
+  def testMultiGetFileBatchesPathInfosOfCollectedFiles(self):
+    client_mock = action_mocks.MultiGetFileClientMock()
+
+    pathspecs = []
+    for i in range(10):
+      path = os.path.join(self.temp_dir, "test_%s.txt" % i)
+      with io.open(path, "wb") as fd:
+        fd.write(b"Hello %d" % i)
+
+      pathspecs.append(
+          rdf_paths.PathSpec(pathtype=rdf_paths.PathSpec.PathType.OS, path=path)
+      )
+
+    with mock.patch.object(
+        data_store.REL_DB,
+        "WritePathInfos",
+        wraps=data_store.REL_DB.WritePathInfos,
+    ) as mock_write:
+      flow_id = flow_test_lib.StartAndRunFlow(
+          transfer.MultiGetFile,
+          client_mock,
+          creator=self.test_username,
+          client_id=self.client_id,
+          flow_args=transfer.MultiGetFileArgs(pathspecs=pathspecs),
+      )
+
+    # Files completed while processing the same batch of responses share a
+    # single WritePathInfos call.
+    self.assertLess(mock_write.call_count, 10)
+    self.assertEqual(
+        sum(len(call[0][1]) for call in mock_write.call_args_list), 10
+    )
+
+    f_obj = flow_test_lib.GetFlowObj(self.client_id, flow_id)
+    p = transfer.MultiGetFile(f_obj).GetProgress()
+    self.assertEqual(p.num_collected, 10)
+
+    for i, pathspec in enumerate(pathspecs):
+      cp = db.ClientPath.FromPathSpec(self.client_id, pathspec)
+      fd_rel_db = file_store.OpenFile(cp)
+      self.assertEqual(b"Hello %d" % i, fd_rel_db.read())
+
   def testExistingChunks(self):
     client_mock = action_mocks.MultiGetFileClientMock()
 
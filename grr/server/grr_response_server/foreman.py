@@ -1,9 +1,14 @@
 #!/usr/bin/env python
 """The GRR Foreman."""
 
+import bisect
+from collections.abc import Callable, Collection, Sequence
 import logging
+import threading
+from typing import Optional
 
 from grr_response_core.lib import rdfvalue
+from grr_response_proto import jobs_pb2
 from grr_response_server import data_store
 from grr_response_server import flow
 from grr_response_server import hunt
@@ -11,6 +16,7 @@ from grr_response_server import message_handlers
 from grr_response_server import mig_foreman_rules
 from grr_response_server.databases import db
 from grr_response_server.rdfvalues import mig_objects
+from grr_response_server.rdfvalues import objects as rdf_objects
 
 
 class Error(Exception):
@@ -21,6 +27,204 @@ class UnknownHuntTypeError(Error):
   pass
 
 
+_LabelPredicate = Callable[[Collection[str]], bool]
+
+_LABEL_QUANTIFIERS = {
+    jobs_pb2.ForemanLabelClientRule.MATCH_ALL: all,
+    jobs_pb2.ForemanLabelClientRule.MATCH_ANY: any,
+    jobs_pb2.ForemanLabelClientRule.DOES_NOT_MATCH_ALL: (
+        lambda iterable: not all(iterable)
+    ),
+    jobs_pb2.ForemanLabelClientRule.DOES_NOT_MATCH_ANY: (
+        lambda iterable: not any(iterable)
+    ),
+}
+
+_RULE_SET_QUANTIFIERS = {
+    jobs_pb2.ForemanClientRuleSet.MATCH_ALL: all,
+    jobs_pb2.ForemanClientRuleSet.MATCH_ANY: any,
+}
+
+
+def _CompileLabelRule(
+    rule: jobs_pb2.ForemanLabelClientRule,
+) -> Optional[_LabelPredicate]:
+  """Compiles a label rule into a predicate over client label names."""
+  quantifier = _LABEL_QUANTIFIERS.get(rule.match_mode)
+  if quantifier is None:
+    return None
+
+  label_names = tuple(rule.label_names)
+  return lambda names: quantifier(name in names for name in label_names)
+
+
+def _CompileLabelsOnlyRuleSet(
+    rule_set: jobs_pb2.ForemanClientRuleSet,
+) -> Optional[_LabelPredicate]:
+  """Compiles a rule set into a predicate over client label names.
+
+  Args:
+    rule_set: A rule set to compile.
+
+  Returns:
+    A predicate equivalent to the rule set or None if the rule set can't be
+    evaluated without the full client information.
+  """
+  quantifier = _RULE_SET_QUANTIFIERS.get(rule_set.match_mode)
+  if quantifier is None:
+    return None
+
+  predicates = []
+  for rule in rule_set.rules:
+    if rule.rule_type != jobs_pb2.ForemanClientRule.LABEL:
+      return None
+
+    predicate = _CompileLabelRule(rule.label)
+    if predicate is None:
+      return None
+    predicates.append(predicate)
+
+  return lambda names: quantifier(predicate(names) for predicate in predicates)
+
+
+def _RequiredLabels(
+    rule_set: jobs_pb2.ForemanClientRuleSet,
+) -> Optional[frozenset[str]]:
+  """Returns labels out of which a client has to have at least one to match."""
+  if (
+      rule_set.match_mode != jobs_pb2.ForemanClientRuleSet.MATCH_ALL
+      and len(rule_set.rules) != 1
+  ):
+    return None
+
+  for rule in rule_set.rules:
+    if rule.rule_type != jobs_pb2.ForemanClientRule.LABEL:
+      continue
+    if not rule.label.label_names:
+      continue
+    if rule.label.match_mode in [
+        jobs_pb2.ForemanLabelClientRule.MATCH_ALL,
+        jobs_pb2.ForemanLabelClientRule.MATCH_ANY,
+    ]:
+      return frozenset(rule.label.label_names)
+
+  return None
+
+
+class _CompiledForemanRule:
+  """A foreman rule prepared for repeated evaluation against many clients."""
+
+  def __init__(self, condition: jobs_pb2.ForemanCondition) -> None:
+    self.hunt_id = condition.hunt_id
+    self.creation_time = condition.creation_time
+    self.expiration_time = condition.expiration_time
+
+    self._condition = mig_foreman_rules.ToRDFForemanCondition(condition)
+    self._label_predicate = _CompileLabelsOnlyRuleSet(
+        condition.client_rule_set
+    )
+    self._required_labels = _RequiredLabels(condition.client_rule_set)
+
+    self.needs_labels = any(
+        rule.rule_type == jobs_pb2.ForemanClientRule.LABEL
+        for rule in condition.client_rule_set.rules
+    )
+    self.needs_client_info = self._label_predicate is None
+
+  def MatchesLabels(self, label_names: Collection[str]) -> bool:
+    """Checks the rule against client labels.
+
+    Args:
+      label_names: Names of the client labels.
+
+    Returns:
+      False if the rule can't match a client with given labels. For rules that
+      need the full client information a True value is not conclusive and the
+      rule needs to be evaluated with `Evaluate` afterwards.
+    """
+    if self._label_predicate is not None:
+      return self._label_predicate(label_names)
+
+    if self._required_labels is not None:
+      return not self._required_labels.isdisjoint(label_names)
+
+    return True
+
+  def Evaluate(self, client_info: rdf_objects.ClientFullInfo) -> bool:
+    return self._condition.Evaluate(client_info)
+
+
+class _ForemanRules:
+  """An immutable snapshot of compiled foreman rules."""
+
+  def __init__(self, conditions: Sequence[jobs_pb2.ForemanCondition]) -> None:
+    self.rules = sorted(
+        (_CompiledForemanRule(condition) for condition in conditions),
+        key=lambda rule: rule.creation_time,
+    )
+    self._creation_times = [rule.creation_time for rule in self.rules]
+    self._min_expiration_time = min(
+        (rule.expiration_time for rule in self.rules), default=None
+    )
+
+  @property
+  def latest_creation_time(self) -> rdfvalue.RDFDatetime:
+    return rdfvalue.RDFDatetime.FromMicrosecondsSinceEpoch(
+        self._creation_times[-1]
+    )
+
+  def CreatedAfter(
+      self, time: rdfvalue.RDFDatetime
+  ) -> Sequence[_CompiledForemanRule]:
+    index = bisect.bisect_right(
+        self._creation_times, time.AsMicrosecondsSinceEpoch()
+    )
+    return self.rules[index:]
+
+  def ExpiredBefore(
+      self, time: rdfvalue.RDFDatetime
+  ) -> Sequence[_CompiledForemanRule]:
+    time_us = time.AsMicrosecondsSinceEpoch()
+    if self._min_expiration_time is None:
+      return []
+    if self._min_expiration_time >= time_us:
+      return []
+    return [rule for rule in self.rules if rule.expiration_time < time_us]
+
+
+class _ForemanRulesCache:
+  """Keeps compiled foreman rules until they change in the database."""
+
+  def __init__(self) -> None:
+    self._lock = threading.Lock()
+    self._db = None
+    self._version = None
+    self._rules = _ForemanRules([])
+
+  def Get(self) -> _ForemanRules:
+    """Returns current foreman rules, reading them only if they changed."""
+    db_obj = data_store.REL_DB
+    version = db_obj.ReadForemanRulesVersion()
+
+    with self._lock:
+      if self._db is db_obj and self._version == version:
+        return self._rules
+
+    # The version is read before the rules, so if the rules change in the
+    # meantime we only end up refreshing the cache once more than needed.
+    rules = _ForemanRules(db_obj.ReadAllForemanRules())
+
+    with self._lock:
+      self._db = db_obj
+      self._version = version
+      self._rules = rules
+
+    return rules
+
+
+_RULES_CACHE = _ForemanRulesCache()
+
+
 # TODO(amoser): Now that Foreman rules are directly stored in the db,
 # consider removing this class altogether once the AFF4 Foreman has
 # been removed.
@@ -97,42 +301,58 @@ class Foreman(object):
     Returns:
       Number of assigned tasks.
     """
-    proto_rules = data_store.REL_DB.ReadAllForemanRules()
-    rules = [
-        mig_foreman_rules.ToRDFForemanCondition(cond) for cond in proto_rules
-    ]
-    if not rules:
+    rules = _RULES_CACHE.Get()
+    if not rules.rules:
       return 0
 
+    # Raises for unknown clients, so rules matching on labels alone (labels of
+    # unknown clients are read as empty) are never applied to them.
     last_foreman_run = self._GetLastForemanRunTime(client_id)
 
-    latest_rule_creation_time = max(rule.creation_time for rule in rules)
+    latest_rule_creation_time = rules.latest_creation_time
 
     if latest_rule_creation_time > last_foreman_run:
       # Update the latest checked rule on the client.
       self._SetLastForemanRunTime(client_id, latest_rule_creation_time)
 
-    relevant_rules = []
-    expired_rules = []
-
     now = rdfvalue.RDFDatetime.Now()
+    now_us = now.AsMicrosecondsSinceEpoch()
 
-    for rule in rules:
-      if rule.expiration_time < now:
-        expired_rules.append(rule)
-      elif rule.creation_time > last_foreman_run:
-        relevant_rules.append(rule)
+    expired_rules = rules.ExpiredBefore(now)
+    relevant_rules = [
+        rule
+        for rule in rules.CreatedAfter(last_foreman_run)
+        if rule.expiration_time >= now_us
+    ]
 
     actions_count = 0
     if relevant_rules:
-      client_data = data_store.REL_DB.ReadClientFullInfo(client_id)
-      if client_data is None:
-        return
-
-      client_data = mig_objects.ToRDFClientFullInfo(client_data)
+      # Labels are cheap to read and often enough to evaluate a rule, so the
+      # full client information is only read if some rule really needs it.
+      label_names = frozenset()
+      if any(rule.needs_labels for rule in relevant_rules):
+        label_names = frozenset(
+            label.name
+            for label in data_store.REL_DB.ReadClientLabels(client_id)
+        )
+
+      client_data = None
       for rule in relevant_rules:
-        if rule.Evaluate(client_data):
-          actions_count += self._RunAction(rule, client_id)
+        if not rule.MatchesLabels(label_names):
+          continue
+
+        if rule.needs_client_info:
+          if client_data is None:
+            client_data = data_store.REL_DB.ReadClientFullInfo(client_id)
+            if client_data is None:
+              return 0
+
+            client_data = mig_objects.ToRDFClientFullInfo(client_data)
+
+          if not rule.Evaluate(client_data):
+            continue
+
+        actions_count += self._RunAction(rule, client_id)
 
     if expired_rules:
       for rule in expired_rules:
@@ -148,10 +368,6 @@ class ForemanMessageHandler(message_handlers.MessageHandler):
   handler_name = "ForemanHandler"
 
   def ProcessMessages(self, msgs):
-    # TODO(amoser): The foreman reads the rules from the database for each
-    # client. In the old implementation we used to have a cache. If this is a
-    # performance hit, lets consider putting the cache back.
-
     foreman_obj = Foreman()
     for msg in msgs:
       foreman_obj.AssignTasksToClient(msg.client_id)
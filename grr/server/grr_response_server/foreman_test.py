@@ -11,6 +11,7 @@ from grr_response_server import foreman
 from grr_response_server import foreman_rules
 from grr_response_server import hunt
 from grr_response_server import mig_foreman_rules
+from grr_response_server.databases import db
 from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
 from grr_response_server.rdfvalues import mig_hunt_objects
 from grr.test_lib import test_lib
@@ -300,6 +301,100 @@ class ForemanTests(test_lib.GRRBaseTest):
         rules = data_store.REL_DB.ReadAllForemanRules()
         self.assertLen(rules, num_rules)
 
+  def _WriteLabelRule(
+      self,
+      hunt_id,
+      label_names,
+      match_mode=foreman_rules.ForemanLabelClientRule.MatchMode.MATCH_ANY,
+  ):
+    now = rdfvalue.RDFDatetime.Now()
+    rule = foreman_rules.ForemanCondition(
+        creation_time=now,
+        expiration_time=now + rdfvalue.Duration.From(1, rdfvalue.HOURS),
+        description="Test rule",
+        hunt_id=hunt_id,
+    )
+    rule.client_rule_set = foreman_rules.ForemanClientRuleSet(
+        rules=[
+            foreman_rules.ForemanClientRule(
+                rule_type=foreman_rules.ForemanClientRule.Type.LABEL,
+                label=foreman_rules.ForemanLabelClientRule(
+                    label_names=label_names,
+                    match_mode=match_mode,
+                ),
+            )
+        ]
+    )
+    data_store.REL_DB.WriteForemanRule(
+        mig_foreman_rules.ToProtoForemanCondition(rule)
+    )
+
+  def testRulesAreOnlyReadWhenChanged(self):
+    client_id_1 = self.SetupClient(1)
+    client_id_2 = self.SetupClient(2)
+    client_id_3 = self.SetupClient(3)
+
+    self._WriteLabelRule("11111111", ["foo"])
+
+    foreman_obj = foreman.Foreman()
+    with mock.patch.object(
+        data_store.REL_DB,
+        "ReadAllForemanRules",
+        wraps=data_store.REL_DB.ReadAllForemanRules,
+    ) as read_mock:
+      foreman_obj.AssignTasksToClient(client_id_1)
+      foreman_obj.AssignTasksToClient(client_id_2)
+      self.assertEqual(read_mock.call_count, 1)
+
+      self._WriteLabelRule("22222222", ["bar"])
+      foreman_obj.AssignTasksToClient(client_id_3)
+      self.assertEqual(read_mock.call_count, 2)
+
+  def testLabelRulesAreEvaluatedWithoutReadingFullClientInfo(self):
+    client_id_1 = self.SetupClient(1)
+    client_id_2 = self.SetupClient(2)
+    data_store.REL_DB.WriteGRRUser("owner")
+    data_store.REL_DB.AddClientLabels(client_id_1, "owner", ["foo"])
+
+    self._WriteLabelRule("11111111", ["foo"])
+
+    with mock.patch.object(
+        hunt, "StartHuntFlowOnClient", self.StartHuntFlowOnClient
+    ):
+      with mock.patch.object(
+          data_store.REL_DB,
+          "ReadClientFullInfo",
+          wraps=data_store.REL_DB.ReadClientFullInfo,
+      ) as read_mock:
+        self.clients_started = []
+        foreman_obj = foreman.Foreman()
+        foreman_obj.AssignTasksToClient(client_id_1)
+        foreman_obj.AssignTasksToClient(client_id_2)
+
+    read_mock.assert_not_called()
+    self.assertEqual(self.clients_started, [("11111111", client_id_1)])
+
+  def testLabelRulesDoNotMatchUnknownClients(self):
+    client_id = self.SetupClient(1)
+    unknown_client_id = "C.1234567812345678"
+
+    self._WriteLabelRule(
+        "11111111",
+        ["foo"],
+        match_mode=foreman_rules.ForemanLabelClientRule.MatchMode.DOES_NOT_MATCH_ANY,
+    )
+
+    foreman_obj = foreman.Foreman()
+    with mock.patch.object(
+        hunt, "StartHuntFlowOnClient", self.StartHuntFlowOnClient
+    ):
+      self.clients_started = []
+      with self.assertRaises(db.UnknownClientError):
+        foreman_obj.AssignTasksToClient(unknown_client_id)
+      foreman_obj.AssignTasksToClient(client_id)
+
+    self.assertEqual(self.clients_started, [("11111111", client_id)])
+
 
 def main(argv):
   # Run the full test suite
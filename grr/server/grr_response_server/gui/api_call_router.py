@@ -860,6 +860,22 @@ class ApiCallRouterStub(ApiCallRouter):
 
     raise NotImplementedError()
 
+  @Category("Flows")
+  @ProtoArgsType(api_flow_pb2.ApiStreamFlowResultsArgs)
+  @ResultBinaryStream()
+  @Http(
+      "GET",
+      "/api/v2/clients/<client_id>/flows/<path:flow_id>/results/stream",
+  )
+  def StreamFlowResults(
+      self,
+      args: api_flow_pb2.ApiStreamFlowResultsArgs,
+      context: Optional[api_call_context.ApiCallContext] = None,
+  ):
+    """Stream all results of a given flow as serialized protos."""
+
+    raise NotImplementedError()
+
   @Category("Flows")
   @ProtoArgsType(api_flow_pb2.ApiGetFlowResultsExportCommandArgs)
   @ProtoResultType(api_flow_pb2.ApiGetFlowResultsExportCommandResult)
@@ -1286,6 +1302,19 @@ class ApiCallRouterStub(ApiCallRouter):
 
     raise NotImplementedError()
 
+  @Category("Hunts")
+  @ProtoArgsType(api_hunt_pb2.ApiStreamHuntResultsArgs)
+  @ResultBinaryStream()
+  @Http("GET", "/api/v2/hunts/<hunt_id>/results/stream")
+  def StreamHuntResults(
+      self,
+      args: api_hunt_pb2.ApiStreamHuntResultsArgs,
+      context: Optional[api_call_context.ApiCallContext] = None,
+  ):
+    """Stream all results of a given hunt as serialized protos."""
+
+    raise NotImplementedError()
+
   @Category("Hunts")
   @ProtoArgsType(api_hunt_pb2.ApiGetHuntResultsExportCommandArgs)
   @ProtoResultType(api_hunt_pb2.ApiGetHuntResultsExportCommandResult)
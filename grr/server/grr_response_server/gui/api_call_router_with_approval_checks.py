@@ -581,6 +581,15 @@ class ApiCallRouterWithApprovalChecks(api_call_router.ApiCallRouterStub):
 
     return self.delegate.ListFlowResults(args, context=context)
 
+  def StreamFlowResults(
+      self,
+      args: api_flow_pb2.ApiStreamFlowResultsArgs,
+      context: Optional[api_call_context.ApiCallContext] = None,
+  ) -> api_flow.ApiStreamFlowResultsHandler:
+    self._CheckFlowOrClientAccess(args.client_id, args.flow_id, context)
+
+    return self.delegate.StreamFlowResults(args, context=context)
+
   def GetExportedFlowResults(
       self,
       args: api_flow_pb2.ApiGetExportedFlowResultsArgs,
@@ -898,6 +907,15 @@ class ApiCallRouterWithApprovalChecks(api_call_router.ApiCallRouterStub):
 
     return self.delegate.CountHuntResultsByType(args, context=context)
 
+  def StreamHuntResults(
+      self,
+      args: api_hunt_pb2.ApiStreamHuntResultsArgs,
+      context: Optional[api_call_context.ApiCallContext] = None,
+  ):
+    # Everybody can look into hunt's results.
+
+    return self.delegate.StreamHuntResults(args, context=context)
+
   def GetExportedHuntResults(
       self,
       args: api_hunt_pb2.ApiGetExportedHuntResultsArgs,
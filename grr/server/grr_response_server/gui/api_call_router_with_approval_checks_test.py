@@ -464,6 +464,7 @@ class ApiCallRouterWithApprovalChecksTest(
   ACCESS_CHECKED_METHODS.extend([
       "GetFlow",
       "ListFlowResults",
+      "StreamFlowResults",
       "GetExportedFlowResults",
       "GetFlowResultsExportCommand",
       "GetFlowFilesArchive",
@@ -482,6 +483,12 @@ class ApiCallRouterWithApprovalChecksTest(
     with self.assertRaises(api_call_handler_base.ResourceNotFoundError):
       self.router.ListFlowResults(args, context=self.context)
 
+    args = api_flow_pb2.ApiStreamFlowResultsArgs(
+        client_id=self.client_id, flow_id="12345678"
+    )
+    with self.assertRaises(api_call_handler_base.ResourceNotFoundError):
+      self.router.StreamFlowResults(args, context=self.context)
+
     args = api_flow_pb2.ApiGetExportedFlowResultsArgs(
         client_id=self.client_id, flow_id="12345678"
     )
@@ -519,6 +526,11 @@ class ApiCallRouterWithApprovalChecksTest(
     )
     self.CheckMethodIsNotAccessChecked(self.router.ListFlowResults, args=args)
 
+    args = api_flow_pb2.ApiStreamFlowResultsArgs(
+        client_id=self.client_id, flow_id=flow_id
+    )
+    self.CheckMethodIsNotAccessChecked(self.router.StreamFlowResults, args=args)
+
     args = api_flow_pb2.ApiGetExportedFlowResultsArgs(
         client_id=self.client_id, flow_id=flow_id
     )
@@ -562,6 +574,15 @@ class ApiCallRouterWithApprovalChecksTest(
         args=args,
     )
 
+    args = api_flow_pb2.ApiStreamFlowResultsArgs(
+        client_id=self.client_id, flow_id=flow_id
+    )
+    self.CheckMethodIsAccessChecked(
+        self.router.StreamFlowResults,
+        "CheckClientAccess",
+        args=args,
+    )
+
     args = api_flow_pb2.ApiGetExportedFlowResultsArgs(
         client_id=self.client_id, flow_id=flow_id
     )
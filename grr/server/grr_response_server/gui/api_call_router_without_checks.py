@@ -330,6 +330,13 @@ class ApiCallRouterWithoutChecks(api_call_router.ApiCallRouterStub):
   ) -> api_flow.ApiListFlowResultsHandler:
     return api_flow.ApiListFlowResultsHandler()
 
+  def StreamFlowResults(
+      self,
+      args: api_flow_pb2.ApiStreamFlowResultsArgs,
+      context: Optional[api_call_context.ApiCallContext] = None,
+  ) -> api_flow.ApiStreamFlowResultsHandler:
+    return api_flow.ApiStreamFlowResultsHandler()
+
   def GetExportedFlowResults(
       self,
       args: api_flow_pb2.ApiGetExportedFlowResultsArgs,
@@ -559,6 +566,13 @@ class ApiCallRouterWithoutChecks(api_call_router.ApiCallRouterStub):
   ) -> api_hunt.ApiCountHuntResultsByTypeHandler:
     return api_hunt.ApiCountHuntResultsByTypeHandler()
 
+  def StreamHuntResults(
+      self,
+      args: api_hunt_pb2.ApiStreamHuntResultsArgs,
+      context: Optional[api_call_context.ApiCallContext] = None,
+  ) -> api_hunt.ApiStreamHuntResultsHandler:
+    return api_hunt.ApiStreamHuntResultsHandler()
+
   def GetExportedHuntResults(
       self,
       args: api_hunt_pb2.ApiGetExportedHuntResultsArgs,
@@ -342,6 +342,16 @@ class ApiLabelsRestrictedCallRouter(api_call_router.ApiCallRouterStub):
 
     return self.delegate.ListFlowResults(args, context=context)
 
+  def StreamFlowResults(
+      self,
+      args: api_flow_pb2.ApiStreamFlowResultsArgs,
+      context: Optional[api_call_context.ApiCallContext] = None,
+  ):
+    self.CheckFlowsAllowed()
+    self.CheckClientApproval(args.client_id, context=context)
+
+    return self.delegate.StreamFlowResults(args, context=context)
+
   def GetFlowResultsExportCommand(
       self,
       args: api_flow_pb2.ApiGetFlowResultsExportCommandArgs,
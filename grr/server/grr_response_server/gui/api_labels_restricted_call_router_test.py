@@ -250,6 +250,12 @@ class ApiLabelsRestrictedCallRouterTest(
             client_id=self.client_id
         ),
     )
+    self.CheckMethod(
+        c.StreamFlowResults,
+        proto_args=api_flow_pb2.ApiStreamFlowResultsArgs(
+            client_id=self.client_id
+        ),
+    )
     self.CheckMethod(
         c.GetFlowResultsExportCommand,
         api_flow_pb2.ApiGetFlowResultsExportCommandArgs(
@@ -300,6 +306,10 @@ class ApiLabelsRestrictedCallRouterTest(
         c.ListHuntResults,
         api_hunt_pb2.ApiListHuntResultsArgs(hunt_id=self.hunt_id),
     )
+    self.CheckMethod(
+        c.StreamHuntResults,
+        api_hunt_pb2.ApiStreamHuntResultsArgs(hunt_id=self.hunt_id),
+    )
     self.CheckMethod(
         c.GetHuntResultsExportCommand,
         api_hunt_pb2.ApiGetHuntResultsExportCommandArgs(hunt_id=self.hunt_id),
@@ -593,6 +603,7 @@ class ApiLabelsRestrictedCallRouterTest(
         "CreateFlow",
         "CancelFlow",
         "ListFlowResults",
+        "StreamFlowResults",
         "GetFlowResultsExportCommand",
         "GetFlowFilesArchive",
         "ListFlowOutputPlugins",
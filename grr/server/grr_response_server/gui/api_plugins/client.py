@@ -132,7 +132,8 @@ class ApiSearchClientsHandler(api_call_handler_base.ApiCallHandler):
     # LookupClients returns a sorted list of client ids.
     clients = index.LookupClients(keywords)[args.offset : args.offset + end]
 
-    client_infos = data_store.REL_DB.MultiReadClientFullInfo(clients)
+    with db.AllowStaleReads():
+      client_infos = data_store.REL_DB.MultiReadClientFullInfo(clients)
     for client_id, client_info in client_infos.items():
       api_clients.append(
           models_clients.ApiClientFromClientFullInfo(client_id, client_info)
@@ -190,7 +191,8 @@ class ApiLabelsRestrictedSearchClientsHandler(
 
     index = 0
     for cid_batch in collection.Batch(sorted(all_client_ids), batch_size):
-      client_infos = data_store.REL_DB.MultiReadClientFullInfo(cid_batch)
+      with db.AllowStaleReads():
+        client_infos = data_store.REL_DB.MultiReadClientFullInfo(cid_batch)
 
       for client_id, client_info in sorted(client_infos.items()):
         if not self._VerifyLabels(client_info.labels):
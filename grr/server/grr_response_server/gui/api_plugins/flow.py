@@ -18,6 +18,7 @@ from grr_response_core.lib.rdfvalues import mig_protodict
 from grr_response_core.lib.rdfvalues import mig_structs
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_core.lib.util import gzchunked
 from grr_response_proto import flows_pb2
 from grr_response_proto import jobs_pb2
 from grr_response_proto import objects_pb2
@@ -539,15 +540,16 @@ class ApiListFlowResultsHandler(api_call_handler_base.ApiCallHandler):
       args: flow_pb2.ApiListFlowResultsArgs,
       context: Optional[api_call_context.ApiCallContext] = None,
   ) -> flow_pb2.ApiListFlowResultsResult:
-    results = data_store.REL_DB.ReadFlowResults(
-        args.client_id,
-        args.flow_id,
-        args.offset,
-        args.count or db.MAX_COUNT,
-        with_substring=args.filter or None,
-        with_tag=args.with_tag or None,
-        with_type=args.with_type or None,
-    )
+    with db.AllowStaleReads():
+      results = data_store.REL_DB.ReadFlowResults(
+          args.client_id,
+          args.flow_id,
+          args.offset,
+          args.count or db.MAX_COUNT,
+          with_substring=args.filter or None,
+          with_tag=args.with_tag or None,
+          with_type=args.with_type or None,
+      )
 
     if args.filter:
       # TODO: with_substring is implemented in a hacky way,
@@ -557,13 +559,14 @@ class ApiListFlowResultsHandler(api_call_handler_base.ApiCallHandler):
       #   string search, total_count will be unset if `filter` is specified.
       total_count = None
     else:
-      total_count = data_store.REL_DB.CountFlowResults(
-          args.client_id,
-          args.flow_id,
-          # TODO: Add with_substring to CountFlowResults().
-          with_tag=args.with_tag or None,
-          with_type=args.with_type or None,
-      )
+      with db.AllowStaleReads():
+        total_count = data_store.REL_DB.CountFlowResults(
+            args.client_id,
+            args.flow_id,
+            # TODO: Add with_substring to CountFlowResults().
+            with_tag=args.with_tag or None,
+            with_type=args.with_type or None,
+        )
 
     wrapped_items = [InitApiFlowResultFromFlowResult(r) for r in results]
 
@@ -572,6 +575,32 @@ class ApiListFlowResultsHandler(api_call_handler_base.ApiCallHandler):
     )
 
 
+class ApiStreamFlowResultsHandler(api_call_handler_base.ApiCallHandler):
+  """Streams all results of a given flow as serialized protos."""
+
+  proto_args_type = flow_pb2.ApiStreamFlowResultsArgs
+
+  _RESULTS_PAGE_SIZE = 1000
+
+  def Handle(
+      self,
+      args: flow_pb2.ApiStreamFlowResultsArgs,
+      context: Optional[api_call_context.ApiCallContext] = None,
+  ) -> api_call_handler_base.ApiBinaryStream:
+    results = data_store.REL_DB.IterateFlowResults(
+        args.client_id,
+        args.flow_id,
+        batch_size=self._RESULTS_PAGE_SIZE,
+        allow_stale=True,
+    )
+    content = gzchunked.Serialize(
+        InitApiFlowResultFromFlowResult(r).SerializeToString() for r in results
+    )
+
+    filename = "flow_{}_results.gzchunked".format(args.flow_id)
+    return api_call_handler_base.ApiBinaryStream(filename, content)
+
+
 class ApiListFlowLogsHandler(api_call_handler_base.ApiCallHandler):
   """Returns a list of logs for the current client and flow."""
 
@@ -691,7 +720,7 @@ class ApiGetFlowFilesArchiveHandler(api_call_handler_base.ApiCallHandler):
   def _WrapContentGenerator(
       self,
       generator: archive_generator.CollectionArchiveGenerator,
-      flow_results: list[flows_pb2.FlowResult],
+      flow_results: Iterable[flows_pb2.FlowResult],
       args: ApiGetFlowFilesArchiveArgs,
       context: Optional[api_call_context.ApiCallContext] = None,
   ) -> Iterator[flows_pb2.FlowResult]:
@@ -805,16 +834,15 @@ class ApiGetFlowFilesArchiveHandler(api_call_handler_base.ApiCallHandler):
       context: Optional[api_call_context.ApiCallContext] = None,
   ):
     flow_object = data_store.REL_DB.ReadFlowObject(args.client_id, args.flow_id)
-    flow_results = data_store.REL_DB.ReadFlowResults(
-        args.client_id, args.flow_id, 0, db.MAX_COUNT
-    )
     flow_instance = flow_base.FlowBase.CreateFlowInstance(
         mig_flow_objects.ToRDFFlow(flow_object)
     )
     try:
       mappings = flow_instance.GetFilesArchiveMappings(
           mig_flow_objects.ToRDFFlowResult(flow_result)
-          for flow_result in flow_results
+          for flow_result in data_store.REL_DB.IterateFlowResults(
+              args.client_id, args.flow_id, allow_stale=True
+          )
       )
     except NotImplementedError:
       mappings = None
@@ -868,6 +896,9 @@ class ApiGetFlowFilesArchiveHandler(api_call_handler_base.ApiCallHandler):
           archive_format=archive_format,
           predicate=self._BuildPredicate(str(args.client_id)),
       )
+      flow_results = data_store.REL_DB.IterateFlowResults(
+          args.client_id, args.flow_id, allow_stale=True
+      )
       content_generator = self._WrapContentGenerator(
           a_gen, flow_results, args, context=context
       )
@@ -1326,23 +1357,13 @@ class ApiGetExportedFlowResultsHandler(api_call_handler_base.ApiCallHandler):
         type_url: str,
     ) -> Iterator[flows_pb2.FlowResult]:
       """Fetches all flow results of a given type."""
-      offset = 0
-      while True:
-        results = data_store.REL_DB.ReadFlowResults(
-            client_id,
-            flow_id,
-            offset=offset,
-            count=self._RESULTS_PAGE_SIZE,
-            with_proto_type_url=type_url,
-        )
-
-        if not results:
-          break
-
-        for r in results:
-          yield r
-
-        offset += self._RESULTS_PAGE_SIZE
+      yield from data_store.REL_DB.IterateFlowResults(
+          client_id,
+          flow_id,
+          with_proto_type_url=type_url,
+          batch_size=self._RESULTS_PAGE_SIZE,
+          allow_stale=True,
+      )
 
     content_generator = instant_output_plugin.GetExportedFlowResults(
         plugin, list(type_url_counts.keys()), FetchFlowResultsByTypeUrl
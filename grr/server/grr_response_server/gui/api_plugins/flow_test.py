@@ -21,6 +21,7 @@ from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.rdfvalues import test_base as rdf_test_base
+from grr_response_core.lib.util import gzchunked
 from grr_response_core.lib.util import temp
 from grr_response_proto import flows_pb2
 from grr_response_proto import jobs_pb2
@@ -699,6 +700,46 @@ class ApiListFlowResultsHandlerTest(test_lib.GRRBaseTest):
     self.assertEmpty(result.items)
 
 
+class ApiStreamFlowResultsHandlerTest(test_lib.GRRBaseTest):
+  """Tests for ApiStreamFlowResultsHandler."""
+
+  def setUp(self):
+    super().setUp()
+
+    self.handler = flow_plugin.ApiStreamFlowResultsHandler()
+
+    self.client_id = self.SetupClient(0)
+
+  def _ReadResults(self, flow_id):
+    result = self.handler.Handle(
+        flow_pb2.ApiStreamFlowResultsArgs(
+            client_id=self.client_id, flow_id=flow_id
+        )
+    )
+
+    items = []
+    for data in gzchunked.Deserialize(result.GenerateContent()):
+      items.append(flow_pb2.ApiFlowResult.FromString(data))
+    return items
+
+  def testStreamsAllResults(self):
+    flow_id = flow_test_lib.StartAndRunFlow(
+        DummyFlowWithTwoTaggedReplies, client_id=self.client_id
+    )
+
+    items = self._ReadResults(flow_id)
+    self.assertLen(items, 2)
+    self.assertEqual(items[0].tag, "tag:foo")
+    self.assertEqual(items[1].tag, "tag:bar")
+
+  def testStreamsNothingForFlowWithoutResults(self):
+    flow_id = flow_test_lib.StartFlow(
+        flow_test_lib.DummyFlowWithSingleReply, client_id=self.client_id
+    )
+
+    self.assertEmpty(self._ReadResults(flow_id))
+
+
 class ApiListAllFlowOutputPluginLogsHandlerTest(
     api_test_lib.ApiCallHandlerTest
 ):
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """API handlers for accessing hunts."""
 
+import bisect
 import collections
 from collections.abc import Iterable, Iterator, Sequence
 import math
@@ -13,6 +14,7 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import registry
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_core.lib.util import gzchunked
 from grr_response_proto import analysis_pb2
 from grr_response_proto import api_utils_pb2
 from grr_response_proto import flows_pb2
@@ -341,7 +343,7 @@ class Histogram:
       min_timestamp: int,
       max_timestamp: int,
       num_buckets: int,
-      values: list[int],
+      values: Iterable[int],
   ):
     self.min_timestamp = min_timestamp
     self.max_timestamp = max_timestamp
@@ -353,8 +355,18 @@ class Histogram:
       lower = min_timestamp + i * self.bucket_size
       self.buckets.append(Bucket(lower_boundary_ts=lower))
 
-    for value in values:
-      self._Insert(value)
+    # Instead of looking up a bucket for every single value, values are sorted
+    # and bucket boundaries are binary searched for. Sorting is done in native
+    # code, so this is much faster for histograms of many values.
+    values = sorted(values)
+    if values:
+      self._GetBucketIndex(values[0])  # Raises for out of range timestamps.
+
+    count_so_far = 0
+    for index, bucket in enumerate(self.buckets):
+      count = self._CountValuesUpToBucket(values, index)
+      bucket.count = count - count_so_far
+      count_so_far = count
 
   def _GetBucketIndex(self, timestamp: int) -> int:
     if self.bucket_size == 0:
@@ -369,8 +381,21 @@ class Histogram:
 
     return index
 
-  def _Insert(self, timestamp: int) -> None:
-    self.buckets[self._GetBucketIndex(timestamp)].count += 1
+  def _CountValuesUpToBucket(self, sorted_values: list[int], index: int) -> int:
+    """Counts values falling into buckets with indices up to the given one."""
+    if self.bucket_size == 0 or index >= self.num_buckets - 1:
+      return len(sorted_values)
+
+    # The smallest timestamp falling into one of the next buckets. The initial
+    # guess is corrected so that the result is consistent with the rounding
+    # done by `_GetBucketIndex`.
+    bound = math.ceil(self.min_timestamp + (index + 1) * self.bucket_size)
+    while self._GetBucketIndex(bound - 1) > index:
+      bound -= 1
+    while self._GetBucketIndex(bound) <= index:
+      bound += 1
+
+    return bisect.bisect_left(sorted_values, bound)
 
   def GetCumulativeHistogram(self) -> "Histogram":
     """Returns the cumulative histogram."""
@@ -700,17 +725,17 @@ class ApiListHuntResultsHandler(api_call_handler_base.ApiCallHandler):
       args: api_hunt_pb2.ApiListHuntResultsArgs,
       context: Optional[api_call_context.ApiCallContext] = None,
   ) -> api_hunt_pb2.ApiListHuntResultsResult:
-    results = data_store.REL_DB.ReadHuntResults(
-        args.hunt_id,
-        args.offset,
-        args.count or db.MAX_COUNT,
-        with_substring=args.filter or None,
-        with_type=args.with_type or None,
-    )
-
-    total_count = data_store.REL_DB.CountHuntResults(
-        args.hunt_id, with_type=args.with_type or None
-    )
+    with db.AllowStaleReads():
+      results = data_store.REL_DB.ReadHuntResults(
+          args.hunt_id,
+          args.offset,
+          args.count or db.MAX_COUNT,
+          with_substring=args.filter or None,
+          with_type=args.with_type or None,
+      )
+      total_count = data_store.REL_DB.CountHuntResults(
+          args.hunt_id, with_type=args.with_type or None
+      )
 
     return api_hunt_pb2.ApiListHuntResultsResult(
         items=[InitApiHuntResultFromFlowResult(r) for r in results],
@@ -718,6 +743,29 @@ class ApiListHuntResultsHandler(api_call_handler_base.ApiCallHandler):
     )
 
 
+class ApiStreamHuntResultsHandler(api_call_handler_base.ApiCallHandler):
+  """Streams all results of a given hunt as serialized protos."""
+
+  proto_args_type = api_hunt_pb2.ApiStreamHuntResultsArgs
+
+  _RESULTS_PAGE_SIZE = 1000
+
+  def Handle(
+      self,
+      args: api_hunt_pb2.ApiStreamHuntResultsArgs,
+      context: Optional[api_call_context.ApiCallContext] = None,
+  ) -> api_call_handler_base.ApiBinaryStream:
+    results = data_store.REL_DB.IterateHuntResults(
+        args.hunt_id, batch_size=self._RESULTS_PAGE_SIZE, allow_stale=True
+    )
+    content = gzchunked.Serialize(
+        InitApiHuntResultFromFlowResult(r).SerializeToString() for r in results
+    )
+
+    filename = "hunt_{}_results.gzchunked".format(args.hunt_id)
+    return api_call_handler_base.ApiBinaryStream(filename, content)
+
+
 class ApiListHuntCrashesHandler(api_call_handler_base.ApiCallHandler):
   """Returns a list of client crashes for the given hunt."""
 
@@ -985,30 +1033,67 @@ class ApiGetHuntClientCompletionStatsHandler(
   proto_args_type = api_hunt_pb2.ApiGetHuntClientCompletionStatsArgs
   proto_result_type = api_hunt_pb2.ApiGetHuntClientCompletionStatsResult
 
+  # Computed stats are cached for a short time, as the GUI polls them.
+  CACHE_MAX_AGE_SECONDS = 30
+  CACHE_MAX_SIZE = 100
+
+  _cache: Optional[utils.AgeBasedCache] = None
+
+  @classmethod
+  def _GetCache(cls) -> utils.AgeBasedCache:
+    if cls._cache is None:
+      cls._cache = utils.AgeBasedCache(
+          max_size=cls.CACHE_MAX_SIZE, max_age=cls.CACHE_MAX_AGE_SECONDS
+      )
+    return cls._cache
+
   def Handle(
       self,
       args: api_hunt_pb2.ApiGetHuntClientCompletionStatsArgs,
       context: Optional[api_call_context.ApiCallContext] = None,
   ) -> api_hunt_pb2.ApiGetHuntClientCompletionStatsResult:
 
-    states_and_timestamps = data_store.REL_DB.ReadHuntFlowsStatesAndTimestamps(
-        str(args.hunt_id)
-    )
+    hunt_id = str(args.hunt_id)
     num_buckets = max(100, args.size)
-    flow_creation_times, flow_completion_times = [], []
 
-    for stat in states_and_timestamps:
-      flow_creation_times.append(stat.create_time.AsSecondsSinceEpoch())
-      if stat.flow_state != flows_pb2.Flow.FlowState.RUNNING:
-        flow_completion_times.append(
-            stat.last_update_time.AsSecondsSinceEpoch()
-        )
+    # Hunt counters change whenever a hunt flow is created or completes, which
+    # makes them a cheap fingerprint of the stats' underlying data.
+    counters = data_store.REL_DB.ReadHuntCounters(hunt_id)
+    cache_key = (hunt_id, num_buckets, counters)
+
+    cache = self._GetCache()
+    try:
+      cached_result = cache.Get(cache_key)
+    except KeyError:
+      pass
+    else:
+      result = api_hunt_pb2.ApiGetHuntClientCompletionStatsResult()
+      result.CopyFrom(cached_result)
+      return result
+
+    result = self._ComputeStats(hunt_id, num_buckets)
+
+    cached_result = api_hunt_pb2.ApiGetHuntClientCompletionStatsResult()
+    cached_result.CopyFrom(result)
+    cache.Put(cache_key, cached_result)
+    return result
+
+  def _ComputeStats(
+      self,
+      hunt_id: str,
+      num_buckets: int,
+  ) -> api_hunt_pb2.ApiGetHuntClientCompletionStatsResult:
+    timestamps = data_store.REL_DB.ReadHuntFlowsTimestamps(hunt_id)
+    flow_creation_times = timestamps.create_times
+    flow_completion_times = timestamps.completion_times
 
     if not flow_creation_times:
       return api_hunt_pb2.ApiGetHuntClientCompletionStatsResult()
 
-    min_timestamp = min(flow_creation_times)
-    max_timestamp = max(flow_creation_times + flow_completion_times)
+    min_timestamp = flow_creation_times[0]
+    max_timestamp = flow_creation_times[-1]
+    if flow_completion_times:
+      max_timestamp = max(max_timestamp, flow_completion_times[-1])
 
     started_histogram = Histogram(
         min_timestamp, max_timestamp, num_buckets, values=flow_creation_times
@@ -1079,10 +1164,7 @@ class ApiGetHuntFilesArchiveHandler(api_call_handler_base.ApiCallHandler):
             hunt_api_object.created,
         )
     )
-    # TODO(user): write general-purpose batcher for such cases.
-    results = data_store.REL_DB.ReadHuntResults(
-        hunt_id, offset=0, count=db.MAX_COUNT
-    )
+    results = data_store.REL_DB.IterateHuntResults(hunt_id, allow_stale=True)
     return results, description
 
   def Handle(
@@ -1162,14 +1244,15 @@ class ApiGetHuntFileHandler(api_call_handler_base.ApiCallHandler):
         str(args.client_id), path_type, components
     )
 
-    results = data_store.REL_DB.ReadHuntResults(
-        str(args.hunt_id),
-        offset=0,
-        count=self.MAX_RECORDS_TO_CHECK,
-        with_timestamp=rdfvalue.RDFDatetime.FromMicrosecondsSinceEpoch(
-            args.timestamp
-        ),
-    )
+    with db.AllowStaleReads():
+      results = data_store.REL_DB.ReadHuntResults(
+          str(args.hunt_id),
+          offset=0,
+          count=self.MAX_RECORDS_TO_CHECK,
+          with_timestamp=rdfvalue.RDFDatetime.FromMicrosecondsSinceEpoch(
+              args.timestamp
+          ),
+      )
     for item in results:
       try:
         client_path = export.FlowResultToClientPath(item)
@@ -1451,6 +1534,7 @@ class ApiModifyHuntHandler(api_call_handler_base.ApiCallHandler):
           kw_args["duration"] = rdfvalue.DurationSeconds(args.duration)
 
         data_store.REL_DB.UpdateHuntObject(hunt_id, **kw_args)
+        hunt.InvalidateCachedHuntObject(hunt_id)
         hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
     except db.UnknownHuntError:
       raise HuntNotFoundError(
@@ -1547,21 +1631,12 @@ class ApiGetExportedHuntResultsHandler(api_call_handler_base.ApiCallHandler):
         type_url: str,
     ) -> Iterator[flows_pb2.FlowResult]:
       """Fetches all hunt results of a given type."""
-      offset = 0
-      while True:
-        results = data_store.REL_DB.ReadHuntResults(
-            hunt_id,
-            offset=offset,
-            count=self._RESULTS_PAGE_SIZE,
-            with_proto_type_url=type_url,
-        )
-
-        if not results:
-          break
-
-        yield from results
-
-        offset += self._RESULTS_PAGE_SIZE
+      yield from data_store.REL_DB.IterateHuntResults(
+          hunt_id,
+          with_proto_type_url=type_url,
+          batch_size=self._RESULTS_PAGE_SIZE,
+          allow_stale=True,
+      )
 
     content_generator = instant_output_plugin.GetExportedFlowResults(
         plugin, list(type_url_counts.keys()), FetchHuntResultsByTypeUrl
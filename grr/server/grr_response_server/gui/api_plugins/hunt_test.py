@@ -6,6 +6,7 @@ import io
 import os
 import tarfile
 from typing import Callable, Iterable, Iterator
+from unittest import mock
 import zipfile
 
 from absl import app
@@ -19,6 +20,7 @@ from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import config as rdf_config
 from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
 from grr_response_core.lib.rdfvalues import test_base as rdf_test_base
+from grr_response_core.lib.util import gzchunked
 from grr_response_proto import flows_pb2
 from grr_response_proto import hunts_pb2
 from grr_response_proto import jobs_pb2
@@ -929,6 +931,58 @@ class ApiListHuntResultsHandlerTest(
     self.assertEqual(result.total_count, 5)
 
 
+class ApiStreamHuntResultsHandlerTest(
+    api_test_lib.ApiCallHandlerTest, hunt_test_lib.StandardHuntTestMixin
+):
+  """Test for ApiStreamHuntResultsHandler."""
+
+  def setUp(self):
+    super().setUp()
+
+    self.handler = hunt_plugin.ApiStreamHuntResultsHandler()
+
+  def _ReadResults(self, hunt_id):
+    result = self.handler.Handle(
+        api_hunt_pb2.ApiStreamHuntResultsArgs(hunt_id=hunt_id),
+        context=self.context,
+    )
+
+    items = []
+    for data in gzchunked.Deserialize(result.GenerateContent()):
+      items.append(api_hunt_pb2.ApiHuntResult.FromString(data))
+    return items
+
+  def testStreamsAllResultsOfAllClients(self):
+    hunt_id = self.StartHunt(description="the hunt")
+
+    client_ids = self.SetupClients(5)
+    for client_id in client_ids:
+      self.AddResultsToHunt(
+          hunt_id,
+          client_id,
+          [
+              rdf_file_finder.CollectFilesByKnownPathResult(),
+              rdf_file_finder.FileFinderResult(),
+          ],
+      )
+
+    items = self._ReadResults(hunt_id)
+    self.assertCountEqual(
+        [r.payload.TypeName() for r in items],
+        [
+            flows_pb2.CollectFilesByKnownPathResult.DESCRIPTOR.full_name,
+            flows_pb2.FileFinderResult.DESCRIPTOR.full_name,
+        ]
+        * 5,
+    )
+    self.assertCountEqual({r.client_id for r in items}, client_ids)
+
+  def testStreamsNothingForHuntWithoutResults(self):
+    hunt_id = self.StartHunt(description="the hunt")
+
+    self.assertEmpty(self._ReadResults(hunt_id))
+
+
 class ApiCountHuntResultsHandlerTest(
     api_test_lib.ApiCallHandlerTest, hunt_test_lib.StandardHuntTestMixin
 ):
@@ -1523,6 +1577,78 @@ class ListHuntErrorsHandlerTest(absltest.TestCase):
     self.assertEqual(results.items[0].log_message, "ERROR_2")
 
 
+class ApiGetHuntClientCompletionStatsHandlerTest(
+    api_test_lib.ApiCallHandlerTest,
+    hunt_test_lib.StandardHuntTestMixin,
+):
+
+  def setUp(self):
+    super().setUp()
+    self.handler = hunt_plugin.ApiGetHuntClientCompletionStatsHandler()
+
+    cache_patcher = mock.patch.object(
+        hunt_plugin.ApiGetHuntClientCompletionStatsHandler, "_cache", None
+    )
+    cache_patcher.start()
+    self.addCleanup(cache_patcher.stop)
+
+  def _InitializeHuntFlow(self, rel_db: db.Database, hunt_id: str) -> None:
+    client_id = db_test_utils.InitializeClient(rel_db)
+    db_test_utils.InitializeFlow(
+        rel_db,
+        client_id=client_id,
+        flow_id=hunt_id,
+        parent_hunt_id=hunt_id,
+        flow_state=rdf_flow_objects.Flow.FlowState.FINISHED,
+    )
+
+  @db_test_lib.WithDatabase
+  def testReturnsEmptyResultForHuntWithoutFlows(self, rel_db: db.Database):
+    hunt_id = db_test_utils.InitializeHunt(rel_db)
+
+    result = self.handler.Handle(
+        api_hunt_pb2.ApiGetHuntClientCompletionStatsArgs(hunt_id=hunt_id),
+        context=self.context,
+    )
+    self.assertEmpty(result.start_points)
+    self.assertEmpty(result.complete_points)
+
+  @db_test_lib.WithDatabase
+  def testReturnsCumulativeCounts(self, rel_db: db.Database):
+    hunt_id = db_test_utils.InitializeHunt(rel_db)
+    for _ in range(3):
+      self._InitializeHuntFlow(rel_db, hunt_id)
+
+    result = self.handler.Handle(
+        api_hunt_pb2.ApiGetHuntClientCompletionStatsArgs(hunt_id=hunt_id),
+        context=self.context,
+    )
+    self.assertLen(result.start_points, 100)
+    self.assertEqual(result.start_points[-1].y_value, 3)
+    self.assertEqual(result.complete_points[-1].y_value, 3)
+
+  @db_test_lib.WithDatabase
+  def testCachesResultUntilHuntFlowsChange(self, rel_db: db.Database):
+    hunt_id = db_test_utils.InitializeHunt(rel_db)
+    self._InitializeHuntFlow(rel_db, hunt_id)
+    args = api_hunt_pb2.ApiGetHuntClientCompletionStatsArgs(hunt_id=hunt_id)
+
+    with mock.patch.object(
+        rel_db,
+        "ReadHuntFlowsTimestamps",
+        wraps=rel_db.ReadHuntFlowsTimestamps,
+    ) as read_mock:
+      self.handler.Handle(args, context=self.context)
+      result = self.handler.Handle(args, context=self.context)
+      self.assertEqual(read_mock.call_count, 1)
+      self.assertEqual(result.start_points[-1].y_value, 1)
+
+      self._InitializeHuntFlow(rel_db, hunt_id)
+      result = self.handler.Handle(args, context=self.context)
+      self.assertEqual(read_mock.call_count, 2)
+      self.assertEqual(result.start_points[-1].y_value, 2)
+
+
 class TestHistogram(absltest.TestCase):
 
   def testHistogram(self):
@@ -10,6 +10,7 @@ from grr_response_core.lib.rdfvalues import osquery as rdf_osquery
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_proto.api import osquery_pb2 as api_osquery_pb2
 from grr_response_server import data_store
+from grr_response_server.databases import db
 from grr_response_server.flows.general import osquery
 from grr_response_server.gui import api_call_context
 from grr_response_server.gui import api_call_handler_base
@@ -75,12 +76,13 @@ def _FetchOsqueryResults(
   last_fetched_count = None
 
   while last_fetched_count != 0:
-    data_fetched = data_store.REL_DB.ReadFlowResults(
-        offset=next_to_fetch,
-        count=_RESULTS_TO_FETCH_AT_ONCE,
-        client_id=client_id,
-        flow_id=flow_id,
-    )
+    with db.AllowStaleReads():
+      data_fetched = data_store.REL_DB.ReadFlowResults(
+          offset=next_to_fetch,
+          count=_RESULTS_TO_FETCH_AT_ONCE,
+          client_id=client_id,
+          flow_id=flow_id,
+      )
 
     last_fetched_count = len(data_fetched)
     next_to_fetch += last_fetched_count
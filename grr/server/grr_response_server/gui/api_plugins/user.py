@@ -1031,9 +1031,10 @@ class ApiListClientApprovalsHandler(api_call_handler_base.ApiCallHandler):
         reverse=True,
     )
 
-    client_full_infos = data_store.REL_DB.MultiReadClientFullInfo(
-        [a.subject_id for a in approvals]
-    )
+    with db.AllowStaleReads():
+      client_full_infos = data_store.REL_DB.MultiReadClientFullInfo(
+          [a.subject_id for a in approvals]
+      )
 
     api_client_approvals = []
     for ar in approvals:
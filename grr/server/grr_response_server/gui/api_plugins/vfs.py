@@ -1034,13 +1034,13 @@ def _GetTimelineStatEntries(
   except db.UnknownPathError:
     return
 
+  with db.AllowStaleReads():
+    descendant_path_infos = data_store.REL_DB.ListDescendantPathInfos(
+        client_id, path_type, components
+    )
+
   path_infos = []
-  for path_info in itertools.chain(
-      [root_path_info],
-      data_store.REL_DB.ListDescendantPathInfos(
-          client_id, path_type, components
-      ),
-  ):
+  for path_info in itertools.chain([root_path_info], descendant_path_infos):
     # TODO(user): this is to keep the compatibility with current
     # AFF4 implementation. Check if this check is needed.
     if path_info.HasField("directory") and path_info.directory:
@@ -1355,9 +1355,11 @@ class ApiGetVfsFilesArchiveHandler(api_call_handler_base.ApiCallHandler):
     client_paths = []
     for start_path in start_paths:
       path_type, components = rdf_objects.ParseCategorizedPath(start_path)
-      for path_info in data_store.REL_DB.ListDescendantPathInfos(
-          client_id, path_type, components
-      ):
+      with db.AllowStaleReads():
+        path_infos = data_store.REL_DB.ListDescendantPathInfos(
+            client_id, path_type, components
+        )
+      for path_info in path_infos:
         if path_info.HasField("directory") and path_info.directory:
           continue
 
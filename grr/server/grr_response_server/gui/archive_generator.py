@@ -4,11 +4,12 @@
 import enum
 import io
 import os
-from typing import Callable, Dict, Iterable, Iterator, Optional
+from typing import Callable, Collection, Dict, Iterable, Iterator, Optional
 import zipfile
 
 import yaml
 
+from grr_response_core import config
 from grr_response_core.lib import utils
 from grr_response_core.lib.util import collection
 from grr_response_proto import flows_pb2
@@ -28,6 +29,17 @@ def _ClientPathToString(client_path: db.ClientPath, prefix: str = "") -> str:
   return os.path.join(prefix, client_path.client_id, client_path.vfs_path)
 
 
+def _StreamFilesChunks(
+    client_paths: Collection[db.ClientPath],
+) -> Iterator[file_store.StreamedFileChunk]:
+  """Streams contents of given files, reading blobs ahead of the writer."""
+  return file_store.StreamFilesChunks(
+      client_paths,
+      read_threads=config.CONFIG["AdminUI.archive_read_threads"],
+      max_bytes_in_flight=config.CONFIG["AdminUI.archive_max_bytes_in_flight"],
+  )
+
+
 class ArchiveFormat(enum.Enum):
   ZIP = 1
   TAR_GZ = 2
@@ -187,7 +199,7 @@ class CollectionArchiveGenerator:
         client_ids.add(client_path.client_id)
         client_paths.add(client_path)
 
-      for chunk in file_store.StreamFilesChunks(client_paths):
+      for chunk in _StreamFilesChunks(client_paths):
         self.processed_files.add(chunk.client_path)
         for output in self._WriteFileChunk(chunk=chunk):
           yield output
@@ -197,7 +209,8 @@ class CollectionArchiveGenerator:
       )
 
     if client_ids:
-      client_infos = data_store.REL_DB.MultiReadClientFullInfo(client_ids)
+      with db.AllowStaleReads():
+        client_infos = data_store.REL_DB.MultiReadClientFullInfo(client_ids)
       for client_id, client_info in client_infos.items():
         client = models_clients.ApiClientFromClientFullInfo(
             client_id, client_info
@@ -340,9 +353,7 @@ class FlowArchiveGenerator:
         archive_paths_by_id[mapping.client_path.path_id] = mapping.archive_path
 
       processed_in_batch = set()
-      for chunk in file_store.StreamFilesChunks(
-          [m.client_path for m in mappings_batch]
-      ):
+      for chunk in _StreamFilesChunks([m.client_path for m in mappings_batch]):
         processed_in_batch.add(chunk.client_path.path_id)
         processed_files[chunk.client_path.vfs_path] = archive_paths_by_id[
             chunk.client_path.path_id
@@ -2,6 +2,8 @@
 """A registry of all new style well known flows."""
 
 from grr_response_server import foreman
+from grr_response_server import hunt
+from grr_response_server import hunt_output_plugins
 from grr_response_server.flows.general import administrative
 from grr_response_server.flows.general import transfer
 
@@ -10,6 +12,8 @@ message_handlers = [
     administrative.ClientStartupHandler,
     administrative.ClientStatsHandler,
     foreman.ForemanMessageHandler,
+    hunt.HuntClientAssignmentHandler,
+    hunt_output_plugins.HuntOutputPluginsHandler,
     transfer.BlobHandler,
 ]
 
@@ -1,19 +1,25 @@
 #!/usr/bin/env python
 """REL_DB implementation of models_hunts."""
 
-from typing import Optional
+import logging
+import threading
+from typing import Optional, Sequence
 
+from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import registry
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import precondition
+from grr_response_core.lib.util import random
 from grr_response_proto import hunts_pb2
+from grr_response_proto import jobs_pb2
 from grr_response_proto import objects_pb2
 from grr_response_server import access_control
 from grr_response_server import data_store
 from grr_response_server import flow
 from grr_response_server import foreman_rules
+from grr_response_server import message_handlers
 from grr_response_server import mig_foreman_rules
 from grr_response_server import notification
 from grr_response_server import output_plugin_registry
@@ -21,7 +27,9 @@ from grr_response_server.models import hunts as models_hunts
 from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
 from grr_response_server.rdfvalues import mig_flow_runner
 from grr_response_server.rdfvalues import mig_hunt_objects
+from grr_response_server.rdfvalues import mig_objects
 from grr_response_server.rdfvalues import mig_output_plugin
+from grr_response_server.rdfvalues import objects as rdf_objects
 
 
 MIN_CLIENTS_FOR_AVERAGE_THRESHOLDS = 1000
@@ -105,10 +113,111 @@ def HuntURNFromID(hunt_id):
   return rdfvalue.RDFURN(f"aff4:/hunts/H:{hunt_id}")
 
 
+_HUNT_OBJECT_CACHE_MAX_AGE = rdfvalue.Duration.From(5, rdfvalue.SECONDS)
+_HUNT_OBJECT_CACHE_MAX_SIZE = 1000
+
+
+class _HuntObjectCache:
+  """A process-wide cache of hunt objects.
+
+  Every hunt has a version that is bumped whenever the hunt is invalidated. A
+  hunt object read from the database is only cached if the version of its hunt
+  did not change in the meantime, so that a concurrent update can not be
+  overwritten by a stale read.
+
+  Updates done by other processes become visible once cached entries expire.
+  """
+
+  def __init__(self, max_age: rdfvalue.Duration, max_size: int) -> None:
+    self._max_age = max_age
+    self._max_size = max_size
+    self._lock = threading.Lock()
+    self._entries: dict[
+        str, tuple[rdfvalue.RDFDatetime, rdf_hunt_objects.Hunt]
+    ] = {}
+    self._versions: dict[str, int] = {}
+
+  def Get(self, hunt_id: str) -> rdf_hunt_objects.Hunt:
+    """Returns a hunt object, reading it from the database if needed."""
+    now = rdfvalue.RDFDatetime.Now()
+
+    with self._lock:
+      # Tests turn off all time-based caching with this flag.
+      if not cache.WITH_LIMITED_CALL_FREQUENCY_PASS_THROUGH:
+        try:
+          timestamp, hunt_obj = self._entries[hunt_id]
+          if timestamp <= now < timestamp + self._max_age:
+            return hunt_obj
+        except KeyError:
+          pass
+      version = self._versions.get(hunt_id, 0)
+
+    hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
+    hunt_obj = mig_hunt_objects.ToRDFHunt(hunt_obj)
+
+    with self._lock:
+      if self._versions.get(hunt_id, 0) == version:
+        if len(self._entries) >= self._max_size:
+          self._entries.clear()
+        self._entries[hunt_id] = (now, hunt_obj)
+
+    return hunt_obj
+
+  def Invalidate(self, hunt_id: str) -> None:
+    with self._lock:
+      self._versions[hunt_id] = self._versions.get(hunt_id, 0) + 1
+      self._entries.pop(hunt_id, None)
+
+
+_hunt_object_cache = _HuntObjectCache(
+    _HUNT_OBJECT_CACHE_MAX_AGE, _HUNT_OBJECT_CACHE_MAX_SIZE
+)
+
+
+def ReadCachedHuntObject(hunt_id: str) -> rdf_hunt_objects.Hunt:
+  """Reads a hunt object, possibly returning a recently cached one.
+
+  Hunt objects can be up to a few seconds stale if they are updated by other
+  processes. The returned object is shared and must not be modified.
+
+  Args:
+    hunt_id: Id of the hunt to read.
+
+  Returns:
+    The hunt object.
+
+  Raises:
+    db.UnknownHuntError: If the hunt does not exist.
+  """
+  return _hunt_object_cache.Get(hunt_id)
+
+
+def InvalidateCachedHuntObject(hunt_id: str) -> None:
+  """Makes sure that the next read of the given hunt hits the database."""
+  _hunt_object_cache.Invalidate(hunt_id)
+
+
+def _StopHuntIfNotStopped(
+    hunt_id: str,
+    hunt_state_reason: hunts_pb2.Hunt.HuntStateReason.ValueType,
+    reason_comment: str,
+) -> None:
+  """Stops a hunt, unless it was already stopped by someone else."""
+  # Limit checks work on cached hunt objects, so the hunt might have already
+  # been stopped or completed in the meantime.
+  try:
+    StopHunt(
+        hunt_id,
+        hunt_state_reason=hunt_state_reason,
+        reason_comment=reason_comment,
+    )
+  except OnlyStartedOrPausedHuntCanBeStoppedError:
+    pass
+
+
 def StopHuntIfCrashLimitExceeded(hunt_id):
   """Stops the hunt if number of crashes exceeds the limit."""
-  hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
-  hunt_obj = mig_hunt_objects.ToRDFHunt(hunt_obj)
+  hunt_obj = ReadCachedHuntObject(hunt_id)
 
   # Do nothing if the hunt is already stopped.
   if hunt_obj.hunt_state == rdf_hunt_objects.Hunt.HuntState.STOPPED:
@@ -124,7 +233,7 @@ def StopHuntIfCrashLimitExceeded(hunt_id):
           f" {hunt_obj.crash_limit} and was stopped."
       )
       hunt_state_reason = hunts_pb2.Hunt.HuntStateReason.TOTAL_CRASHES_EXCEEDED
-      StopHunt(
+      _StopHuntIfNotStopped(
           hunt_obj.hunt_id,
           hunt_state_reason=hunt_state_reason,
           reason_comment=reason,
@@ -139,8 +248,7 @@ _TIME_BETWEEN_STOP_CHECKS = rdfvalue.Duration.From(30, rdfvalue.SECONDS)
 @cache.WithLimitedCallFrequency(_TIME_BETWEEN_STOP_CHECKS)
 def StopHuntIfCPUOrNetworkLimitsExceeded(hunt_id):
   """Stops the hunt if average limites are exceeded."""
-  hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
-  hunt_obj = mig_hunt_objects.ToRDFHunt(hunt_obj)
+  hunt_obj = ReadCachedHuntObject(hunt_id)
 
   # Do nothing if the hunt is already stopped.
   if hunt_obj.hunt_state == rdf_hunt_objects.Hunt.HuntState.STOPPED:
@@ -159,7 +267,7 @@ def StopHuntIfCPUOrNetworkLimitsExceeded(hunt_id):
         f" {hunt_obj.total_network_bytes_limit} and was stopped."
     )
     hunt_state_reason = hunts_pb2.Hunt.HuntStateReason.TOTAL_NETWORK_EXCEEDED
-    StopHunt(
+    _StopHuntIfNotStopped(
         hunt_obj.hunt_id,
         hunt_state_reason=hunt_state_reason,
         reason_comment=reason,
@@ -181,7 +289,7 @@ def StopHuntIfCPUOrNetworkLimitsExceeded(hunt_id):
           f"limit of {hunt_obj.avg_results_per_client_limit} and was stopped."
       )
       hunt_state_reason = hunts_pb2.Hunt.HuntStateReason.AVG_RESULTS_EXCEEDED
-      StopHunt(
+      _StopHuntIfNotStopped(
           hunt_obj.hunt_id,
           hunt_state_reason=hunt_state_reason,
           reason_comment=reason,
@@ -200,7 +308,7 @@ def StopHuntIfCPUOrNetworkLimitsExceeded(hunt_id):
           " stopped."
       )
       hunt_state_reason = hunts_pb2.Hunt.HuntStateReason.AVG_CPU_EXCEEDED
-      StopHunt(
+      _StopHuntIfNotStopped(
           hunt_obj.hunt_id,
           hunt_state_reason=hunt_state_reason,
           reason_comment=reason,
@@ -223,7 +331,7 @@ def StopHuntIfCPUOrNetworkLimitsExceeded(hunt_id):
           " was stopped."
       )
       hunt_state_reason = hunts_pb2.Hunt.HuntStateReason.AVG_NETWORK_EXCEEDED
-      StopHunt(
+      _StopHuntIfNotStopped(
           hunt_obj.hunt_id,
           hunt_state_reason=hunt_state_reason,
           reason_comment=reason,
@@ -255,6 +363,7 @@ def CompleteHuntIfExpirationTimeReached(hunt_id: str) -> rdf_hunt_objects.Hunt:
     data_store.REL_DB.UpdateHuntObject(
         hunt_obj.hunt_id, hunt_state=hunts_pb2.Hunt.HuntState.COMPLETED
     )
+    InvalidateCachedHuntObject(hunt_obj.hunt_id)
     hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_obj.hunt_id)
     hunt_obj = mig_hunt_objects.ToRDFHunt(hunt_obj)
 
@@ -355,8 +464,195 @@ def _ScheduleGenericHunt(hunt_obj: rdf_hunt_objects.Hunt):
   data_store.REL_DB.WriteForemanRule(proto_foreman_condition)
 
 
-def StartHunt(hunt_id) -> rdf_hunt_objects.Hunt:
-  """Starts a hunt with a given id."""
+def _CreateClientAssignmentRequest(
+    hunt_id: str,
+    client_ids: Sequence[str] = (),
+) -> objects_pb2.MessageHandlerRequest:
+  """Creates a request to assign clients to a started hunt.
+
+  Args:
+    hunt_id: Id of the hunt to assign clients to.
+    client_ids: Clients to assign. If empty, all online clients are split into
+      batches and a separate request is created for each of them.
+
+  Returns:
+    A message handler request to be picked up by `HuntClientAssignmentHandler`.
+  """
+  assignment = hunts_pb2.HuntClientAssignment(
+      hunt_id=hunt_id, client_ids=client_ids
+  )
+
+  request = objects_pb2.MessageHandlerRequest()
+  request.handler_name = HuntClientAssignmentHandler.handler_name
+  request.request_id = random.Id64()
+  request.request.CopyFrom(
+      jobs_pb2.EmbeddedRDFValue(
+          name=rdf_hunt_objects.HuntClientAssignment.__name__,
+          data=assignment.SerializeToString(),
+      )
+  )
+  return request
+
+
+def _OnlineClientsMinLastPing() -> rdfvalue.RDFDatetime:
+  return (
+      rdfvalue.RDFDatetime.Now()
+      - config.CONFIG["Hunt.assign_clients_on_start_online_threshold"]
+  )
+
+
+def _ScheduleClientAssignment(hunt_id: str) -> None:
+  """Splits online clients into batches to be assigned to a hunt."""
+  batch_size = config.CONFIG["Hunt.assign_clients_on_start_batch_size"]
+
+  requests = [
+      _CreateClientAssignmentRequest(hunt_id, client_ids)
+      for client_ids in data_store.REL_DB.ReadAllClientIDs(
+          min_last_ping=_OnlineClientsMinLastPing(), batch_size=batch_size
+      )
+  ]
+  if requests:
+    data_store.REL_DB.WriteMessageHandlerRequests(requests)
+
+  logging.info(
+      "Scheduled assignment of online clients to hunt %s in %d batches.",
+      hunt_id,
+      len(requests),
+  )
+
+
+def _AssignClients(hunt_id: str, client_ids: Sequence[str]) -> int:
+  """Starts a hunt on those of the given clients matching its client rule set.
+
+  Args:
+    hunt_id: Id of the hunt to start on the clients.
+    client_ids: Clients to start the hunt on.
+
+  Returns:
+    Number of clients the hunt was started on.
+  """
+  hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
+  hunt_obj = mig_hunt_objects.ToRDFHunt(hunt_obj)
+  if hunt_obj.hunt_state != hunt_obj.HuntState.STARTED:
+    return 0
+
+  infos = data_store.REL_DB.MultiReadClientFullInfo(
+      client_ids, min_last_ping=_OnlineClientsMinLastPing()
+  )
+  matching_client_ids = [
+      client_id
+      for client_id in client_ids
+      if client_id in infos
+      and hunt_obj.client_rule_set.Evaluate(
+          mig_objects.ToRDFClientFullInfo(infos[client_id])
+      )
+  ]
+
+  # The foreman and other assignment batches may be starting the hunt on
+  # clients at the same time, so the number of hunt clients is taken from the
+  # database instead of being counted locally.
+  num_clients = data_store.REL_DB.CountHuntFlows(hunt_id)
+
+  num_assigned = 0
+  for client_id in matching_client_ids:
+    if hunt_obj.client_limit and num_clients >= hunt_obj.client_limit:
+      break
+
+    # Flows are spread according to the client rate the same way the foreman
+    # does it.
+    if hunt_obj.client_rate > 0:
+      num_clients_diff = max(0, num_clients - hunt_obj.num_clients_at_start_time)
+      next_client_due_msecs = int(
+          num_clients_diff / hunt_obj.client_rate * 60e6
+      )
+      start_at = rdfvalue.RDFDatetime.FromMicrosecondsSinceEpoch(
+          hunt_obj.last_start_time.AsMicrosecondsSinceEpoch()
+          + next_client_due_msecs
+      )
+    else:
+      start_at = None
+
+    try:
+      _StartHuntFlow(hunt_obj, client_id, start_at=start_at)
+    except flow.CanNotStartFlowWithExistingIdError:
+      continue
+    except Exception as e:  # pylint: disable=broad-except
+      logging.exception(
+          "Unable to start hunt %s on client %s: %s", hunt_id, client_id, e
+      )
+      continue
+    num_clients += 1
+    num_assigned += 1
+
+  if (
+      hunt_obj.client_limit
+      and data_store.REL_DB.CountHuntFlows(hunt_id) >= hunt_obj.client_limit
+  ):
+    try:
+      PauseHunt(
+          hunt_id,
+          hunt_state_reason=rdf_hunt_objects.Hunt.HuntStateReason.TOTAL_CLIENTS_EXCEEDED,
+      )
+    except OnlyStartedHuntCanBePausedError:
+      pass
+
+  logging.info(
+      "Hunt %s started on %d out of %d clients of an assignment batch.",
+      hunt_id,
+      num_assigned,
+      len(client_ids),
+  )
+  return num_assigned
+
+
+class HuntClientAssignmentHandler(message_handlers.MessageHandler):
+  """Starts started hunts on online clients matching their client rule sets.
+
+  A request without client ids splits all online clients into batches, each
+  of which is then assigned to the hunt by a request of its own. This keeps
+  the (potentially long) scan of the client table off the request path and
+  lets multiple workers process the batches.
+  """
+
+  handler_name = "HuntClientAssignmentHandler"
+
+  def ProcessMessages(
+      self,
+      msgs: Sequence[rdf_objects.MessageHandlerRequest],
+  ) -> None:
+    for msg in msgs:
+      assignment = msg.request.payload
+      try:
+        if assignment.client_ids:
+          _AssignClients(assignment.hunt_id, list(assignment.client_ids))
+        else:
+          _ScheduleClientAssignment(assignment.hunt_id)
+      except Exception as e:  # pylint: disable=broad-except
+        logging.exception(
+            "Error while assigning clients to hunt %s: %s",
+            assignment.hunt_id,
+            e,
+        )
+
+
+def StartHunt(
+    hunt_id,
+    assign_clients: Optional[bool] = None,
+) -> rdf_hunt_objects.Hunt:
+  """Starts a hunt with a given id.
+
+  Args:
+    hunt_id: Id of the hunt to start.
+    assign_clients: If True, the hunt's client rule set is evaluated against all
+      online clients by a worker and the hunt is started on the matching ones
+      right away, instead of waiting for each of them to check in with the
+      foreman. Defaults to the `Hunt.assign_clients_on_start` config option.
+
+  Returns:
+    The started hunt.
+  """
+  if assign_clients is None:
+    assign_clients = config.CONFIG["Hunt.assign_clients_on_start"]
 
   hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
   hunt_obj = mig_hunt_objects.ToRDFHunt(hunt_obj)
@@ -371,11 +667,16 @@ def StartHunt(hunt_id) -> rdf_hunt_objects.Hunt:
       start_time=rdfvalue.RDFDatetime.Now(),
       num_clients_at_start_time=num_hunt_clients,
   )
+  InvalidateCachedHuntObject(hunt_id)
   hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
   hunt_obj = mig_hunt_objects.ToRDFHunt(hunt_obj)
 
   if hunt_obj.args.hunt_type == hunt_obj.args.HuntType.STANDARD:
     _ScheduleGenericHunt(hunt_obj)
+    if assign_clients:
+      data_store.REL_DB.WriteMessageHandlerRequests(
+          [_CreateClientAssignmentRequest(hunt_id)]
+      )
   else:
     raise UnknownHuntTypeError(
         f"Invalid hunt type for hunt {hunt_id}: {hunt_obj.args.hunt_type}"
@@ -402,6 +703,7 @@ def PauseHunt(
       hunt_state_reason=hunt_state_reason,
       hunt_state_comment=reason,
   )
+  InvalidateCachedHuntObject(hunt_id)
   data_store.REL_DB.RemoveForemanRule(hunt_id=hunt_obj.hunt_id)
 
   hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
@@ -432,6 +734,7 @@ def StopHunt(
       hunt_state_reason=hunt_state_reason,
       hunt_state_comment=reason_comment,
   )
+  InvalidateCachedHuntObject(hunt_id)
   data_store.REL_DB.RemoveForemanRule(hunt_id=hunt_obj.hunt_id)
 
   # TODO: Stop matching on string (comment).
@@ -475,6 +778,7 @@ def UpdateHunt(
       client_rate=client_rate,
       duration=duration,
   )
+  InvalidateCachedHuntObject(hunt_id)
   hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
   hunt_obj = mig_hunt_objects.ToRDFHunt(hunt_obj)
   return hunt_obj
@@ -488,22 +792,50 @@ def _GetNumClients(hunt_id):
   return data_store.REL_DB.CountHuntFlows(hunt_id)
 
 
+def _StartHuntFlow(
+    hunt_obj: rdf_hunt_objects.Hunt,
+    client_id: str,
+    start_at: Optional[rdfvalue.RDFDatetime] = None,
+) -> None:
+  """Starts a flow of a standard hunt on a given client."""
+  hunt_args = hunt_obj.args.standard
+
+  flow_cls = registry.FlowRegistry.FlowClassByName(hunt_args.flow_name)
+  if hunt_args.HasField("flow_args"):
+    flow_args = hunt_args.flow_args.Unpack(flow_cls.args_type)
+  else:
+    flow_args = None
+
+  flow.StartFlow(
+      client_id=client_id,
+      creator=hunt_obj.creator,
+      cpu_limit=hunt_obj.per_client_cpu_limit,
+      network_bytes_limit=hunt_obj.per_client_network_bytes_limit,
+      flow_cls=flow_cls,
+      flow_args=flow_args,
+      start_at=start_at,
+      output_plugins=hunt_obj.output_plugins,
+      parent=flow.FlowParent.FromHuntID(hunt_obj.hunt_id),
+  )
+
+
 def StartHuntFlowOnClient(client_id, hunt_id):
   """Starts a flow corresponding to a given hunt on a given client."""
+  # TODO(user): Flows started here flush their Fleetspeak messages one client
+  # at a time. Batching the sends of many clients is not implemented yet.
 
-  hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
+  hunt_obj = ReadCachedHuntObject(hunt_id)
 
   # There may be a little race between foreman rules being removed and
   # foreman scheduling a client on an (already) paused hunt. Making sure
   # we don't lose clients in such a race by accepting clients for paused
   # hunts.
-  if not models_hunts.IsHuntSuitableForFlowProcessing(hunt_obj.hunt_state):
+  if not models_hunts.IsHuntSuitableForFlowProcessing(
+      int(hunt_obj.hunt_state)
+  ):
     return
 
-  hunt_obj = mig_hunt_objects.ToRDFHunt(hunt_obj)
   if hunt_obj.args.hunt_type == hunt_obj.args.HuntType.STANDARD:
-    hunt_args = hunt_obj.args.standard
-
     if hunt_obj.client_rate > 0:
       # Given that we use caching in _GetNumClients and hunt_obj may be updated
       # in another process, we have to account for cases where num_clients_diff
@@ -526,23 +858,7 @@ def StartHuntFlowOnClient(client_id, hunt_id):
     # TODO(user): remove client_rate support when AFF4 is gone.
     # In REL_DB always work as if client rate is 0.
 
-    flow_cls = registry.FlowRegistry.FlowClassByName(hunt_args.flow_name)
-    if hunt_args.HasField("flow_args"):
-      flow_args = hunt_args.flow_args.Unpack(flow_cls.args_type)
-    else:
-      flow_args = None
-
-    flow.StartFlow(
-        client_id=client_id,
-        creator=hunt_obj.creator,
-        cpu_limit=hunt_obj.per_client_cpu_limit,
-        network_bytes_limit=hunt_obj.per_client_network_bytes_limit,
-        flow_cls=flow_cls,
-        flow_args=flow_args,
-        start_at=start_at,
-        output_plugins=hunt_obj.output_plugins,
-        parent=flow.FlowParent.FromHuntID(hunt_id),
-    )
+    _StartHuntFlow(hunt_obj, client_id, start_at=start_at)
 
     if hunt_obj.client_limit:
       if _GetNumClients(hunt_obj.hunt_id) >= hunt_obj.client_limit:
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""Asynchronous processing of hunt results with output plugins."""
+
+import logging
+from typing import Sequence
+
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.rdfvalues import mig_protodict
+from grr_response_core.lib.util import collection
+from grr_response_core.lib.util import random
+from grr_response_core.stats import metrics
+from grr_response_proto import flows_pb2
+from grr_response_proto import jobs_pb2
+from grr_response_proto import objects_pb2
+from grr_response_server import data_store
+from grr_response_server import message_handlers
+from grr_response_server import output_plugin as output_plugin_lib
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
+from grr_response_server.rdfvalues import flow_runner as rdf_flow_runner
+from grr_response_server.rdfvalues import mig_flow_runner
+from grr_response_server.rdfvalues import objects as rdf_objects
+
+
+HUNT_OUTPUT_PLUGIN_ERRORS = metrics.Counter(
+    "hunt_output_plugin_errors", fields=[("plugin", str)]
+)
+HUNT_RESULTS_RAN_THROUGH_PLUGIN = metrics.Counter(
+    "hunt_results_ran_through_plugin", fields=[("plugin", str)]
+)
+# Time (in seconds) between queueing hunt results and running them through
+# the hunt's output plugins.
+HUNT_OUTPUT_PLUGINS_LAG = metrics.Event(
+    "hunt_output_plugins_lag",
+    bins=[0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600],
+)
+# Number of hunt results run through output plugins in a single batch.
+HUNT_OUTPUT_PLUGINS_BATCH_SIZE = metrics.Event(
+    "hunt_output_plugins_batch_size",
+    bins=[1, 10, 100, 1000, 10000, 100000],
+)
+
+
+def CreateRequest(
+    client_id: str,
+    results: Sequence[flows_pb2.FlowResult],
+) -> objects_pb2.MessageHandlerRequest:
+  """Creates a request to run the given hunt results through output plugins.
+
+  Args:
+    client_id: Id of the client the results were collected from.
+    results: Results of a hunt flow to process.
+
+  Returns:
+    A message handler request to be picked up by `HuntOutputPluginsHandler`.
+  """
+  batch = flows_pb2.FlowResultBatch(results=results)
+
+  request = objects_pb2.MessageHandlerRequest()
+  request.client_id = client_id
+  request.handler_name = HuntOutputPluginsHandler.handler_name
+  request.request_id = random.Id64()
+  request.request.CopyFrom(
+      jobs_pb2.EmbeddedRDFValue(
+          name=rdf_flow_objects.FlowResultBatch.__name__,
+          data=batch.SerializeToString(),
+      )
+  )
+  return request
+
+
+class HuntOutputPluginsHandler(message_handlers.MessageHandler):
+  """Runs queued hunt results through hunt output plugins.
+
+  Results of all leased requests are grouped by hunt, so that every output
+  plugin of a hunt processes all of them at once and its state is updated
+  only once per batch.
+  """
+
+  handler_name = "HuntOutputPluginsHandler"
+
+  def ProcessMessages(
+      self,
+      msgs: Sequence[rdf_objects.MessageHandlerRequest],
+  ) -> None:
+    now = rdfvalue.RDFDatetime.Now()
+
+    results = []
+    for msg in msgs:
+      if msg.HasField("timestamp"):
+        HUNT_OUTPUT_PLUGINS_LAG.RecordEvent(
+            (now - msg.timestamp).ToFractional(rdfvalue.SECONDS)
+        )
+      results.extend(msg.request.payload.results)
+
+    for hunt_id, hunt_results in collection.Group(
+        results, lambda r: r.hunt_id
+    ).items():
+      try:
+        _ProcessHuntResults(hunt_id, hunt_results)
+      except Exception as e:  # pylint: disable=broad-except
+        logging.exception(
+            "Error while processing %d results of hunt %s: %s",
+            len(hunt_results),
+            hunt_id,
+            e,
+        )
+
+
+def _ProcessHuntResults(
+    hunt_id: str,
+    results: Sequence[rdf_flow_objects.FlowResult],
+) -> None:
+  """Runs results of a single hunt through all of its output plugins."""
+  HUNT_OUTPUT_PLUGINS_BATCH_SIZE.RecordEvent(len(results))
+
+  plugin_states = [
+      mig_flow_runner.ToRDFOutputPluginState(s)
+      for s in data_store.REL_DB.ReadHuntOutputPluginsStates(hunt_id)
+  ]
+  results_by_flow = collection.Group(
+      results, lambda r: (r.client_id, r.flow_id)
+  )
+
+  for index, plugin_state in enumerate(plugin_states):
+    plugin = None
+    error = None
+    try:
+      plugin = _RunPlugin(hunt_id, plugin_state, results)
+    except Exception as e:  # pylint: disable=broad-except
+      logging.exception(
+          "Plugin %s failed to process %d results of hunt %s.",
+          plugin_state.plugin_descriptor,
+          len(results),
+          hunt_id,
+      )
+      error = e
+
+    if error is None:
+      log_entry_type = flows_pb2.FlowOutputPluginLogEntry.LogEntryType.LOG
+    else:
+      log_entry_type = flows_pb2.FlowOutputPluginLogEntry.LogEntryType.ERROR
+
+    log_entries = []
+    for (client_id, flow_id), flow_results in results_by_flow.items():
+      if error is None:
+        message = "Processed %d replies." % len(flow_results)
+      else:
+        message = "Error while processing %d replies: %s" % (
+            len(flow_results),
+            error,
+        )
+
+      log_entries.append(
+          flows_pb2.FlowOutputPluginLogEntry(
+              client_id=client_id,
+              flow_id=flow_id,
+              hunt_id=hunt_id,
+              output_plugin_id=plugin_state.plugin_id,
+              log_entry_type=log_entry_type,
+              message=message,
+          )
+      )
+    data_store.REL_DB.WriteMultipleFlowOutputPluginLogEntries(log_entries)
+
+    plugin_name = plugin_state.plugin_descriptor.plugin_name
+    if error is not None:
+      HUNT_OUTPUT_PLUGIN_ERRORS.Increment(fields=[plugin_name])
+      continue
+
+    HUNT_RESULTS_RAN_THROUGH_PLUGIN.Increment(
+        len(results), fields=[plugin_name]
+    )
+
+    # Only do the REL_DB call if the plugin state has actually changed.
+    state = plugin_state.plugin_state.Copy()
+    plugin.UpdateState(state)
+    if state != plugin_state.plugin_state:
+
+      def UpdateFn(
+          current_state: jobs_pb2.AttributedDict,
+      ) -> jobs_pb2.AttributedDict:
+        state_rdf = mig_protodict.ToRDFAttributedDict(current_state)
+        plugin.UpdateState(state_rdf)  # pylint: disable=cell-var-from-loop
+        return mig_protodict.ToProtoAttributedDict(state_rdf)
+
+      data_store.REL_DB.UpdateHuntOutputPluginState(hunt_id, index, UpdateFn)
+
+
+def _RunPlugin(
+    hunt_id: str,
+    plugin_state: rdf_flow_runner.OutputPluginState,
+    results: Sequence[rdf_flow_objects.FlowResult],
+) -> output_plugin_lib.OutputPlugin:
+  """Runs results through a single output plugin and returns the plugin."""
+  plugin_descriptor = plugin_state.plugin_descriptor
+  plugin_cls = plugin_descriptor.GetPluginClass()
+  # Unlike when hunt results are processed inline by their flow (in which case
+  # the source is the flow's `long_flow_id`), a batch contains results of many
+  # hunt flows, so the source is the hunt. Results still carry the ids of the
+  # client and the flow they come from.
+  plugin = plugin_cls(
+      source_urn=f"hunts/{hunt_id}", args=plugin_descriptor.args
+  )
+
+  # The state read from the database is only used as a scratch copy, the
+  # actual update is done atomically with `UpdateHuntOutputPluginState`.
+  state = plugin_state.plugin_state.Copy()
+  plugin.ProcessResponses(state, results)
+  plugin.Flush(state)
+  return plugin
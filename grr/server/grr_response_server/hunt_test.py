@@ -12,8 +12,10 @@ from absl import app
 from google.protobuf import any_pb2
 from google.protobuf import message as message_pb2
 from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
+from grr_response_core.lib.rdfvalues import mig_protodict
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_proto import flows_pb2
 from grr_response_proto import hunts_pb2
@@ -24,8 +26,10 @@ from grr_response_server import flow_base
 from grr_response_server import foreman
 from grr_response_server import foreman_rules
 from grr_response_server import hunt
+from grr_response_server import hunt_output_plugins
 from grr_response_server import mig_foreman_rules
 from grr_response_server import output_plugin
+from grr_response_server import worker_lib
 from grr_response_server.flows.general import file_finder
 from grr_response_server.flows.general import processes
 from grr_response_server.output_plugins import test_plugins
@@ -254,6 +258,40 @@ class HuntTest(
     )
     self.assertEqual(hunt_obj2.hunt_state_comment, "not working")
 
+  @mock.patch.object(cache, "WITH_LIMITED_CALL_FREQUENCY_PASS_THROUGH", False)
+  def testReadCachedHuntObjectCachesHuntObjects(self):
+    hunt_id = self._CreateHunt(client_rate=0, client_limit=10)
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1000)):
+      hunt_obj = hunt.ReadCachedHuntObject(hunt_id)
+    self.assertEqual(hunt_obj.client_limit, 10)
+
+    # Bypassing `hunt` module, so that the cache is not invalidated.
+    data_store.REL_DB.UpdateHuntObject(hunt_id, client_limit=20)
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1001)):
+      hunt_obj = hunt.ReadCachedHuntObject(hunt_id)
+    self.assertEqual(hunt_obj.client_limit, 10)
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1010)):
+      hunt_obj = hunt.ReadCachedHuntObject(hunt_id)
+    self.assertEqual(hunt_obj.client_limit, 20)
+
+  @mock.patch.object(cache, "WITH_LIMITED_CALL_FREQUENCY_PASS_THROUGH", False)
+  def testReadCachedHuntObjectIsInvalidatedOnHuntStateChange(self):
+    hunt_id = self._CreateHunt(client_rate=0)
+
+    hunt_obj = hunt.ReadCachedHuntObject(hunt_id)
+    self.assertEqual(hunt_obj.hunt_state, hunt_obj.HuntState.STARTED)
+
+    hunt.PauseHunt(hunt_id)
+    hunt_obj = hunt.ReadCachedHuntObject(hunt_id)
+    self.assertEqual(hunt_obj.hunt_state, hunt_obj.HuntState.PAUSED)
+
+    hunt.StopHunt(hunt_id)
+    hunt_obj = hunt.ReadCachedHuntObject(hunt_id)
+    self.assertEqual(hunt_obj.hunt_state, hunt_obj.HuntState.STOPPED)
+
   def testHuntWithInvalidForemanRulesDoesNotStart(self):
     client_rule_set = foreman_rules.ForemanClientRuleSet(
         rules=[
@@ -411,6 +449,219 @@ class HuntTest(
       )
       self.assertLess(time_diff, rdfvalue.Duration.From(5, rdfvalue.SECONDS))
 
+  def _CreateHuntAndAssignClients(self, **kwargs):
+    hunt_obj = rdf_hunt_objects.Hunt(creator=self.test_username, **kwargs)
+    hunt_obj = mig_hunt_objects.ToProtoHunt(hunt_obj)
+    hunt.CreateHunt(hunt_obj)
+    hunt.StartHunt(hunt_obj.hunt_id, assign_clients=True)
+    self._ProcessClientAssignmentRequests()
+
+    return hunt_obj.hunt_id
+
+  def _ProcessClientAssignmentRequests(self):
+    while True:
+      requests = data_store.REL_DB.ReadMessageHandlerRequests()
+      if not requests:
+        break
+      worker_lib.ProcessMessageHandlerRequests(requests)
+
+  def testAssigningClientsOnStartIsLeftToWorkers(self):
+    client_id = self.SetupClient(0)
+
+    hunt_obj = rdf_hunt_objects.Hunt(
+        creator=self.test_username,
+        client_rule_set=foreman_rules.ForemanClientRuleSet(),
+        client_rate=0,
+        args=self.ClientFileFinderHuntArgs(),
+    )
+    hunt_obj = mig_hunt_objects.ToProtoHunt(hunt_obj)
+    hunt.CreateHunt(hunt_obj)
+    hunt.StartHunt(hunt_obj.hunt_id, assign_clients=True)
+
+    self.assertEmpty(data_store.REL_DB.ReadAllFlowObjects(client_id=client_id))
+    requests = data_store.REL_DB.ReadMessageHandlerRequests()
+    self.assertLen(requests, 1)
+    self.assertEqual(
+        requests[0].handler_name,
+        hunt.HuntClientAssignmentHandler.handler_name,
+    )
+
+    self._ProcessClientAssignmentRequests()
+
+    self.assertLen(data_store.REL_DB.ReadAllFlowObjects(client_id=client_id), 1)
+
+  def testAssigningClientsOnStartProcessesClientsInBatches(self):
+    client_ids = self.SetupClients(10)
+
+    with test_lib.ConfigOverrider(
+        {"Hunt.assign_clients_on_start_batch_size": 3}
+    ):
+      hunt_obj = rdf_hunt_objects.Hunt(
+          creator=self.test_username,
+          client_rule_set=foreman_rules.ForemanClientRuleSet(),
+          client_rate=0,
+          args=self.ClientFileFinderHuntArgs(),
+      )
+      hunt_obj = mig_hunt_objects.ToProtoHunt(hunt_obj)
+      hunt.CreateHunt(hunt_obj)
+      hunt.StartHunt(hunt_obj.hunt_id, assign_clients=True)
+
+      # The first request splits the clients into batches.
+      worker_lib.ProcessMessageHandlerRequests(
+          data_store.REL_DB.ReadMessageHandlerRequests()
+      )
+      self.assertLen(data_store.REL_DB.ReadMessageHandlerRequests(), 4)
+
+      self._ProcessClientAssignmentRequests()
+
+    for client_id in client_ids:
+      flows = data_store.REL_DB.ReadAllFlowObjects(client_id=client_id)
+      self.assertLen(flows, 1)
+
+  def testAssigningClientsOnStartSurvivesFailuresOnSingleClients(self):
+    client_ids = self.SetupClients(3)
+    failing_client_id = client_ids[1]
+
+    start_hunt_flow = hunt._StartHuntFlow
+
+    def StartHuntFlow(hunt_obj, client_id, start_at=None):
+      if client_id == failing_client_id:
+        raise RuntimeError("Something went wrong")
+      start_hunt_flow(hunt_obj, client_id, start_at=start_at)
+
+    with mock.patch.object(hunt, "_StartHuntFlow", StartHuntFlow):
+      self._CreateHuntAndAssignClients(
+          client_rule_set=foreman_rules.ForemanClientRuleSet(),
+          client_rate=0,
+          args=self.ClientFileFinderHuntArgs(),
+      )
+
+    for client_id in client_ids:
+      flows = data_store.REL_DB.ReadAllFlowObjects(client_id=client_id)
+      if client_id == failing_client_id:
+        self.assertEmpty(flows)
+      else:
+        self.assertLen(flows, 1)
+
+  def testAssigningClientsOnStartCountsClientsStartedConcurrently(self):
+    client_ids = self.SetupClients(10)
+
+    # Clients that the foreman starts the hunt on while the assignment is in
+    # progress have to be counted against the client limit.
+    count_hunt_flows = data_store.REL_DB.CountHuntFlows
+
+    def CountHuntFlows(*args, **kwargs):
+      return count_hunt_flows(*args, **kwargs) + 3
+
+    with mock.patch.object(
+        data_store.REL_DB, "CountHuntFlows", side_effect=CountHuntFlows
+    ):
+      hunt_id = self._CreateHuntAndAssignClients(
+          client_rule_set=foreman_rules.ForemanClientRuleSet(),
+          client_rate=0,
+          client_limit=5,
+          args=self.ClientFileFinderHuntArgs(),
+      )
+
+    num_flows = sum(
+        len(data_store.REL_DB.ReadAllFlowObjects(client_id=client_id))
+        for client_id in client_ids
+    )
+    self.assertEqual(num_flows, 2)
+
+    hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
+    self.assertEqual(hunt_obj.hunt_state, hunts_pb2.Hunt.HuntState.PAUSED)
+
+  def testAssigningClientsOnStartStartsHuntOnMatchingClients(self):
+    windows_client_id = self.SetupClient(0, system="Windows")
+    linux_client_id = self.SetupClient(1, system="Linux")
+
+    client_rule_set = foreman_rules.ForemanClientRuleSet(
+        rules=[
+            foreman_rules.ForemanClientRule(
+                rule_type=foreman_rules.ForemanClientRule.Type.OS,
+                os=foreman_rules.ForemanOsClientRule(os_windows=True),
+            )
+        ]
+    )
+    hunt_id = self._CreateHuntAndAssignClients(
+        client_rule_set=client_rule_set,
+        client_rate=0,
+        args=self.ClientFileFinderHuntArgs(),
+    )
+
+    flows = data_store.REL_DB.ReadAllFlowObjects(client_id=windows_client_id)
+    self.assertLen(flows, 1)
+    self.assertEqual(flows[0].parent_hunt_id, hunt_id)
+
+    flows = data_store.REL_DB.ReadAllFlowObjects(client_id=linux_client_id)
+    self.assertEmpty(flows)
+
+    # The foreman must not start the hunt on the same client again.
+    foreman_obj = foreman.Foreman()
+    foreman_obj.AssignTasksToClient(windows_client_id)
+
+    flows = data_store.REL_DB.ReadAllFlowObjects(client_id=windows_client_id)
+    self.assertLen(flows, 1)
+
+  def testAssigningClientsOnStartSkipsOfflineClients(self):
+    client_id = self.SetupClient(
+        0, ping=rdfvalue.RDFDatetime.Now() - rdfvalue.Duration("1d")
+    )
+
+    self._CreateHuntAndAssignClients(
+        client_rule_set=foreman_rules.ForemanClientRuleSet(),
+        client_rate=0,
+        args=self.ClientFileFinderHuntArgs(),
+    )
+
+    flows = data_store.REL_DB.ReadAllFlowObjects(client_id=client_id)
+    self.assertEmpty(flows)
+
+  def testAssigningClientsOnStartPausesHuntOnReachingClientLimit(self):
+    self.SetupClients(10)
+
+    hunt_id = self._CreateHuntAndAssignClients(
+        client_rule_set=foreman_rules.ForemanClientRuleSet(),
+        client_rate=0,
+        client_limit=5,
+        args=self.ClientFileFinderHuntArgs(),
+    )
+
+    hunt_obj = data_store.REL_DB.ReadHuntObject(hunt_id)
+    self.assertEqual(hunt_obj.hunt_state, hunts_pb2.Hunt.HuntState.PAUSED)
+    self.assertEqual(
+        hunt_obj.hunt_state_reason,
+        hunts_pb2.Hunt.HuntStateReason.TOTAL_CLIENTS_EXCEEDED,
+    )
+
+    hunt_counters = data_store.REL_DB.ReadHuntCounters(hunt_id)
+    self.assertEqual(hunt_counters.num_clients, 5)
+
+  def testAssigningClientsOnStartAppliesClientRate(self):
+    now = rdfvalue.RDFDatetime.Now()
+    self.SetupClients(10)
+
+    self._CreateHuntAndAssignClients(
+        client_rule_set=foreman_rules.ForemanClientRuleSet(),
+        client_rate=1,
+        args=self.ClientFileFinderHuntArgs(),
+    )
+
+    requests = data_store.REL_DB.ReadFlowProcessingRequests()
+    requests.sort(key=lambda r: r.delivery_time)
+
+    # The first flow is started immediately and has been processed already.
+    self.assertLen(requests, 9)
+    for i, r in enumerate(requests):
+      delivery_time = rdfvalue.RDFDatetime.FromMicrosecondsSinceEpoch(
+          r.delivery_time
+      )
+      time_diff = delivery_time - (
+          now + rdfvalue.Duration.From(1, rdfvalue.MINUTES) * (i + 1)
+      )
+      self.assertLess(time_diff, rdfvalue.Duration.From(5, rdfvalue.SECONDS))
+
   def testResultsAreCorrectlyCounted(self):
     path = os.path.join(self.base_path, "*hello*")
     num_files = len(glob.glob(path))
@@ -581,6 +832,82 @@ class HuntTest(
         hunt_test_lib.StatefulDummyHuntOutputPlugin.data, [0, 1, 2, 3, 4]
     )
 
+  def testAsyncOutputPluginsProcessResultsInBatches(self):
+    hunt_test_lib.DummyHuntOutputPlugin.num_calls = 0
+    hunt_test_lib.DummyHuntOutputPlugin.num_responses = 0
+
+    plugin_descriptor = rdf_output_plugin.OutputPluginDescriptor(
+        plugin_name="DummyHuntOutputPlugin"
+    )
+    with test_lib.ConfigOverrider({"Worker.async_hunt_output_plugins": True}):
+      hunt_id, client_ids = self._CreateAndRunHunt(
+          num_clients=5,
+          client_mock=hunt_test_lib.SampleHuntMock(failrate=-1),
+          client_rule_set=foreman_rules.ForemanClientRuleSet(),
+          client_rate=0,
+          args=self.ClientFileFinderHuntArgs(),
+          output_plugins=[plugin_descriptor],
+      )
+
+    # Results are only queued while the hunt flows are processed.
+    self.assertEqual(hunt_test_lib.DummyHuntOutputPlugin.num_calls, 0)
+
+    requests = [
+        r
+        for r in data_store.REL_DB.ReadMessageHandlerRequests()
+        if r.handler_name
+        == hunt_output_plugins.HuntOutputPluginsHandler.handler_name
+    ]
+    self.assertLen(requests, 5)
+
+    with self.assertStatsCounterDelta(
+        5,
+        flow_base.HUNT_RESULTS_RAN_THROUGH_PLUGIN,
+        fields=["DummyHuntOutputPlugin"],
+    ):
+      worker_lib.ProcessMessageHandlerRequests(requests)
+
+    self.assertEqual(hunt_test_lib.DummyHuntOutputPlugin.num_calls, 1)
+    self.assertEqual(hunt_test_lib.DummyHuntOutputPlugin.num_responses, 5)
+    self.assertEmpty(data_store.REL_DB.ReadMessageHandlerRequests())
+
+    logs = data_store.REL_DB.ReadHuntOutputPluginLogEntries(
+        hunt_id,
+        output_plugin_id="0",
+        offset=0,
+        count=sys.maxsize,
+        with_type=flows_pb2.FlowOutputPluginLogEntry.LogEntryType.LOG,
+    )
+    self.assertCountEqual([l.client_id for l in logs], client_ids)
+    for l in logs:
+      self.assertEqual(l.message, "Processed 1 replies.")
+
+  def testAsyncOutputPluginsUpdateStateOncePerBatch(self):
+    hunt_test_lib.StatefulDummyHuntOutputPlugin.data = []
+
+    plugin_descriptor = rdf_output_plugin.OutputPluginDescriptor(
+        plugin_name="StatefulDummyHuntOutputPlugin"
+    )
+    with test_lib.ConfigOverrider({"Worker.async_hunt_output_plugins": True}):
+      hunt_id, _ = self._CreateAndRunHunt(
+          num_clients=5,
+          client_mock=hunt_test_lib.SampleHuntMock(failrate=-1),
+          client_rule_set=foreman_rules.ForemanClientRuleSet(),
+          client_rate=0,
+          args=self.ClientFileFinderHuntArgs(),
+          output_plugins=[plugin_descriptor],
+      )
+
+    worker_lib.ProcessMessageHandlerRequests(
+        data_store.REL_DB.ReadMessageHandlerRequests()
+    )
+
+    self.assertListEqual(hunt_test_lib.StatefulDummyHuntOutputPlugin.data, [0])
+    states = data_store.REL_DB.ReadHuntOutputPluginsStates(hunt_id)
+    self.assertLen(states, 1)
+    state = mig_protodict.ToRDFAttributedDict(states[0].plugin_state)
+    self.assertEqual(state.index, 1)
+
   def testOutputPluginFlushErrorIsLoggedProperly(self):
     plugin_descriptor = rdf_output_plugin.OutputPluginDescriptor(
         plugin_name="FailingInFlushDummyHuntOutputPlugin"
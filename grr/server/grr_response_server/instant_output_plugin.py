@@ -5,6 +5,8 @@ import abc
 import functools
 import logging
 import re
+import struct
+import tempfile
 from typing import Callable, Iterable, Iterator, Optional, Sequence
 
 from google.protobuf import message
@@ -79,7 +81,8 @@ class InstantOutputPluginProto:
         Each value is a FlowResult wrapping a value of a type_url type.
         type_url_results_generator_fn may be called multiple times within 1
         ProcessValuesOfType() call - for example, when multiple passes over the
-        data are required.
+        data are required. Plugins should avoid that where possible, as every
+        call reads the values from the database again.
     """
     raise NotImplementedError()
 
@@ -91,6 +94,68 @@ class InstantOutputPluginProto:
     """
 
 
+class _ExportedValuesBuffer:
+  """Buffers exported values of a single type, spilling them to disk if big.
+
+  Values are kept in memory until their total serialized size exceeds the
+  given budget. From then on all values are written to a temporary file as
+  length-prefixed serialized protos.
+  """
+
+  _LENGTH_FORMAT = "<I"
+  _LENGTH_SIZE = struct.calcsize(_LENGTH_FORMAT)
+
+  def __init__(
+      self, value_cls: type[message.Message], max_memory_bytes: int
+  ) -> None:
+    self._value_cls = value_cls
+    self._max_memory_bytes = max_memory_bytes
+    self._values: list[message.Message] = []
+    self._size_bytes = 0
+    self._file = None
+
+  def Add(self, value: message.Message) -> None:
+    if self._file is not None:
+      self._Write(value)
+      return
+
+    self._values.append(value)
+    self._size_bytes += value.ByteSize()
+    if self._size_bytes > self._max_memory_bytes:
+      self._file = tempfile.TemporaryFile()
+      for buffered_value in self._values:
+        self._Write(buffered_value)
+      self._values = []
+
+  def _Write(self, value: message.Message) -> None:
+    data = value.SerializeToString()
+    self._file.write(struct.pack(self._LENGTH_FORMAT, len(data)))
+    self._file.write(data)
+
+  def Read(self) -> Iterator[message.Message]:
+    """Yields all buffered values in the order they were added."""
+    if self._file is None:
+      yield from self._values
+      return
+
+    self._file.seek(0)
+    while True:
+      length = self._file.read(self._LENGTH_SIZE)
+      if not length:
+        break
+
+      (size,) = struct.unpack(self._LENGTH_FORMAT, length)
+      value = self._value_cls()
+      value.ParseFromString(self._file.read(size))
+      yield value
+
+  def Close(self) -> None:
+    self._values = []
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+
+
 class InstantOutputPluginWithExportConversionProto(InstantOutputPluginProto):
   """Instant output plugin that flattens data before exporting."""
 
@@ -98,6 +163,10 @@ class InstantOutputPluginWithExportConversionProto(InstantOutputPluginProto):
 
   BATCH_SIZE = 5000
 
+  # Exported values of additional types are kept in memory up to this size
+  # (per type) and spilled to a temporary file afterwards.
+  MAX_BUFFERED_BYTES_PER_TYPE = 64 * 1024 * 1024
+
   def __init__(self, *args, **kwargs):
     super().__init__(*args, **kwargs)
     self._cached_metadata = {}
@@ -143,78 +212,76 @@ class InstantOutputPluginWithExportConversionProto(InstantOutputPluginProto):
       return
 
     original_rdf_type_name = db_utils.TypeURLToRDFTypeName(type_url)
-    next_types = set()
-    processed_types = set()
-    while True:
-      converted_responses = export.FetchMetadataAndConvertFlowResults(
-          source_urn=self.source_urn,
-          options=export_pb2.ExportOptions(),
-          flow_results=type_url_results_generator_fn(),
-          cached_metadata=self._cached_metadata,
-      )
+    converted_responses = export.FetchMetadataAndConvertFlowResults(
+        source_urn=self.source_urn,
+        options=export_pb2.ExportOptions(),
+        flow_results=type_url_results_generator_fn(),
+        cached_metadata=self._cached_metadata,
+    )
 
-      generator = self._GenerateSingleExportedTypeIteration(
-          next_types, processed_types, converted_responses
+    # Results are read and converted only once. Values of the first exported
+    # type are streamed to the plugin directly, values of all other types are
+    # buffered and passed to the plugin once the conversion is done.
+    buffers: dict[type[message.Message], _ExportedValuesBuffer] = {}
+    try:
+      generator = self._GenerateFirstExportedTypeAndBufferOthers(
+          converted_responses, buffers
       )
-
       for chunk in self.ProcessUniqueOriginalExportedTypePair(
           original_rdf_type_name, generator
       ):
         yield chunk
 
-      if not next_types:
-        break
-
-  def _GenerateSingleExportedTypeIteration(
+      # Make sure all the values got buffered even if the plugin did not
+      # consume all values of the first type.
+      for _ in generator:
+        pass
+
+      for values_buffer in buffers.values():
+        for chunk in self.ProcessUniqueOriginalExportedTypePair(
+            original_rdf_type_name, values_buffer.Read()
+        ):
+          yield chunk
+    finally:
+      for values_buffer in buffers.values():
+        values_buffer.Close()
+
+  def _GenerateFirstExportedTypeAndBufferOthers(
       self,
-      next_types: set[type[message.Message]],
-      processed_types: set[type[message.Message]],
       converted_responses: Iterable[message.Message],
-  ):
-    """Yields responses of a given type only.
-
-    _GenerateSingleExportedTypeIteration iterates through converted_responses
-    and only yields responses of the same type. The type is either popped from
-    next_types or inferred from the first item of converted_responses.
-    The type is added to a set of processed_types.
-
-    Along the way _GenerateSingleExportedTypeIteration updates next_types set.
-    All newly encountered and not previously processed types are added to
-    next_types set.
+      buffers: dict[type[message.Message], _ExportedValuesBuffer],
+  ) -> Iterator[message.Message]:
+    """Yields responses of the first type, buffering responses of other types.
 
-    Calling _GenerateSingleExportedTypeIteration multiple times allows doing
-    multiple passes on converted responses and emitting converted responses
-    of the same type continuously (so that they can be written into
-    the same file by the plugin).
+    The type of the first converted response determines which responses are
+    yielded. Responses of all other types are added to per-type buffers (in
+    the order in which the types were first encountered).
 
     Args:
-      next_types: List of value type classes that will be used in further
-        iterations.
-      processed_types: List of value type classes that have been used already.
       converted_responses: Iterable with values to iterate over.
+      buffers: A dictionary to put buffers of values of other types into.
 
     Yields:
-      Values from converted_response with the same type. Type is either
-      popped from the next_types set or inferred from the first
-      converted_responses value.
+      Values from converted_responses that have the type of the first value.
     """
-    if not next_types:
-      current_type = None
-    else:
-      current_type = next_types.pop()
-      processed_types.add(current_type)
+    first_type = None
 
     for converted_response in converted_responses:
-      if not current_type:
-        current_type = converted_response.__class__
-        processed_types.add(current_type)
+      response_type = converted_response.__class__
+      if first_type is None:
+        first_type = response_type
 
-      if converted_response.__class__ != current_type:
-        if converted_response.__class__ not in processed_types:
-          next_types.add(converted_response.__class__)
+      if response_type == first_type:
+        yield converted_response
         continue
 
-      yield converted_response
+      values_buffer = buffers.get(response_type)
+      if values_buffer is None:
+        values_buffer = _ExportedValuesBuffer(
+            response_type, self.MAX_BUFFERED_BYTES_PER_TYPE
+        )
+        buffers[response_type] = values_buffer
+      values_buffer.Add(converted_response)
 
 
 def GetExportedFlowResults(
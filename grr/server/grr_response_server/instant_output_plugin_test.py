@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 import io
 from typing import Iterable, Iterator
+from unittest import mock
 
 from absl import app
 
@@ -170,6 +171,52 @@ class InstantOutputPluginWithExportConversionProtoTest(
         ],
     )
 
+  @export_test_lib.WithAllExportConverters
+  @export_test_lib.WithExportConverterProto(TestConverterProto1)
+  @export_test_lib.WithExportConverterProto(TestConverterProto2)
+  def testReadsValuesOnlyOnceWithTwoExportedValues(self):
+    value = tests_pb2.DummySrcValueProto2(value="foo")
+    packed_value = any_pb2.Any()
+    packed_value.Pack(value)
+    flow_results = [
+        flows_pb2.FlowResult(client_id=self.client_id, payload=packed_value)
+    ]
+    results_fn = mock.Mock(return_value=flow_results)
+
+    chunks = list(
+        self.plugin.ProcessValuesOfType(packed_value.type_url, results_fn)
+    )
+
+    results_fn.assert_called_once()
+    self.assertEqual(
+        b"".join(chunks).decode("utf-8").split("\n"),
+        [
+            "Original: DummySrcValueProto2",
+            "Exported value: exp1-foo",
+            "Original: DummySrcValueProto2",
+            "Exported value: exp2-foo",
+            "",
+        ],
+    )
+
+  @export_test_lib.WithAllExportConverters
+  @export_test_lib.WithExportConverterProto(TestConverterProto1)
+  @export_test_lib.WithExportConverterProto(TestConverterProto2)
+  def testSpillsBufferedValuesToDisk(self):
+    values = [tests_pb2.DummySrcValueProto2(value=str(i)) for i in range(10)]
+
+    with mock.patch.object(self.plugin, "MAX_BUFFERED_BYTES_PER_TYPE", 16):
+      lines = self.ProcessValuesToLines({tests_pb2.DummySrcValueProto2: values})
+
+    self.assertListEqual(
+        lines,
+        ["Start", "Original: DummySrcValueProto2"]
+        + [f"Exported value: exp1-{i}" for i in range(10)]
+        + ["Original: DummySrcValueProto2"]
+        + [f"Exported value: exp2-{i}" for i in range(10)]
+        + ["Finish"],
+    )
+
 
 class GetExportedFlowResultsTest(test_lib.GRRBaseTest):
 
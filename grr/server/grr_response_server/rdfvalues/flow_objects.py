@@ -130,6 +130,13 @@ class FlowResult(rdf_structs.RDFProtoStruct):
     )
 
 
+class FlowResultBatch(rdf_structs.RDFProtoStruct):
+  protobuf = flows_pb2.FlowResultBatch
+  rdf_deps = [
+      FlowResult,
+  ]
+
+
 class FlowError(rdf_structs.RDFProtoStruct):
   protobuf = flows_pb2.FlowError
   rdf_deps = [rdfvalue.RDFDatetime]
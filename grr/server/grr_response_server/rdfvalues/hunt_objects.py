@@ -141,3 +141,8 @@ class HuntMetadata(rdf_structs.RDFProtoStruct):
       rdfvalue.RDFDatetime,
       rdfvalue.DurationSeconds,
   ]
+
+
+class HuntClientAssignment(rdf_structs.RDFProtoStruct):
+  protobuf = hunts_pb2.HuntClientAssignment
+  rdf_deps = []
@@ -1,12 +1,16 @@
 #!/usr/bin/env python
 """Stats server implementation."""
 
+from collections.abc import Callable
 import errno
 from http import server as http_server
 import ipaddress
+import json
 import logging
 import socket
 import threading
+from typing import Any
+from urllib import parse as urlparse
 
 import prometheus_client
 
@@ -14,7 +18,42 @@ from grr_response_core import config
 from grr_response_core.lib import utils
 from grr_response_server import base_stats_server
 
-StatsServerHandler = prometheus_client.MetricsHandler
+# Additional pages served by the stats server, keyed by their path. Every page
+# is rendered by a function receiving the query parameters of the request and
+# returning a JSON-serializable value.
+_JSON_PAGES: dict[str, Callable[[dict[str, str]], Any]] = {}
+
+
+def RegisterJSONPage(
+    path: str,
+    render_fn: Callable[[dict[str, str]], Any],
+) -> None:
+  """Registers a page serving JSON on the given path of the stats server."""
+  _JSON_PAGES[path] = render_fn
+
+
+class StatsServerHandler(prometheus_client.MetricsHandler):
+  """Serves Prometheus metrics and registered JSON pages."""
+
+  def do_GET(self):  # pylint: disable=invalid-name
+    url = urlparse.urlparse(self.path)
+    render_fn = _JSON_PAGES.get(url.path)
+    if render_fn is None:
+      super().do_GET()
+      return
+
+    params = dict(urlparse.parse_qsl(url.query))
+    try:
+      body = json.dumps(render_fn(params), indent=2).encode("utf-8")
+    except ValueError as e:
+      self.send_error(400, str(e))
+      return
+
+    self.send_response(200)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
 
 
 # Python's standard HTTP server implementation works through a IPv4 socket.
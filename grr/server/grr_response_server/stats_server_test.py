@@ -55,6 +55,23 @@ class StatsServerTest(
     self.assertEqual(families["foobars"].samples[0].value, 42)
 
 
+  def testJSONPage(self):
+    port = portpicker.pick_unused_port()
+
+    with mock.patch.dict(stats_server._JSON_PAGES):
+      stats_server.RegisterJSONPage(
+          "/foo", lambda params: {"bar": params.get("bar")}
+      )
+      server = stats_server.StatsServer("::1", port)
+      server.Start()
+      self.addCleanup(server.Stop)
+      res = requests.get("http://[::1]:{}/foo?bar=baz".format(port))
+
+    self.assertEqual(res.status_code, 200)
+    self.assertEqual(res.headers["Content-Type"], "application/json")
+    self.assertEqual(res.json(), {"bar": "baz"})
+
+
 def main(args):
   test_lib.main(args)
 
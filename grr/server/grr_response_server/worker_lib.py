@@ -3,8 +3,9 @@
 
 import logging
 import time
-from typing import Sequence
+from typing import Optional, Sequence
 
+from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import registry
 from grr_response_core.lib.util import collection
@@ -18,7 +19,6 @@ from grr_response_server import handler_registry
 from grr_response_server import server_stubs
 # pylint: enable=unused-import
 from grr_response_server.databases import db
-from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import mig_flow_objects
 from grr_response_server.rdfvalues import mig_objects
 
@@ -80,6 +80,7 @@ class GRRWorker(object):
   """A GRR worker."""
 
   message_handler_lease_time = rdfvalue.Duration.From(600, rdfvalue.SECONDS)
+  flow_processing_time = rdfvalue.Duration.From(6, rdfvalue.HOURS)
 
   def __init__(self):
     """Constructor."""
@@ -96,7 +97,13 @@ class GRRWorker(object):
         self.message_handler_lease_time,
         limit=100,
     )
-    data_store.REL_DB.RegisterFlowProcessingHandler(self.ProcessFlow)
+    batch_size = config.CONFIG["Worker.flow_processing_batch_size"]
+    if batch_size > 1:
+      data_store.REL_DB.RegisterFlowProcessingBatchHandler(
+          self.ProcessFlows, batch_size
+      )
+    else:
+      data_store.REL_DB.RegisterFlowProcessingHandler(self.ProcessFlow)
 
     try:
       # The main thread just keeps sleeping and listens to keyboard interrupt
@@ -107,8 +114,13 @@ class GRRWorker(object):
       logging.info("Caught interrupt, exiting.")
       self.Shutdown()
 
-  def _ReleaseProcessedFlow(self, flow_obj: rdf_flow_objects.Flow) -> bool:
+  def _ReleaseProcessedFlow(self, flow_obj: flow_base.FlowBase) -> bool:
     """Release a processed flow if the processing deadline is not exceeded."""
+    self._PrepareRelease(flow_obj)
+    return data_store.REL_DB.ReleaseProcessedFlow(self._ToProtoFlow(flow_obj))
+
+  def _PrepareRelease(self, flow_obj: flow_base.FlowBase) -> None:
+    """Checks the lease of a processed flow and flushes its messages."""
     rdf_flow = flow_obj.rdf_flow
     if rdf_flow.processing_deadline < rdfvalue.RDFDatetime.Now():
       raise flow_base.FlowError(
@@ -121,36 +133,131 @@ class GRRWorker(object):
       )
     flow_obj.FlushQueuedMessages()
 
-    proto_flow = mig_flow_objects.ToProtoFlow(rdf_flow)
-    return data_store.REL_DB.ReleaseProcessedFlow(proto_flow)
+  def _ToProtoFlow(self, flow_obj: flow_base.FlowBase) -> flows_pb2.Flow:
+    rdf_flow = flow_obj.rdf_flow
+    flow_base.FLOW_RDF_CONVERSIONS.Increment(fields=[rdf_flow.flow_class_name])
+    return mig_flow_objects.ToProtoFlow(rdf_flow)
 
   def ProcessFlow(
       self, flow_processing_request: flows_pb2.FlowProcessingRequest
   ) -> None:
     """The callback for the flow processing queue."""
-    client_id = flow_processing_request.client_id
-    flow_id = flow_processing_request.flow_id
-
     data_store.REL_DB.AckFlowProcessingRequests([flow_processing_request])
 
+    self._LeaseAndProcessFlow(
+        flow_processing_request.client_id, flow_processing_request.flow_id
+    )
+
+  def ProcessFlows(
+      self, flow_processing_requests: Sequence[flows_pb2.FlowProcessingRequest]
+  ) -> None:
+    """The callback for the flow processing queue in batch mode.
+
+    Requests are acknowledged, their flows leased, the flows' requests and
+    responses read and the processed flows released with a single database
+    call each. Flows that can't be leased in bulk are processed one by one so
+    that errors are handled exactly as in ProcessFlow. Flows that can't be
+    released because new requests became ready meanwhile continue processing
+    one by one as well.
+
+    Args:
+      flow_processing_requests: Requests for flows to process.
+    """
+    data_store.REL_DB.AckFlowProcessingRequests(flow_processing_requests)
+
+    flow_keys = list(
+        dict.fromkeys((r.client_id, r.flow_id) for r in flow_processing_requests)
+    )
+
+    flows = data_store.REL_DB.LeaseFlowsForProcessing(
+        flow_keys, processing_time=self.flow_processing_time
+    )
+    request_dicts = data_store.REL_DB.ReadFlowRequestsForFlows(list(flows))
+
+    to_release = []
+    for client_id, flow_id in flow_keys:
+      try:
+        flow = flows.get((client_id, flow_id))
+        if flow is None:
+          self._LeaseAndProcessFlow(client_id, flow_id)
+          continue
+
+        flow_obj = self._ProcessReadyRequests(
+            flow, request_dicts[(client_id, flow_id)]
+        )
+        if flow_obj is not None:
+          self._PrepareRelease(flow_obj)
+          to_release.append(flow_obj)
+      except Exception as e:  # pylint: disable=broad-except
+        logging.exception(
+            "Error while processing flow %s/%s: %s", client_id, flow_id, e
+        )
+
+    if not to_release:
+      return
+
+    released = data_store.REL_DB.ReleaseProcessedFlows(
+        [self._ToProtoFlow(flow_obj) for flow_obj in to_release]
+    )
+    for flow_obj in to_release:
+      rdf_flow = flow_obj.rdf_flow
+      try:
+        self._FinishProcessing(
+            flow_obj, released[(rdf_flow.client_id, rdf_flow.flow_id)]
+        )
+      except Exception as e:  # pylint: disable=broad-except
+        logging.exception(
+            "Error while processing flow %s/%s: %s",
+            rdf_flow.client_id,
+            rdf_flow.flow_id,
+            e,
+        )
+
+  def _LeaseAndProcessFlow(self, client_id: str, flow_id: str) -> None:
+    """Leases a single flow and processes all its ready requests."""
     try:
       flow = data_store.REL_DB.LeaseFlowForProcessing(
           client_id,
           flow_id,
-          processing_time=rdfvalue.Duration.From(6, rdfvalue.HOURS),
+          processing_time=self.flow_processing_time,
       )
     except db.ParentHuntIsNotRunningError:
       flow_base.TerminateFlow(client_id, flow_id, "Parent hunt stopped.")
       return
 
+    flow_obj = self._ProcessReadyRequests(flow)
+    if flow_obj is not None:
+      self._FinishProcessing(flow_obj, self._ReleaseProcessedFlow(flow_obj))
+
+  def _ProcessReadyRequests(
+      self, flow: flows_pb2.Flow, request_dict=None
+  ) -> Optional[flow_base.FlowBase]:
+    """Processes ready requests of a flow leased by this worker.
+
+    Args:
+      flow: The leased flow.
+      request_dict: Requests of the flow, read from the database if not given.
+
+    Returns:
+      The flow object to release, None if the flow is not running.
+
+    Raises:
+      FlowHasNothingToProcessError: If there was nothing to process.
+    """
+    client_id = flow.client_id
+    flow_id = flow.flow_id
+
+    # TODO(user): FlowBase keeps its state in an RDF flow object, so every
+    # flow is converted here and back in `_ToProtoFlow`. A proto-native
+    # execution mode avoiding these conversions is not implemented yet.
     rdf_flow = mig_flow_objects.ToRDFFlow(flow)
+    flow_base.FLOW_RDF_CONVERSIONS.Increment(fields=[rdf_flow.flow_class_name])
 
-    first_request_to_process = rdf_flow.next_request_to_process
     logging.info(
         "Processing Flow %s/%s/%d (%s).",
         client_id,
         flow_id,
-        first_request_to_process,
+        rdf_flow.next_request_to_process,
         rdf_flow.flow_class_name,
     )
 
@@ -164,38 +271,49 @@ class GRRWorker(object):
           flow_id,
           client_id,
       )
-      return
+      return None
 
-    processed, incrementally_processed = flow_obj.ProcessAllReadyRequests()
+    processed, incrementally_processed = flow_obj.ProcessAllReadyRequests(
+        request_dict
+    )
     if processed == 0 and incrementally_processed == 0:
       raise FlowHasNothingToProcessError(
           "Unable to process any requests for flow %s on client %s."
           % (flow_id, client_id)
       )
 
-    while not self._ReleaseProcessedFlow(flow_obj):
+    return flow_obj
+
+  def _FinishProcessing(
+      self, flow_obj: flow_base.FlowBase, released: bool
+  ) -> None:
+    """Processes a flow until it is released to the database."""
+    rdf_flow = flow_obj.rdf_flow
+    client_id = rdf_flow.client_id
+    flow_id = rdf_flow.flow_id
+
+    while not released:
       processed, incrementally_processed = flow_obj.ProcessAllReadyRequests()
       if processed == 0 and incrementally_processed == 0:
         raise FlowHasNothingToProcessError(
             "%s/%s: ReleaseProcessedFlow returned false but no "
             "request could be processed (next req: %d)."
-            % (client_id, flow_id, flow_obj.rdf_flow.next_request_to_process)
+            % (client_id, flow_id, rdf_flow.next_request_to_process)
         )
+      released = self._ReleaseProcessedFlow(flow_obj)
 
     if flow_obj.IsRunning():
       logging.info(
-          "Processing Flow %s/%s/%d (%s) done, next request to process: %d.",
+          "Processing Flow %s/%s (%s) done, next request to process: %d.",
           client_id,
           flow_id,
-          first_request_to_process,
           rdf_flow.flow_class_name,
           rdf_flow.next_request_to_process,
       )
     else:
       logging.info(
-          "Processing Flow %s/%s/%d (%s) done, flow is done.",
+          "Processing Flow %s/%s (%s) done, flow is done.",
           client_id,
           flow_id,
-          first_request_to_process,
           rdf_flow.flow_class_name,
       )
@@ -10,8 +10,6 @@ import subprocess
 import tempfile
 import types
 
-from grr_response_client import actions
-from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_server import action_registry
@@ -23,13 +21,6 @@ from grr.test_lib import worker_mocks
 class EmptyActionTest(test_lib.GRRBaseTest):
   """Test the client Actions."""
 
-  def setUp(self):
-    super().setUp()
-    # Reset the global last progress time to prevent order-dependent tests.
-    actions.ActionPlugin.last_progress_time = (
-        rdfvalue.RDFDatetime.FromSecondsSinceEpoch(0)
-    )
-
   def RunAction(self, action_cls, arg=None, grr_worker=None):
     if arg is None:
       arg = rdf_flows.GrrMessage()
@@ -10,7 +10,6 @@ from typing import Optional, Union
 from unittest import mock
 
 from google.protobuf import any_pb2
-from grr_response_client import actions
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import registry
 from grr_response_core.lib.rdfvalues import client as rdf_client
@@ -301,14 +300,6 @@ class EchoLogFlowProto(
 class FlowTestsBaseclass(test_lib.GRRBaseTest):
   """The base class for all flow tests."""
 
-  def setUp(self):
-    super().setUp()
-
-    # Some tests run with fake time and leak into the last_progress_time. To
-    # prevent getting negative durations, we clean up here.
-    actions.ActionPlugin.last_progress_time = (
-        rdfvalue.RDFDatetime.FromSecondsSinceEpoch(0))
-
   def assertFlowLoggedRegex(
       self,
       client_id: str,